@@ -0,0 +1,124 @@
+# Large file open benchmark.
+# Loads the same generated file into a QTextEdit filled with setText (the old editor base, which also
+# runs rich text detection), a bare QPlainTextEdit, and CodeEditor (QPlainTextEdit plus the gutter,
+# word index and completer), then jumps to the end and types one character at the top.
+# Each widget runs in a fresh process so the peak memory of one run cannot hide the other.
+#
+# Usage: python benchmarks/bench_editor_open.py [--size-mb N] [--widget NAME] [--highlight]
+
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+CORPUS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'corpus', 'sample.py')
+
+WIDGETS = ['textedit', 'plaintext', 'codeeditor']
+
+# Repeats the Python corpus sample until the text reaches size_mb megabytes.
+def build_text(size_mb):
+    with open(CORPUS_FILE, encoding='utf-8') as f:
+        sample = f.read()
+    target = int(size_mb * 1024 * 1024)
+    return (sample * (target // len(sample) + 1))[:target]
+
+# Peak resident memory of this process in megabytes (ru_maxrss is in kilobytes on Linux).
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+# Runs one widget in this process and prints its measurements on one line.
+def run_widget(widget_name, size_mb, highlight):
+    from PyQt5.QtWidgets import QApplication, QTextEdit, QPlainTextEdit
+    from PyQt5.QtGui import QTextCursor
+    from PyQt5.QtCore import QTimer
+    app = QApplication(sys.argv)
+    import ide
+
+    text = build_text(size_mb)
+    baseline = peak_rss_mb()
+
+    start = time.perf_counter()
+    if widget_name == 'textedit':
+        widget = QTextEdit()
+        widget.setText(text)
+        if highlight:
+            highlighter = ide.GrammarHighlighter(widget.document(), ide.get_grammar('python'))
+            highlighter.start()
+    elif widget_name == 'plaintext':
+        widget = QPlainTextEdit()
+        widget.setPlainText(text)
+        if highlight:
+            highlighter = ide.GrammarHighlighter(widget.document(), ide.get_grammar('python'))
+            highlighter.start()
+    else:
+        widget = ide.CodeEditor()
+        widget.setPlainText(text)
+        if highlight:
+            widget.set_highlighter('python')
+    loaded = time.perf_counter()
+
+    widget.resize(1000, 800)
+    widget.show()
+    app.processEvents()
+    shown = time.perf_counter()
+
+    # Moving the cursor to the end makes the widget lay out everything above it
+    cursor = widget.textCursor()
+    cursor.movePosition(QTextCursor.End)
+    widget.setTextCursor(cursor)
+    widget.ensureCursorVisible()
+    app.processEvents()
+    at_end = time.perf_counter()
+
+    cursor.movePosition(QTextCursor.Start)
+    widget.setTextCursor(cursor)
+    widget.ensureCursorVisible()
+    app.processEvents()
+    edit_start = time.perf_counter()
+    cursor.insertText('x')
+    app.processEvents()
+    edited = time.perf_counter()
+
+    print(f"{widget_name} {loaded - start:.3f} {shown - loaded:.3f} {at_end - shown:.3f} {edited - edit_start:.4f} "
+          f"{peak_rss_mb() - baseline:.1f} {widget.document().blockCount()}")
+    sys.stdout.flush()
+    QTimer.singleShot(0, app.quit) # Let aboutToQuit stop the editor's worker threads
+    app.exec_()
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark opening a large file in the editor widgets.")
+    parser.add_argument('--size-mb', type=float, default=12, help="Size of the generated file in megabytes.")
+    parser.add_argument('--widget', choices=WIDGETS, help="Run only this widget.")
+    parser.add_argument('--highlight', action='store_true', help="Also attach the Python highlighter.")
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_widget(args.widget, args.size_mb, args.highlight)
+        return
+
+    env = dict(os.environ)
+    env.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    print(f"File size: {args.size_mb:g} MB of Python source")
+    print(f"{'widget':<12} {'load s':>8} {'show s':>8} {'to end s':>9} {'edit s':>8} {'peak MB':>9} {'lines':>9}")
+    for widget_name in ([args.widget] if args.widget else WIDGETS):
+        command = [sys.executable, os.path.abspath(__file__), '--child', '--widget', widget_name,
+                   '--size-mb', str(args.size_mb)]
+        if args.highlight:
+            command.append('--highlight')
+        result = subprocess.run(command, env=env, capture_output=True, text=True)
+        lines = [line for line in result.stdout.splitlines() if line.startswith(widget_name + ' ')]
+        if result.returncode != 0 or not lines:
+            print(f"{widget_name:<12} failed: {result.stderr.strip().splitlines()[-1:] or result.returncode}")
+            continue
+        name, load, show, to_end, edit, peak, blocks = lines[-1].split()
+        print(f"{name:<12} {float(load):>8.3f} {float(show):>8.3f} {float(to_end):>9.3f} {float(edit):>8.4f} "
+              f"{float(peak):>9.1f} {int(blocks):>9}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+# Find bar benchmark.
+# Loads a generated document into a CodeEditor and times the find bar: collecting every match, in
+# time slices or, for a long document, in worker processes (with the longest event loop stall while
+# it runs), redrawing the viewport highlights on scroll, and Replace All in one edit block. For
+# comparison it counts the same matches with repeated QPlainTextEdit.find calls, as the old dialog
+# would have to, and replaces them with one cursor edit per match outside an edit block.
+#
+# Usage: python benchmarks/bench_find_bar.py [--lines N] [--query TEXT] [--replace-lines N]
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Every line has one match of 'needle' and a near miss.
+def build_text(lines):
+    return "".join(f"value_{i} = compute(needle, {i}) + needless_{i % 97}\n" for i in range(lines))
+
+# Processes events until done() is true; returns (seconds, longest stall between 1 ms timer ticks).
+def run_until(app, done):
+    from PyQt5.QtCore import QTimer
+    ticks = []
+    timer = QTimer()
+    timer.timeout.connect(lambda: ticks.append(time.perf_counter()))
+    timer.start(1)
+    start = time.perf_counter()
+    while not done():
+        app.processEvents()
+        time.sleep(0.001) # As the event loop would, leaving the CPU to search workers
+    total = time.perf_counter() - start
+    timer.stop()
+    gaps = [b - a for a, b in zip([start] + ticks, ticks)] or [total]
+    return total, max(gaps)
+
+def new_editor(ide, text):
+    editor = ide.CodeEditor()
+    editor.resize(1000, 700)
+    editor.setPlainText(text)
+    editor._completion_timer.stop() # A completion request would copy the whole document mid-measurement
+    editor.show()
+    return editor
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the find bar.")
+    parser.add_argument('--lines', type=int, default=500000, help="Lines in the generated document.")
+    parser.add_argument('--query', default='needle', help="Text to find.")
+    parser.add_argument('--replace-lines', type=int, default=50000, help="Lines in the Replace All document.")
+    args = parser.parse_args()
+
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PyQt5.QtWidgets import QApplication, QMainWindow
+    from PyQt5.QtGui import QTextCursor, QTextDocument
+    app = QApplication(sys.argv)
+    import ide
+
+    text = build_text(args.lines)
+    print(f"Document: {args.lines} lines, {len(text) / 1024 / 1024:.1f} MB")
+    editor = new_editor(ide, text)
+    window = QMainWindow() # Gives the bar a status bar to report to
+    bar = ide.FindBar(window)
+    bar.show()
+    bar.set_editor(editor)
+
+    # Old: the dialog had no count; getting one means calling find until it fails
+    start = time.perf_counter()
+    editor.moveCursor(QTextCursor.Start)
+    legacy_count = 0
+    while editor.find(args.query, QTextDocument.FindWholeWords):
+        legacy_count += 1
+    legacy_count_time = time.perf_counter() - start
+    start = time.perf_counter()
+    editor.moveCursor(QTextCursor.Start)
+    editor.find("not_in_the_document")
+    legacy_miss_time = time.perf_counter() - start
+
+    editor.moveCursor(QTextCursor.Start)
+    bar.whole_word_checkbox.setChecked(True)
+    bar.find_input.setText(args.query)
+    bar.restart_scan()
+    count_time, count_stall = run_until(app, lambda: not bar.is_searching())
+    bar.find_input.setText("not_in_the_document")
+    bar.restart_scan()
+    miss_time, miss_stall = run_until(app, lambda: not bar.is_searching())
+
+    bar.find_input.setText(args.query)
+    bar.restart_scan()
+    run_until(app, lambda: not bar.is_searching())
+    scroll_bar = editor.verticalScrollBar()
+    times = []
+    for step in range(50):
+        start = time.perf_counter()
+        scroll_bar.setValue(scroll_bar.maximum() * step // 50)
+        app.processEvents()
+        times.append(time.perf_counter() - start)
+    scroll_ms = sum(times) / len(times) * 1000
+
+    print(f"{'':<22}{'count s':>9}{'GUI stall ms':>14}{'miss s':>8}{'miss stall ms':>15}{'matches':>9}")
+    print(f"{'find calls (old)':<22}{legacy_count_time:>9.2f}{legacy_count_time * 1000:>14.0f}"
+          f"{legacy_miss_time:>8.2f}{legacy_miss_time * 1000:>15.0f}{legacy_count:>9}")
+    print(f"{'find bar':<22}{count_time:>9.2f}{count_stall * 1000:>14.0f}{miss_time:>8.2f}{miss_stall * 1000:>15.0f}{len(bar.starts):>9}")
+    print(f"Scroll with highlights: {scroll_ms:.1f} ms per step, {len(editor.extraSelections())} highlights in view")
+    bar.set_editor(None)
+    editor.close()
+
+    replace_text = build_text(args.replace_lines)
+    print(f"Replace All on {args.replace_lines} lines:")
+    editor = new_editor(ide, replace_text)
+    start = time.perf_counter()
+    cursor = QTextCursor(editor.document())
+    replaced = 0
+    while True: # One edit per match, each laid out and undone on its own
+        cursor = editor.document().find(args.query, cursor, QTextDocument.FindWholeWords)
+        if cursor.isNull():
+            break
+        cursor.insertText("haystack")
+        replaced += 1
+    app.processEvents()
+    legacy_time = time.perf_counter() - start
+    editor.undo()
+    legacy_undo = replaced - editor.toPlainText().count('haystack')
+    editor.close()
+
+    editor = new_editor(ide, replace_text)
+    bar.set_editor(editor)
+    bar.find_input.setText(args.query)
+    bar.replace_input.setText("haystack")
+    bar.restart_scan()
+    start = time.perf_counter()
+    bar.replace_all() # Waits for the matches, then replaces them
+    run_until(app, lambda: not bar._pending_replace_all)
+    app.processEvents()
+    bar_time = time.perf_counter() - start
+    bar_replaced = editor.toPlainText().count('haystack')
+    editor.undo()
+    bar_undo = bar_replaced - editor.toPlainText().count('haystack')
+    print(f"{'':<22}{'seconds':>9}{'replaced':>10}{'reverted by one undo':>22}")
+    print(f"{'per-match edits (old)':<22}{legacy_time:>9.2f}{replaced:>10}{legacy_undo:>22}")
+    print(f"{'find bar':<22}{bar_time:>9.2f}{bar_replaced:>10}{bar_undo:>22}")
+    bar.set_editor(None)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+# Find in files benchmark.
+# Generates a workspace of many small source files (copies of the corpus samples, some with a rare
+# marker) and searches it with FileSearch, the worker-pool search behind the Find in Files panel,
+# while a timer on the GUI thread measures how long the event loop is held up. For comparison it
+# also searches the same files sequentially on the GUI thread, as a search without workers would.
+#
+# Usage: python benchmarks/bench_find_in_files.py [--files N] [--query TEXT] [--regex] [--workspace DIR]
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'corpus')
+
+# Writes 'count' files spread over nested directories; every 997th file gets the marker line.
+def build_workspace(root, count):
+    samples = []
+    for file_name in sorted(os.listdir(CORPUS_DIR)):
+        if not os.path.isfile(os.path.join(CORPUS_DIR, file_name)):
+            continue
+        with open(os.path.join(CORPUS_DIR, file_name), encoding='utf-8') as f:
+            samples.append((os.path.splitext(file_name)[1], f.read()))
+    for i in range(count):
+        directory = os.path.join(root, f"pkg{i // 1000:03d}", f"mod{i // 100 % 10}")
+        os.makedirs(directory, exist_ok=True)
+        extension, text = samples[i % len(samples)]
+        if i % 997 == 0:
+            text += "\n# needle_marker_42 found here\n"
+        with open(os.path.join(directory, f"file{i}{extension}"), 'w', encoding='utf-8') as f:
+            f.write(text)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark find in files.")
+    parser.add_argument('--files', type=int, default=100000, help="Files in the generated workspace.")
+    parser.add_argument('--query', default='needle_marker_42', help="Text to search for.")
+    parser.add_argument('--regex', action='store_true', help="Treat the query as a regular expression.")
+    parser.add_argument('--workspace', help="Search this directory instead of a generated one.")
+    args = parser.parse_args()
+
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PyQt5.QtWidgets import QApplication
+    from PyQt5.QtCore import QTimer
+    app = QApplication(sys.argv)
+    import ide
+
+    root = args.workspace or tempfile.mkdtemp(prefix='kodykoala_search_')
+    try:
+        if not args.workspace:
+            start = time.perf_counter()
+            build_workspace(root, args.files)
+            print(f"Generated {args.files} files in {time.perf_counter() - start:.1f} s")
+        regex = ide.compile_search_pattern(args.query, regex=args.regex)
+        ide.get_search_pool() # Start the workers outside the timed part, as the IDE keeps them between searches
+
+        # Event loop latency: the longest gap between ticks of a 5 ms timer
+        ticks = []
+        timer = QTimer()
+        timer.timeout.connect(lambda: ticks.append(time.perf_counter()))
+        timer.start(5)
+
+        first = []
+        search = ide.FileSearch(root, regex)
+        search.found.connect(lambda matches: first or first.append(time.perf_counter()))
+        start = time.perf_counter()
+        search.start()
+        while not search.isFinished():
+            app.processEvents()
+            time.sleep(0.001)
+        app.processEvents()
+        total = time.perf_counter() - start
+        timer.stop()
+        gaps = [b - a for a, b in zip(ticks, ticks[1:])] or [0]
+        print(f"Workers: {ide.FIND_IN_FILES_WORKERS}")
+        print(f"{'search':<12}{'files':>9}{'matches':>9}{'first ms':>10}{'total s':>9}{'max GUI stall ms':>18}")
+        first_ms = (first[0] - start) * 1000 if first else float('nan')
+        print(f"{'pool':<12}{search.searched:>9}{search.match_count:>9}{first_ms:>10.0f}{total:>9.2f}{max(gaps) * 1000:>18.0f}")
+
+        start = time.perf_counter()
+        searched, matches = ide.search_files(0, list(ide.iter_search_files(root)), regex)
+        total = time.perf_counter() - start
+        print(f"{'sequential':<12}{searched:>9}{len(matches):>9}{'':>10}{total:>9.2f}{total * 1000:>18.0f}")
+    finally:
+        if not args.workspace:
+            shutil.rmtree(root, ignore_errors=True)
+
+if __name__ == '__main__':
+    main()
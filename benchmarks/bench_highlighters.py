@@ -0,0 +1,178 @@
+# Highlighter throughput benchmark.
+# Compares the single-pass LanguageGrammar tokenizer with the per-language highlighter classes it
+# replaced (one regex per keyword plus one search loop per rule, over every block). The old classes
+# are loaded with git from the revision that added them, or from --baseline; both sides rehighlight
+# the same QTextDocument, so each pays for its QSyntaxHighlighter.setFormat calls.
+#
+# Usage: python benchmarks/bench_highlighters.py [--lines N] [--repeat N] [--language NAME] [--baseline REV]
+
+import argparse
+import ast
+import os
+import re
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ide import LANGUAGE_GRAMMARS, get_grammar, get_grammar_formats
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'corpus')
+
+# Corpus sample used for each language
+CORPUS_FILES = {
+    'python': 'sample.py', 'html': 'sample.html', 'css': 'sample.css',
+    'javascript': 'sample.js', 'java': 'sample.java', 'cpp': 'sample.cpp',
+    'csharp': 'sample.cs', 'scss': 'sample.scss', 'sql': 'sample.sql',
+    'swift': 'sample.swift', 'ruby': 'sample.rb', 'go': 'sample.go',
+    'rust': 'sample.rs', 'php': 'sample.php', 'perl': 'sample.pl',
+    'kotlin': 'sample.kt', 'react_native': 'sample.jsx', 'xml': 'sample.xml',
+    'json': 'sample.json', 'markdown': 'sample.md', 'shell': 'sample.sh',
+    'typescript': 'sample.ts', 'vue': 'sample.vue', 'dart': 'sample.dart',
+    'r': 'sample.r',
+}
+
+# Old highlighter class for each language
+LEGACY_CLASSES = {
+    'python': 'PythonHighlighter', 'html': 'HtmlHighlighter', 'css': 'CssHighlighter',
+    'javascript': 'JavaScriptHighlighter', 'java': 'JavaHighlighter', 'cpp': 'CppHighlighter',
+    'csharp': 'CSharpHighlighter', 'scss': 'ScssHighlighter', 'sql': 'SqlHighlighter',
+    'swift': 'SwiftHighlighter', 'ruby': 'RubyHighlighter', 'go': 'GoHighlighter',
+    'rust': 'RustHighlighter', 'php': 'PhpHighlighter', 'perl': 'PerlHighlighter',
+    'kotlin': 'KotlinHighlighter', 'react_native': 'ReactNativeHighlighter', 'xml': 'XmlHighlighter',
+    'json': 'JsonHighlighter', 'markdown': 'MarkdownHighlighter', 'shell': 'ShellHighlighter',
+    'typescript': 'TypeScriptHighlighter', 'vue': 'VueHighlighter', 'dart': 'DartHighlighter',
+    'r': 'RHighlighter',
+}
+
+# The revision that added the per-language highlighter classes to ide.py, so they are measured as
+# first written rather than as partly rewritten later. Returns None without that history, e.g. in a
+# shallow clone.
+def find_baseline_revision():
+    result = subprocess.run(['git', 'log', '--reverse', '--format=%H', '-S', 'class PythonHighlighter(', '--', 'ide.py'],
+                            cwd=REPO_DIR, capture_output=True, text=True)
+    commits = result.stdout.split()
+    return commits[0] if result.returncode == 0 and commits else None
+
+# True for a module constant the old classes may use, like SYNTAX_COLORS: an upper-case name bound
+# to a literal.
+def is_constant(node):
+    if not isinstance(node, ast.Assign) or not all(isinstance(t, ast.Name) and t.id.isupper() for t in node.targets):
+        return False
+    try:
+        ast.literal_eval(node.value)
+    except (ValueError, TypeError):
+        return False
+    return True
+
+# Loads the highlighter classes of the baseline revision, before the grammar engine replaced them.
+# Only the classes and module constants are taken from the old ide.py, so none of its other code runs.
+def load_legacy_classes(revision):
+    from PyQt5.QtGui import QColor, QFont, QSyntaxHighlighter, QTextCharFormat
+    source = subprocess.run(['git', 'show', f'{revision}:ide.py'], cwd=REPO_DIR, capture_output=True,
+                            text=True, check=True).stdout
+    tree = ast.parse(source)
+    keep = [node for node in tree.body
+            if (isinstance(node, ast.ClassDef) and node.name.endswith('Highlighter'))
+            or is_constant(node)]
+    namespace = {'re': re, 'QColor': QColor, 'QFont': QFont, 'QSyntaxHighlighter': QSyntaxHighlighter, 'QTextCharFormat': QTextCharFormat}
+    exec(compile(ast.Module(body=keep, type_ignores=[]), f'{revision}:ide.py', 'exec'), namespace)
+    return namespace
+
+# Builds one old highlighter on a scratch document, then moves it to the measured one. Classes that
+# reuse another's rules construct that highlighter too; it stays on the scratch document, so only
+# the old rule loop itself is timed, not the duplicate passes the old editor also ran.
+def legacy_highlighter(classes, language, document, scratch):
+    highlighter = classes[LEGACY_CLASSES[language]](scratch)
+    highlighter.setDocument(document)
+    return highlighter
+
+# The current tokenizer on the same footing: a synchronous highlighter that formats every span.
+# GrammarHighlighter itself hands blocks to a thread and applies the results later.
+def grammar_highlighter(language, document):
+    from PyQt5.QtGui import QSyntaxHighlighter
+
+    class SyncGrammarHighlighter(QSyntaxHighlighter):
+        def __init__(self, document):
+            super().__init__(document)
+            self.grammar = get_grammar(language)
+            self.formats = get_grammar_formats(self.grammar)
+
+        def highlightBlock(self, text):
+            spans, state = self.grammar.tokenize(text, max(self.previousBlockState(), 0))
+            formats = self.formats
+            for start, length, style in spans:
+                self.setFormat(start, length, formats[style])
+            self.setCurrentBlockState(state)
+
+    return SyncGrammarHighlighter(document)
+
+def load_lines(language, line_count):
+    with open(os.path.join(CORPUS_DIR, CORPUS_FILES[language]), encoding='utf-8') as f:
+        sample = f.read().splitlines()
+    lines = []
+    while len(lines) < line_count:
+        lines.extend(sample)
+    return lines[:line_count]
+
+def best_time(func, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark syntax highlighting throughput per language.")
+    parser.add_argument('--lines', type=int, default=5000, help="Number of lines highlighted per language.")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per measurement; the best run is reported.")
+    parser.add_argument('--language', choices=sorted(LANGUAGE_GRAMMARS), help="Only benchmark one language.")
+    parser.add_argument('--baseline', help="Revision to load the old highlighters from. Defaults to the one "
+                                           "that added them.")
+    args = parser.parse_args()
+    baseline = args.baseline or find_baseline_revision()
+    if baseline is None:
+        parser.error("no revision with the old highlighter classes in the git history; pass --baseline")
+
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PyQt5.QtWidgets import QApplication
+    from PyQt5.QtGui import QTextDocument
+    app = QApplication(sys.argv)
+    classes = load_legacy_classes(baseline)
+    scratch = QTextDocument()
+
+    languages = [args.language] if args.language else list(LANGUAGE_GRAMMARS)
+    print(f"{'language':<14}{'legacy lines/s':>16}{'grammar lines/s':>17}{'grammar MB/s':>14}{'speedup':>10}")
+    for language in languages:
+        lines = load_lines(language, args.lines)
+        size_mb = sum(len(line) + 1 for line in lines) / (1024 * 1024)
+        document = QTextDocument()
+        document.setPlainText("\n".join(lines))
+
+        highlighter = grammar_highlighter(language, document)
+        single = best_time(highlighter.rehighlight, args.repeat)
+        highlighter.setDocument(None)
+        # Some old classes were broken: one fails to compile its rules, one raises in highlightBlock.
+        # PyQt aborts on an exception in a virtual method unless sys.excepthook is replaced.
+        errors = []
+        sys.excepthook = lambda kind, value, traceback: errors.append(value)
+        try:
+            highlighter = legacy_highlighter(classes, language, document, scratch)
+            legacy = best_time(highlighter.rehighlight, args.repeat)
+            highlighter.setDocument(None)
+        except Exception as e:
+            errors.append(e)
+        sys.excepthook = sys.__excepthook__
+        if errors:
+            print(f"{language:<14}{'failed':>16}{len(lines) / single:>17,.0f}{size_mb / single:>14.2f}"
+                  f"{'':>10}  {type(errors[0]).__name__}: {errors[0]}")
+            continue
+        print(f"{language:<14}{len(lines) / legacy:>16,.0f}{len(lines) / single:>17,.0f}"
+              f"{size_mb / single:>14.2f}{legacy / single:>9.1f}x")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+# Image viewer benchmark.
+# Opens a generated photo-sized image in MediaViewer and drags its size through a series of resize
+# events, then compares the GUI thread time with the old viewer, which decoded the file from disk
+# and smoothly rescaled it on every resize.
+#
+# Usage: python benchmarks/bench_image_viewer.py [--width N] [--height N] [--format png|jpg] [--resizes N]
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Draws a gradient with some shapes, so the encoders have real work to do.
+def build_image(path, width, height):
+    from PyQt5.QtGui import QImage, QPainter, QLinearGradient, QColor
+    from PyQt5.QtCore import Qt
+    image = QImage(width, height, QImage.Format_RGB32)
+    painter = QPainter(image)
+    gradient = QLinearGradient(0, 0, width, height)
+    gradient.setColorAt(0, QColor('#1e3a5f'))
+    gradient.setColorAt(1, QColor('#f4a261'))
+    painter.fillRect(image.rect(), gradient)
+    painter.setPen(Qt.white)
+    for i in range(0, width, max(1, width // 40)):
+        painter.drawEllipse(i, (i * 7) % height, width // 20, height // 20)
+    painter.end()
+    image.save(path)
+
+# The old MediaViewer.resizeEvent: decode from disk and smooth-scale to the new size.
+def legacy_resize(path, size):
+    from PyQt5.QtGui import QImage, QPixmap
+    from PyQt5.QtCore import Qt
+    pixmap = QPixmap.fromImage(QImage(path))
+    return pixmap.scaled(size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark opening and resizing an image in MediaViewer.")
+    parser.add_argument('--width', type=int, default=6000, help="Width of the generated image.")
+    parser.add_argument('--height', type=int, default=4000, help="Height of the generated image.")
+    parser.add_argument('--format', choices=['png', 'jpg'], default='jpg', help="Format of the generated image.")
+    parser.add_argument('--resizes', type=int, default=30, help="Resize events in the simulated drag.")
+    args = parser.parse_args()
+
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PyQt5.QtWidgets import QApplication
+    from PyQt5.QtCore import QSize
+    app = QApplication(sys.argv)
+    import ide
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, f'photo.{args.format}')
+        build_image(path, args.width, args.height)
+        sizes = [QSize(600 + 10 * i, 400 + 5 * i) for i in range(args.resizes)]
+        print(f"Image: {args.width}x{args.height} {args.format}, {os.path.getsize(path) / 1024 / 1024:.1f} MB")
+
+        start = time.perf_counter()
+        legacy_resize(path, sizes[0])
+        legacy_open = time.perf_counter() - start
+        legacy_times = []
+        for size in sizes:
+            start = time.perf_counter()
+            legacy_resize(path, size)
+            legacy_times.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        viewer = ide.MediaViewer(path)
+        viewer.resize(sizes[0])
+        viewer.show()
+        blocked = time.perf_counter() - start # GUI thread time before the viewer is on screen
+        while viewer.source is None:
+            app.processEvents()
+        app.processEvents()
+        shown = time.perf_counter() - start
+        times = []
+        for size in sizes:
+            start = time.perf_counter()
+            viewer.resize(size)
+            app.processEvents()
+            times.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        while viewer._rescale_timer.isActive():
+            app.processEvents()
+        settle = time.perf_counter() - start - ide.IMAGE_RESCALE_DEBOUNCE_MS / 1000
+        start = time.perf_counter()
+        viewer.resize(sizes[0]) # Back to a size seen before: served from the scaled pixmap cache
+        app.processEvents()
+        revisit = time.perf_counter() - start
+
+        print(f"{'viewer':<10}{'open ms':>10}{'GUI block ms':>14}{'resize med ms':>15}{'resize max ms':>15}")
+        print(f"{'legacy':<10}{legacy_open * 1000:>10.1f}{legacy_open * 1000:>14.1f}"
+              f"{statistics.median(legacy_times) * 1000:>15.1f}{max(legacy_times) * 1000:>15.1f}")
+        print(f"{'new':<10}{shown * 1000:>10.1f}{blocked * 1000:>14.1f}"
+              f"{statistics.median(times) * 1000:>15.1f}{max(times) * 1000:>15.1f}")
+        print(f"Smooth rescale after the drag settles: {settle * 1000:.1f} ms; revisiting a cached size: {revisit * 1000:.2f} ms")
+        viewer.close_media()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+# Untitled buffer language detection benchmark.
+# Compares classify_language with the old cascade from _auto_detect_language_on_type, which lowercased
+# the whole buffer and tried its rules in order until one matched. Accuracy is measured on every corpus
+# sample as a whole, on its first lines, and on windows cut from its middle (text pasted without a
+# header); speed on the samples and on one large paste. The classifier's hints were written against
+# the samples in corpus/, so the samples in corpus/heldout/, which it was not tuned on, are reported
+# on their own.
+#
+# Usage: python benchmarks/bench_language_detect.py [--window N] [--paste-mb N] [--repeat N]
+
+import argparse
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ide import classify_language, language_for_extension, language_for_path
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'corpus')
+HELDOUT_DIR = os.path.join(CORPUS_DIR, 'heldout')
+
+# The old detection cascade, unchanged apart from returning a language name.
+def legacy_detect(buffer_text):
+    text = buffer_text.strip().lower()
+    detected_ext = None
+    if text.startswith('<!doctype html>') or text.startswith('<html'):
+        detected_ext = '.html'
+    elif text.startswith('import ') or text.startswith('package '):
+        if re.search(r'\bclass\b|\bpublic static void main\b', text):
+            detected_ext = '.java'
+        elif re.search(r'\bfun\b|\bval\b|\bvar\b', text):
+            detected_ext = '.kt'
+        elif re.search(r'\bpackage main\b|\bfunc main\b', text):
+            detected_ext = '.go'
+        elif re.search(r'\bimport\s+react\b|\bimport\s+\{.*\}\s+from\s+\'react\'', text):
+            detected_ext = '.jsx'
+        elif re.search(r'\bimport\s+\{.*\}\s+from\s+\'vue\'', text) or re.search(r'<template>|<script>|<style>', buffer_text.strip()):
+            detected_ext = '.vue'
+        elif re.search(r'\bimport\s+\'dart:io\'', text) or re.search(r'\bvoid\s+main\s*\(', text):
+            detected_ext = '.dart'
+    elif text.startswith('#include') or re.search(r'\b(int|void|char|double|float)\s+main\s*\(', text):
+        detected_ext = '.cpp'
+    elif text.startswith('using system;') or re.search(r'\bclass\b.*?\bpublic static void main\b', text):
+        detected_ext = '.cs'
+    elif text.startswith('<?php'):
+        detected_ext = '.php'
+    elif text.startswith('require ') or text.startswith('use '):
+        if re.search(r'\bmy\b|\buse strict\b', text):
+            detected_ext = '.pl'
+        elif re.search(r'\bdef\b|\bend\b|\bclass\b', text):
+            detected_ext = '.rb'
+    elif text.startswith('fn ') or text.startswith('mod '):
+        detected_ext = '.rs'
+    elif text.startswith('@import') or re.search(r'\$[a-zA-Z0-9_-]+', text):
+        detected_ext = '.scss'
+    elif re.search(r'\b(select|insert|update|delete)\b', text):
+        detected_ext = '.sql'
+    elif re.search(r'\bfunc\b|\bvar\b|\blet\b', text) and not text.startswith('import '):
+        detected_ext = '.swift'
+    elif text.startswith('//') or text.startswith('/*'):
+        pass
+    elif text.strip().startswith('{') or text.strip().startswith('.'):
+        detected_ext = '.css'
+    elif re.search(r'\bfunction\b|\bconst\b|\blet\b|\bvar\b', text):
+        detected_ext = '.js'
+    elif re.search(r'\b(def|class|import)\b', text):
+        detected_ext = '.py'
+    elif text.startswith('<') and '>' in text:
+        detected_ext = '.xml'
+    elif text.startswith('{') and '}' in text and ':' in text:
+        detected_ext = '.json'
+    elif text.startswith('# ') or text.startswith('## ') or text.startswith('- ') or text.startswith('* '):
+        detected_ext = '.md'
+    elif text.startswith('#!') or text.startswith('echo ') or text.startswith('ls '):
+        detected_ext = '.sh'
+    elif re.search(r'\b(function|var|let|const)\b', text) and re.search(r'\b(interface|enum|type)\b', text):
+        detected_ext = '.ts'
+    elif re.search(r'\b(library|require|attach|detach)\b', text) or re.search(r'<-', text):
+        detected_ext = '.r'
+    return language_for_extension(detected_ext) if detected_ext else None
+
+# Returns (kind, language, text) cases for the samples in a directory: each sample whole, its head,
+# and windows from its middle.
+def build_cases(directory, window):
+    cases = []
+    for file_name in sorted(os.listdir(directory)):
+        path = os.path.join(directory, file_name)
+        language = language_for_path(path)
+        if not os.path.isfile(path) or not language:
+            continue
+        with open(path, encoding='utf-8') as f:
+            lines = f.read().splitlines(keepends=True)
+        cases.append(('whole', language, ''.join(lines)))
+        cases.append(('head', language, ''.join(lines[:window])))
+        for start in range(window // 2, max(window // 2 + 1, len(lines) - window), window // 2):
+            cases.append(('window', language, ''.join(lines[start:start + window])))
+    return cases
+
+# Average seconds per call over the given texts.
+def time_calls(detect, texts, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for text in texts:
+            detect(text)
+    return (time.perf_counter() - start) / (repeat * len(texts))
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark untitled buffer language detection.")
+    parser.add_argument('--window', type=int, default=10, help="Lines per head and window case.")
+    parser.add_argument('--paste-mb', type=float, default=5, help="Size of the simulated large paste in megabytes.")
+    parser.add_argument('--repeat', type=int, default=20, help="Timing repetitions over the corpus cases.")
+    args = parser.parse_args()
+
+    detectors = [('classifier', classify_language), ('legacy', legacy_detect)]
+    kinds = ['whole', 'head', 'window']
+    sets = [('tuned', build_cases(CORPUS_DIR, args.window)), ('held-out', build_cases(HELDOUT_DIR, args.window))]
+
+    for set_name, cases in sets:
+        print(f"{set_name}: {len(cases)} cases")
+        print(f"{'detector':<12}" + ''.join(f"{kind:>10}" for kind in kinds) + f"{'all':>10}")
+        for name, detect in detectors:
+            row = f"{name:<12}"
+            correct = 0
+            for kind in kinds:
+                subset = [case for case in cases if case[0] == kind]
+                hits = sum(1 for _, language, text in subset if detect(text) == language)
+                correct += hits
+                row += f"{hits / len(subset):>9.0%} "
+            print(row + f"{correct / len(cases):>9.0%}")
+        print("Classifier misses (kind, expected, got):")
+        for kind, language, text in cases:
+            detected = classify_language(text)
+            if detected != language:
+                print(f"  {(kind, language, detected)}")
+        print()
+
+    texts = [text for _, cases in sets for _, _, text in cases]
+    with open(os.path.join(CORPUS_DIR, 'sample.py'), encoding='utf-8') as f:
+        sample = f.read()
+    paste = sample * (int(args.paste_mb * 1024 * 1024) // len(sample) + 1)
+    times = {}
+    print(f"{'detector':<12}{'per case ms':>14}{f'{args.paste_mb:g} MB paste ms':>20}")
+    for name, detect in detectors:
+        per_case = time_calls(detect, texts, args.repeat)
+        paste_time = time_calls(detect, [paste], 1)
+        print(f"{name:<12}{per_case * 1000:>14.3f}{paste_time * 1000:>20.1f}")
+        times[name] = per_case
+    print(f"The classifier takes {times['classifier'] / times['legacy']:.1f}x as long per case.")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+# Large document find benchmark.
+# Loads a generated document of tens of megabytes into a CodeEditor and times finding in it from the
+# top: a marker near the end, a query with no match and a common word, first
+# with QPlainTextEdit.find as the old dialog did, then with the find bar, which searches a snapshot
+# in worker processes. The longest event loop stall is measured for each. Then a catastrophically
+# backtracking regular expression is searched, which the find bar gives up on after a timeout.
+# Last, the same queries are searched in the document saved to a file and shown in a
+# LargeFileViewer, which the find bar searches over the file in the same worker processes.
+#
+# Usage: python benchmarks/bench_large_find.py [--lines N]
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_find_bar import new_editor
+
+MARKER = 'needle_marker_42'
+
+# Every line has one match of 'needle'; the marker is on one line near the end, followed by a line
+# that makes (a+)+$ try every way of splitting it.
+def build_text(lines):
+    text = [f"value_{i} = compute(needle, {i}) + needless_{i % 97}\n" for i in range(lines)]
+    text[lines * 9 // 10] = f"# {MARKER} is here\n"
+    text[lines * 9 // 10 + 1] = "a" * 40 + "b\n"
+    return "".join(text)
+
+# Calls start(), then processes events until done() is true; returns (seconds, longest stall). The
+# loop sleeps between rounds, as the event loop would, leaving the CPU to the search workers.
+def run_until(app, start, done):
+    from PyQt5.QtCore import QTimer
+    ticks = []
+    timer = QTimer()
+    timer.timeout.connect(lambda: ticks.append(time.perf_counter()))
+    timer.start(1)
+    begin = time.perf_counter()
+    start()
+    ticks.append(time.perf_counter())
+    while not done():
+        app.processEvents()
+        time.sleep(0.001)
+    total = time.perf_counter() - begin
+    timer.stop()
+    return total, max(b - a for a, b in zip([begin] + ticks, ticks))
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark find in a large document.")
+    parser.add_argument('--lines', type=int, default=1000000, help="Lines in the generated document.")
+    args = parser.parse_args()
+
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PyQt5.QtWidgets import QApplication, QMainWindow
+    from PyQt5.QtGui import QTextCursor, QTextDocument
+    app = QApplication(sys.argv)
+    import ide
+
+    text = build_text(args.lines)
+    print(f"Document: {args.lines} lines, {len(text) / 1024 / 1024:.1f} MB")
+    editor = new_editor(ide, text)
+    window = QMainWindow()
+    bar = ide.FindBar(window)
+    bar.show()
+    bar.set_editor(editor)
+    ide.get_document_search_pool() # Start the workers outside the timed part, as the IDE keeps them between searches
+
+    print(f"{'query':<22}{'old s':>8}{'find bar s':>12}{'GUI stall ms':>14}{'matches':>9}")
+    for query, flags in ((MARKER, QTextDocument.FindFlags()), ("not_in_the_document", QTextDocument.FindFlags()),
+                         ("needle", QTextDocument.FindWholeWords)):
+        editor.moveCursor(QTextCursor.Start)
+        start = time.perf_counter()
+        editor.find(query, flags) # The old dialog: one synchronous call, the window frozen throughout
+        old = time.perf_counter() - start
+
+        editor.moveCursor(QTextCursor.Start)
+        bar.whole_word_checkbox.setChecked(bool(flags & QTextDocument.FindWholeWords))
+        bar.find_input.setText(query)
+        # Jumps once the first match is in, or wraps to nothing once the search is done
+        jumped = lambda: bar._pending_jump is None and (editor.textCursor().hasSelection() or not bar.is_searching())
+        seconds, stall = run_until(app, bar.find_next, jumped)
+        found = len(bar.starts) if not bar.is_searching() else f"{len(bar.starts)}+"
+        print(f"{query:<22}{old:>8.2f}{seconds:>12.2f}{stall * 1000:>14.0f}{found:>9}")
+        run_until(app, lambda: None, lambda: not bar.is_searching())
+
+    bar.whole_word_checkbox.setChecked(False)
+    bar.regex_checkbox.setChecked(True)
+    bar.find_input.setText(r"(a+)+$")
+    seconds, stall = run_until(app, bar.restart_scan, lambda: not bar.is_searching())
+    print(f"(a+)+$ regex: '{bar.count_label.text()}' after {seconds:.1f} s, {bar._searched_to * 100 // len(text)}% "
+          f"searched, GUI stall {stall * 1000:.0f} ms (timeout {ide.FIND_REGEX_TIMEOUT:g} s)")
+    bar.set_editor(None)
+
+    with tempfile.NamedTemporaryFile('w', encoding='utf-8', suffix='.txt', delete=False) as f:
+        f.write(text)
+    viewer = ide.LargeFileViewer(f.name)
+    bar.set_editor(viewer)
+    print("\nLargeFileViewer on the same text saved to a file")
+    print(f"{'query':<22}{'first s':>9}{'all s':>8}{'GUI stall ms':>14}{'matches':>11}")
+    for query, whole_words in ((MARKER, False), ("not_in_the_document", False), ("needle", True), (r"(a+)+$", False)):
+        viewer.go_to_line(1)
+        bar.regex_checkbox.setChecked(query.startswith('('))
+        bar.whole_word_checkbox.setChecked(whole_words)
+        bar.find_input.setText(query)
+        jumped = lambda: bar._pending_jump is None and (viewer.match is not None or not bar.is_searching())
+        first, stall = run_until(app, bar.find_next, jumped)
+        rest, rest_stall = run_until(app, lambda: None, lambda: not bar.is_searching())
+        found = "timed out" if bar._timed_out else len(bar.starts)
+        print(f"{query:<22}{first:>9.2f}{first + rest:>8.2f}{max(stall, rest_stall) * 1000:>14.0f}{found!s:>11}")
+    bar.set_editor(None)
+    viewer.close_file()
+    os.remove(f.name)
+
+if __name__ == '__main__':
+    main()
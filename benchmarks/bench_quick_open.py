@@ -0,0 +1,104 @@
+# Quick Open benchmark.
+# Generates a workspace of many empty files with varied names in nested directories, lets the
+# WorkspaceFileIndex crawl it and times Quick Open queries against it, each the first after the
+# crawl. For comparison the same queries are ranked by a FuzzyMatcher over every path, the matcher
+# the completion popup uses. Also times how soon a newly created file can be found, and checks that
+# the matcher ranks candidates whose letters fold differently outside ASCII.
+#
+# Usage: python benchmarks/bench_quick_open.py [--files N] [--workspace DIR]
+
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+WORDS = ("core util test model view widget parser lexer token index search file path render image cache config "
+         "server client handler editor theme layout session plugin driver schema query event stream buffer").split()
+EXTENSIONS = ['.py', '.js', '.ts', '.md', '.json', '.c', '.h', '.css']
+QUERIES = ['m', 'ed', 'test', 'idx', 'cfg', 'qhandler', 'core/parser', 'zzz', 'ModelView']
+# (candidates, query, expected matches): 'ſ' matches 's' only under IGNORECASE, the Kelvin sign lowers to 'k'
+FOLD_CASES = [(['\u017ftart', 'start'], 'st', ['start']), (['\u212aelvin', 'kelvin'], 'ke', ['kelvin', '\u212aelvin']),
+              (['\u0130stanbul'], 'ist', ['\u0130stanbul'])]
+
+# Writes 'count' empty files named from WORDS into directories up to four levels deep.
+def build_workspace(root, count):
+    rng = random.Random(42)
+    directories = []
+    for _ in range(max(1, count // 40)):
+        parts = [rng.choice(WORDS) + (str(rng.randint(0, 9)) if rng.random() < 0.3 else '') for _ in range(rng.randint(1, 4))]
+        directories.append(os.path.join(root, *parts))
+    for directory in set(directories):
+        os.makedirs(directory, exist_ok=True)
+    for i in range(count):
+        name = f"{rng.choice(WORDS)}_{rng.choice(WORDS)}{i}{rng.choice(EXTENSIONS)}"
+        open(os.path.join(rng.choice(directories), name), 'w').close()
+
+# Processes events until done() is true; returns the seconds it took.
+def wait_for(app, done, timeout=3600):
+    start = time.perf_counter()
+    while not done() and time.perf_counter() - start < timeout:
+        app.processEvents()
+        time.sleep(0.001)
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Quick Open over a workspace.")
+    parser.add_argument('--files', type=int, default=200000, help="Files in the generated workspace.")
+    parser.add_argument('--workspace', help="Index this directory instead of a generated one.")
+    args = parser.parse_args()
+
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PyQt5.QtWidgets import QApplication
+    app = QApplication(sys.argv)
+    import ide
+
+    root = os.path.abspath(args.workspace or tempfile.mkdtemp(prefix='kodykoala_quick_open_'))
+    try:
+        if not args.workspace:
+            start = time.perf_counter()
+            build_workspace(root, args.files)
+            print(f"Generated {args.files} files in {time.perf_counter() - start:.1f} s")
+        files = sorted(path[len(root) + 1:] for path in ide.iter_search_files(root))
+        index = ide.get_file_index()
+        index.set_root(root)
+        crawl = wait_for(app, lambda: index._snapshot[0] == root and bin(index._snapshot[3]).count('1') == len(files))
+        print(f"Index crawled in {crawl:.1f} s: {len(files)} files")
+        ide.recent_files.record(os.path.join(root, files[len(files) // 2])) # One recently opened file
+
+        matcher = ide.FuzzyMatcher()
+        for candidates, query, expected in FOLD_CASES:
+            matcher.set_candidates(candidates)
+            found = matcher.match(query)
+            if found != expected:
+                print(f"Matcher ranked {found!r} for {query!r}, expected {expected!r}")
+        matcher.set_candidates(files)
+        print(f"{'query':<14}{'index ms':>10}{'matcher ms':>12}  best match")
+        for query in QUERIES:
+            start = time.perf_counter()
+            results = index.match(query)
+            indexed = time.perf_counter() - start
+            start = time.perf_counter()
+            matcher.match(query.replace('/', os.sep), ide.QUICK_OPEN_RESULT_LIMIT)
+            full = time.perf_counter() - start
+            best = os.path.relpath(results[0], root) if results else '-'
+            print(f"{query:<14}{indexed * 1000:>10.1f}{full * 1000:>12.1f}  {best}")
+
+        # A new file, reported by the watcher or a save
+        path = os.path.join(root, os.path.dirname(files[0]), 'freshly_created_file.py')
+        open(path, 'w').close()
+        start = time.perf_counter()
+        index.update_file(path)
+        wait_for(app, lambda: index.match('freshlycreated')[:1] == [path])
+        print(f"New file to listed: {(time.perf_counter() - start) * 1000:.1f} ms")
+    finally:
+        ide.get_file_index().stop()
+        if not args.workspace:
+            shutil.rmtree(root, ignore_errors=True)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+# Theme switching benchmark.
+# Opens a number of untitled tabs in the IDE, timing each tab open, then switches between the dark
+# and light themes and times each switch including the repaint events it queues. Medians are
+# reported next to the worst case, since single runs vary a lot with other load on the machine.
+# Runs in a temporary directory so the IDE's config and session files are left alone.
+#
+# Usage: python benchmarks/bench_theme_switch.py [--tabs N] [--switches N]
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark opening tabs and switching themes in the IDE.")
+    parser.add_argument('--tabs', type=int, default=100, help="Number of untitled tabs to open.")
+    parser.add_argument('--switches', type=int, default=20, help="Number of theme switches to time.")
+    args = parser.parse_args()
+
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PyQt5.QtWidgets import QApplication
+    app = QApplication(sys.argv)
+    os.chdir(tempfile.mkdtemp(prefix='kodykoala_bench_'))
+    import ide
+
+    window = ide.IDE()
+    window.show()
+    app.processEvents()
+
+    open_times = []
+    for _ in range(args.tabs):
+        start = time.perf_counter()
+        window._new_file(window.left_tab_widget)
+        app.processEvents()
+        open_times.append(time.perf_counter() - start)
+
+    switch_times = []
+    for i in range(args.switches):
+        theme_name = 'light' if i % 2 == 0 else 'dark'
+        start = time.perf_counter()
+        window.apply_theme(theme_name)
+        app.processEvents()
+        switch_times.append(time.perf_counter() - start)
+
+    print(f"Tabs open: {window.left_tab_widget.count()}")
+    print(f"{'operation':<14}{'median ms':>11}{'max ms':>10}")
+    for name, times in [('open tab', open_times), ('last 10 tabs', open_times[-10:]), ('switch theme', switch_times)]:
+        print(f"{name:<14}{statistics.median(times) * 1000:>11.1f}{max(times) * 1000:>10.1f}")
+    os._exit(0) # Skip the IDE's save-on-close prompts
+
+if __name__ == '__main__':
+    main()
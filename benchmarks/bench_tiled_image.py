@@ -0,0 +1,138 @@
+# Very large image benchmark.
+# Opens a generated image far bigger than the screen the old way (decode it whole into a pixmap and
+# scale that to the view, as MediaViewer did) and in TiledImageViewer, which shows an overview and
+# then decodes only the tiles in view. For the tiled viewer it also zooms to 100% and pans.
+# Each viewer runs in a fresh process so the peak memory of one run cannot hide the other.
+#
+# Usage: python benchmarks/bench_tiled_image.py [--width N] [--height N] [--format jpg|png|tiff] [--viewer NAME]
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+VIEWERS = ['legacy', 'tiled']
+
+# A memory figure of this process from /proc/self/status, in megabytes. VmHWM is the peak resident
+# size; RssAnon the current one without pages of memory-mapped files, which the system can drop.
+def memory_mb(field):
+    with open('/proc/self/status') as f:
+        fields = dict(line.split(':', 1) for line in f)
+    return int(fields[field].split()[0]) / 1024
+
+# Draws a grid of labelled circles over a gradient, so every tile looks different.
+def build_image(path, width, height):
+    from PyQt5.QtGui import QImage, QPainter, QLinearGradient, QColor
+    from PyQt5.QtCore import Qt
+    image = QImage(width, height, QImage.Format_RGB32)
+    painter = QPainter(image)
+    gradient = QLinearGradient(0, 0, width, height)
+    gradient.setColorAt(0, QColor('#1e3a5f'))
+    gradient.setColorAt(1, QColor('#f4a261'))
+    painter.fillRect(image.rect(), gradient)
+    painter.setPen(Qt.white)
+    for x in range(0, width, 400):
+        for y in range(0, height, 400):
+            painter.drawEllipse(x + 50, y + 50, 300, 300)
+            painter.drawText(x + 150, y + 200, f"{x},{y}")
+    painter.end()
+    image.save(path, quality=90) if path.endswith('.jpg') else image.save(path)
+
+# Processes events until done() is true; returns the seconds it took.
+def wait_for(app, done, timeout=300):
+    start = time.perf_counter()
+    while not done() and time.perf_counter() - start < timeout:
+        app.processEvents()
+        time.sleep(0.001)
+    return time.perf_counter() - start
+
+# True once the tiled viewer has every tile it asked for, including the one being decoded.
+def tiles_done(viewer):
+    viewer.viewport().repaint() # Paints request the missing tiles
+    loader = viewer.loader
+    return bool(viewer._tiles) and not loader._wanted and (loader._loading is None or loader._loading in viewer._tiles)
+
+# Runs one viewer in this process and prints its measurements on one line.
+def run_viewer(viewer_name, path):
+    from PyQt5.QtWidgets import QApplication, QLabel
+    from PyQt5.QtGui import QImage, QPixmap
+    from PyQt5.QtCore import Qt, QTimer
+    app = QApplication(sys.argv)
+    import ide
+
+    baseline = memory_mb('VmRSS')
+    start = time.perf_counter()
+    if viewer_name == 'legacy':
+        widget = QLabel()
+        widget.resize(1200, 800)
+        pixmap = QPixmap.fromImage(QImage(path))
+        widget.setPixmap(pixmap.scaled(widget.size(), Qt.KeepAspectRatio, Qt.SmoothTransformation))
+        widget.show()
+        app.processEvents()
+        first = time.perf_counter() - start
+        zoomed, pan = first, 0.0 # The full pixmap is already in memory
+    else:
+        widget = ide.TiledImageViewer(path)
+        widget.resize(1200, 800)
+        widget.show()
+        first = wait_for(app, lambda: widget._overviews or widget._error)
+        if widget._error:
+            sys.exit(widget._error.splitlines()[-1]) # Too large for its format
+        widget.viewport().repaint()
+        # Zooming in to 100% at the center, then panning a viewport at a time
+        widget.set_zoom(1.0)
+        widget.viewport().repaint()
+        zoomed = wait_for(app, lambda: tiles_done(widget))
+        pans = []
+        for _ in range(5):
+            widget.horizontalScrollBar().setValue(widget.horizontalScrollBar().value() + widget.viewport().width())
+            widget.viewport().repaint()
+            pans.append(wait_for(app, lambda: tiles_done(widget)))
+        pan = sum(pans) / len(pans)
+    settled = memory_mb('RssAnon')
+    print(f"{viewer_name} {first:.3f} {zoomed:.3f} {pan:.3f} {memory_mb('VmHWM') - baseline:.1f} {settled:.1f}")
+    sys.stdout.flush()
+    QTimer.singleShot(0, app.quit) # Let aboutToQuit stop the viewer's loader and delete its tile files
+    app.exec_()
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark opening a very large image.")
+    parser.add_argument('--width', type=int, default=16000, help="Width of the generated image.")
+    parser.add_argument('--height', type=int, default=12000, help="Height of the generated image.")
+    parser.add_argument('--format', choices=['jpg', 'png', 'tiff'], default='jpg', help="Format of the generated image.")
+    parser.add_argument('--viewer', choices=VIEWERS, help="Run only this viewer.")
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_viewer(args.viewer, args.child)
+        return
+
+    env = dict(os.environ)
+    env.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, f'huge.{args.format}')
+        from PyQt5.QtWidgets import QApplication
+        app = QApplication(sys.argv)
+        build_image(path, args.width, args.height)
+        del app
+        print(f"Image: {args.width}x{args.height} {args.format}, {os.path.getsize(path) / 1024 / 1024:.0f} MB on disk, "
+              f"{args.width * args.height * 4 / 1024 / 1024:.0f} MB decoded")
+        print(f"{'viewer':<8} {'first s':>8} {'100% s':>8} {'pan s':>8} {'peak MB':>9} {'settled MB':>11}")
+        for viewer_name in ([args.viewer] if args.viewer else VIEWERS):
+            command = [sys.executable, os.path.abspath(__file__), '--child', path, '--viewer', viewer_name]
+            result = subprocess.run(command, env=env, capture_output=True, text=True)
+            lines = [line for line in result.stdout.splitlines() if line.startswith(viewer_name + ' ')]
+            if result.returncode != 0 or not lines:
+                print(f"{viewer_name:<8} failed: {result.stderr.strip().splitlines()[-1:] or result.returncode}")
+                continue
+            name, first, zoomed, pan, peak, settled = lines[-1].split()
+            print(f"{name:<8} {float(first):>8.3f} {float(zoomed):>8.3f} {float(pan):>8.3f} {float(peak):>9.1f} {float(settled):>11.1f}")
+
+if __name__ == '__main__':
+    main()
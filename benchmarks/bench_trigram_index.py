@@ -0,0 +1,120 @@
+# Trigram index benchmark.
+# Generates the find in files workspace (see bench_find_in_files.py), builds its TrigramIndex and
+# times a set of literal and regex searches with the index narrowing the files against the same
+# searches walking the whole workspace. Also times reopening the index in a later session and
+# bringing it up to date after a save.
+#
+# Usage: python benchmarks/bench_trigram_index.py [--files N] [--workspace DIR]
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_find_in_files import build_workspace
+
+# (query, regular expression, case sensitive)
+QUERIES = [
+    ('needle_marker_42', False, False),
+    ('NEEDLE_MARKER_42', False, True),
+    (r'needle_\w+_42', True, False),
+    (r'(needle|haystack)_marker', True, False),
+    ('println', False, False),
+    ('def ', False, True),
+]
+
+# Processes events until done() is true; returns the seconds it took.
+def wait_for(app, done, timeout=3600):
+    start = time.perf_counter()
+    while not done() and time.perf_counter() - start < timeout:
+        app.processEvents()
+        time.sleep(0.001)
+    return time.perf_counter() - start
+
+# Runs one search to the end; returns (seconds, files searched, matches, whether the index was used).
+def run_search(app, ide, root, regex, index):
+    matches = []
+    search = ide.FileSearch(root, regex, index)
+    search.found.connect(matches.extend)
+    start = time.perf_counter()
+    search.start()
+    wait_for(app, search.isFinished)
+    app.processEvents()
+    return time.perf_counter() - start, search.searched, matches, search.indexed
+
+def tree_size_mb(root):
+    total = 0
+    for directory, _, files in os.walk(root):
+        total += sum(os.path.getsize(os.path.join(directory, name)) for name in files)
+    return total / 1024 / 1024
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark find in files with the trigram index.")
+    parser.add_argument('--files', type=int, default=100000, help="Files in the generated workspace.")
+    parser.add_argument('--workspace', help="Search this directory instead of a generated one.")
+    args = parser.parse_args()
+
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PyQt5.QtWidgets import QApplication
+    app = QApplication(sys.argv)
+    import ide
+
+    root = os.path.abspath(args.workspace or tempfile.mkdtemp(prefix='kodykoala_trigrams_'))
+    cache = tempfile.mkdtemp(prefix='kodykoala_trigram_cache_')
+    ide.TRIGRAM_INDEX_DIR = cache # Build from scratch, whatever is cached for the workspace
+    try:
+        if not args.workspace:
+            start = time.perf_counter()
+            build_workspace(root, args.files)
+            print(f"Generated {args.files} files in {time.perf_counter() - start:.1f} s")
+        ide.get_search_pool() # Start the workers outside the timed part, as the IDE keeps them between searches
+
+        index = ide.get_trigram_index()
+        index.set_root(root)
+        build = wait_for(app, lambda: index._ready_root == root)
+        database = ide.trigram_index_path(root)
+        index_mb = sum(os.path.getsize(database + suffix) for suffix in ('', '-wal') if os.path.exists(database + suffix)) / 1024 / 1024
+        print(f"Index built in {build:.1f} s: {index_mb:.1f} MB for {tree_size_mb(root):.1f} MB of files")
+
+        print(f"{'query':<34}{'candidates':>11}{'lookup ms':>10}{'indexed s':>10}{'walk s':>8}{'matches':>9}{'same':>6}")
+        for text, regex_mode, case_sensitive in QUERIES:
+            regex = ide.compile_search_pattern(text, regex_mode, case_sensitive)
+            start = time.perf_counter()
+            candidates = index.candidates(root, regex)
+            lookup = time.perf_counter() - start
+            indexed_time, _, indexed_matches, used = run_search(app, ide, root, regex, index)
+            walk_time, _, walk_matches, _ = run_search(app, ide, root, regex, None)
+            count = len(candidates) if candidates is not None else '-'
+            label = f"{text}{' (regex)' if regex_mode else ''}{' (case)' if case_sensitive else ''}"
+            print(f"{label:<34}{count:>11}{lookup * 1000:>10.1f}{indexed_time if used else float('nan'):>10.2f}"
+                  f"{walk_time:>8.2f}{len(walk_matches):>9}{str(indexed_matches == walk_matches):>6}")
+
+        # A save: the file gains a new token and is reported through update_file
+        path = next(ide.iter_search_files(root))
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write("\n# freshly_saved_token\n")
+        regex = ide.compile_search_pattern('freshly_saved_token')
+        index.update_file(path)
+        update = wait_for(app, lambda: index.candidates(root, regex) == [path])
+        print(f"Save to searchable: {update * 1000:.1f} ms")
+
+        # A later session: the index is reopened and checked against the disk
+        other = os.path.join(cache, 'other')
+        os.makedirs(other)
+        index.set_root(other)
+        wait_for(app, lambda: index._ready_root == other)
+        index.set_root(root)
+        reopen = wait_for(app, lambda: index._ready_root == root)
+        print(f"Reopened and checked in {reopen:.1f} s")
+    finally:
+        if not args.workspace:
+            shutil.rmtree(root, ignore_errors=True)
+        ide.get_trigram_index().stop()
+        shutil.rmtree(cache, ignore_errors=True)
+
+if __name__ == '__main__':
+    main()
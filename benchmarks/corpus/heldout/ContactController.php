@@ -0,0 +1,38 @@
+<?php
+
+declare(strict_types=1);
+
+namespace App\Http\Controllers;
+
+use App\Models\Contact;
+use Illuminate\Http\JsonResponse;
+use Illuminate\Http\Request;
+
+final class ContactController
+{
+    public function index(Request $request): JsonResponse
+    {
+        $query = Contact::query()->orderBy('last_name');
+        if ($search = $request->query('q')) {
+            $query->where('email', 'like', "%{$search}%");
+        }
+        return response()->json($query->paginate(25));
+    }
+
+    public function store(Request $request): JsonResponse
+    {
+        $data = $request->validate([
+            'first_name' => 'required|string|max:100',
+            'last_name' => 'required|string|max:100',
+            'email' => 'required|email|unique:contacts',
+        ]);
+        $contact = Contact::create($data);
+        return response()->json($contact, 201);
+    }
+
+    public function destroy(int $id): JsonResponse
+    {
+        Contact::findOrFail($id)->delete();
+        return response()->json(null, 204);
+    }
+}
@@ -0,0 +1,37 @@
+using System;
+using System.Collections.Generic;
+using System.Linq;
+using System.Threading.Tasks;
+
+namespace Shop.Orders
+{
+    public record OrderLine(string Sku, int Quantity, decimal UnitPrice);
+
+    public interface IOrderRepository
+    {
+        Task<IReadOnlyList<OrderLine>> GetLinesAsync(Guid orderId);
+    }
+
+    public class OrderService
+    {
+        private readonly IOrderRepository _repository;
+
+        public OrderService(IOrderRepository repository)
+        {
+            _repository = repository ?? throw new ArgumentNullException(nameof(repository));
+        }
+
+        public async Task<decimal> GetTotalAsync(Guid orderId)
+        {
+            var lines = await _repository.GetLinesAsync(orderId);
+            return lines.Sum(line => line.Quantity * line.UnitPrice);
+        }
+
+        public async Task<string> DescribeAsync(Guid orderId)
+        {
+            var lines = await _repository.GetLinesAsync(orderId);
+            var skus = string.Join(", ", lines.Select(l => l.Sku));
+            return $"Order {orderId:N} has {lines.Count} lines: {skus}";
+        }
+    }
+}
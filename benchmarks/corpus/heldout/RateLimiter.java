@@ -0,0 +1,46 @@
+package com.example.gateway;
+
+import java.time.Clock;
+import java.util.Map;
+import java.util.concurrent.ConcurrentHashMap;
+
+/**
+ * Token bucket rate limiter, one bucket per client key.
+ */
+public final class RateLimiter {
+    private final Map<String, Bucket> buckets = new ConcurrentHashMap<>();
+    private final Clock clock;
+    private final int capacity;
+    private final double refillPerSecond;
+
+    public RateLimiter(Clock clock, int capacity, double refillPerSecond) {
+        this.clock = clock;
+        this.capacity = capacity;
+        this.refillPerSecond = refillPerSecond;
+    }
+
+    public boolean tryAcquire(String key) {
+        Bucket bucket = buckets.computeIfAbsent(key, k -> new Bucket(capacity, clock.millis()));
+        synchronized (bucket) {
+            long now = clock.millis();
+            double refill = (now - bucket.updatedAt) / 1000.0 * refillPerSecond;
+            bucket.tokens = Math.min(capacity, bucket.tokens + refill);
+            bucket.updatedAt = now;
+            if (bucket.tokens < 1.0) {
+                return false;
+            }
+            bucket.tokens -= 1.0;
+            return true;
+        }
+    }
+
+    private static final class Bucket {
+        double tokens;
+        long updatedAt;
+
+        Bucket(double tokens, long updatedAt) {
+            this.tokens = tokens;
+            this.updatedAt = updatedAt;
+        }
+    }
+}
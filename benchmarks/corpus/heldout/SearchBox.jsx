@@ -0,0 +1,36 @@
+import React, { useEffect, useState } from 'react';
+import PropTypes from 'prop-types';
+
+export default function SearchBox({ onResults, delay }) {
+  const [query, setQuery] = useState('');
+  const [loading, setLoading] = useState(false);
+
+  useEffect(() => {
+    if (!query) {
+      onResults([]);
+      return undefined;
+    }
+    const timer = setTimeout(async () => {
+      setLoading(true);
+      const response = await fetch(`/api/search?q=${encodeURIComponent(query)}`);
+      onResults(await response.json());
+      setLoading(false);
+    }, delay);
+    return () => clearTimeout(timer);
+  }, [query, delay, onResults]);
+
+  return (
+    <form className="search" onSubmit={(event) => event.preventDefault()}>
+      <input
+        type="search"
+        value={query}
+        placeholder="Search..."
+        onChange={(event) => setQuery(event.target.value)}
+      />
+      {loading && <span className="search__spinner" aria-label="Loading" />}
+    </form>
+  );
+}
+
+SearchBox.propTypes = { onResults: PropTypes.func.isRequired, delay: PropTypes.number };
+SearchBox.defaultProps = { delay: 250 };
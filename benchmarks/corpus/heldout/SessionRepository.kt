@@ -0,0 +1,36 @@
+package com.example.sessions
+
+import kotlinx.coroutines.Dispatchers
+import kotlinx.coroutines.withContext
+import java.time.Instant
+
+data class Session(val id: String, val userId: Long, val expiresAt: Instant) {
+    val isExpired: Boolean
+        get() = Instant.now().isAfter(expiresAt)
+}
+
+interface SessionStore {
+    suspend fun load(id: String): Session?
+    suspend fun save(session: Session)
+}
+
+class SessionRepository(private val store: SessionStore) {
+    private val cache = mutableMapOf<String, Session>()
+
+    suspend fun find(id: String): Session? = withContext(Dispatchers.IO) {
+        val cached = cache[id]
+        when {
+            cached == null -> store.load(id)?.also { cache[id] = it }
+            cached.isExpired -> null.also { cache.remove(id) }
+            else -> cached
+        }
+    }
+
+    suspend fun extend(id: String, seconds: Long): Session? {
+        val session = find(id) ?: return null
+        val extended = session.copy(expiresAt = session.expiresAt.plusSeconds(seconds))
+        store.save(extended)
+        cache[id] = extended
+        return extended
+    }
+}
@@ -0,0 +1,36 @@
+import Foundation
+
+struct Forecast: Decodable, Identifiable {
+    let id: UUID
+    let city: String
+    let high: Double
+    let low: Double
+}
+
+enum WeatherError: Error {
+    case badStatus(Int)
+}
+
+@MainActor
+final class WeatherStore: ObservableObject {
+    @Published private(set) var forecasts: [Forecast] = []
+    private let session: URLSession
+
+    init(session: URLSession = .shared) {
+        self.session = session
+    }
+
+    func refresh(from url: URL) async throws {
+        let (data, response) = try await session.data(from: url)
+        guard let http = response as? HTTPURLResponse, http.statusCode == 200 else {
+            throw WeatherError.badStatus((response as? HTTPURLResponse)?.statusCode ?? -1)
+        }
+        let decoder = JSONDecoder()
+        forecasts = try decoder.decode([Forecast].self, from: data)
+            .sorted { $0.city < $1.city }
+    }
+
+    var warmest: Forecast? {
+        forecasts.max(by: { $0.high < $1.high })
+    }
+}
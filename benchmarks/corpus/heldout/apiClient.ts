@@ -0,0 +1,44 @@
+export interface Page<T> {
+  items: T[];
+  nextCursor?: string;
+}
+
+export type HttpMethod = 'GET' | 'POST' | 'DELETE';
+
+export class ApiError extends Error {
+  constructor(public readonly status: number, message: string) {
+    super(message);
+  }
+}
+
+export class ApiClient {
+  private readonly headers: Record<string, string>;
+
+  constructor(private readonly baseUrl: string, token?: string) {
+    this.headers = { 'Content-Type': 'application/json' };
+    if (token) {
+      this.headers.Authorization = `Bearer ${token}`;
+    }
+  }
+
+  async request<T>(method: HttpMethod, path: string, body?: unknown): Promise<T> {
+    const response = await fetch(`${this.baseUrl}${path}`, {
+      method,
+      headers: this.headers,
+      body: body === undefined ? undefined : JSON.stringify(body),
+    });
+    if (!response.ok) {
+      throw new ApiError(response.status, await response.text());
+    }
+    return (await response.json()) as T;
+  }
+
+  async *paginate<T>(path: string): AsyncGenerator<T> {
+    let cursor: string | undefined;
+    do {
+      const page: Page<T> = await this.request('GET', cursor ? `${path}?cursor=${cursor}` : path);
+      yield* page.items;
+      cursor = page.nextCursor;
+    } while (cursor);
+  }
+}
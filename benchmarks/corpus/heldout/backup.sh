@@ -0,0 +1,27 @@
+#!/usr/bin/env bash
+set -euo pipefail
+
+SOURCE_DIR="${1:-$HOME/projects}"
+DEST="${BACKUP_DEST:-/mnt/backup}"
+KEEP_DAYS=14
+STAMP="$(date +%Y%m%d-%H%M%S)"
+ARCHIVE="$DEST/projects-$STAMP.tar.gz"
+
+log() {
+    printf '[%s] %s\n' "$(date +%T)" "$*" >&2
+}
+
+if [[ ! -d "$SOURCE_DIR" ]]; then
+    log "source $SOURCE_DIR does not exist"
+    exit 1
+fi
+
+mkdir -p "$DEST"
+log "archiving $SOURCE_DIR to $ARCHIVE"
+tar --exclude='node_modules' --exclude='.git' -czf "$ARCHIVE" -C "$(dirname "$SOURCE_DIR")" "$(basename "$SOURCE_DIR")"
+
+find "$DEST" -name 'projects-*.tar.gz' -mtime +"$KEEP_DAYS" -print -delete | while read -r old; do
+    log "removed $old"
+done
+
+du -sh "$ARCHIVE" | awk '{ print "size: " $1 }'
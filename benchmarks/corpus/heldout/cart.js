@@ -0,0 +1,38 @@
+'use strict';
+
+const TAX_RATE = 0.2;
+
+class Cart {
+  constructor(storage) {
+    this.storage = storage;
+    this.items = JSON.parse(storage.getItem('cart') || '[]');
+  }
+
+  add(product, quantity = 1) {
+    const existing = this.items.find((item) => item.id === product.id);
+    if (existing) {
+      existing.quantity += quantity;
+    } else {
+      this.items.push({ id: product.id, price: product.price, quantity });
+    }
+    this.save();
+  }
+
+  total() {
+    const subtotal = this.items.reduce((sum, item) => sum + item.price * item.quantity, 0);
+    return Math.round(subtotal * (1 + TAX_RATE) * 100) / 100;
+  }
+
+  save() {
+    this.storage.setItem('cart', JSON.stringify(this.items));
+  }
+}
+
+document.querySelectorAll('[data-product]').forEach((button) => {
+  button.addEventListener('click', async () => {
+    const response = await fetch(`/api/products/${button.dataset.product}`);
+    window.cart.add(await response.json());
+  });
+});
+
+module.exports = { Cart };
@@ -0,0 +1,35 @@
+require 'bigdecimal'
+require 'date'
+
+module Billing
+  class Invoice
+    attr_reader :number, :lines, :issued_on
+
+    def initialize(number, issued_on: Date.today)
+      @number = number
+      @issued_on = issued_on
+      @lines = []
+    end
+
+    def add_line(description, amount, quantity: 1)
+      @lines << { description: description, amount: BigDecimal(amount.to_s), quantity: quantity }
+      self
+    end
+
+    def total
+      @lines.sum { |line| line[:amount] * line[:quantity] }
+    end
+
+    def overdue?(today = Date.today)
+      today > issued_on + 30
+    end
+
+    def to_s
+      rows = @lines.map { |line| format('%-20s %8.2f x%d', line[:description], line[:amount], line[:quantity]) }
+      (["Invoice ##{number}"] + rows + ["Total: #{total.to_s('F')}"]).join("\n")
+    end
+  end
+end
+
+invoice = Billing::Invoice.new(42).add_line('Hosting', 19.99).add_line('Support', 45, quantity: 2)
+puts invoice unless invoice.overdue?
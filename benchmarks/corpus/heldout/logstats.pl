@@ -0,0 +1,26 @@
+#!/usr/bin/perl
+use strict;
+use warnings;
+use Getopt::Long;
+
+my $top = 10;
+GetOptions('top=i' => \$top) or die "usage: $0 [--top N] access.log\n";
+
+my (%hits, %bytes);
+while (my $line = <>) {
+    chomp $line;
+    next unless $line =~ m{^(\S+) \S+ \S+ \[[^\]]+\] "(?:GET|POST) (\S+) [^"]*" (\d{3}) (\d+|-)};
+    my ($client, $path, $status, $size) = ($1, $2, $3, $4);
+    next if $status >= 400;
+    $hits{$path}++;
+    $bytes{$client} += $size eq '-' ? 0 : $size;
+}
+
+print "Top $top paths:\n";
+my @paths = sort { $hits{$b} <=> $hits{$a} } keys %hits;
+for my $path (@paths[0 .. ($top > @paths ? $#paths : $top - 1)]) {
+    printf "%7d  %s\n", $hits{$path}, $path;
+}
+
+my ($heaviest) = sort { $bytes{$b} <=> $bytes{$a} } keys %bytes;
+printf "Heaviest client: %s (%.1f MB)\n", $heaviest, $bytes{$heaviest} / 1_048_576 if $heaviest;
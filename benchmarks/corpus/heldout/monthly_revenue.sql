@@ -0,0 +1,22 @@
+-- Revenue per customer segment and month, with the month-over-month change.
+WITH monthly AS (
+    SELECT
+        c.segment,
+        DATE_TRUNC('month', o.created_at) AS month,
+        SUM(oi.quantity * oi.unit_price) AS revenue
+    FROM orders o
+    JOIN order_items oi ON oi.order_id = o.id
+    JOIN customers c ON c.id = o.customer_id
+    WHERE o.status = 'paid'
+      AND o.created_at >= CURRENT_DATE - INTERVAL '12 months'
+    GROUP BY c.segment, DATE_TRUNC('month', o.created_at)
+)
+SELECT
+    segment,
+    month,
+    revenue,
+    revenue - LAG(revenue) OVER (PARTITION BY segment ORDER BY month) AS change
+FROM monthly
+ORDER BY segment, month;
+
+CREATE INDEX IF NOT EXISTS idx_orders_status_created ON orders (status, created_at);
@@ -0,0 +1,42 @@
+import csv
+import statistics
+from collections import defaultdict
+from dataclasses import dataclass, field
+
+
+@dataclass
+class Reading:
+    station: str
+    celsius: float
+    tags: list = field(default_factory=list)
+
+
+def load_readings(path):
+    readings = []
+    with open(path, newline="") as handle:
+        for row in csv.DictReader(handle):
+            try:
+                readings.append(Reading(row["station"], float(row["celsius"])))
+            except (KeyError, ValueError):
+                continue
+    return readings
+
+
+def summarize(readings):
+    by_station = defaultdict(list)
+    for reading in readings:
+        by_station[reading.station].append(reading.celsius)
+    summary = {}
+    for station, values in sorted(by_station.items()):
+        summary[station] = {
+            "mean": round(statistics.mean(values), 2),
+            "max": max(values),
+            "count": len(values),
+        }
+    return summary
+
+
+if __name__ == "__main__":
+    import sys
+    for station, stats in summarize(load_readings(sys.argv[1])).items():
+        print(f"{station:<12} {stats['mean']:>7} {stats['max']:>7} {stats['count']:>5}")
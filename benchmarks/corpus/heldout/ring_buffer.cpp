@@ -0,0 +1,48 @@
+#include <array>
+#include <cstddef>
+#include <iostream>
+#include <optional>
+
+template <typename T, std::size_t N>
+class RingBuffer {
+public:
+    bool push(const T& value) {
+        if (size_ == N) {
+            return false;
+        }
+        data_[(head_ + size_) % N] = value;
+        ++size_;
+        return true;
+    }
+
+    std::optional<T> pop() {
+        if (size_ == 0) {
+            return std::nullopt;
+        }
+        T value = data_[head_];
+        head_ = (head_ + 1) % N;
+        --size_;
+        return value;
+    }
+
+    std::size_t size() const noexcept { return size_; }
+
+private:
+    std::array<T, N> data_{};
+    std::size_t head_ = 0;
+    std::size_t size_ = 0;
+};
+
+int main() {
+    RingBuffer<int, 4> buffer;
+    for (int i = 0; i < 6; ++i) {
+        if (!buffer.push(i * i)) {
+            std::cout << "full at " << i << '\n';
+        }
+    }
+    while (auto value = buffer.pop()) {
+        std::cout << *value << ' ';
+    }
+    std::cout << std::endl;
+    return 0;
+}
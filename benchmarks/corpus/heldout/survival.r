@@ -0,0 +1,30 @@
+library(dplyr)
+library(ggplot2)
+
+# Summarise trial outcomes per treatment arm and plot the response rates.
+trial <- read.csv("trial_results.csv", stringsAsFactors = FALSE)
+
+summary_by_arm <- trial %>%
+  filter(!is.na(response)) %>%
+  group_by(arm) %>%
+  summarise(
+    patients = n(),
+    responders = sum(response == "yes"),
+    rate = responders / patients,
+    median_age = median(age, na.rm = TRUE)
+  ) %>%
+  arrange(desc(rate))
+
+print(summary_by_arm)
+
+bootstrap_rate <- function(x, n = 1000) {
+  rates <- replicate(n, mean(sample(x, replace = TRUE) == "yes"))
+  quantile(rates, c(0.025, 0.975))
+}
+
+ci <- tapply(trial$response, trial$arm, bootstrap_rate)
+
+plot <- ggplot(summary_by_arm, aes(x = arm, y = rate)) +
+  geom_col(fill = "steelblue") +
+  labs(title = "Response rate by arm", x = NULL, y = "Rate")
+ggsave("response_rates.png", plot, width = 6, height = 4)
@@ -0,0 +1,37 @@
+import 'dart:async';
+import 'dart:convert';
+
+class Todo {
+  final String id;
+  final String title;
+  final bool done;
+
+  const Todo({required this.id, required this.title, this.done = false});
+
+  Todo toggled() => Todo(id: id, title: title, done: !done);
+
+  Map<String, dynamic> toJson() => {'id': id, 'title': title, 'done': done};
+
+  factory Todo.fromJson(Map<String, dynamic> json) =>
+      Todo(id: json['id'] as String, title: json['title'] as String, done: json['done'] as bool? ?? false);
+}
+
+class TodoStore {
+  final _controller = StreamController<List<Todo>>.broadcast();
+  List<Todo> _todos = [];
+
+  Stream<List<Todo>> get changes => _controller.stream;
+
+  void load(String source) {
+    final decoded = jsonDecode(source) as List<dynamic>;
+    _todos = decoded.map((e) => Todo.fromJson(e as Map<String, dynamic>)).toList();
+    _controller.add(List.unmodifiable(_todos));
+  }
+
+  void toggle(String id) {
+    _todos = [for (final todo in _todos) todo.id == id ? todo.toggled() : todo];
+    _controller.add(List.unmodifiable(_todos));
+  }
+
+  Future<void> dispose() => _controller.close();
+}
@@ -0,0 +1,52 @@
+use std::fmt;
+
+#[derive(Debug, Clone, PartialEq)]
+pub enum Token {
+    Number(f64),
+    Ident(String),
+    Op(char),
+}
+
+#[derive(Debug)]
+pub struct LexError {
+    pub position: usize,
+}
+
+impl fmt::Display for LexError {
+    fn fmt(&self, f: &mut fmt::Formatter<'_>) -> fmt::Result {
+        write!(f, "unexpected character at {}", self.position)
+    }
+}
+
+pub fn tokenize(input: &str) -> Result<Vec<Token>, LexError> {
+    let chars: Vec<char> = input.chars().collect();
+    let mut tokens = Vec::new();
+    let mut i = 0;
+    while i < chars.len() {
+        let c = chars[i];
+        match c {
+            ' ' | '\t' => i += 1,
+            '0'..='9' | '.' => {
+                let start = i;
+                while i < chars.len() && (chars[i].is_ascii_digit() || chars[i] == '.') {
+                    i += 1;
+                }
+                let text: String = chars[start..i].iter().collect();
+                tokens.push(Token::Number(text.parse().map_err(|_| LexError { position: start })?));
+            }
+            '+' | '-' | '*' | '/' | '(' | ')' => {
+                tokens.push(Token::Op(c));
+                i += 1;
+            }
+            c if c.is_alphabetic() => {
+                let start = i;
+                while i < chars.len() && chars[i].is_alphanumeric() {
+                    i += 1;
+                }
+                tokens.push(Token::Ident(chars[start..i].iter().collect()));
+            }
+            _ => return Err(LexError { position: i }),
+        }
+    }
+    Ok(tokens)
+}
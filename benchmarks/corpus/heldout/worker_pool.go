@@ -0,0 +1,57 @@
+package main
+
+import (
+	"context"
+	"fmt"
+	"sync"
+	"time"
+)
+
+type Job struct {
+	ID      int
+	Payload string
+}
+
+type Result struct {
+	JobID    int
+	Duration time.Duration
+}
+
+func worker(ctx context.Context, jobs <-chan Job, results chan<- Result, wg *sync.WaitGroup) {
+	defer wg.Done()
+	for {
+		select {
+		case <-ctx.Done():
+			return
+		case job, ok := <-jobs:
+			if !ok {
+				return
+			}
+			start := time.Now()
+			time.Sleep(time.Duration(len(job.Payload)) * time.Millisecond)
+			results <- Result{JobID: job.ID, Duration: time.Since(start)}
+		}
+	}
+}
+
+func main() {
+	ctx, cancel := context.WithTimeout(context.Background(), 2*time.Second)
+	defer cancel()
+	jobs := make(chan Job)
+	results := make(chan Result, 16)
+	var wg sync.WaitGroup
+	for i := 0; i < 4; i++ {
+		wg.Add(1)
+		go worker(ctx, jobs, results, &wg)
+	}
+	go func() {
+		for i := 0; i < 10; i++ {
+			jobs <- Job{ID: i, Payload: fmt.Sprintf("job-%d", i)}
+		}
+		close(jobs)
+	}()
+	go func() { wg.Wait(); close(results) }()
+	for r := range results {
+		fmt.Printf("job %d took %v\n", r.JobID, r.Duration)
+	}
+}
@@ -0,0 +1,42 @@
+#include <iostream>
+#include <vector>
+#include <string>
+
+/* Matrix helpers
+   used by the solver */
+namespace solver {
+
+template <typename T>
+class Matrix {
+public:
+    Matrix(size_t rows, size_t cols) : rows_(rows), cols_(cols), data_(rows * cols) {}
+
+    T& at(size_t r, size_t c) { return data_[r * cols_ + c]; }
+
+    Matrix multiply(const Matrix& other) const {
+        Matrix result(rows_, other.cols_);
+        for (size_t i = 0; i < rows_; ++i) {
+            for (size_t j = 0; j < other.cols_; ++j) {
+                T sum = 0;
+                for (size_t k = 0; k < cols_; ++k) {
+                    sum += data_[i * cols_ + k] * other.data_[k * other.cols_ + j];
+                }
+                result.at(i, j) = sum;
+            }
+        }
+        return result;
+    }
+
+private:
+    size_t rows_, cols_;
+    std::vector<T> data_;
+};
+
+} // namespace solver
+
+int main() {
+    solver::Matrix<double> m(2, 2);
+    m.at(0, 0) = 1.5;
+    std::cout << "value: " << m.at(0, 0) << std::endl;
+    return 0;
+}
@@ -0,0 +1,37 @@
+using System;
+using System.Collections.Generic;
+using System.Linq;
+
+namespace Inventory
+{
+    /* Tracks stock levels
+       for each product */
+    public class Stock
+    {
+        private readonly Dictionary<string, int> levels = new Dictionary<string, int>();
+
+        public void Add(string product, int amount)
+        {
+            if (levels.ContainsKey(product))
+                levels[product] += amount;
+            else
+                levels[product] = amount;
+        }
+
+        public IEnumerable<string> LowStock(int threshold)
+        {
+            return levels.Where(pair => pair.Value < threshold).Select(pair => pair.Key);
+        }
+
+        public static void Main(string[] args)
+        {
+            var stock = new Stock();
+            stock.Add("bolts", 4);
+            stock.Add("nuts", 40);
+            foreach (var name in stock.LowStock(10))
+            {
+                Console.WriteLine($"Low: {name}"); // report
+            }
+        }
+    }
+}
@@ -0,0 +1,29 @@
+import 'dart:async';
+import 'dart:math';
+
+/* A simple dice game
+   with two players */
+class Player {
+  final String name;
+  int score = 0;
+
+  Player(this.name);
+
+  void roll(Random random) {
+    score += random.nextInt(6) + 1;
+  }
+}
+
+Future<void> main() async {
+  final random = Random(42);
+  final players = [Player('Ada'), Player('Linus')];
+  for (var round = 1; round <= 3; round++) {
+    for (final player in players) {
+      player.roll(random);
+    }
+    await Future.delayed(const Duration(milliseconds: 10));
+  }
+  final winner = players.reduce((a, b) => a.score >= b.score ? a : b);
+  print('''Winner: ${winner.name}
+with ${winner.score} points'''); // report
+}
@@ -0,0 +1,40 @@
+package main
+
+import (
+	"fmt"
+	"strings"
+	"sync"
+)
+
+/* Counter is safe
+   for concurrent use */
+type Counter struct {
+	mu     sync.Mutex
+	counts map[string]int
+}
+
+func NewCounter() *Counter {
+	return &Counter{counts: make(map[string]int)}
+}
+
+func (c *Counter) Add(word string) {
+	c.mu.Lock()
+	defer c.mu.Unlock()
+	c.counts[strings.ToLower(word)]++
+}
+
+func main() {
+	text := `the quick brown fox
+jumps over the lazy dog`
+	c := NewCounter()
+	var wg sync.WaitGroup
+	for _, w := range strings.Fields(text) {
+		wg.Add(1)
+		go func(word string) {
+			defer wg.Done()
+			c.Add(word)
+		}(w)
+	}
+	wg.Wait()
+	fmt.Println("the:", c.counts["the"]) // 2
+}
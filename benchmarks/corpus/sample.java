@@ -0,0 +1,43 @@
+package com.example.inventory;
+
+import java.util.ArrayList;
+import java.util.List;
+
+/**
+ * Simple in-memory inventory.
+ */
+public class Inventory {
+    private final List<Item> items = new ArrayList<>();
+
+    public void add(String name, int quantity) {
+        if (quantity <= 0) {
+            throw new IllegalArgumentException("quantity must be positive");
+        }
+        items.add(new Item(name, quantity));
+    }
+
+    public int total() {
+        int sum = 0;
+        for (Item item : items) {
+            sum += item.quantity; // accumulate
+        }
+        return sum;
+    }
+
+    public static void main(String[] args) {
+        Inventory inventory = new Inventory();
+        inventory.add("apple", 3);
+        inventory.add("pear", 5);
+        System.out.println("Total: " + inventory.total());
+    }
+
+    static class Item {
+        final String name;
+        final int quantity;
+
+        Item(String name, int quantity) {
+            this.name = name;
+            this.quantity = quantity;
+        }
+    }
+}
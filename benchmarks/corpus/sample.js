@@ -0,0 +1,29 @@
+// Fetch the report and render it into the table
+const API_URL = 'https://example.com/api/reports';
+
+/* Keeps the last response so that
+   re-rendering does not refetch */
+let cache = null;
+
+async function loadReports(filter) {
+    if (cache) {
+        return cache.filter(r => r.status === filter);
+    }
+    const response = await fetch(`${API_URL}?status=${filter}`);
+    const data = await response.json();
+    cache = data.items;
+    return cache;
+}
+
+function render(rows) {
+    const table = document.querySelector('.report');
+    rows.forEach((row, index) => {
+        const tr = document.createElement('tr');
+        tr.innerHTML = `<td>${row.name}</td>
+                        <td>${row.status}</td>`;
+        table.appendChild(tr);
+    });
+    console.log("rendered", rows.length, 'rows');
+}
+
+setTimeout(() => loadReports('ok').then(render), 250);
@@ -0,0 +1,26 @@
+import React, { useState, useEffect } from 'react';
+import { View, Text, Button, FlatList } from 'react-native';
+
+// Shows a list of todos with a counter
+export default function TodoScreen({ route }) {
+    const [todos, setTodos] = useState([]);
+    const [count, setCount] = useState(0);
+
+    useEffect(() => {
+        fetch(`https://example.com/todos?user=${route.params.id}`)
+            .then(res => res.json())
+            .then(data => setTodos(data));
+    }, [route.params.id]);
+
+    return (
+        <View style={styles.container}>
+            <Text style={styles.title}>Todos ({todos.length})</Text>
+            <FlatList
+                data={todos}
+                keyExtractor={item => String(item.id)}
+                renderItem={({ item }) => <Text>{item.title}</Text>}
+            />
+            <Button title="Add" onPress={() => setCount(count + 1)} />
+        </View>
+    );
+}
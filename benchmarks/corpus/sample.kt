@@ -0,0 +1,31 @@
+package com.example.notes
+
+import java.time.LocalDate
+
+/* A note with an optional
+   due date */
+data class Note(val title: String, val due: LocalDate? = null)
+
+class NoteBook {
+    private val notes = mutableListOf<Note>()
+
+    fun add(note: Note) {
+        notes.add(note)
+    }
+
+    fun overdue(today: LocalDate): List<Note> =
+        notes.filter { it.due != null && it.due.isBefore(today) }
+
+    companion object {
+        const val MAX_NOTES = 100
+    }
+}
+
+fun main() {
+    val book = NoteBook()
+    book.add(Note("Pay rent", LocalDate.of(2024, 1, 1)))
+    book.add(Note("Call home"))
+    for (note in book.overdue(LocalDate.now())) {
+        println("Overdue: ${note.title}") // report
+    }
+}
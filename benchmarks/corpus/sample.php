@@ -0,0 +1,36 @@
+<?php
+namespace App\Controllers;
+
+use App\Models\User;
+
+/* Handles user pages
+   and profile updates */
+class UserController
+{
+    private $repository;
+
+    public function __construct($repository)
+    {
+        $this->repository = $repository;
+    }
+
+    public function show($id)
+    {
+        $user = $this->repository->find($id);
+        if ($user === null) {
+            http_response_code(404);
+            echo "User not found";
+            return;
+        }
+        // Render the profile
+        include 'views/profile.php';
+    }
+
+    public function update($id, array $data)
+    {
+        foreach ($data as $key => $value) {
+            $data[$key] = trim($value);
+        }
+        return $this->repository->save($id, $data);
+    }
+}
@@ -0,0 +1,28 @@
+#!/usr/bin/perl
+use strict;
+use warnings;
+
+# Count log levels in a file
+my %counts;
+my $file = shift @ARGV or die "usage: $0 logfile\n";
+
+open(my $fh, '<', $file) or die "Cannot open $file: $!";
+while (my $line = <$fh>) {
+    chomp $line;
+    next unless $line =~ /\[(\w+)\]/;
+    $counts{$1}++;
+}
+close($fh);
+
+foreach my $level (sort keys %counts) {
+    printf "%-8s %d\n", $level, $counts{$level};
+}
+
+sub total {
+    my ($hash) = @_;
+    my $sum = 0;
+    $sum += $_ for values %$hash;
+    return $sum;
+}
+
+print "Total: ", total(\%counts), "\n";
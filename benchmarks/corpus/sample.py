@@ -0,0 +1,42 @@
+import os
+import re
+from collections import defaultdict
+
+
+@dataclass
+class WordCounter(object):
+    """Counts words in text files.
+
+    Lines that start with a hash are skipped.
+    """
+
+    def __init__(self, root, pattern=r"\w+"):
+        self.root = root
+        self.pattern = re.compile(pattern)
+        self.counts = defaultdict(int)
+
+    def scan(self):
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            for name in filenames:
+                if not name.endswith('.txt'):
+                    continue
+                self._count_file(os.path.join(dirpath, name))
+        return self.counts
+
+    def _count_file(self, path):
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                if line.startswith('#'):  # skip comments
+                    continue
+                for word in self.pattern.findall(line):
+                    self.counts[word.lower()] += 1
+
+    def top(self, n=10):
+        return sorted(self.counts.items(), key=lambda item: -item[1])[:n]
+
+
+if __name__ == '__main__':
+    counter = WordCounter('.')
+    counter.scan()
+    for word, count in counter.top(5):
+        print(f"{word}: {count}")
@@ -0,0 +1,27 @@
+# Summarise sales by region
+library(dplyr)
+
+sales <- read.csv("sales.csv", stringsAsFactors = FALSE)
+
+clean_sales <- function(df) {
+  df <- df[!is.na(df$amount), ]
+  df$region <- factor(df$region)
+  return(df)
+}
+
+sales <- clean_sales(sales)
+totals <- aggregate(amount ~ region, data = sales, FUN = sum)
+
+for (i in seq_len(nrow(totals))) {
+  cat(sprintf("%s: %.2f\n", totals$region[i], totals$amount[i]))
+}
+
+if (mean(sales$amount) > 100) {
+  message('High average sale')
+} else {
+  warning("Low average sale")
+}
+
+model <- lm(amount ~ month, data = sales)
+summary(model)
+plot(sales$month, sales$amount, main = "Sales per month")
@@ -0,0 +1,30 @@
+# Simple bank account model
+class Account
+  attr_reader :balance
+
+  def initialize(owner, balance = 0)
+    @owner = owner
+    @balance = balance
+  end
+
+  def deposit(amount)
+    raise ArgumentError, "amount must be positive" unless amount.positive?
+    @balance += amount
+    self
+  end
+
+  def withdraw(amount)
+    if amount > @balance
+      puts 'Insufficient funds'
+    else
+      @balance -= amount
+    end
+    self
+  end
+end
+
+account = Account.new("Ada", 100)
+account.deposit(50).withdraw(30)
+[1, 2, 3].each do |i|
+  puts "Step #{i}: #{account.balance}"
+end
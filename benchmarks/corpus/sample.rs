@@ -0,0 +1,36 @@
+use std::collections::HashMap;
+use std::fs;
+
+/* Parses key=value pairs
+   from a config file */
+#[derive(Debug, Default)]
+pub struct Config {
+    values: HashMap<String, String>,
+}
+
+impl Config {
+    pub fn load(path: &str) -> Result<Self, std::io::Error> {
+        let text = fs::read_to_string(path)?;
+        let mut config = Config::default();
+        for line in text.lines() {
+            if line.starts_with('#') {
+                continue; // comment
+            }
+            if let Some((key, value)) = line.split_once('=') {
+                config.values.insert(key.trim().to_string(), value.trim().to_string());
+            }
+        }
+        Ok(config)
+    }
+
+    pub fn get(&self, key: &str) -> Option<&String> {
+        self.values.get(key)
+    }
+}
+
+fn main() {
+    match Config::load("app.conf") {
+        Ok(config) => println!("port = {:?}", config.get("port")),
+        Err(e) => eprintln!("failed: {}", e),
+    }
+}
@@ -0,0 +1,24 @@
+#!/bin/bash
+# Back up a directory into a dated archive
+set -euo pipefail
+
+SRC="${1:-$HOME/projects}"
+DEST=/var/backups
+STAMP=$(date +%Y-%m-%d)
+
+log() {
+    echo "[$(date +%T)] $*"
+}
+
+if [[ ! -d "$SRC" ]]; then
+    log "source $SRC does not exist"
+    exit 1
+fi
+
+for dir in "$SRC"/*; do
+    name=$(basename "$dir")
+    tar -czf "$DEST/${name}-${STAMP}.tar.gz" -C "$SRC" "$name"
+    log 'archived' "$name"
+done
+
+find "$DEST" -name '*.tar.gz' -mtime +30 -delete
@@ -0,0 +1,21 @@
+-- Monthly revenue per customer
+CREATE TABLE orders (
+    id INT PRIMARY KEY,
+    customer_id INT NOT NULL,
+    total DECIMAL(10, 2),
+    created_at DATETIME
+);
+
+/* Only completed orders
+   are counted */
+SELECT c.name, SUM(o.total) AS revenue, COUNT(o.id) AS orders
+FROM customers c
+INNER JOIN orders o ON o.customer_id = c.id
+WHERE o.status = 'completed'
+  AND o.created_at BETWEEN '2024-01-01' AND '2024-01-31'
+GROUP BY c.name
+HAVING SUM(o.total) > 100
+ORDER BY revenue DESC;
+
+UPDATE customers SET tier = 'gold' WHERE id IN (SELECT customer_id FROM orders WHERE total > 1000);
+DELETE FROM sessions WHERE expires_at IS NULL;
@@ -0,0 +1,31 @@
+import Foundation
+
+/* A small task queue
+   backed by an array */
+struct Task {
+    let title: String
+    var done: Bool = false
+}
+
+class TaskList {
+    private var tasks: [Task] = []
+
+    func add(_ title: String) {
+        tasks.append(Task(title: title))
+    }
+
+    func complete(at index: Int) {
+        guard index < tasks.count else { return }
+        tasks[index].done = true
+    }
+
+    var remaining: Int {
+        return tasks.filter { !$0.done }.count
+    }
+}
+
+let list = TaskList()
+list.add("Write report")
+list.add("Review code")
+list.complete(at: 0)
+print("Remaining: \(list.remaining)") // 1
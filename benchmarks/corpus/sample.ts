@@ -0,0 +1,27 @@
+// Typed event bus
+type Handler<T> = (payload: T) => void;
+
+interface Events {
+    saved: { path: string };
+    closed: { id: number };
+}
+
+/* Dispatches events to
+   registered handlers */
+export class EventBus<E extends Record<string, unknown>> {
+    private handlers: { [K in keyof E]?: Handler<E[K]>[] } = {};
+
+    public on<K extends keyof E>(event: K, handler: Handler<E[K]>): void {
+        (this.handlers[event] ??= []).push(handler);
+    }
+
+    public emit<K extends keyof E>(event: K, payload: E[K]): number {
+        const list = this.handlers[event] ?? [];
+        list.forEach(handler => handler(payload));
+        return list.length;
+    }
+}
+
+const bus = new EventBus<Events>();
+bus.on('saved', ({ path }) => console.log(`saved ${path}`));
+bus.emit('saved', { path: '/tmp/a.txt' });
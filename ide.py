@@ -2,19 +2,32 @@ import sys
 import os
 import json
 import shutil
+import time
+import queue
+import importlib
+import threading
+import tempfile
+import fnmatch
+import functools
+import multiprocessing
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
-    QTabWidget, QTextEdit, QFileSystemModel, QTreeView, QAction,
+    QTabWidget, QFileSystemModel, QTreeView, QAction,
     QFileDialog, QMessageBox, QSplitter, QSizePolicy, QMenu,
     QDialog, QPushButton, QLabel, QLineEdit, QShortcut, QCheckBox,
     QPlainTextEdit, QFontDialog, QAbstractItemView, QInputDialog,
-    QCompleter, QListView, QColorDialog, QGridLayout, QScrollArea
+    QCompleter, QListView, QColorDialog, QGridLayout, QScrollArea, QAbstractScrollArea, QTextEdit
 )
 from PyQt5.QtGui import (
     QIcon, QFont, QColor, QFontMetrics, QTextCharFormat, QTextCursor,
-    QTextDocument, QSyntaxHighlighter, QImage, QPixmap, QTextOption, QKeySequence
+    QTextDocument, QSyntaxHighlighter, QTextBlockUserData, QImage, QPixmap, QTextOption, QKeySequence,
+    QPainter, QImageReader, QImageIOHandler
 )
-from PyQt5.QtCore import Qt, QDir, QProcess, QTimer, QThread, pyqtSignal, QUrl, QMimeData, QStringListModel, QSize, QRect
+from PyQt5.QtCore import (
+    Qt, QDir, QProcess, QTimer, QThread, pyqtSignal, QUrl, QMimeData, QStringListModel, QSize, QRect, QPoint,
+    QAbstractListModel, QModelIndex, QEvent, QPointF, QRectF, QFileSystemWatcher, QObject
+)
+from PyQt5 import sip
 
 try:
     from PyQt5.QtMultimedia import QMediaPlayer, QMediaContent
@@ -24,6 +37,20 @@ except ImportError:
     _HAS_MULTIMEDIA = False
 
 import re
+try:
+    from re import _parser as sre_parse # Python 3.11+
+except ImportError:
+    import sre_parse
+import bisect
+import itertools
+import heapq
+import mmap
+import operator
+import hashlib
+import sqlite3
+import zlib
+from array import array
+from collections import Counter, deque, defaultdict
 try:
     import jedi
     _HAS_JEDI = True
@@ -104,6 +131,8 @@ THEMES = {
         "completer_selection_bg": "#3a3f4b",
         "file_tree_selection_bg": "#007acc", # Blue for file tree selection
         "file_tree_selection_text": "#ffffff", # White text for file tree selection
+        "find_match_bg": "#4b4a2e", # Find bar matches in the editor
+        "find_current_bg": "#8a6d1f", # The selected find bar match
     },
     "light": {
         "bg_color": "#ffffff",
@@ -124,12 +153,152 @@ THEMES = {
         "completer_selection_bg": "#c8d8f0",
         "file_tree_selection_bg": "#4a90d9", # Blue for file tree selection
         "file_tree_selection_text": "#ffffff", # White text for file tree selection
+        "find_match_bg": "#fff3a8",
+        "find_current_bg": "#ffc94d",
     }
 }
 
+# Stylesheet template for the whole application, filled in with a theme's colors by theme_stylesheet().
+THEME_STYLESHEET = """
+    QMainWindow {{
+        background-color: {bg_color};
+        color: {text_color};
+    }}
+    QTabWidget::pane {{
+        border: 1px solid {border_color};
+        border-radius: 5px;
+    }}
+    QTabBar::tab {{
+        background: {tab_bg};
+        color: {tab_text};
+        border: 1px solid {border_color};
+        border-bottom-color: {border_color};
+        border-top-left-radius: 4px;
+        border-top-right-radius: 4px;
+        padding: 5px 10px;
+        margin-right: 2px;
+    }}
+    QTabBar::tab:selected {{
+        background: {tab_selected_bg};
+        color: {text_color};
+        border-bottom-color: {tab_selected_bg};
+    }}
+    QTabBar::tab:hover {{
+        background: {current_line_bg};
+    }}
+    QSplitter::handle {{
+        background-color: {border_color};
+        width: 3px;
+        height: 3px;
+    }}
+    QTreeView {{
+        background-color: {bg_color};
+        color: {text_color};
+        border: 1px solid {border_color};
+        border-radius: 5px;
+    }}
+    QTreeView::item:selected {{
+        background-color: {file_tree_selection_bg}; /* Blue highlight for selected items */
+        color: {file_tree_selection_text}; /* White text for file tree selection */
+        border-radius: 3px; /* Rounded corners for selected item */
+        padding: 2px; /* Add some padding */
+    }}
+    QTreeView::branch:selected {{
+        background-color: {file_tree_selection_bg}; /* Ensure branch also highlights blue */
+    }}
+    QPlainTextEdit {{ /* Terminal */
+        background-color: {terminal_bg};
+        color: {terminal_text};
+        border: 1px solid {border_color};
+        border-radius: 5px;
+    }}
+    QLineEdit {{
+        background-color: {terminal_bg};
+        color: {terminal_text};
+        border: 1px solid {border_color};
+        padding: 2px;
+        border-radius: 3px;
+    }}
+    QPushButton {{
+        background-color: {current_line_bg};
+        color: {text_color};
+        border: 1px solid {border_color};
+        border-radius: 5px;
+        padding: 3px 8px;
+    }}
+    QPushButton:hover {{
+        background-color: {selection_bg};
+    }}
+    QMenu {{
+        background-color: {bg_color};
+        color: {text_color};
+        border: 1px solid {border_color};
+    }}
+    QMenu::item:selected {{
+        background-color: {selection_bg};
+    }}
+    QDialog {{
+        background-color: {bg_color};
+        color: {text_color};
+        border-radius: 5px;
+    }}
+    QLabel {{
+        color: {text_color};
+    }}
+    QCheckBox {{
+        color: {text_color};
+    }}
+    QCompleter {{
+        border: 1px solid {border_color};
+        border-radius: 4px;
+        background-color: {completer_bg};
+        color: {completer_text};
+        selection-background-color: {completer_selection_bg};
+    }}
+    QCompleter::item:selected {{
+        background-color: {completer_selection_bg};
+        color: {completer_text};
+    }}
+    QuickSwitcherDialog {{
+        background-color: {bg_color};
+        color: {text_color};
+        border: 1px solid {border_color};
+        border-radius: 5px;
+    }}
+    QuickSwitcherDialog QLineEdit {{
+        background-color: {terminal_bg};
+        color: {terminal_text};
+        border: 1px solid {border_color};
+        padding: 5px;
+        border-radius: 3px;
+    }}
+    QuickSwitcherDialog QListView {{
+        background-color: {bg_color};
+        color: {text_color};
+        border: 1px solid {border_color};
+        border-radius: 5px;
+    }}
+    QuickSwitcherDialog QListView::item:selected {{
+        background-color: {file_tree_selection_bg};
+        color: {file_tree_selection_text};
+    }}
+"""
+
+_theme_stylesheets = {} # Theme name -> rendered stylesheet
+
+# Renders a theme's stylesheet, once per theme.
+def theme_stylesheet(theme_name):
+    stylesheet = _theme_stylesheets.get(theme_name)
+    if stylesheet is None:
+        stylesheet = THEME_STYLESHEET.format(**THEMES[theme_name])
+        _theme_stylesheets[theme_name] = stylesheet
+    return stylesheet
+
 # Configuration file path for saving user preferences
 CONFIG_FILE = "kodykoala_config.json"
 SESSION_FILE = "kodykoala_session.json" # File for crash recovery
+CACHE_DIR = "kodykoala_cache" # Caches that are safe to delete, kept between sessions
+JEDI_PRELOAD_FILE = os.path.join(CACHE_DIR, "jedi_preload.json") # Imports to warm up per workspace
 
 # CustomFileSystemModel extends QFileSystemModel to provide custom icons.
 # This is used to display a custom folder icon in the file tree.
@@ -151,1024 +320,2173 @@ class CustomFileSystemModel(QFileSystemModel):
             return self.folder_icon # Return custom icon for directories
         return super().icon(index) # For other files, return default icon
 
-# PythonHighlighter provides syntax highlighting for Python code.
-# It defines rules for keywords, strings, comments, functions, numbers, etc.
-class PythonHighlighter(QSyntaxHighlighter):
-    def __init__(self, document):
-        super().__init__(document)
-        self.highlightingRules = []
-
-        # Keyword format and rules
-        keywordFormat = QTextCharFormat()
-        keywordFormat.setForeground(QColor(SYNTAX_COLORS["keywords"]))
-        keywords = ['False', 'None', 'True', 'and', 'as', 'assert', 'async',
-                    'await', 'break', 'class', 'continue', 'def', 'del',
-                    'elif', 'else', 'except', 'finally', 'for', 'from',
-                    'global', 'if', 'import', 'in', 'is', 'lambda', 'nonlocal',
-                    'not', 'or', 'pass', 'raise', 'return', 'try', 'while',
-                    'with', 'yield', 'print', 'input', 'len', 'range', 'list',
-                    'dict', 'set', 'tuple', 'str', 'int', 'float', 'bool',
-                    'super', 'self', 'abs', 'all', 'any', 'ascii', 'bin',
-                    'bytes', 'callable', 'chr', 'classmethod', 'compile', 'complex',
-                    'delattr', 'dir', 'divmod', 'enumerate', 'exec', 'filter',
-                    'format', 'frozenset', 'getattr', 'globals', 'hasattr', 'hash',
-                    'help', 'hex', 'id', 'issubclass', 'iter', 'map', 'max', 'min',
-                    'next', 'object', 'oct', 'open', 'ord', 'pow', 'property',
-                    'repr', 'reversed', 'round', 'setattr', 'slice', 'sorted',
-                    'staticmethod', 'sum', 'type', 'vars', 'zip']
-        self.highlightingRules.extend([(re.compile(r'\b' + keyword + r'\b'), keywordFormat)
-                                       for keyword in keywords])
-
-        # String format and rules (single, double, and triple quotes)
-        stringFormat = QTextCharFormat()
-        stringFormat.setForeground(QColor(SYNTAX_COLORS["strings"]))
-        self.highlightingRules.append((re.compile(r'"[^"\\]*(\\.[^"\\]*)*"'), stringFormat))
-        self.highlightingRules.append((re.compile(r"'[^'\\]*(\\.[^'\\]*)*'"), stringFormat))
-        self.highlightingRules.append((re.compile(r'"""[\s\S]*?"""'), stringFormat))
-        self.highlightingRules.append((re.compile(r"'''[\s\S]*?'''"), stringFormat))
-
-        # Comment format and rules
-        commentFormat = QTextCharFormat()
-        commentFormat.setForeground(QColor(SYNTAX_COLORS["comments"]))
-        self.highlightingRules.append((re.compile(r'#[^\n]*'), commentFormat))
-
-        # Function format and rules
-        functionFormat = QTextCharFormat()
-        functionFormat.setForeground(QColor(SYNTAX_COLORS["function"]))
-        self.highlightingRules.append((re.compile(r'\b[A-Za-z_][A-Za-z0-9_]*\s*\('), functionFormat))
-
-        # Number format and rules (integers and floats)
-        numberFormat = QTextCharFormat()
-        numberFormat.setForeground(QColor(SYNTAX_COLORS["integer"]))
-        self.highlightingRules.append((re.compile(r'\b[0-9]+(?:\.[0-9]+)?\b'), numberFormat))
-
-        # 'self' keyword format
-        selfFormat = QTextCharFormat()
-        selfFormat.setForeground(QColor(SYNTAX_COLORS["self_keyword"]))
-        self.highlightingRules.append((re.compile(r'\bself\b'), selfFormat))
-
-        # Class name format and rules
-        classNameFormat = QTextCharFormat()
-        classNameFormat.setForeground(QColor(SYNTAX_COLORS["class_name"]))
-        self.highlightingRules.append((re.compile(r'\bclass\s+([A-Z][A-Za-z0-9_]*)\b'), classNameFormat))
-
-        # Decorator format and rules
-        decoratorFormat = QTextCharFormat()
-        decoratorFormat.setForeground(QColor(SYNTAX_COLORS["decorator"]))
-        self.highlightingRules.append((re.compile(r'@\b[A-Za-z_][A-Za-z0-9_]*\b'), decoratorFormat))
-
-    # Applies highlighting rules to a block of text.
-    def highlightBlock(self, text):
-        for pattern, format in self.highlightingRules:
-            if pattern.pattern.startswith(r'\bclass\s+') or pattern.pattern.startswith(r'@'):
-                # Special handling for class names and decorators to highlight only the relevant part
-                match_iter = pattern.finditer(text)
-                for match in match_iter:
-                    if match.groups():
-                        self.setFormat(match.start(1), len(match.group(1)), format)
-                    else:
-                        self.setFormat(match.start(), match.end() - match.start(), format)
-            else:
-                # General highlighting for other patterns
-                expression = pattern
-                index = expression.search(text)
-                while index:
-                    self.setFormat(index.start(), index.end() - index.start(), format)
-                    index = expression.search(text, index.end())
-        self.setCurrentBlockState(0)
-
-# HtmlHighlighter provides syntax highlighting for HTML code.
-class HtmlHighlighter(QSyntaxHighlighter):
-    def __init__(self, document):
-        super().__init__(document)
-        self.highlightingRules = []
-
-        tagFormat = QTextCharFormat()
-        tagFormat.setForeground(QColor(SYNTAX_COLORS["html_tag"]))
-        self.highlightingRules.append((re.compile(r'</?[a-zA-Z0-9]+[^>]*>'), tagFormat))
-
-        attributeFormat = QTextCharFormat()
-        attributeFormat.setForeground(QColor(SYNTAX_COLORS["html_attribute"]))
-        self.highlightingRules.append((re.compile(r'\b[a-zA-Z\-]+\s*='), attributeFormat))
-
-        stringFormat = QTextCharFormat()
-        stringFormat.setForeground(QColor(SYNTAX_COLORS["strings"]))
-        self.highlightingRules.append((re.compile(r'"[^"]*"'), stringFormat))
-        self.highlightingRules.append((re.compile(r"'[^']*'"), stringFormat))
-
-        commentFormat = QTextCharFormat()
-        commentFormat.setForeground(QColor(SYNTAX_COLORS["comments"]))
-        self.highlightingRules.append((re.compile(r'<!--.*?-->'), commentFormat))
-
-    def highlightBlock(self, text):
-        for pattern, format in self.highlightingRules:
-            expression = pattern
-            index = expression.search(text)
-            while index:
-                self.setFormat(index.start(), index.end() - index.start(), format)
-                index = expression.search(text, index.end())
-
-# CssHighlighter provides syntax highlighting for CSS code.
-class CssHighlighter(QSyntaxHighlighter):
-    def __init__(self, document):
-        super().__init__(document)
-        self.highlightingRules = []
-
-        selectorFormat = QTextCharFormat()
-        selectorFormat.setForeground(QColor(SYNTAX_COLORS["css_selector"]))
-        self.highlightingRules.append((re.compile(r'[.#]?[a-zA-Z0-9\-]+\s*{'), selectorFormat))
-        self.highlightingRules.append((re.compile(r'\b(body|html|div|span|p|a|ul|ol|li|h1|h2|h3|h4|h5|h6)\b'), selectorFormat))
-
-        propertyFormat = QTextCharFormat()
-        propertyFormat.setForeground(QColor(SYNTAX_COLORS["css_property"]))
-        css_properties = ['align-items', 'background', 'background-color', 'border', 'border-radius',
-                          'box-shadow', 'color', 'display', 'flex', 'font-family', 'font-size',
-                          'font-weight', 'height', 'justify-content', 'margin', 'margin-bottom',
-                          'margin-left', 'margin-right', 'margin-top', 'max-width', 'min-height',
-                          'opacity', 'overflow', 'padding', 'padding-bottom', 'padding-left',
-                          'padding-right', 'padding-top', 'position', 'text-align', 'text-decoration',
-                          'transform', 'transition', 'width', 'z-index', 'top', 'bottom', 'left', 'right']
-        self.highlightingRules.extend([(re.compile(r'\b' + prop + r'\b\s*:'), propertyFormat) for prop in css_properties])
-
-        valueFormat = QTextCharFormat()
-        valueFormat.setForeground(QColor(SYNTAX_COLORS["function"]))
-        self.highlightingRules.append((re.compile(r':\s*[^;}]*'), valueFormat))
-
-        commentFormat = QTextCharFormat()
-        commentFormat.setForeground(QColor(SYNTAX_COLORS["comments"]))
-        self.highlightingRules.append((re.compile(r'/\*.*?\*/'), commentFormat))
-
-    def highlightBlock(self, text):
-        for pattern, format in self.highlightingRules:
-            expression = pattern
-            index = expression.search(text)
-            while index:
-                self.setFormat(index.start(), index.end() - index.start(), format)
-                index = expression.search(text, index.end())
-
-# JavaScriptHighlighter provides syntax highlighting for JavaScript code.
-class JavaScriptHighlighter(QSyntaxHighlighter):
-    def __init__(self, document):
-        super().__init__(document)
-        self.highlightingRules = []
-
-        keywordFormat = QTextCharFormat()
-        keywordFormat.setForeground(QColor(SYNTAX_COLORS["js_keyword"]))
-        keywords = ['break', 'case', 'catch', 'class', 'const', 'continue',
-                    'debugger', 'default', 'delete', 'do', 'else', 'export',
-                    'extends', 'finally', 'for', 'function', 'if', 'import',
-                    'in', 'instanceof', 'new', 'return', 'super', 'switch',
-                    'this', 'throw', 'typeof', 'var', 'void', 'while',
-                    'with', 'yield', 'let', 'static', 'await', 'async', 'of',
-                    'console', 'log', 'document', 'window', 'alert', 'confirm',
-                    'prompt', 'fetch', 'then', 'catch', 'finally', 'map', 'filter',
-                    'reduce', 'forEach', 'setTimeout', 'setInterval', 'clearTimeout',
-                    'clearInterval', 'JSON', 'parse', 'stringify', 'Math', 'Date',
-                    'Array', 'Object', 'String', 'Number', 'Boolean', 'Promise',
-                    'Symbol', 'Proxy', 'Reflect', 'WeakMap', 'WeakSet', 'Set', 'Map']
-        self.highlightingRules.extend([(re.compile(r'\b' + keyword + r'\b'), keywordFormat)
-                                       for keyword in keywords])
-
-        stringFormat = QTextCharFormat()
-        stringFormat.setForeground(QColor(SYNTAX_COLORS["js_string"]))
-        self.highlightingRules.append((re.compile(r'"[^"\\]*(\\.[^"\\]*)*"'), stringFormat))
-        self.highlightingRules.append((re.compile(r"'[^'\\]*(\\.[^'\\]*)*'"), stringFormat))
-        self.highlightingRules.append((re.compile(r'`[^`\\]*(\\.[^`\\]*)*`'), stringFormat))
-
-        commentFormat = QTextCharFormat()
-        commentFormat.setForeground(QColor(SYNTAX_COLORS["comments"]))
-        self.highlightingRules.append((re.compile(r'//[^\n]*'), commentFormat))
-        self.highlightingRules.append((re.compile(r'/\*.*?\*/', re.DOTALL), commentFormat))
-
-        numberFormat = QTextCharFormat()
-        numberFormat.setForeground(QColor(SYNTAX_COLORS["integer"]))
-        self.highlightingRules.append((re.compile(r'\b[0-9]+(?:\.[0-9]+)?\b'), numberFormat))
-
-        functionFormat = QTextCharFormat()
-        functionFormat.setForeground(QColor(SYNTAX_COLORS["function"]))
-        self.highlightingRules.append((re.compile(r'\b[a-zA-Z_][a-zA-Z0-9_]*\s*\('), functionFormat))
-
-    def highlightBlock(self, text):
-        for pattern, format in self.highlightingRules:
-            expression = pattern
-            index = expression.search(text)
-            while index:
-                self.setFormat(index.start(), index.end() - index.start(), format)
-                index = expression.search(text, index.end())
-
-# JavaHighlighter provides syntax highlighting for Java code.
-class JavaHighlighter(QSyntaxHighlighter):
-    def __init__(self, document):
-        super().__init__(document)
-        self.highlightingRules = []
-        keywordFormat = QTextCharFormat()
-        keywordFormat.setForeground(QColor(SYNTAX_COLORS["java_keyword"]))
-        keywords = ['abstract', 'continue', 'for', 'new', 'switch', 'assert', 'default', 'goto',
-                    'package', 'synchronized', 'boolean', 'do', 'if', 'private', 'this', 'break',
-                    'double', 'implements', 'protected', 'throw', 'byte', 'else', 'import',
-                    'public', 'throws', 'case', 'enum', 'instanceof', 'return', 'transient',
-                    'catch', 'extends', 'int', 'short', 'try', 'char', 'final', 'interface',
-                    'static', 'void', 'class', 'finally', 'long', 'strictfp', 'volatile',
-                    'const', 'float', 'native', 'super', 'while', 'null', 'true', 'false',
-                    'System', 'out', 'println', 'main', 'String', 'void', 'public', 'private',
-                    'protected']
-        self.highlightingRules.extend([(re.compile(r'\b' + keyword + r'\b'), keywordFormat) for keyword in keywords])
-        stringFormat = QTextCharFormat()
-        stringFormat.setForeground(QColor(SYNTAX_COLORS["strings"]))
-        self.highlightingRules.append((re.compile(r'"[^"\\]*(\\.[^"\\]*)*"'), stringFormat))
-        self.highlightingRules.append((re.compile(r"'[^'\\]*(\\.[^'\\]*)*'"), stringFormat))
-        commentFormat = QTextCharFormat()
-        commentFormat.setForeground(QColor(SYNTAX_COLORS["comments"]))
-        self.highlightingRules.append((re.compile(r'//[^\n]*'), commentFormat))
-        self.highlightingRules.append((re.compile(r'/\*.*?\*/', re.DOTALL), commentFormat))
-        numberFormat = QTextCharFormat()
-        numberFormat.setForeground(QColor(SYNTAX_COLORS["integer"]))
-        self.highlightingRules.append((re.compile(r'\b[0-9]+(?:\.[0-9]+)?\b'), numberFormat))
-
-    def highlightBlock(self, text):
-        for pattern, format in self.highlightingRules:
-            expression = pattern
-            index = expression.search(text)
-            while index:
-                self.setFormat(index.start(), index.end() - index.start(), format)
-                index = expression.search(text, index.end())
-
-# CppHighlighter provides syntax highlighting for C++ code.
-class CppHighlighter(QSyntaxHighlighter):
-    def __init__(self, document):
-        super().__init__(document)
-        self.highlightingRules = []
-        keywordFormat = QTextCharFormat()
-        keywordFormat.setForeground(QColor(SYNTAX_COLORS["c_cpp_keyword"]))
-        keywords = ['alignas', 'alignof', 'and', 'and_eq', 'asm', 'atomic_cancel',
-                    'atomic_commit', 'atomic_noexcept', 'auto', 'bitand', 'bitor',
-                    'bool', 'break', 'case', 'catch', 'char', 'char8_t', 'char16_t',
-                    'char32_t', 'class', 'compl', 'concept', 'const', 'consteval',
-                    'constexpr', 'constinit', 'const_cast', 'continue', 'co_await',
-                    'co_return', 'co_yield', 'decltype', 'default', 'delete', 'do',
-                    'double', 'dynamic_cast', 'else', 'enum', 'explicit', 'export',
-                    'extern', 'false', 'float', 'for', 'friend', 'goto', 'if',
-                    'inline', 'int', 'long', 'mutable', 'namespace', 'new', 'noexcept',
-                    'not', 'not_eq', 'nullptr', 'operator', 'or', 'or_eq', 'private',
-                    'protected', 'public', 'reflexpr', 'register', 'reinterpret_cast',
-                    'requires', 'return', 'short', 'signed', 'sizeof', 'static',
-                    'static_assert', 'static_cast', 'struct', 'switch', 'synchronized',
-                    'template', 'this', 'thread_local', 'throw', 'true', 'try',
-                    'typedef', 'typeid', 'typename', 'union', 'unsigned', 'using',
-                    'virtual', 'void', 'volatile', 'wchar_t', 'while', 'xor', 'xor_eq',
-                    'cout', 'cin', 'endl', 'std', 'vector', 'string', 'map', 'set', 'include']
-        self.highlightingRules.extend([(re.compile(r'\b' + keyword + r'\b'), keywordFormat) for keyword in keywords])
-        preprocessorFormat = QTextCharFormat()
-        preprocessorFormat.setForeground(QColor(SYNTAX_COLORS["import"]))
-        self.highlightingRules.append((re.compile(r'#.*'), preprocessorFormat))
-        stringFormat = QTextCharFormat()
-        stringFormat.setForeground(QColor(SYNTAX_COLORS["strings"]))
-        self.highlightingRules.append((re.compile(r'"[^"\\]*(\\.[^"\\]*)*"'), stringFormat))
-        self.highlightingRules.append((re.compile(r"'[^'\\]*(\\.[^'\\]*)*'"), stringFormat))
-        commentFormat = QTextCharFormat()
-        commentFormat.setForeground(QColor(SYNTAX_COLORS["comments"]))
-        self.highlightingRules.append((re.compile(r'//[^\n]*'), commentFormat))
-        self.highlightingRules.append((re.compile(r'/\*.*?\*/', re.DOTALL), commentFormat))
-        numberFormat = QTextCharFormat()
-        numberFormat.setForeground(QColor(SYNTAX_COLORS["integer"]))
-        self.highlightingRules.append((re.compile(r'\b[0-9]+(?:\.[0-9]+)?\b'), numberFormat))
-
-    def highlightBlock(self, text):
-        for pattern, format in self.highlightingRules:
-            expression = pattern
-            index = expression.search(text)
-            while index:
-                self.setFormat(index.start(), index.end() - index.start(), format)
-                index = expression.search(text, index.end())
-
-# CSharpHighlighter provides syntax highlighting for C# code.
-class CSharpHighlighter(QSyntaxHighlighter):
-    def __init__(self, document):
-        super().__init__(document)
-        self.highlightingRules = []
-        keywordFormat = QTextCharFormat()
-        keywordFormat.setForeground(QColor(SYNTAX_COLORS["csharp_keyword"]))
-        keywords = ['abstract', 'as', 'base', 'bool', 'break', 'byte', 'case', 'catch',
-                    'char', 'checked', 'class', 'const', 'continue', 'decimal', 'default',
-                    'delegate', 'do', 'double', 'else', 'enum', 'event', 'explicit', 'extern',
-                    'false', 'finally', 'fixed', 'float', 'for', 'foreach', 'goto', 'if',
-                    'implicit', 'in', 'int', 'interface', 'internal', 'is', 'lock', 'long',
-                    'namespace', 'new', 'null', 'object', 'operator', 'out', 'override',
-                    'params', 'private', 'protected', 'public', 'readonly', 'ref', 'return',
-                    'sbyte', 'sealed', 'short', 'sizeof', 'stackalloc', 'static', 'string',
-                    'struct', 'switch', 'this', 'throw', 'true', 'try', 'typeof', 'uint',
-                    'ulong', 'unchecked', 'unsafe', 'ushort', 'using', 'virtual', 'void',
-                    'volatile', 'while', 'add', 'alias', 'ascending', 'async', 'await',
-                    'by', 'descending', 'dynamic', 'from', 'get', 'global', 'group', 'into',
-                    'join', 'let', 'nameof', 'on', 'orderby', 'partial', 'remove', 'select',
-                    'set', 'value', 'var', 'when', 'where', 'yield', 'Console', 'WriteLine']
-        self.highlightingRules.extend([(re.compile(r'\b' + keyword + r'\b'), keywordFormat) for keyword in keywords])
-        stringFormat = QTextCharFormat()
-        stringFormat.setForeground(QColor(SYNTAX_COLORS["strings"]))
-        self.highlightingRules.append((re.compile(r'"[^"\\]*(\\.[^"\\]*)*"'), stringFormat))
-        self.highlightingRules.append((re.compile(r"'[^'\\]*(\\.[^'\\]*)*'"), stringFormat))
-        commentFormat = QTextCharFormat()
-        commentFormat.setForeground(QColor(SYNTAX_COLORS["comments"]))
-        self.highlightingRules.append((re.compile(r'//[^\n]*'), commentFormat))
-        self.highlightingRules.append((re.compile(r'/\*.*?\*/', re.DOTALL), commentFormat))
-        numberFormat = QTextCharFormat()
-        numberFormat.setForeground(QColor(SYNTAX_COLORS["integer"]))
-        self.highlightingRules.append((re.compile(r'\b[0-9]+(?:\.[0-9]+)?\b'), numberFormat))
-
-    def highlightBlock(self, text):
-        for pattern, format in self.highlightingRules:
-            expression = pattern
-            index = expression.search(text)
-            while index:
-                self.setFormat(index.start(), index.end() - index.start(), format)
-                index = expression.search(text, index.end())
-
-# ScssHighlighter provides syntax highlighting for SCSS code.
-class ScssHighlighter(QSyntaxHighlighter):
-    def __init__(self, document):
-        super().__init__(document)
-        self.highlightingRules = []
-        variableFormat = QTextCharFormat()
-        variableFormat.setForeground(QColor(SYNTAX_COLORS["variable"]))
-        self.highlightingRules.append((re.compile(r'\$[a-zA-Z0-9_-]+'), variableFormat))
-
-        keywordFormat = QTextCharFormat()
-        keywordFormat.setForeground(QColor(SYNTAX_COLORS["keywords"]))
-        keywords = ['@import', '@mixin', '@include', '@function', '@return', '@extend', '@if', '@else', '@for', '@each', '@while']
-        self.highlightingRules.extend([(re.compile(r'\b' + keyword + r'\b'), keywordFormat) for keyword in keywords])
+# Language grammars are plain data tables that are compiled by LanguageGrammar.
+# Each rule is a dict with these keys:
+#   'kind'        - SYNTAX_COLORS key used to color the token, or None to consume it without a format
+#   'pattern'     - regular expression matching the token
+#   'keywords'    - instead of 'pattern', a list of words compiled into one word-bounded alternation
+#   'suffix'      - extra pattern (usually a lookahead) appended after the keyword alternation
+#   'group'       - format only the first capture group of the pattern instead of the whole match;
+#                   the text before the group is left to the other rules
+#   'ignore_case' - match this rule case-insensitively
+#   'end'         - the token may span several blocks: 'pattern' opens it and 'end' closes it
+#   'bold', 'italic', 'underline' - extra character formatting for the token
+# Rules are listed in priority order: when two rules match at the same position the earlier one wins.
+
+_COMMENT_HASH = {'kind': 'comments', 'pattern': r'#.*'}
+_COMMENT_LINE = {'kind': 'comments', 'pattern': r'//.*'}
+_COMMENT_BLOCK = {'kind': 'comments', 'pattern': r'/\*', 'end': r'\*/'}
+_STRING_DOUBLE = {'kind': 'strings', 'pattern': r'"[^"\\]*(?:\\.[^"\\]*)*"'}
+_STRING_SINGLE = {'kind': 'strings', 'pattern': r"'[^'\\]*(?:\\.[^'\\]*)*'"}
+_NUMBER = {'kind': 'integer', 'pattern': r'\b[0-9]+(?:\.[0-9]+)?\b'}
+_FUNCTION_CALL = {'kind': 'function', 'pattern': r'\b[A-Za-z_][A-Za-z0-9_]*(?=\s*\()'}
+_IDENTIFIER = {'kind': None, 'pattern': r'\b[A-Za-z_][A-Za-z0-9_]*'}
+
+_JAVASCRIPT_RULES = [
+    _COMMENT_LINE, _COMMENT_BLOCK,
+    {'kind': 'js_string', 'pattern': r'"[^"\\]*(?:\\.[^"\\]*)*"'},
+    {'kind': 'js_string', 'pattern': r"'[^'\\]*(?:\\.[^'\\]*)*'"},
+    {'kind': 'js_string', 'pattern': r'`', 'end': r'(?<!\\)`'},
+    _FUNCTION_CALL,
+    {'kind': 'js_keyword', 'keywords': [
+        'break', 'case', 'catch', 'class', 'const', 'continue',
+        'debugger', 'default', 'delete', 'do', 'else', 'export',
+        'extends', 'finally', 'for', 'function', 'if', 'import',
+        'in', 'instanceof', 'new', 'return', 'super', 'switch',
+        'this', 'throw', 'typeof', 'var', 'void', 'while',
+        'with', 'yield', 'let', 'static', 'await', 'async', 'of',
+        'console', 'log', 'document', 'window', 'alert', 'confirm',
+        'prompt', 'fetch', 'then', 'map', 'filter',
+        'reduce', 'forEach', 'setTimeout', 'setInterval', 'clearTimeout',
+        'clearInterval', 'JSON', 'parse', 'stringify', 'Math', 'Date',
+        'Array', 'Object', 'String', 'Number', 'Boolean', 'Promise',
+        'Symbol', 'Proxy', 'Reflect', 'WeakMap', 'WeakSet', 'Set', 'Map']},
+    _IDENTIFIER, _NUMBER,
+]
+
+_HTML_RULES = [
+    {'kind': 'comments', 'pattern': r'<!--', 'end': r'-->'},
+    {'kind': 'html_tag', 'pattern': r'</?[a-zA-Z0-9]+'},
+    {'kind': 'html_tag', 'pattern': r'/?>'},
+    {'kind': 'html_attribute', 'pattern': r'\b[a-zA-Z\-]+(?=\s*=)'},
+    {'kind': 'strings', 'pattern': r'"[^"]*"'},
+    {'kind': 'strings', 'pattern': r"'[^']*'"},
+]
+
+_CSS_RULES = [
+    _COMMENT_BLOCK,
+    {'kind': 'css_property', 'suffix': r'(?=\s*:)', 'keywords': [
+        'align-items', 'background', 'background-color', 'border', 'border-radius',
+        'box-shadow', 'color', 'display', 'flex', 'font-family', 'font-size',
+        'font-weight', 'height', 'justify-content', 'margin', 'margin-bottom',
+        'margin-left', 'margin-right', 'margin-top', 'max-width', 'min-height',
+        'opacity', 'overflow', 'padding', 'padding-bottom', 'padding-left',
+        'padding-right', 'padding-top', 'position', 'text-align', 'text-decoration',
+        'transform', 'transition', 'width', 'z-index', 'top', 'bottom', 'left', 'right']},
+    {'kind': 'function', 'pattern': r':\s*[^;{}]*'},
+    {'kind': 'css_selector', 'pattern': r'[.#]?[a-zA-Z0-9\-]+(?=\s*\{)'},
+    {'kind': 'css_selector', 'keywords': ['body', 'html', 'div', 'span', 'p', 'a', 'ul', 'ol', 'li',
+                                          'h1', 'h2', 'h3', 'h4', 'h5', 'h6']},
+]
+
+LANGUAGE_GRAMMARS = {
+    'python': [
+        {'kind': 'strings', 'pattern': r'(?:\b[rRbBuUfF]{1,2})?"""', 'end': r'"""'},
+        {'kind': 'strings', 'pattern': r"(?:\b[rRbBuUfF]{1,2})?'''", 'end': r"'''"},
+        {'kind': 'strings', 'pattern': r'(?:\b[rRbBuUfF]{1,2})?"[^"\\]*(?:\\.[^"\\]*)*"'},
+        {'kind': 'strings', 'pattern': r"(?:\b[rRbBuUfF]{1,2})?'[^'\\]*(?:\\.[^'\\]*)*'"},
+        _COMMENT_HASH,
+        {'kind': 'decorator', 'pattern': r'@[A-Za-z_][A-Za-z0-9_]*'},
+        {'kind': 'class_name', 'pattern': r'\bclass\s+([A-Z][A-Za-z0-9_]*)\b', 'group': True},
+        _FUNCTION_CALL,
+        {'kind': 'self_keyword', 'keywords': ['self']},
+        {'kind': 'keywords', 'keywords': [
+            'False', 'None', 'True', 'and', 'as', 'assert', 'async',
+            'await', 'break', 'class', 'continue', 'def', 'del',
+            'elif', 'else', 'except', 'finally', 'for', 'from',
+            'global', 'if', 'import', 'in', 'is', 'lambda', 'nonlocal',
+            'not', 'or', 'pass', 'raise', 'return', 'try', 'while',
+            'with', 'yield', 'print', 'input', 'len', 'range', 'list',
+            'dict', 'set', 'tuple', 'str', 'int', 'float', 'bool',
+            'super', 'abs', 'all', 'any', 'ascii', 'bin',
+            'bytes', 'callable', 'chr', 'classmethod', 'compile', 'complex',
+            'delattr', 'dir', 'divmod', 'enumerate', 'exec', 'filter',
+            'format', 'frozenset', 'getattr', 'globals', 'hasattr', 'hash',
+            'help', 'hex', 'id', 'issubclass', 'iter', 'map', 'max', 'min',
+            'next', 'object', 'oct', 'open', 'ord', 'pow', 'property',
+            'repr', 'reversed', 'round', 'setattr', 'slice', 'sorted',
+            'staticmethod', 'sum', 'type', 'vars', 'zip']},
+        _IDENTIFIER, _NUMBER,
+    ],
+    'html': _HTML_RULES,
+    'css': _CSS_RULES,
+    'javascript': _JAVASCRIPT_RULES,
+    'java': [
+        _COMMENT_LINE, _COMMENT_BLOCK, _STRING_DOUBLE, _STRING_SINGLE,
+        {'kind': 'java_keyword', 'keywords': [
+            'abstract', 'continue', 'for', 'new', 'switch', 'assert', 'default', 'goto',
+            'package', 'synchronized', 'boolean', 'do', 'if', 'private', 'this', 'break',
+            'double', 'implements', 'protected', 'throw', 'byte', 'else', 'import',
+            'public', 'throws', 'case', 'enum', 'instanceof', 'return', 'transient',
+            'catch', 'extends', 'int', 'short', 'try', 'char', 'final', 'interface',
+            'static', 'void', 'class', 'finally', 'long', 'strictfp', 'volatile',
+            'const', 'float', 'native', 'super', 'while', 'null', 'true', 'false',
+            'System', 'out', 'println', 'main', 'String']},
+        _IDENTIFIER, _NUMBER,
+    ],
+    'cpp': [
+        _COMMENT_LINE, _COMMENT_BLOCK,
+        {'kind': 'import', 'pattern': r'^\s*#\s*[A-Za-z]+'},
+        _STRING_DOUBLE, _STRING_SINGLE,
+        {'kind': 'c_cpp_keyword', 'keywords': [
+            'alignas', 'alignof', 'and', 'and_eq', 'asm', 'atomic_cancel',
+            'atomic_commit', 'atomic_noexcept', 'auto', 'bitand', 'bitor',
+            'bool', 'break', 'case', 'catch', 'char', 'char8_t', 'char16_t',
+            'char32_t', 'class', 'compl', 'concept', 'const', 'consteval',
+            'constexpr', 'constinit', 'const_cast', 'continue', 'co_await',
+            'co_return', 'co_yield', 'decltype', 'default', 'delete', 'do',
+            'double', 'dynamic_cast', 'else', 'enum', 'explicit', 'export',
+            'extern', 'false', 'float', 'for', 'friend', 'goto', 'if',
+            'inline', 'int', 'long', 'mutable', 'namespace', 'new', 'noexcept',
+            'not', 'not_eq', 'nullptr', 'operator', 'or', 'or_eq', 'private',
+            'protected', 'public', 'reflexpr', 'register', 'reinterpret_cast',
+            'requires', 'return', 'short', 'signed', 'sizeof', 'static',
+            'static_assert', 'static_cast', 'struct', 'switch', 'synchronized',
+            'template', 'this', 'thread_local', 'throw', 'true', 'try',
+            'typedef', 'typeid', 'typename', 'union', 'unsigned', 'using',
+            'virtual', 'void', 'volatile', 'wchar_t', 'while', 'xor', 'xor_eq',
+            'cout', 'cin', 'endl', 'std', 'vector', 'string', 'map', 'set', 'include']},
+        _IDENTIFIER, _NUMBER,
+    ],
+    'csharp': [
+        _COMMENT_LINE, _COMMENT_BLOCK, _STRING_DOUBLE, _STRING_SINGLE,
+        {'kind': 'csharp_keyword', 'keywords': [
+            'abstract', 'as', 'base', 'bool', 'break', 'byte', 'case', 'catch',
+            'char', 'checked', 'class', 'const', 'continue', 'decimal', 'default',
+            'delegate', 'do', 'double', 'else', 'enum', 'event', 'explicit', 'extern',
+            'false', 'finally', 'fixed', 'float', 'for', 'foreach', 'goto', 'if',
+            'implicit', 'in', 'int', 'interface', 'internal', 'is', 'lock', 'long',
+            'namespace', 'new', 'null', 'object', 'operator', 'out', 'override',
+            'params', 'private', 'protected', 'public', 'readonly', 'ref', 'return',
+            'sbyte', 'sealed', 'short', 'sizeof', 'stackalloc', 'static', 'string',
+            'struct', 'switch', 'this', 'throw', 'true', 'try', 'typeof', 'uint',
+            'ulong', 'unchecked', 'unsafe', 'ushort', 'using', 'virtual', 'void',
+            'volatile', 'while', 'add', 'alias', 'ascending', 'async', 'await',
+            'by', 'descending', 'dynamic', 'from', 'get', 'global', 'group', 'into',
+            'join', 'let', 'nameof', 'on', 'orderby', 'partial', 'remove', 'select',
+            'set', 'value', 'var', 'when', 'where', 'yield', 'Console', 'WriteLine']},
+        _IDENTIFIER, _NUMBER,
+    ],
+    'scss': [
+        _COMMENT_LINE,
+        {'kind': 'variable', 'pattern': r'\$[a-zA-Z0-9_-]+'},
+        {'kind': 'keywords', 'keywords': ['@import', '@mixin', '@include', '@function', '@return',
+                                          '@extend', '@if', '@else', '@for', '@each', '@while']},
+    ] + _CSS_RULES,
+    'sql': [
+        {'kind': 'comments', 'pattern': r'--.*'}, _COMMENT_BLOCK, _STRING_SINGLE,
+        {'kind': 'sql_keyword', 'ignore_case': True, 'keywords': [
+            'SELECT', 'FROM', 'WHERE', 'AND', 'OR', 'INSERT', 'INTO', 'VALUES',
+            'UPDATE', 'SET', 'DELETE', 'CREATE', 'TABLE', 'ALTER', 'DROP',
+            'JOIN', 'INNER', 'LEFT', 'RIGHT', 'FULL', 'ON', 'GROUP BY', 'ORDER BY',
+            'HAVING', 'AS', 'DISTINCT', 'COUNT', 'SUM', 'AVG', 'MIN', 'MAX',
+            'DATABASE', 'USE', 'PRIMARY KEY', 'FOREIGN KEY', 'NOT NULL', 'UNIQUE',
+            'INDEX', 'VIEW', 'PROCEDURE', 'FUNCTION', 'TRIGGER', 'BEGIN', 'END',
+            'COMMIT', 'ROLLBACK', 'TRUNCATE', 'UNION', 'ALL', 'EXISTS', 'LIKE',
+            'IN', 'IS', 'NULL', 'BETWEEN', 'CASE', 'WHEN', 'THEN', 'CAST',
+            'CONVERT', 'DATE', 'TIME', 'DATETIME', 'VARCHAR', 'INT', 'TEXT', 'BOOLEAN']},
+        _IDENTIFIER,
+    ],
+    'swift': [
+        _COMMENT_LINE, _COMMENT_BLOCK, _STRING_DOUBLE,
+        {'kind': 'swift_keyword', 'keywords': [
+            'associatedtype', 'class', 'deinit', 'enum', 'extension', 'fileprivate',
+            'func', 'import', 'init', 'inout', 'internal', 'let', 'open', 'operator',
+            'private', 'protocol', 'public', 'static', 'struct', 'subscript', 'typealias',
+            'var', 'break', 'case', 'continue', 'default', 'defer', 'do', 'else',
+            'fallthrough', 'for', 'guard', 'if', 'in', 'repeat', 'return', 'switch',
+            'where', 'while', 'as', 'Any', 'catch', 'false', 'is', 'nil', 'rethrows',
+            'super', 'self', 'Self', 'throw', 'throws', 'true', 'try', 'associativity',
+            'convenience', 'dynamic', 'didSet', 'final', 'get', 'infix', 'indirect',
+            'lazy', 'left', 'mutating', 'nonmutating', 'optional', 'override', 'postfix',
+            'precedence', 'prefix', 'Protocol', 'required', 'right', 'set', 'Type',
+            'unowned', 'weak', 'willSet', 'print']},
+        _IDENTIFIER, _NUMBER,
+    ],
+    'ruby': [
+        _COMMENT_HASH, _STRING_DOUBLE, _STRING_SINGLE,
+        {'kind': 'ruby_keyword', 'keywords': [
+            'BEGIN', 'END', 'alias', 'and', 'begin', 'break', 'case', 'class',
+            'def', 'defined?', 'do', 'else', 'elsif', 'end', 'ensure', 'false',
+            'for', 'if', 'in', 'module', 'next', 'nil', 'not', 'or', 'redo',
+            'rescue', 'retry', 'return', 'self', 'super', 'then', 'true',
+            'undef', 'unless', 'until', 'when', 'while', 'yield', 'puts', 'gets']},
+        _IDENTIFIER, _NUMBER,
+    ],
+    'go': [
+        _COMMENT_LINE, _COMMENT_BLOCK, _STRING_DOUBLE,
+        {'kind': 'strings', 'pattern': r'`', 'end': r'`'},
+        {'kind': 'go_keyword', 'keywords': [
+            'break', 'case', 'chan', 'const', 'continue', 'default', 'defer', 'else',
+            'fallthrough', 'for', 'func', 'go', 'goto', 'if', 'import', 'interface',
+            'map', 'package', 'range', 'return', 'select', 'struct', 'switch', 'type',
+            'var', 'fmt', 'Println', 'main']},
+        _IDENTIFIER, _NUMBER,
+    ],
+    'rust': [
+        _COMMENT_LINE, _COMMENT_BLOCK, _STRING_DOUBLE,
+        {'kind': 'rust_keyword', 'keywords': [
+            'as', 'break', 'const', 'continue', 'crate', 'else', 'enum', 'extern',
+            'false', 'fn', 'for', 'if', 'impl', 'in', 'let', 'loop', 'match',
+            'mod', 'move', 'mut', 'pub', 'ref', 'return', 'self', 'Self', 'static',
+            'struct', 'super', 'trait', 'true', 'type', 'unsafe', 'use', 'where',
+            'while', 'async', 'await', 'dyn', 'macro', 'union', 'println']},
+        _IDENTIFIER, _NUMBER,
+    ],
+    'php': [
+        _COMMENT_LINE, _COMMENT_HASH, _COMMENT_BLOCK, _STRING_DOUBLE, _STRING_SINGLE,
+        {'kind': 'variable', 'pattern': r'\$[a-zA-Z_][a-zA-Z0-9_]*'},
+        {'kind': 'php_keyword', 'ignore_case': True, 'keywords': [
+            '__halt_compiler', 'abstract', 'and', 'array', 'as', 'break', 'callable',
+            'case', 'catch', 'class', 'clone', 'const', 'continue', 'declare', 'default',
+            'die', 'do', 'echo', 'else', 'elseif', 'empty', 'enddeclare', 'endfor',
+            'endforeach', 'endif', 'endswitch', 'endwhile', 'eval', 'exit', 'extends',
+            'final', 'finally', 'for', 'foreach', 'function', 'global', 'goto', 'if',
+            'implements', 'include', 'include_once', 'instanceof', 'insteadof', 'interface',
+            'isset', 'list', 'namespace', 'new', 'or', 'print', 'private', 'protected',
+            'public', 'require', 'require_once', 'return', 'static', 'switch', 'throw',
+            'trait', 'try', 'unset', 'use', 'var', 'while', 'xor', 'yield']},
+        _IDENTIFIER, _NUMBER,
+    ],
+    'perl': [
+        _COMMENT_HASH, _STRING_DOUBLE, _STRING_SINGLE,
+        {'kind': 'variable', 'pattern': r'[\$\@\%][a-zA-Z_][a-zA-Z0-9_]*'},
+        {'kind': 'perl_keyword', 'keywords': [
+            'abs', 'accept', 'alarm', 'and', 'atan2', 'bind', 'binmode', 'bless',
+            'break', 'caller', 'chdir', 'chmod', 'chomp', 'chop', 'chown', 'chr',
+            'chroot', 'close', 'closedir', 'connect', 'continue', 'cos', 'crypt',
+            'dbmclose', 'dbmopen', 'defined', 'delete', 'die', 'do', 'dump', 'each',
+            'else', 'elsif', 'endgrent', 'endhostent', 'endnetent', 'endprotoent',
+            'endpwent', 'endservent', 'eof', 'eval', 'exec', 'exists', 'exit',
+            'exp', 'fcntl', 'fileno', 'flock', 'for', 'foreach', 'fork', 'format',
+            'formline', 'getc', 'getgrent', 'getgrgid', 'getgrnam', 'gethostbyaddr',
+            'gethostbyname', 'gethostent', 'getlogin', 'getnetbyaddr', 'getnetbyname',
+            'getnetent', 'getpeername', 'getpgrp', 'getppid', 'getpriority',
+            'getprotobyname', 'getprotobynumber', 'getprotoent', 'getpwent',
+            'getpwnam', 'getpwuid', 'getservbyname', 'getservbyport', 'getservent',
+            'getsockname', 'getsockopt', 'glob', 'gmtime', 'goto', 'grep', 'hex',
+            'if', 'index', 'int', 'ioctl', 'join', 'keys', 'kill', 'last', 'lc',
+            'lcfirst', 'length', 'link', 'listen', 'local', 'localtime', 'log',
+            'lstat', 'map', 'mkdir', 'msgctl', 'msgget', 'msgrcv', 'msgsnd', 'my',
+            'next', 'no', 'oct', 'open', 'opendir', 'or', 'ord', 'our', 'pack',
+            'pipe', 'pop', 'pos', 'print', 'printf', 'prototype', 'push', 'quotemeta',
+            'rand', 'read', 'readdir', 'readlink', 'readpipe', 'recv', 'redo', 'ref',
+            'rename', 'require', 'reset', 'return', 'reverse', 'rewinddir', 'rindex',
+            'rmdir', 'say', 'scalar', 'seek', 'seekdir', 'select', 'semctl', 'semget',
+            'semop', 'send', 'setgrent', 'sethostent', 'setnetent', 'setpgrp',
+            'setpriority', 'setprotoent', 'setpwent', 'setservent', 'setsockopt',
+            'shift', 'shmctl', 'shmget', 'shmread', 'shmwrite', 'shutdown', 'sin',
+            'sleep', 'socket', 'socketpair', 'sort', 'splice', 'split', 'sprintf',
+            'sqrt', 'srand', 'stat', 'state', 'study', 'sub', 'substr', 'symlink',
+            'syscall', 'sysopen', 'sysread', 'sysseek', 'system', 'syswrite', 'tell',
+            'telldir', 'tie', 'tied', 'time', 'times', 'tr', 'truncate', 'uc', 'ucfirst',
+            'umask', 'undef', 'unless', 'unlink', 'unpack', 'unshift', 'untie', 'until',
+            'use', 'utime', 'values', 'vec', 'wait', 'waitpid', 'wantarray', 'warn',
+            'when', 'while', 'write', 'y']},
+        _IDENTIFIER, _NUMBER,
+    ],
+    'kotlin': [
+        _COMMENT_LINE, _COMMENT_BLOCK, _STRING_DOUBLE, _STRING_SINGLE,
+        {'kind': 'kotlin_keyword', 'keywords': [
+            'as', 'as?', 'break', 'class', 'continue', 'do', 'else', 'false',
+            'for', 'fun', 'if', 'in', 'interface', 'is', 'null', 'object',
+            'package', 'return', 'super', 'this', 'throw', 'true', 'try',
+            'typealias', 'typeof', 'val', 'var', 'when', 'while', 'by', 'catch',
+            'constructor', 'delegate', 'dynamic', 'field', 'file', 'finally',
+            'get', 'import', 'init', 'param', 'property', 'receiver', 'set',
+            'setparam', 'where', 'actual', 'annotation', 'companion', 'crossinline',
+            'data', 'enum', 'expect', 'external', 'infix', 'inline', 'inner',
+            'internal', 'lateinit', 'noinline', 'open', 'operator', 'out',
+            'override', 'private', 'protected', 'public', 'reified', 'sealed',
+            'suspend', 'tailrec', 'vararg', 'println']},
+        _IDENTIFIER, _NUMBER,
+    ],
+    'react_native': [
+        {'kind': 'html_tag', 'pattern': r'</?[A-Za-z][A-Za-z0-9_.]*(?=[\s/>])'},
+        {'kind': 'html_attribute', 'pattern': r'\b[a-zA-Z\-]+(?=\s*=[^=])'},
+    ] + _JAVASCRIPT_RULES,
+    'xml': [
+        {'kind': 'comments', 'pattern': r'<!--', 'end': r'-->'},
+        {'kind': 'variable', 'pattern': r'<!\[CDATA\[', 'end': r'\]\]>'},
+        {'kind': 'import', 'pattern': r'<!DOCTYPE[^>]*>'},
+        {'kind': 'xml_tag', 'pattern': r'<[/?]?[a-zA-Z0-9_.:\-]+'},
+        {'kind': 'xml_tag', 'pattern': r'[/?]?>'},
+        {'kind': 'xml_attribute', 'pattern': r'\b[a-zA-Z_:\-]+(?=\s*=)'},
+        {'kind': 'strings', 'pattern': r'"[^"]*"'},
+        {'kind': 'strings', 'pattern': r"'[^']*'"},
+    ],
+    'json': [
+        {'kind': 'json_key', 'pattern': r'"((?:[^"\\]|\\.)*)"(?=\s*:)', 'group': True},
+        {'kind': 'json_value_string', 'pattern': r'"(?:[^"\\]|\\.)*"'},
+        {'kind': 'json_value_number', 'pattern': r'-?\b\d+(?:\.\d+)?(?:[eE][+\-]?\d+)?\b'},
+        {'kind': 'boolean', 'keywords': ['true', 'false', 'null']},
+    ],
+    'markdown': [
+        {'kind': 'variable', 'pattern': r'^\s*```', 'end': r'```'},
+        {'kind': 'markdown_heading', 'pattern': r'^#+\s.*'},
+        {'kind': 'keywords', 'pattern': r'^\s*(?:[\-\*\+]|\d+\.)\s'},
+        {'kind': 'variable', 'pattern': r'`[^`]+`'},
+        {'kind': 'markdown_bold', 'pattern': r'\*\*([^\*]+)\*\*', 'group': True, 'bold': True},
+        {'kind': 'markdown_bold', 'pattern': r'\b__([^_]+)__\b', 'group': True, 'bold': True},
+        {'kind': 'markdown_italic', 'pattern': r'\*([^\*]+)\*', 'group': True, 'italic': True},
+        {'kind': 'markdown_italic', 'pattern': r'\b_([^_]+)_\b', 'group': True, 'italic': True},
+        {'kind': 'function', 'pattern': r'\[([^\]]+)\]\([^\)]+\)', 'group': True, 'underline': True},
+    ],
+    'shell': [
+        _COMMENT_HASH,
+        {'kind': 'shell_string', 'pattern': r'"[^"\\]*(?:\\.[^"\\]*)*"'},
+        {'kind': 'shell_string', 'pattern': r"'[^']*'"},
+        {'kind': 'variable', 'pattern': r'\$\{[a-zA-Z_][a-zA-Z0-9_]*\}|\$[a-zA-Z_][a-zA-Z0-9_]*'},
+        {'kind': 'shell_keyword', 'keywords': [
+            'if', 'then', 'else', 'elif', 'fi', 'case', 'esac', 'for', 'while',
+            'until', 'do', 'done', 'in', 'function', 'select', 'break', 'continue',
+            'return', 'exit', 'export', 'declare', 'local', 'readonly', 'unset',
+            'source', 'test', '[[', ']]', '[', ']', 'cd', 'pwd', 'ls', 'grep',
+            'find', 'awk', 'sed', 'cut', 'sort', 'uniq', 'head', 'tail', 'cat',
+            'echo', 'printf', 'read', 'trap', 'set', 'shopt', 'alias', 'unalias']},
+        {'kind': 'function', 'pattern': r'^\s*[a-zA-Z_][a-zA-Z0-9_]*\b'},
+        _IDENTIFIER,
+    ],
+    'typescript': [
+        {'kind': 'typescript_keyword', 'keywords': [
+            'public', 'private', 'protected', 'interface', 'enum', 'abstract',
+            'implements', 'extends', 'static', 'readonly', 'declare', 'type',
+            'module', 'namespace', 'as', 'is', 'infer', 'keyof', 'unique',
+            'never', 'any', 'unknown', 'void', 'boolean', 'number', 'string',
+            'symbol', 'bigint']},
+    ] + _JAVASCRIPT_RULES,
+    'vue': [
+        {'kind': 'vue_keyword', 'keywords': [
+            'v-bind', 'v-on', 'v-model', 'v-if', 'v-else', 'v-else-if',
+            'v-for', 'v-show', 'v-text', 'v-html', 'v-pre', 'v-cloak',
+            'v-once', 'slot', 'template', 'script', 'style', 'data',
+            'methods', 'computed', 'watch', 'props', 'components',
+            'mounted', 'created', 'updated', 'destroyed', 'beforeCreate',
+            'beforeMount', 'beforeUpdate', 'beforeDestroy']},
+    ] + _HTML_RULES + _JAVASCRIPT_RULES,
+    'dart': [
+        _COMMENT_LINE, _COMMENT_BLOCK,
+        {'kind': 'strings', 'pattern': r'"""', 'end': r'"""'},
+        {'kind': 'strings', 'pattern': r"'''", 'end': r"'''"},
+        _STRING_DOUBLE, _STRING_SINGLE,
+        {'kind': 'dart_keyword', 'keywords': [
+            'abstract', 'as', 'assert', 'async', 'await', 'break', 'case', 'catch',
+            'class', 'const', 'continue', 'covariant', 'default', 'deferred', 'do',
+            'dynamic', 'else', 'enum', 'export', 'extends', 'extension', 'external',
+            'factory', 'false', 'final', 'finally', 'for', 'Function', 'get', 'hide',
+            'if', 'implements', 'import', 'in', 'interface', 'is', 'late', 'library',
+            'mixin', 'new', 'null', 'on', 'operator', 'part', 'required', 'rethrow',
+            'return', 'set', 'show', 'static', 'super', 'switch', 'sync', 'this',
+            'throw', 'true', 'try', 'typedef', 'var', 'void', 'while', 'with', 'yield',
+            'int', 'double', 'String', 'bool', 'List', 'Map', 'Set', 'print']},
+        _IDENTIFIER, _NUMBER,
+    ],
+    'r': [
+        _COMMENT_HASH, _STRING_DOUBLE, _STRING_SINGLE,
+        {'kind': 'r_keyword', 'keywords': [
+            'if', 'else', 'repeat', 'while', 'for', 'in', 'next', 'break',
+            'function', 'return', 'switch', 'try', 'tryCatch', 'stop', 'warning',
+            'message', 'library', 'require', 'attach', 'detach', 'source',
+            'data', 'read.csv', 'read.table', 'write.csv', 'write.table',
+            'plot', 'hist', 'boxplot', 'mean', 'median', 'sum', 'min', 'max',
+            'sd', 'var', 'lm', 'glm', 'summary', 'print', 'cat', 'paste',
+            'c', 'list', 'data.frame', 'matrix', 'array', 'factor', 'TRUE',
+            'FALSE', 'NA', 'NULL', 'Inf', 'NaN']},
+        _IDENTIFIER, _NUMBER,
+    ],
+}
 
-        css_highlighter = CssHighlighter(document)
-        self.highlightingRules.extend(css_highlighter.highlightingRules)
+# LanguageGrammar compiles one grammar table into a single named-group alternation.
+# tokenize() is pure Python and does not touch Qt, so it can also be used for benchmarks.
+class LanguageGrammar:
+    def __init__(self, name, rules):
+        self.name = name
+        self.styles = [] # (color key, bold, italic, underline) for each distinct style
+        self.end_patterns = [None] # Block state -> pattern closing the token that is still open
+        self.state_styles = [None] # Block state -> style of the token that is still open
+
+        self.pattern = re.compile('|'.join('(?P<r%d>%s)' % (index, self._rule_pattern(rule))
+                                           for index, rule in enumerate(rules)))
+
+        # Indexed by the number of each rule's outer group, which is match.lastindex after a match
+        self._rules = [None] * (self.pattern.groups + 1)
+        for index, rule in enumerate(rules):
+            group = self.pattern.groupindex['r%d' % index]
+            style = self._style_index(rule)
+            capture = group + 1 if rule.get('group') else 0
+            opens_state = 0
+            if 'end' in rule:
+                self.end_patterns.append(re.compile(rule['end']))
+                self.state_styles.append(style)
+                opens_state = len(self.end_patterns) - 1
+            self._rules[group] = (style, capture, opens_state)
+
+    @staticmethod
+    def _rule_pattern(rule):
+        if 'keywords' in rule:
+            words = sorted(set(rule['keywords']), key=len, reverse=True) # Longest first so prefixes never win
+            pattern = r'(?<!\w)(?:' + '|'.join(re.escape(word) for word in words) + r')(?!\w)'
+            pattern += rule.get('suffix', '')
+        else:
+            pattern = rule['pattern']
+        if rule.get('ignore_case'):
+            pattern = '(?i:' + pattern + ')'
+        return pattern
+
+    def _style_index(self, rule):
+        if rule.get('kind') is None:
+            return None
+        style = (rule['kind'], rule.get('bold', False), rule.get('italic', False), rule.get('underline', False))
+        if style not in self.styles:
+            self.styles.append(style)
+        return self.styles.index(style)
+
+    # Splits one line of text into (start, length, style) spans.
+    # 'state' is the block state left by the previous line; the state for the next line is returned with the spans.
+    def tokenize(self, text, state=0):
+        spans = []
+        pos = 0
+        length = len(text)
+
+        # Continue a multi-line token left open by the previous line
+        if 0 < state < len(self.end_patterns):
+            end = self.end_patterns[state].search(text)
+            if end is None:
+                spans.append((0, length, self.state_styles[state]))
+                return spans, state
+            pos = end.end()
+            spans.append((0, pos, self.state_styles[state]))
+
+        search = self.pattern.search
+        rules = self._rules
+        while pos < length:
+            match = search(text, pos)
+            if match is None:
+                break
+            style, capture, opens_state = rules[match.lastindex]
+            start = match.start()
+            pos = match.end()
+            if opens_state:
+                end = self.end_patterns[opens_state].search(text, pos)
+                if end is None:
+                    spans.append((start, length - start, style))
+                    return spans, opens_state
+                pos = end.end()
+            if style is not None:
+                if capture:
+                    if match.start(capture) != -1:
+                        self._lead_spans(text, start, match.start(capture), spans)
+                        spans.append((match.start(capture), match.end(capture) - match.start(capture), style))
+                else:
+                    spans.append((start, pos - start, style))
+            if pos == start:
+                pos += 1 # Never loop on an empty match
+        return spans, 0
+
+    # Adds the spans of the tokens in text[start:end], the part of a 'group' rule's match before the
+    # group, like 'class' before a class name. Tokens are cut off at end.
+    def _lead_spans(self, text, start, end, spans):
+        search = self.pattern.search
+        while start < end:
+            match = search(text, start, end)
+            if match is None:
+                return
+            style, capture, _ = self._rules[match.lastindex]
+            if style is not None:
+                if not capture:
+                    spans.append((match.start(), match.end() - match.start(), style))
+                elif match.start(capture) != -1:
+                    spans.append((match.start(capture), match.end(capture) - match.start(capture), style))
+            start = max(match.end(), match.start() + 1)
+
+# Compiled grammars, built the first time each language is used and shared by every editor.
+_compiled_grammars = {}
+
+# Version of SYNTAX_COLORS, bumped whenever a color changes so cached formats can be rebuilt.
+_syntax_colors_version = 0
+
+# Character formats for each (language, colors version), shared by every editor.
+_format_cache = {}
+
+# Patterns that find the names a file defines, for the workspace symbol index.
+# Each alternative captures the name in one group; languages without an entry are not indexed.
+_C_FAMILY_SYMBOLS = (r'\b(?:class|struct|interface|enum|union|namespace|record|mixin|typedef[ \t]+\w+)[ \t]+(\w+)'
+                     r'|^[ \t]*(?:[\w:<>\[\],*&?]+[ \t]+)+[*&]?(\w+)[ \t]*\([^;]*$'
+                     r'|^[ \t]*(?:#define|const|static|var|let|final)[ \t]+(?:[\w<>?]+[ \t]+)?(\w+)[ \t]*[=(]')
+_SCRIPT_SYMBOLS = (r'\b(?:function\*?|class|interface|type|enum|namespace)[ \t]+(\w+)'
+                   r'|\b(?:const|let|var)[ \t]+(\w+)'
+                   r'|^[ \t]*(?:async[ \t]+)?(\w+)[ \t]*\([^)]*\)[ \t]*\{')
+
+SYMBOL_PATTERNS = {
+    'python': r'^[ \t]*(?:async[ \t]+)?(?:def|class)[ \t]+(\w+)|^(\w+)[ \t]*(?::[^=\n]*)?=(?!=)',
+    'java': _C_FAMILY_SYMBOLS,
+    'cpp': _C_FAMILY_SYMBOLS,
+    'csharp': _C_FAMILY_SYMBOLS,
+    'dart': _C_FAMILY_SYMBOLS,
+    'javascript': _SCRIPT_SYMBOLS,
+    'typescript': _SCRIPT_SYMBOLS,
+    'react_native': _SCRIPT_SYMBOLS,
+    'vue': _SCRIPT_SYMBOLS,
+    'go': r'^func[ \t]+(?:\([^)]*\)[ \t]*)?(\w+)|^type[ \t]+(\w+)|^(?:var|const)[ \t]+(\w+)|^[ \t]+(\w+)[ \t]+(?:=|\w+[ \t]*=)',
+    'rust': r'\b(?:fn|struct|enum|trait|type|mod|const|static|union|macro_rules!)[ \t]+(\w+)',
+    'swift': r'\b(?:class|struct|enum|protocol|extension|func|let|var|typealias)[ \t]+(\w+)',
+    'kotlin': r'\b(?:class|interface|object|fun|val|var|typealias)[ \t]+(?:<[^>]*>[ \t]*)?(?:\w+\.)?(\w+)',
+    'ruby': r'^[ \t]*(?:def[ \t]+(?:self\.)?|class[ \t]+|module[ \t]+)(\w+)|^[ \t]*([A-Z]\w*)[ \t]*=',
+    'php': r'\b(?:function|class|interface|trait|enum)[ \t]+&?(\w+)|^[ \t]*\$(\w+)[ \t]*=',
+    'perl': r'^[ \t]*(?:sub|package)[ \t]+(\w+)|\bmy[ \t]+[$@%](\w+)',
+    'shell': r'^[ \t]*(?:function[ \t]+)?(\w+)[ \t]*\(\)|^[ \t]*(?:export[ \t]+|local[ \t]+)?(\w+)=',
+    'sql': r'(?i)\bcreate[ \t]+(?:or[ \t]+replace[ \t]+)?(?:table|view|function|procedure|index|trigger)[ \t]+'
+           r'(?:if[ \t]+not[ \t]+exists[ \t]+)?(\w+)',
+    'scss': r'^[ \t]*\$(\w+)|@(?:mixin|function)[ \t]+(\w+)',
+    'r': r'^[ \t]*(\w+)[ \t]*(?:<-|=)',
+}
 
-    def highlightBlock(self, text):
-        for pattern, format in self.highlightingRules:
-            expression = pattern
-            index = expression.search(text)
-            while index:
-                self.setFormat(index.start(), index.end() - index.start(), format)
-                index = expression.search(text, index.end())
-
-# SqlHighlighter provides syntax highlighting for SQL code.
-class SqlHighlighter(QSyntaxHighlighter):
-    def __init__(self, document):
-        super().__init__(document)
-        self.highlightingRules = []
-        keywordFormat = QTextCharFormat()
-        keywordFormat.setForeground(QColor(SYNTAX_COLORS["sql_keyword"]))
-        keywords = ['SELECT', 'FROM', 'WHERE', 'AND', 'OR', 'INSERT', 'INTO', 'VALUES',
-                    'UPDATE', 'SET', 'DELETE', 'FROM', 'CREATE', 'TABLE', 'ALTER', 'DROP',
-                    'JOIN', 'INNER', 'LEFT', 'RIGHT', 'FULL', 'ON', 'GROUP BY', 'ORDER BY',
-                    'HAVING', 'AS', 'DISTINCT', 'COUNT', 'SUM', 'AVG', 'MIN', 'MAX',
-                    'DATABASE', 'USE', 'PRIMARY KEY', 'FOREIGN KEY', 'NOT NULL', 'UNIQUE',
-                    'INDEX', 'VIEW', 'PROCEDURE', 'FUNCTION', 'TRIGGER', 'BEGIN', 'END',
-                    'COMMIT', 'ROLLBACK', 'TRUNCATE', 'UNION', 'ALL', 'EXISTS', 'LIKE',
-                    'IN', 'IS', 'NULL', 'BETWEEN', 'CASE', 'WHEN', 'THEN', 'END', 'CAST',
-                    'CONVERT', 'DATE', 'TIME', 'DATETIME', 'VARCHAR', 'INT', 'TEXT', 'BOOLEAN']
-        self.highlightingRules.extend([(re.compile(r'\b' + keyword + r'\b', re.IGNORECASE), keywordFormat) for keyword in keywords])
-
-        stringFormat = QTextCharFormat()
-        stringFormat.setForeground(QColor(SYNTAX_COLORS["strings"]))
-        self.highlightingRules.append((re.compile(r"'[^'\\]*(\\.[^'\\]*)*'"), stringFormat))
-
-        commentFormat = QTextCharFormat()
-        commentFormat.setForeground(QColor(SYNTAX_COLORS["comments"]))
-        self.highlightingRules.append((re.compile(r'--[^\n]*'), commentFormat))
-        self.highlightingRules.append((re.compile(r'/\*.*?\*/', re.DOTALL), commentFormat))
+# Words the generic patterns can mistake for a definition, e.g. "} else if (x) {".
+_SYMBOL_STOPWORDS = {'if', 'for', 'while', 'switch', 'return', 'catch', 'else', 'new', 'sizeof', 'do', 'in'}
+
+# LanguageDescriptor says how files of one language are recognized and where its grammar comes from.
+# 'grammar' is a rule list, a "module:attribute" string naming a rule list that is only imported
+# the first time the language is used, or None for the built-in table in LANGUAGE_GRAMMARS.
+# 'symbols' is a regex for the names a file defines, or None for the entry in SYMBOL_PATTERNS.
+# 'hints' are (regex, weight) pairs for classifying untitled buffers, or None for LANGUAGE_HINTS.
+class LanguageDescriptor:
+    def __init__(self, name, display_name, extensions=(), filenames=(), shebangs=(), grammar=None, symbols=None,
+                 hints=None):
+        self.name = name
+        self.display_name = display_name
+        self.extensions = [extension.lower() for extension in extensions]
+        self.filenames = list(filenames)
+        self.shebangs = list(shebangs) # Interpreter names, e.g. 'python' for "#!/usr/bin/env python3"
+        self.grammar = grammar
+        self.symbols = symbols
+        self.hints = hints
+        self._symbol_pattern = None
+
+    # Returns the compiled symbol pattern, or None if this language's files are not indexed.
+    def symbol_pattern(self):
+        if self._symbol_pattern is None:
+            pattern = self.symbols or SYMBOL_PATTERNS.get(self.name)
+            if pattern is None:
+                return None
+            self._symbol_pattern = re.compile(pattern, re.MULTILINE)
+        return self._symbol_pattern
+
+    # Returns the grammar rules, importing the module that defines them on first use.
+    def load_rules(self):
+        if self.grammar is None:
+            return LANGUAGE_GRAMMARS[self.name]
+        if isinstance(self.grammar, str):
+            module_name, _, attribute = self.grammar.partition(':')
+            self.grammar = getattr(importlib.import_module(module_name), attribute)
+        return self.grammar
+
+# Registered languages by name, in registration order.
+LANGUAGES = {}
+_languages_by_extension = {}
+_languages_by_filename = {}
+_languages_by_shebang = {}
+
+# Entry point group that third-party language packs register under. Each entry point is a
+# callable that receives register_language, so packs never need to import ide.py themselves.
+LANGUAGE_PLUGIN_GROUP = "kodykoala.languages"
+_language_plugins_loaded = False
+
+# Registers (or replaces) a language. Later registrations win for shared extensions.
+def register_language(name, display_name, extensions=(), filenames=(), shebangs=(), grammar=None, symbols=None,
+                      hints=None):
+    global _classifier_hints
+    descriptor = LanguageDescriptor(name, display_name, extensions, filenames, shebangs, grammar, symbols, hints)
+    LANGUAGES[name] = descriptor
+    for extension in descriptor.extensions:
+        _languages_by_extension[extension] = name
+    for filename in descriptor.filenames:
+        _languages_by_filename[filename] = name
+    for interpreter in descriptor.shebangs:
+        _languages_by_shebang[interpreter] = name
+    _compiled_grammars.pop(name, None) # Recompile if the language was replaced
+    _classifier_hints = None
+    return descriptor
+
+register_language('python', "Python", ['.py', '.pyw'], shebangs=['python'])
+register_language('java', "Java", ['.java'])
+register_language('html', "HTML", ['.html', '.htm'])
+register_language('javascript', "JavaScript", ['.js', '.mjs', '.cjs'], shebangs=['node'])
+register_language('cpp', "C++", ['.cpp', '.cxx', '.cc', '.h', '.hpp'])
+register_language('csharp', "C#", ['.cs'])
+register_language('css', "CSS", ['.css'])
+register_language('scss', "SCSS", ['.scss'])
+register_language('sql', "SQL", ['.sql'])
+register_language('swift', "Swift", ['.swift'])
+register_language('ruby', "Ruby", ['.rb'], filenames=['Gemfile', 'Rakefile'], shebangs=['ruby'])
+register_language('go', "Go", ['.go'])
+register_language('rust', "Rust", ['.rs'])
+register_language('php', "PHP", ['.php'], shebangs=['php'])
+register_language('perl', "Perl", ['.pl'], shebangs=['perl'])
+register_language('kotlin', "Kotlin", ['.kt'])
+register_language('react_native', "React Native", ['.jsx'])
+register_language('xml', "XML", ['.xml', '.xsd', '.xsl', '.svg'])
+register_language('json', "JSON", ['.json'])
+register_language('markdown', "Markdown", ['.md'])
+register_language('shell', "Shell Script", ['.sh', '.bash'], filenames=['.bashrc', '.bash_profile', '.profile'],
+                  shebangs=['sh', 'bash'])
+register_language('typescript', "TypeScript", ['.ts', '.tsx'])
+register_language('vue', "Vue", ['.vue'])
+register_language('dart', "Dart", ['.dart'])
+register_language('r', "R", ['.r'], shebangs=['Rscript'])
+
+# Lets installed language packs register themselves. Runs once, on the first language lookup.
+def _load_language_plugins():
+    global _language_plugins_loaded
+    if _language_plugins_loaded:
+        return
+    _language_plugins_loaded = True
+    try:
+        from importlib.metadata import entry_points
+        plugins = entry_points()
+        if hasattr(plugins, 'select'):
+            plugins = plugins.select(group=LANGUAGE_PLUGIN_GROUP)
+        else:
+            plugins = plugins.get(LANGUAGE_PLUGIN_GROUP, [])
+    except Exception as e:
+        print(f"Error looking up language packs: {e}")
+        return
+    for plugin in plugins:
+        try:
+            plugin.load()(register_language)
+        except Exception as e:
+            print(f"Error loading language pack '{plugin.name}': {e}")
+
+# Returns the language registered for a file extension such as '.py', or None.
+def language_for_extension(extension):
+    _load_language_plugins()
+    return _languages_by_extension.get(extension.lower())
+
+# Returns the language named by a "#!" line, or None.
+def language_for_shebang(line):
+    _load_language_plugins()
+    if not line or not line.startswith('#!'):
+        return None
+    parts = line[2:].split()
+    if not parts:
+        return None
+    interpreter = os.path.basename(parts[0])
+    if interpreter == 'env':
+        arguments = [part for part in parts[1:] if not part.startswith('-')]
+        if not arguments:
+            return None
+        interpreter = arguments[0]
+    interpreter = re.sub(r'[0-9.]+$', '', interpreter) # python3.11 -> python
+    return _languages_by_shebang.get(interpreter)
+
+# Returns the language of a file from its name, extension or, for files without an
+# extension, its "#!" line. Returns None for unknown files.
+def language_for_path(file_path):
+    _load_language_plugins()
+    file_name = os.path.basename(file_path)
+    if file_name in _languages_by_filename:
+        return _languages_by_filename[file_name]
+    extension = os.path.splitext(file_name)[1].lower()
+    if extension:
+        return _languages_by_extension.get(extension)
+    try:
+        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+            first_line = f.readline(256)
+    except OSError:
+        return None
+    return language_for_shebang(first_line)
+
+# Untitled buffers are classified from at most this many leading characters, once typing pauses.
+CLASSIFY_SAMPLE_CHARS = 4096
+CLASSIFY_DEBOUNCE_MS = 400
+CLASSIFY_MATCH_CAP = 8 # A hint counts at most this many times, so one common token cannot swamp the rest
+CLASSIFY_MIN_SCORE = 4 # Weaker evidence than this leaves the buffer unclassified
+
+# Patterns shared by the JavaScript family.
+_JS_FAMILY_HINTS = [
+    (r'\bfunction\s*\w*\s*\(', 1), (r'\bconst \w+\s*=', 2), (r'\blet \w+\s*=', 1), (r'=>', 1),
+    (r'\bconsole\.log\(', 4), (r'\brequire\([\'"]', 3), (r'\bmodule\.exports\b', 5), (r'===|!==', 3),
+    (r'^import .* from [\'"]', 2), (r'^export (?:default |const |function |class )', 2),
+    (r'\bundefined\b', 2), (r'\basync \w*\s*\(', 1), (r'\bdocument\.|\bwindow\.', 3),
+]
+_CSS_FAMILY_HINTS = [
+    (r'^[ \t]*[.#]?[\w-]+(?:[ \t]*[,>+~ ][ \t]*[.#:]?[\w-]+)*[ \t]*\{[ \t]*$', 2),
+    (r'^[ \t]*[\w-]+[ \t]*:[ \t]*[^;{}\n]+;[ \t]*$', 2), (r'@media\b', 2), (r'\b\d+(?:px|em|rem|vh|vw)\b', 2),
+    (r'#[0-9a-fA-F]{3,6}\b', 1), (r'!important\b', 3), (r':hover\b', 3),
+]
+
+# LANGUAGE_HINTS scores untitled buffers for classify_language: (regex, weight) pairs that are
+# typical of each language. Patterns are compiled with MULTILINE; identical patterns in several
+# languages are matched once and credited to all of them.
+LANGUAGE_HINTS = {
+    'python': [
+        (r'^[ \t]*def \w+\(.*\)[ \t]*(?:->.*)?:', 5), (r'^[ \t]*class \w+(?:\(.*\))?:[ \t]*$', 5),
+        (r'^from [\w.]+ import ', 5), (r'^import [\w.]+(?:, [\w.]+)*[ \t]*$', 1), (r'\bself\.', 1),
+        (r'\belif\b', 4), (r'\bNone\b', 2), (r'__\w+__', 2), (r'"""|\'\'\'', 3),
+        (r'^[ \t]*(?:if|for|while|with|try|else)\b.*:[ \t]*$', 2), (r'\bnot in\b|\bis not\b', 3),
+        (r'\bprint\(', 1), (r'\blambda\b', 1),
+    ],
+    'java': [
+        (r'^package [\w.]+;', 4), (r'^import java\.', 6), (r'\bpublic static void main\(String', 6),
+        (r'\bSystem\.out\.print', 6), (r'\bpublic (?:final |abstract )?class\b', 2), (r'@Override\b', 3),
+        (r'\bString\[\]', 3), (r'\bimplements\b', 1), (r'\bprivate final\b', 2),
+    ],
+    'kotlin': [
+        (r'\bfun \w+\(', 5), (r'\bval \w+', 3), (r'^package [\w.]+[ \t]*$', 3), (r'\bwhen[ \t]*(?:\(|\{)', 3),
+        (r'\bdata class\b', 5), (r'\bcompanion object\b', 5), (r'\boverride fun\b', 5), (r'\?\.let\b', 5),
+        (r'^import (?:kotlin|kotlinx|android)\.', 6), (r'\bprintln\(', 1),
+    ],
+    'swift': [
+        (r'^import (?:Foundation|UIKit|SwiftUI|Combine)\b', 8), (r'\bfunc \w+\(', 2),
+        (r'\bvar \w+[ \t]*:[ \t]*\[?[A-Z]', 2), (r'\bguard let\b', 6), (r'\bif let\b', 5), (r'\\\(', 3),
+        (r'\bprotocol \w+', 4), (r'@(?:objc|IBOutlet|IBAction|State|Published|escaping)\b', 5),
+        (r'->[ \t]*\[?[A-Z]\w*\]?[ \t]*\{', 2), (r'\bmutating func\b', 6), (r'\blet \w+[ \t]*:[ \t]*[A-Z]', 2),
+    ],
+    'go': [
+        (r'^package \w+[ \t]*$', 3), (r'^import \($', 6), (r'^func (?:\(\w+ \*?\w+\) )?\w+\(', 4), (r':=', 3),
+        (r'\bfmt\.', 6), (r'\bgo func\b', 6), (r'\bchan\b', 3), (r'\bdefer\b', 3), (r'\berr != nil\b', 6),
+        (r'\bstruct \{', 4), (r'\[\]\w+\{', 2), (r'\bnil\b', 1),
+    ],
+    'rust': [
+        (r'\bfn \w+', 4), (r'\blet mut\b', 6), (r'\bimpl\b', 3), (r'\bpub fn\b', 6), (r'\bprintln!\(', 8),
+        (r'\b\w+!\(', 2), (r'&mut\b', 6), (r'^use \w+(?:::\w+)+', 6), (r'#\[derive', 8), (r'\bmod \w+;', 5),
+        (r'\bOk\(|\bErr\(|\bSome\(', 2), (r'::', 1), (r'\bmatch \w+ \{', 3),
+    ],
+    'cpp': [
+        (r'^#include[ \t]*[<"]', 6), (r'\bstd::', 6), (r'\bcout\b|\bcin\b', 5), (r'\bint main[ \t]*\(', 4),
+        (r'\btemplate[ \t]*<', 6), (r'\bnullptr\b', 5), (r'^#define\b', 5), (r'\bpublic:|\bprivate:', 5),
+        (r'::', 1), (r'\bvirtual\b', 2), (r'\bconst \w+[ \t]*[*&]', 3),
+    ],
+    'csharp': [
+        (r'^using System', 8), (r'^using [\w.]+;', 4), (r'\bnamespace [\w.]+', 3), (r'\bConsole\.Write', 8),
+        (r'\bstatic void Main\(', 6), (r'\{[ \t]*get;', 6), (r'\bvar \w+ = new\b', 2), (r'\basync Task\b', 5),
+        (r'\bstring\b', 1), (r'\bforeach[ \t]*\(var\b', 5),
+    ],
+    'php': [
+        (r'<\?php', 12), (r'\$\w+[ \t]*=', 2), (r'\$this->', 6), (r'\bpublic function\b', 6),
+        (r'^namespace [\w\\]+;', 5), (r'^use [\w\\]+;', 3), (r'\becho\b', 1), (r'->', 1),
+    ],
+    'perl': [
+        (r'\bmy [$@%]\w+', 6), (r'^use strict;', 8), (r'^use warnings;', 8), (r'\bsub \w+[ \t]*\{', 5),
+        (r'@ARGV|\$_\b|@_\b', 4), (r'=~[ \t]*[ms]?/', 4), (r'\bchomp\b', 4), (r'\$\w+\{', 2),
+    ],
+    'ruby': [
+        (r'^[ \t]*def \w+[?!]?(?:\(.*\))?[ \t]*$', 4), (r'^[ \t]*end[ \t]*$', 3), (r'\bputs\b', 4),
+        (r'\battr_(?:accessor|reader|writer)\b', 8), (r'^require [\'"]', 5), (r'\bdo \|\w+', 6), (r'\.each\b', 2),
+        (r'@\w+[ \t]*=', 2), (r'\bunless\b', 3), (r'\belsif\b', 6), (r'\bnil\b', 2), (r'#\{', 3),
+        (r'\bclass \w+ < \w+', 5), (r'^[ \t]*module \w+', 3),
+    ],
+    'javascript': _JS_FAMILY_HINTS,
+    'typescript': _JS_FAMILY_HINTS + [
+        (r':[ \t]*(?:string|number|boolean|void|any|unknown)\b', 4), (r'^(?:export )?interface \w+', 5),
+        (r'^(?:export )?type \w+(?:<.*>)?[ \t]*=', 5), (r'\b(?:private|public|readonly) \w+[ \t]*[:?]', 4),
+        (r'\bas (?:string|number|any|const)\b', 4), (r'\benum \w+', 2),
+    ],
+    'react_native': _JS_FAMILY_HINTS + [
+        (r'<[A-Z]\w*[ \t/>]', 3), (r'^import React\b', 8), (r'from [\'"]react(?:-native)?[\'"]', 8),
+        (r'\bclassName=', 5), (r'\buse(?:State|Effect|Ref|Memo)\(', 5), (r'\bStyleSheet\.create\b', 8),
+    ],
+    'vue': [
+        (r'^<template>', 12), (r'\bv-(?:if|else|for|model|bind|on|show)\b', 6), (r'@click\b', 5),
+        (r'\{\{.*\}\}', 3), (r'^<style(?: scoped)?', 3), (r'from [\'"]vue[\'"]', 8), (r'^export default \{', 3),
+    ],
+    'html': [
+        (r'(?i)<!DOCTYPE html', 12), (r'<html\b', 8), (r'</?(?:div|span|p|a|body|head|ul|li|table|title)\b', 2),
+        (r'<(?:meta|link|br|img)\b', 2), (r'&(?:nbsp|amp|lt|gt);', 2),
+    ],
+    'xml': [
+        (r'^<\?xml\b', 12), (r'\bxmlns(?::\w+)?=', 5), (r'</\w+:\w+>', 3), (r'<!\[CDATA\[', 5), (r'<\w+[^<>]*/>', 1),
+    ],
+    'css': _CSS_FAMILY_HINTS,
+    'scss': _CSS_FAMILY_HINTS + [
+        (r'^[ \t]*\$[\w-]+[ \t]*:', 6), (r'@mixin\b|@include\b', 8), (r'&:', 5), (r'@extend\b', 6),
+        (r'^[ \t]*&', 3),
+    ],
+    'sql': [
+        (r'(?i)\bselect\b.+\bfrom\b', 5), (r'(?i)\binsert into\b', 6), (r'(?i)\bcreate table\b', 8),
+        (r'(?i)\b(?:inner|left|right|outer) join\b', 5), (r'(?i)\bprimary key\b', 6), (r'(?i)\bvarchar\b', 6),
+        (r'(?i)\b(?:group|order) by\b', 4), (r'(?i)\bupdate \w+ set\b', 6), (r'(?i)\bwhere\b', 1),
+        (r'^--[ \t]', 2),
+    ],
+    'json': [
+        (r'^[ \t]*"[^"\n]+"[ \t]*:[ \t]*["\[{\dtfn-]', 3), (r'^[ \t]*[\]}],?[ \t]*$', 1), (r'\A[ \t\n]*[\[{]', 2),
+    ],
+    'markdown': [
+        (r'^#{1,6} \S', 2), (r'\[[^\]\n]+\]\([^)\n]+\)', 5), (r'^```', 6), (r'\*\*\w[^*\n]*\*\*', 3),
+        (r'^> ', 2), (r'^\d+\. \S', 2), (r'^[-*+] \S', 1), (r'`[^`\n]+`', 1),
+    ],
+    'shell': [
+        (r'^[ \t]*(?:echo|export|cd|source|alias|set -\w+)\b', 2), (r'\$\{\w+', 2), (r'\bfi\b', 5),
+        (r'\besac\b', 6), (r'\[\[ .* \]\]', 4), (r'\[ -[a-z] ', 5), (r'\$\(', 3), (r'^[ \t]*\w+\(\)[ \t]*\{', 4),
+        (r'"\$\w+"', 3), (r'2>&1|>[ \t]*/dev/null', 5), (r';[ \t]*then\b|;[ \t]*do\b', 4), (r'\bdone\b', 2),
+    ],
+    'r': [
+        (r'<-', 4), (r'\blibrary\(', 6), (r'%>%', 8), (r'\bc\(', 3), (r'\bdata\.frame\b', 6),
+        (r'\bggplot\(', 6), (r'\b(?:NULL|NA|TRUE|FALSE)\b', 2), (r'\bpaste0?\(', 4), (r'\b[sl]apply\(', 6),
+        (r'\bfunction\(', 1),
+    ],
+    'dart': [
+        (r'^import [\'"](?:package|dart):', 8), (r'\bvoid main\(\)', 3), (r'\bfinal \w+(?:<.*>)? \w+ =', 2),
+        (r'\bWidget build\(', 8), (r'@override\b', 4), (r'\bFuture<', 4), (r'\basync \{', 3),
+        (r"\bprint\('", 2), (r'\blate\b', 3), (r'\brequired this\.', 6), (r'\$\w+|\$\{', 1),
+    ],
+}
 
-    def highlightBlock(self, text):
-        for pattern, format in self.highlightingRules:
-            expression = pattern
-            index = expression.search(text)
-            while index:
-                self.setFormat(index.start(), index.end() - index.start(), format)
-                index = expression.search(text, index.end())
-
-# SwiftHighlighter provides syntax highlighting for Swift code.
-class SwiftHighlighter(QSyntaxHighlighter):
-    def __init__(self, document):
-        super().__init__(document)
-        self.highlightingRules = []
-        keywordFormat = QTextCharFormat()
-        keywordFormat.setForeground(QColor(SYNTAX_COLORS["swift_keyword"]))
-        keywords = ['associatedtype', 'class', 'deinit', 'enum', 'extension', 'fileprivate',
-                    'func', 'import', 'init', 'inout', 'internal', 'let', 'open', 'operator',
-                    'private', 'protocol', 'public', 'static', 'struct', 'subscript', 'typealias',
-                    'var', 'break', 'case', 'continue', 'default', 'defer', 'do', 'else',
-                    'fallthrough', 'for', 'guard', 'if', 'in', 'repeat', 'return', 'switch',
-                    'where', 'while', 'as', 'Any', 'catch', 'false', 'is', 'nil', 'rethrows',
-                    'super', 'self', 'Self', 'throw', 'throws', 'true', 'try', 'associativity',
-                    'convenience', 'dynamic', 'didSet', 'final', 'get', 'infix', 'indirect',
-                    'lazy', 'left', 'mutating', 'nonmutating', 'optional', 'override', 'postfix',
-                    'precedence', 'prefix', 'Protocol', 'required', 'right', 'set', 'Type',
-                    'unowned', 'weak', 'willSet', 'print']
-        self.highlightingRules.extend([(re.compile(r'\b' + keyword + r'\b'), keywordFormat) for keyword in keywords])
-        stringFormat = QTextCharFormat()
-        stringFormat.setForeground(QColor(SYNTAX_COLORS["strings"]))
-        self.highlightingRules.append((re.compile(r'"[^"\\]*(\\.[^"\\]*)*"'), stringFormat))
-        commentFormat = QTextCharFormat()
-        commentFormat.setForeground(QColor(SYNTAX_COLORS["comments"]))
-        self.highlightingRules.append((re.compile(r'//[^\n]*'), commentFormat))
-        self.highlightingRules.append((re.compile(r'/\*.*?\*/', re.DOTALL), commentFormat))
-        numberFormat = QTextCharFormat()
-        numberFormat.setForeground(QColor(SYNTAX_COLORS["integer"]))
-        self.highlightingRules.append((re.compile(r'\b[0-9]+(?:\.[0-9]+)?\b'), numberFormat))
+# Modelines such as "# vim: set ft=python:" or "-*- mode: ruby -*-".
+_MODELINE_PATTERN = re.compile(r'-\*-[ \t]*(?:mode:[ \t]*)?([\w+#-]+)[ \t]*(?:;.*)?-\*-'
+                               r'|\b(?:vim?|ex):.*?\b(?:ft|filetype|syntax)=([\w+#-]+)')
+_classifier_hints = None # [(compiled pattern, [(language, weight)])], rebuilt when languages change
+
+# Returns the language named by a modeline in the first or last lines of a sample, or None.
+def language_for_modeline(sample):
+    lines = sample.splitlines()
+    for line in lines[:5] + lines[-5:]:
+        match = _MODELINE_PATTERN.search(line)
+        if not match:
+            continue
+        name = (match.group(1) or match.group(2)).lower()
+        if name in LANGUAGES:
+            return name
+        language = language_for_extension('.' + name)
+        if language:
+            return language
+        for descriptor in LANGUAGES.values():
+            if descriptor.display_name.lower() == name:
+                return descriptor.name
+    return None
+
+# Splits a regex at its top-level '|' characters.
+def _split_alternatives(pattern):
+    branches = []
+    depth = 0
+    start = 0
+    i = 0
+    in_class = False
+    while i < len(pattern):
+        char = pattern[i]
+        if char == '\\':
+            i += 1 # Skip the escaped character
+        elif in_class:
+            in_class = char != ']'
+        elif char == '[':
+            in_class = True
+            if pattern[i + 1:i + 2] == ']':
+                i += 1 # A ']' right after '[' is part of the class
+        elif char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        elif char == '|' and depth == 0:
+            branches.append(pattern[start:i])
+            start = i + 1
+        i += 1
+    branches.append(pattern[start:])
+    return branches
+
+# Moves a leading \b behind the literal word after it: "\bfmt\." becomes "fmt(?<=\bfmt)\.". It matches
+# the same text, but the regex engine can then skip straight to occurrences of the literal.
+def _fast_hint_pattern(pattern):
+    flags, body = re.match(r'(\(\?[a-zA-Z]+\))?(.*)', pattern, re.DOTALL).groups()
+    branches = []
+    for branch in _split_alternatives(body):
+        match = re.match(r'\\b(\w+)', branch)
+        word = match.group(1) if match else ''
+        if word and branch[match.end():match.end() + 1] in ('?', '*', '+', '{'):
+            word = word[:-1] # The quantifier applies to the last character
+        branches.append(word + '(?<=\\b' + word + ')' + branch[2 + len(word):] if word else branch)
+    return (flags or '') + '|'.join(branches)
+
+# Compiles the hints of every language, each distinct pattern once with the languages it counts for.
+def _compile_classifier_hints():
+    global _classifier_hints
+    if _classifier_hints is None:
+        targets = {} # pattern -> [(language, weight)]
+        for descriptor in LANGUAGES.values():
+            for pattern, weight in descriptor.hints or LANGUAGE_HINTS.get(descriptor.name, ()):
+                targets.setdefault(pattern, []).append((descriptor.name, weight))
+        _classifier_hints = [(re.compile(_fast_hint_pattern(pattern), re.MULTILINE), languages)
+                             for pattern, languages in targets.items()]
+    return _classifier_hints
+
+# Guesses the language of some text, e.g. an untitled buffer. Only the first
+# CLASSIFY_SAMPLE_CHARS characters are read: a "#!" line or a modeline decides on its own,
+# otherwise the hints of every language are scored together over the sample. Returns None when
+# the evidence is too weak.
+def classify_language(text):
+    _load_language_plugins()
+    sample = text[:CLASSIFY_SAMPLE_CHARS]
+    first_line = sample.lstrip()[:256].split('\n', 1)[0]
+    language = language_for_shebang(first_line) or language_for_modeline(sample)
+    if language:
+        return language
+
+    scores = Counter()
+    for pattern, languages in _compile_classifier_hints():
+        count = min(len(pattern.findall(sample)), CLASSIFY_MATCH_CAP)
+        if count:
+            for language, weight in languages:
+                scores[language] += weight * count
+    if not scores:
+        return None
+    language, score = scores.most_common(1)[0]
+    return language if score >= CLASSIFY_MIN_SCORE else None
+
+# Builds the file dialog filter string for all registered languages.
+def language_file_filters():
+    _load_language_plugins()
+    filters = []
+    for descriptor in LANGUAGES.values():
+        if descriptor.extensions:
+            patterns = ' '.join('*' + extension for extension in descriptor.extensions)
+            filters.append(f"{descriptor.display_name} Files ({patterns})")
+    filters.append("Text Files (*.txt)")
+    filters.append("All Files (*.*)")
+    return ';;'.join(filters)
+
+# Returns the compiled LanguageGrammar for a registered language name.
+def get_grammar(language):
+    grammar = _compiled_grammars.get(language)
+    if grammar is None:
+        _load_language_plugins()
+        grammar = LanguageGrammar(language, LANGUAGES[language].load_rules())
+        _compiled_grammars[language] = grammar
+    return grammar
+
+# Updates one syntax color and invalidates the cached formats.
+def set_syntax_color(key, color_hex):
+    global _syntax_colors_version
+    if SYNTAX_COLORS.get(key) == color_hex:
+        return
+    SYNTAX_COLORS[key] = color_hex
+    _syntax_colors_version += 1
+    _format_cache.clear() # Formats built with the old colors are never used again
+
+# Returns the shared QTextCharFormats for a grammar, built once per colors version.
+def get_grammar_formats(grammar):
+    key = (grammar.name, _syntax_colors_version)
+    formats = _format_cache.get(key)
+    if formats is None:
+        formats = [_create_text_format(style) for style in grammar.styles]
+        _format_cache[key] = formats
+    return formats
+
+# Builds the QTextCharFormat for one grammar style.
+def _create_text_format(style):
+    color_key, bold, italic, underline = style
+    textFormat = QTextCharFormat()
+    textFormat.setForeground(QColor(SYNTAX_COLORS[color_key]))
+    if bold:
+        textFormat.setFontWeight(QFont.Bold)
+    if italic:
+        textFormat.setFontItalic(True)
+    if underline:
+        textFormat.setUnderlineStyle(QTextCharFormat.SingleUnderline)
+    return textFormat
+
+# Most blocks tokenized by one background job; a job also reads a few blocks past the last
+# one that is waiting, in case an edit changes the state carried into the following lines.
+ASYNC_HIGHLIGHT_CHUNK = 500
+ASYNC_HIGHLIGHT_LOOKAHEAD = 50
+# Tokenized lines remembered by each highlighter before its cache is reset.
+ASYNC_HIGHLIGHT_CACHE_LIMIT = 200000
+
+# A snapshot of consecutive block texts to tokenize off the GUI thread.
+# 'revision' is the document revision the texts were read at.
+class TokenizeJob:
+    def __init__(self, owner, grammar, revision, first_block, start_state, texts):
+        self.owner = owner
+        self.grammar = grammar
+        self.revision = revision
+        self.first_block = first_block
+        self.start_state = start_state
+        self.texts = texts
+        self.results = [] # (spans, end state) for each text
+
+# TokenizerThread runs the grammar tokenizers for every editor on one shared thread.
+# A text the grammar fails on, and every text after it in the job, comes back without spans,
+# so its block is shown plain instead of waiting for a result that never arrives.
+class TokenizerThread(QThread):
+    tokenized = pyqtSignal(object)
 
-    def highlightBlock(self, text):
-        for pattern, format in self.highlightingRules:
-            expression = pattern
-            index = expression.search(text)
-            while index:
-                self.setFormat(index.start(), index.end() - index.start(), format)
-                index = expression.search(text, index.end())
-
-# RubyHighlighter provides syntax highlighting for Ruby code.
-class RubyHighlighter(QSyntaxHighlighter):
-    def __init__(self, document):
-        super().__init__(document)
-        self.highlightingRules = []
-        keywordFormat = QTextCharFormat()
-        keywordFormat.setForeground(QColor(SYNTAX_COLORS["ruby_keyword"]))
-        keywords = ['BEGIN', 'END', 'alias', 'and', 'begin', 'break', 'case', 'class',
-                    'def', 'defined?', 'do', 'else', 'elsif', 'end', 'ensure', 'false',
-                    'for', 'if', 'in', 'module', 'next', 'nil', 'not', 'or', 'redo',
-                    'rescue', 'retry', 'return', 'self', 'super', 'then', 'true',
-                    'undef', 'unless', 'until', 'when', 'while', 'yield', 'puts', 'gets']
-        self.highlightingRules.extend([(re.compile(r'\b' + keyword + r'\b'), keywordFormat) for keyword in keywords])
-        stringFormat = QTextCharFormat()
-        stringFormat.setForeground(QColor(SYNTAX_COLORS["strings"]))
-        self.highlightingRules.append((re.compile(r'"[^"\\]*(\\.[^"\\]*)*"'), stringFormat))
-        self.highlightingRules.append((re.compile(r"'[^'\\]*(\\.[^'\\]*)*'"), stringFormat))
-        commentFormat = QTextCharFormat()
-        commentFormat.setForeground(QColor(SYNTAX_COLORS["comments"]))
-        self.highlightingRules.append((re.compile(r'#[^\n]*'), commentFormat))
-        numberFormat = QTextCharFormat()
-        numberFormat.setForeground(QColor(SYNTAX_COLORS["integer"]))
-        self.highlightingRules.append((re.compile(r'\b[0-9]+(?:\.[0-9]+)?\b'), numberFormat))
+    def __init__(self):
+        super().__init__()
+        self.jobs = queue.Queue()
 
-    def highlightBlock(self, text):
-        for pattern, format in self.highlightingRules:
-            expression = pattern
-            index = expression.search(text)
-            while index:
-                self.setFormat(index.start(), index.end() - index.start(), format)
-                index = expression.search(text, index.end())
-
-# GoHighlighter provides syntax highlighting for Go code.
-class GoHighlighter(QSyntaxHighlighter):
-    def __init__(self, document):
-        super().__init__(document)
-        self.highlightingRules = []
-        keywordFormat = QTextCharFormat()
-        keywordFormat.setForeground(QColor(SYNTAX_COLORS["go_keyword"]))
-        keywords = ['break', 'case', 'chan', 'const', 'continue', 'default', 'defer', 'else',
-                    'fallthrough', 'for', 'func', 'go', 'goto', 'if', 'import', 'interface',
-                    'map', 'package', 'range', 'return', 'select', 'struct', 'switch', 'type',
-                    'var', 'fmt', 'Println', 'main']
-        self.highlightingRules.extend([(re.compile(r'\b' + keyword + r'\b'), keywordFormat) for keyword in keywords])
-        stringFormat = QTextCharFormat()
-        stringFormat.setForeground(QColor(SYNTAX_COLORS["strings"]))
-        self.highlightingRules.append((re.compile(r'"[^"\\]*(\\.[^"\\]*)*"'), stringFormat))
-        self.highlightingRules.append((re.compile(r'`.*?`', re.DOTALL), stringFormat))
-        commentFormat = QTextCharFormat()
-        commentFormat.setForeground(QColor(SYNTAX_COLORS["comments"]))
-        self.highlightingRules.append((re.compile(r'//[^\n]*'), commentFormat))
-        self.highlightingRules.append((re.compile(r'/\*.*?\*/', re.DOTALL), commentFormat))
-        numberFormat = QTextCharFormat()
-        numberFormat.setForeground(QColor(SYNTAX_COLORS["integer"]))
-        self.highlightingRules.append((re.compile(r'\b[0-9]+(?:\.[0-9]+)?\b'), numberFormat))
+    def submit(self, job):
+        self.jobs.put(job)
 
-    def highlightBlock(self, text):
-        for pattern, format in self.highlightingRules:
-            expression = pattern
-            index = expression.search(text)
-            while index:
-                self.setFormat(index.start(), index.end() - index.start(), format)
-                index = expression.search(text, index.end())
-
-# RustHighlighter provides syntax highlighting for Rust code.
-class RustHighlighter(QSyntaxHighlighter):
-    def __init__(self, document):
-        super().__init__(document)
-        self.highlightingRules = []
-        keywordFormat = QTextCharFormat()
-        keywordFormat.setForeground(QColor(SYNTAX_COLORS["rust_keyword"]))
-        keywords = ['as', 'break', 'const', 'continue', 'crate', 'else', 'enum', 'extern',
-                    'false', 'fn', 'for', 'if', 'impl', 'in', 'let', 'loop', 'match',
-                    'mod', 'move', 'mut', 'pub', 'ref', 'return', 'self', 'Self', 'static',
-                    'struct', 'super', 'trait', 'true', 'type', 'unsafe', 'use', 'where',
-                    'while', 'async', 'await', 'dyn', 'macro', 'union', 'println']
-        self.highlightingRules.extend([(re.compile(r'\b' + keyword + r'\b'), keywordFormat) for keyword in keywords])
-        stringFormat = QTextCharFormat()
-        stringFormat.setForeground(QColor(SYNTAX_COLORS["strings"]))
-        self.highlightingRules.append((re.compile(r'"[^"\\]*(\\.[^"\\]*)*"'), stringFormat))
-        commentFormat = QTextCharFormat()
-        commentFormat.setForeground(QColor(SYNTAX_COLORS["comments"]))
-        self.highlightingRules.append((re.compile(r'//[^\n]*'), commentFormat))
-        self.highlightingRules.append((re.compile(r'/\*.*?\*/', re.DOTALL), commentFormat))
-        numberFormat = QTextCharFormat()
-        numberFormat.setForeground(QColor(SYNTAX_COLORS["integer"]))
-        self.highlightingRules.append((re.compile(r'\b[0-9]+(?:\.[0-9]+)?\b'), numberFormat))
+    def stop(self):
+        self.jobs.put(None)
+        self.wait()
 
-    def highlightBlock(self, text):
-        for pattern, format in self.highlightingRules:
-            expression = pattern
-            index = expression.search(text)
-            while index:
-                self.setFormat(index.start(), index.end() - index.start(), format)
-                index = expression.search(text, index.end())
-
-# PhpHighlighter provides syntax highlighting for PHP code.
-class PhpHighlighter(QSyntaxHighlighter):
-    def __init__(self, document):
+    def run(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                break
+            try:
+                state = job.start_state
+                for text in job.texts:
+                    spans, state = job.grammar.tokenize(text, state)
+                    job.results.append((spans, state))
+            except Exception as e:
+                print(f"Error tokenizing {job.grammar.name}: {e}")
+                job.results.extend(([], 0) for _ in range(len(job.texts) - len(job.results)))
+            self.tokenized.emit(job)
+
+_tokenizer_thread = None
+
+# Hands a finished job to the highlighter that submitted it, unless that has been deleted since.
+def _deliver_tokenize_job(job):
+    if not sip.isdeleted(job.owner):
+        job.owner._on_tokenized(job)
+
+# Returns the shared TokenizerThread, starting it on first use.
+def get_tokenizer_thread():
+    global _tokenizer_thread
+    if _tokenizer_thread is None:
+        _tokenizer_thread = TokenizerThread()
+        _tokenizer_thread.tokenized.connect(_deliver_tokenize_job)
+        app = QApplication.instance()
+        if app is not None:
+            app.aboutToQuit.connect(_tokenizer_thread.stop)
+        _tokenizer_thread.start()
+    return _tokenizer_thread
+
+# Spans last applied to a block, reused while a fresh tokenization is pending.
+class BlockSpans(QTextBlockUserData):
+    def __init__(self, spans, pending):
+        super().__init__()
+        self.spans = spans
+        self.pending = pending
+
+# Documents with at least this many blocks are highlighted lazily.
+LAZY_HIGHLIGHT_MIN_BLOCKS = 5000
+# Blocks around the viewport that are highlighted together with the visible ones.
+LAZY_HIGHLIGHT_MARGIN = 50
+# Time budget of one background highlighting slice, in seconds.
+LAZY_HIGHLIGHT_SLICE = 0.008
+
+# GrammarHighlighter highlights a document with any LanguageGrammar.
+# Multi-line tokens are carried across blocks through the block state, so Qt only
+# re-runs the following block when an edit changes whether a token is left open.
+#
+# In lazy mode only the blocks up to a watermark and the blocks around the viewport are
+# highlighted when Qt asks for them. The watermark is advanced in short time slices
+# from the event loop, and the slices pause while the editor is hidden.
+#
+# Tokenizing happens on the shared TokenizerThread. highlightBlock only applies spans that
+# are already known for the block's (state, text); otherwise it keeps the block's previous
+# spans and queues the block. Results for an older document revision are discarded.
+class GrammarHighlighter(QSyntaxHighlighter):
+    def __init__(self, document, grammar):
         super().__init__(document)
-        self.highlightingRules = []
-        keywordFormat = QTextCharFormat()
-        keywordFormat.setForeground(QColor(SYNTAX_COLORS["php_keyword"]))
-        keywords = ['__halt_compiler', 'abstract', 'and', 'array', 'as', 'break', 'callable',
-                    'case', 'catch', 'class', 'clone', 'const', 'continue', 'declare', 'default',
-                    'die', 'do', 'echo', 'else', 'elseif', 'empty', 'enddeclare', 'endfor',
-                    'endforeach', 'endif', 'endswitch', 'endwhile', 'eval', 'exit', 'extends',
-                    'final', 'finally', 'for', 'foreach', 'function', 'global', 'goto', 'if',
-                    'implements', 'include', 'include_once', 'instanceof', 'insteadof', 'interface',
-                    'isset', 'list', 'namespace', 'new', 'or', 'print', 'private', 'protected',
-                    'public', 'require', 'require_once', 'return', 'static', 'switch', 'throw',
-                    'trait', 'try', 'unset', 'use', 'var', 'while', 'xor', 'yield']
-        self.highlightingRules.extend([(re.compile(r'\b' + keyword + r'\b', re.IGNORECASE), keywordFormat) for keyword in keywords])
-        stringFormat = QTextCharFormat()
-        stringFormat.setForeground(QColor(SYNTAX_COLORS["strings"]))
-        self.highlightingRules.append((re.compile(r'"[^"\\]*(\\.[^"\\]*)*"'), stringFormat))
-        self.highlightingRules.append((re.compile(r"'[^'\\]*(\\.[^'\\]*)*'"), stringFormat))
-        commentFormat = QTextCharFormat()
-        commentFormat.setForeground(QColor(SYNTAX_COLORS["comments"]))
-        self.highlightingRules.append((re.compile(r'//[^\n]*'), commentFormat))
-        self.highlightingRules.append((re.compile(r'#[^\n]*'), commentFormat))
-        self.highlightingRules.append((re.compile(r'/\*.*?\*/', re.DOTALL), commentFormat))
-        numberFormat = QTextCharFormat()
-        numberFormat.setForeground(QColor(SYNTAX_COLORS["integer"]))
-        self.highlightingRules.append((re.compile(r'\b[0-9]+(?:\.[0-9]+)?\b'), numberFormat))
-        variableFormat = QTextCharFormat()
-        variableFormat.setForeground(QColor(SYNTAX_COLORS["variable"]))
-        self.highlightingRules.append((re.compile(r'\$[a-zA-Z_][a-zA-Z0-9_]*'), variableFormat))
+        self.grammar = grammar
+        self.colors_version = _syntax_colors_version
+        self.formats = get_grammar_formats(grammar)
+
+        self.lazy = False
+        self._highlighted_upto = -1 # Every block up to this number has been highlighted in order
+        self._visible_first = 0
+        self._visible_last = -1
+        self._slice_deadline = 0.0 # Only a background slice may move the watermark
+        self._paused = False
+        self._block_count = 0
+        self._background_timer = QTimer(self)
+        self._background_timer.setInterval(0)
+        self._background_timer.timeout.connect(self._highlight_next_slice)
+        document.contentsChange.connect(self._on_contents_change)
+
+        self._tokenized = {} # (state, text) -> (spans, end state), filled by the tokenizer thread
+        self._pending_blocks = set() # Block numbers shown with old spans until their job returns
+        self._job_running = False
+        self._applying_results = False
+        self._applying_last = -1 # Last block of the job whose results are being applied
+        self._dispatch_timer = QTimer(self)
+        self._dispatch_timer.setSingleShot(True)
+        self._dispatch_timer.setInterval(0)
+        self._dispatch_timer.timeout.connect(self._dispatch_job)
+        self._tokenizer = get_tokenizer_thread()
+
+    # Highlights the whole document now, or switches to lazy mode for large documents.
+    # 'lazy' forces lazy mode for a document that is still growing, e.g. a file being streamed in.
+    def start(self, lazy=False):
+        document = self.document()
+        if document.blockCount() < LAZY_HIGHLIGHT_MIN_BLOCKS and not lazy:
+            self.lazy = False
+            self.rehighlight()
+            return
+        restart = self.lazy # Blocks highlighted before keep their state, so they must be redone explicitly
+        self.lazy = True
+        self._highlighted_upto = -1
+        self._block_count = document.blockCount()
+        self._highlight_visible_blocks(force=restart)
+        if not self._paused:
+            self._background_timer.start()
+
+    # Called by the editor whenever the visible block range changes.
+    def set_visible_range(self, first, last):
+        first = max(first - LAZY_HIGHLIGHT_MARGIN, 0)
+        last = last + LAZY_HIGHLIGHT_MARGIN
+        if (first, last) == (self._visible_first, self._visible_last):
+            return
+        self._visible_first, self._visible_last = first, last
+        if self.lazy:
+            self._highlight_visible_blocks()
+
+    # Stops the background pass, e.g. while the tab is hidden.
+    def pause(self):
+        self._paused = True
+        self._background_timer.stop()
+
+    def resume(self):
+        self._paused = False
+        if self.lazy and self._highlighted_upto < self.document().blockCount() - 1:
+            self._background_timer.start()
+
+    # Highlights the viewport blocks that have never been highlighted (their state is still -1).
+    # 'force' also redoes blocks highlighted before, e.g. after the colors changed.
+    def _highlight_visible_blocks(self, force=False):
+        document = self.document()
+        first = max(self._visible_first, self._highlighted_upto + 1)
+        block = document.findBlockByNumber(first)
+        while block.isValid() and block.blockNumber() <= self._visible_last:
+            if force or block.userState() == -1:
+                self.rehighlightBlock(block) # Cascades through the following unhighlighted blocks
+            block = block.next()
+
+    # Advances the watermark until the slice's time budget runs out.
+    def _highlight_next_slice(self):
+        document = self.document()
+        if document is None:
+            self._background_timer.stop()
+            return
+        self._slice_deadline = time.perf_counter() + LAZY_HIGHLIGHT_SLICE
+        block = document.findBlockByNumber(self._highlighted_upto + 1)
+        while block.isValid() and time.perf_counter() < self._slice_deadline:
+            upto = self._highlighted_upto
+            self.rehighlightBlock(block) # Cascades into the following blocks while their state changes
+            if self._highlighted_upto == upto:
+                break
+            block = document.findBlockByNumber(self._highlighted_upto + 1)
+        self._slice_deadline = 0.0
+        if self._highlighted_upto >= document.blockCount() - 1:
+            self._background_timer.stop()
+
+    # Keeps the watermark on the same text when blocks are removed above it.
+    def _on_contents_change(self, position, chars_removed, chars_added):
+        document = self.document()
+        if not self.lazy or document is None:
+            return
+        delta = document.blockCount() - self._block_count
+        self._block_count = document.blockCount()
+        changed_block = document.findBlock(position).blockNumber()
+        if delta < 0 and changed_block < self._highlighted_upto:
+            self._highlighted_upto = max(self._highlighted_upto + delta, changed_block)
+        if not self._paused and self._highlighted_upto < self._block_count - 1:
+            self._background_timer.start()
+
+    # Sends the earliest waiting blocks to the tokenizer thread. Only one job per highlighter
+    # is in flight, so results always come back in order.
+    def _dispatch_job(self):
+        document = self.document()
+        if self._job_running or not self._pending_blocks or document is None:
+            return
+        first = min(self._pending_blocks)
+        last = min(max(self._pending_blocks) + ASYNC_HIGHLIGHT_LOOKAHEAD, first + ASYNC_HIGHLIGHT_CHUNK - 1)
+        block = document.findBlockByNumber(first)
+        if not block.isValid():
+            self._pending_blocks.clear()
+            return
+        start_state = max(block.previous().userState(), 0) if first > 0 else 0
+        texts = []
+        while block.isValid() and block.blockNumber() <= last:
+            texts.append(block.text())
+            block = block.next()
+        self._pending_blocks.difference_update(range(first, first + len(texts)))
+        self._job_running = True
+        self._tokenizer.submit(TokenizeJob(self, self.grammar, document.revision(), first, start_state, texts))
+
+    # Stores a finished job and rehighlights the blocks that were waiting for it.
+    def _on_tokenized(self, job):
+        self._job_running = False
+        document = self.document()
+        if document is None or job.grammar is not self.grammar:
+            return
+        if job.revision != document.revision():
+            # The text changed while the job ran: read the blocks again
+            self._pending_blocks.update(range(job.first_block, job.first_block + len(job.texts)))
+            self._dispatch_timer.start()
+            return
 
-    def highlightBlock(self, text):
-        for pattern, format in self.highlightingRules:
-            expression = pattern
-            index = expression.search(text)
-            while index:
-                self.setFormat(index.start(), index.end() - index.start(), format)
-                index = expression.search(text, index.end())
-
-# PerlHighlighter provides syntax highlighting for Perl code.
-class PerlHighlighter(QSyntaxHighlighter):
-    def __init__(self, document):
-        super().__init__(document)
-        self.highlightingRules = []
-        keywordFormat = QTextCharFormat()
-        keywordFormat.setForeground(QColor(SYNTAX_COLORS["perl_keyword"]))
-        keywords = ['abs', 'accept', 'alarm', 'and', 'atan2', 'bind', 'binmode', 'bless',
-                    'break', 'caller', 'chdir', 'chmod', 'chomp', 'chop', 'chown', 'chr',
-                    'chroot', 'close', 'closedir', 'connect', 'continue', 'cos', 'crypt',
-                    'dbmclose', 'dbmopen', 'defined', 'delete', 'die', 'do', 'dump', 'each',
-                    'else', 'elsif', 'endgrent', 'endhostent', 'endnetent', 'endprotoent',
-                    'endpwent', 'endservent', 'eof', 'eval', 'exec', 'exists', 'exit',
-                    'exp', 'fcntl', 'fileno', 'flock', 'for', 'foreach', 'fork', 'format',
-                    'formline', 'getc', 'getgrent', 'getgrgid', 'getgrnam', 'gethostbyaddr',
-                    'gethostbyname', 'gethostent', 'getlogin', 'getnetbyaddr', 'getnetbyname',
-                    'getnetent', 'getpeername', 'getpgrp', 'getppid', 'getpriority',
-                    'getprotobyname', 'getprotobynumber', 'getprotoent', 'getpwent',
-                    'getpwnam', 'getpwuid', 'getservbyname', 'getservbyport', 'getservent',
-                    'getsockname', 'getsockopt', 'glob', 'gmtime', 'goto', 'grep', 'hex',
-                    'if', 'index', 'int', 'ioctl', 'join', 'keys', 'kill', 'last', 'lc',
-                    'lcfirst', 'length', 'link', 'listen', 'local', 'localtime', 'log',
-                    'lstat', 'map', 'mkdir', 'msgctl', 'msgget', 'msgrcv', 'msgsnd', 'my',
-                    'next', 'no', 'oct', 'open', 'opendir', 'or', 'ord', 'our', 'pack',
-                    'pipe', 'pop', 'pos', 'print', 'printf', 'prototype', 'push', 'quotemeta',
-                    'rand', 'read', 'readdir', 'readlink', 'readpipe', 'recv', 'redo', 'ref',
-                    'rename', 'require', 'reset', 'return', 'reverse', 'rewinddir', 'rindex',
-                    'rmdir', 'say', 'scalar', 'seek', 'seekdir', 'select', 'semctl', 'semget',
-                    'semop', 'send', 'setgrent', 'sethostent', 'setnetent', 'setpgrp',
-                    'setpriority', 'setprotoent', 'setpwent', 'setservent', 'setsockopt',
-                    'shift', 'shmctl', 'shmget', 'shmread', 'shmwrite', 'shutdown', 'sin',
-                    'sleep', 'socket', 'socketpair', 'sort', 'splice', 'split', 'sprintf',
-                    'sqrt', 'srand', 'stat', 'state', 'study', 'sub', 'substr', 'symlink',
-                    'syscall', 'sysopen', 'sysread', 'sysseek', 'system', 'syswrite', 'tell',
-                    'telldir', 'tie', 'tied', 'time', 'times', 'tr', 'truncate', 'uc', 'ucfirst',
-                    'umask', 'undef', 'unless', 'unlink', 'unpack', 'unshift', 'untie', 'until',
-                    'use', 'utime', 'values', 'vec', 'wait', 'waitpid', 'wantarray', 'warn',
-                    'when', 'while', 'write', 'y']
-        self.highlightingRules.extend([(re.compile(r'\b' + keyword + r'\b'), keywordFormat) for keyword in keywords])
-        stringFormat = QTextCharFormat()
-        stringFormat.setForeground(QColor(SYNTAX_COLORS["strings"]))
-        self.highlightingRules.append((re.compile(r'"[^"\\]*(\\.[^"\\]*)*"'), stringFormat))
-        self.highlightingRules.append((re.compile(r"'[^'\\]*(\\.[^'\\]*)*'"), stringFormat))
-        commentFormat = QTextCharFormat()
-        commentFormat.setForeground(QColor(SYNTAX_COLORS["comments"]))
-        self.highlightingRules.append((re.compile(r'#[^\n]*'), commentFormat))
-        numberFormat = QTextCharFormat()
-        numberFormat.setForeground(QColor(SYNTAX_COLORS["integer"]))
-        self.highlightingRules.append((re.compile(r'\b[0-9]+(?:\.[0-9]+)?\b'), numberFormat))
-        variableFormat = QTextCharFormat()
-        variableFormat.setForeground(QColor(SYNTAX_COLORS["variable"]))
-        self.highlightingRules.append((re.compile(r'[\$\@\%][a-zA-Z_][a-zA-Z0-9_]*'), variableFormat))
+        if len(self._tokenized) > ASYNC_HIGHLIGHT_CACHE_LIMIT:
+            self._tokenized.clear()
+        state = job.start_state
+        for text, (spans, end_state) in zip(job.texts, job.results):
+            self._tokenized[(state, text)] = (spans, end_state)
+            state = end_state
+
+        self._applying_results = True
+        self._applying_last = job.first_block + len(job.results) - 1
+        block = document.findBlockByNumber(job.first_block)
+        for _ in range(len(job.results)):
+            if not block.isValid():
+                break
+            data = block.userData()
+            if data is None or data.pending:
+                self.rehighlightBlock(block) # Cascades through following blocks that are now known
+            block = block.next()
+        self._applying_results = False
+        if self._pending_blocks:
+            self._dispatch_timer.start()
+
+    # Returns True if the current block may be highlighted now in lazy mode.
+    # Outside a background slice only the viewport is highlighted; when an edit cascades
+    # past it, the watermark is moved back so the background pass redoes the rest. Applying a job's
+    # results works the same way past the job's last block, so one result never relights the
+    # whole document from the cache in a single event.
+    def _should_highlight(self, block_number):
+        if self._slice_deadline and time.perf_counter() < self._slice_deadline:
+            if block_number == self._highlighted_upto + 1:
+                self._highlighted_upto = block_number
+            return block_number <= self._highlighted_upto
+        if self._visible_first <= block_number <= self._visible_last:
+            return True
+        if block_number <= self._highlighted_upto:
+            if self._applying_results and block_number <= self._applying_last:
+                return True
+            self._highlighted_upto = block_number - 1
+            if not self._paused:
+                self._background_timer.start()
+        return False
+
+    # Picks up the current syntax colors. Returns True if the formats changed.
+    def refresh_formats(self):
+        if self.colors_version == _syntax_colors_version:
+            return False
+        self.colors_version = _syntax_colors_version
+        self.formats = get_grammar_formats(self.grammar)
+        return True
 
     def highlightBlock(self, text):
-        for pattern, format in self.highlightingRules:
-            expression = pattern
-            index = expression.search(text)
-            while index:
-                self.setFormat(index.start(), index.end() - index.start(), format)
-                index = expression.search(text, index.end())
-
-# KotlinHighlighter provides syntax highlighting for Kotlin code.
-class KotlinHighlighter(QSyntaxHighlighter):
-    def __init__(self, document):
-        super().__init__(document)
-        self.highlightingRules = []
-        keywordFormat = QTextCharFormat()
-        keywordFormat.setForeground(QColor(SYNTAX_COLORS["kotlin_keyword"]))
-        keywords = ['as', 'as?', 'break', 'class', 'continue', 'do', 'else', 'false',
-                    'for', 'fun', 'if', 'in', 'interface', 'is', 'null', 'object',
-                    'package', 'return', 'super', 'this', 'throw', 'true', 'try',
-                    'typealias', 'typeof', 'val', 'var', 'when', 'while', 'by', 'catch',
-                    'constructor', 'delegate', 'dynamic', 'field', 'file', 'finally',
-                    'get', 'import', 'init', 'param', 'property', 'receiver', 'set',
-                    'setparam', 'where', 'actual', 'annotation', 'companion', 'crossinline',
-                    'data', 'enum', 'expect', 'external', 'infix', 'inline', 'inner',
-                    'internal', 'lateinit', 'noinline', 'open', 'operator', 'out',
-                    'override', 'private', 'protected', 'public', 'reified', 'sealed',
-                    'suspend', 'tailrec', 'vararg', 'println']
-        self.highlightingRules.extend([(re.compile(r'\b' + keyword + r'\b'), keywordFormat) for keyword in keywords])
-        stringFormat = QTextCharFormat()
-        stringFormat.setForeground(QColor(SYNTAX_COLORS["strings"]))
-        self.highlightingRules.append((re.compile(r'"[^"\\]*(\\.[^"\\]*)*"'), stringFormat))
-        self.highlightingRules.append((re.compile(r"'[^'\\]*(\\.[^'\\]*)*'"), stringFormat))
-        commentFormat = QTextCharFormat()
-        commentFormat.setForeground(QColor(SYNTAX_COLORS["comments"]))
-        self.highlightingRules.append((re.compile(r'//[^\n]*'), commentFormat))
-        self.highlightingRules.append((re.compile(r'/\*.*?\*/', re.DOTALL), commentFormat))
-        numberFormat = QTextCharFormat()
-        numberFormat.setForeground(QColor(SYNTAX_COLORS["integer"]))
-        self.highlightingRules.append((re.compile(r'\b[0-9]+(?:\.[0-9]+)?\b'), numberFormat))
+        if self.lazy and not self._should_highlight(self.currentBlock().blockNumber()):
+            return # Left for the background pass; the block keeps its old state
+        result = self._tokenized.get((max(self.previousBlockState(), 0), text))
+        formats = self.formats
+        if result is None:
+            # Not tokenized yet: keep the old spans and state until the tokenizer thread answers
+            data = self.currentBlockUserData()
+            if data is not None:
+                length = len(text)
+                for start, span_length, style in data.spans:
+                    if start < length:
+                        self.setFormat(start, min(span_length, length - start), formats[style])
+                data.pending = True
+            else:
+                self.setCurrentBlockUserData(BlockSpans([], True))
+            self._pending_blocks.add(self.currentBlock().blockNumber())
+            self._dispatch_timer.start()
+            return
+        spans, state = result
+        for start, length, style in spans:
+            self.setFormat(start, length, formats[style])
+        data = self.currentBlockUserData()
+        if data is not None:
+            data.spans = spans
+            data.pending = False
+        else:
+            self.setCurrentBlockUserData(BlockSpans(spans, False))
+        self.setCurrentBlockState(state)
 
-    def highlightBlock(self, text):
-        for pattern, format in self.highlightingRules:
-            expression = pattern
-            index = expression.search(text)
-            while index:
-                self.setFormat(index.start(), index.end() - index.start(), format)
-                index = expression.search(text, index.end())
-
-# ReactNativeHighlighter provides syntax highlighting for React Native (JSX/TSX) code.
-class ReactNativeHighlighter(QSyntaxHighlighter):
-    def __init__(self, document):
-        super().__init__(document)
-        self.highlightingRules = []
-        js_highlighter = JavaScriptHighlighter(document)
-        self.highlightingRules.extend(js_highlighter.highlightingRules)
+# Worker class for running external processes in a separate thread.
+# This prevents the UI from freezing during long-running operations.
+class Worker(QThread):
+    finished = pyqtSignal(str, str)
 
-        jsxTagFormat = QTextCharFormat()
-        jsxTagFormat.setForeground(QColor(SYNTAX_COLORS["html_tag"]))
-        self.highlightingRules.append((re.compile(r'<[A-Za-z][A-Za-z0-9_.]*[^>]*>'), jsxTagFormat))
-        self.highlightingRules.append((re.compile(r'</[A-Za-z][A-Za-z0-9_.]*>'), jsxTagFormat))
+    def __init__(self, command, tool_name):
+        super().__init__()
+        self.command = command
+        self.tool_name = tool_name
 
-        jsxAttributeFormat = QTextCharFormat()
-        jsxAttributeFormat.setForeground(QColor(SYNTAX_COLORS["html_attribute"]))
-        self.highlightingRules.append((re.compile(r'\b[a-zA-Z\-]+\s*='), jsxAttributeFormat))
+    def run(self):
+        try:
+            process = QProcess()
+            process.start(self.command)
+            process.waitForFinished()
+            output = process.readAllStandardOutput().data().decode().strip()
+            error_output = process.readAllStandardError().data().decode().strip()
+            result = output if output else error_output
+            self.finished.emit(self.tool_name, result)
+        except Exception as e:
+            self.finished.emit(self.tool_name, f"Error running {self.tool_name}: {e}")
 
-    def highlightBlock(self, text):
-        for pattern, format in self.highlightingRules:
-            expression = pattern
-            index = expression.search(text)
-            while index:
-                self.setFormat(index.start(), index.end() - index.start(), format)
-                index = expression.search(text, index.end())
-
-# XmlHighlighter provides syntax highlighting for XML code.
-class XmlHighlighter(QSyntaxHighlighter):
-    def __init__(self, document):
-        super().__init__(document)
-        self.highlightingRules = []
+LOAD_FIRST_CHUNK = 64 * 1024 # Characters read first, enough for the first screenful
+LOAD_CHUNK_SIZE = 256 * 1024 # Characters read, and appended to the editor, per step after that
 
-        tagFormat = QTextCharFormat()
-        tagFormat.setForeground(QColor(SYNTAX_COLORS["xml_tag"]))
-        self.highlightingRules.append((re.compile(r'</?[a-zA-Z0-9_.:\-]+[^>]*>'), tagFormat))
+# FileLoader reads and decodes a text file off the GUI thread, handing it over in chunks.
+# Each chunk comes with the percentage of the file read so far.
+class FileLoader(QThread):
+    chunk_loaded = pyqtSignal(str, int)
+    loaded = pyqtSignal() # The whole file has been handed over
+    failed = pyqtSignal(str)
 
-        attributeFormat = QTextCharFormat()
-        attributeFormat.setForeground(QColor(SYNTAX_COLORS["xml_attribute"]))
-        self.highlightingRules.append((re.compile(r'\b[a-zA-Z_:\-]+="[^"]*"'), attributeFormat))
-        self.highlightingRules.append((re.compile(r'\b[a-zA-Z_:\-]+=\'[^\']*\''), attributeFormat))
+    def __init__(self, file_path):
+        super().__init__()
+        self.file_path = file_path
+        self._stopped = False
 
-        stringFormat = QTextCharFormat()
-        stringFormat.setForeground(QColor(SYNTAX_COLORS["strings"]))
-        self.highlightingRules.append((re.compile(r'"[^"]*"'), stringFormat))
-        self.highlightingRules.append((re.compile(r"'[^']*'"), stringFormat))
+    def stop(self):
+        self._stopped = True
+        self.wait()
 
-        commentFormat = QTextCharFormat()
-        commentFormat.setForeground(QColor(SYNTAX_COLORS["comments"]))
-        self.highlightingRules.append((re.compile(r'<!--.*?-->'), commentFormat))
+    def run(self):
+        try:
+            size = max(1, os.path.getsize(self.file_path))
+            with open(self.file_path, 'r', encoding='utf-8', errors='ignore') as f:
+                chunk_size = LOAD_FIRST_CHUNK
+                while not self._stopped:
+                    text = f.read(chunk_size)
+                    if not text:
+                        break
+                    self.chunk_loaded.emit(text, min(100, int(f.buffer.tell() * 100 / size)))
+                    chunk_size = LOAD_CHUNK_SIZE
+            if not self._stopped:
+                self.loaded.emit()
+        except Exception as e:
+            self.failed.emit(str(e))
 
-        doctypeFormat = QTextCharFormat()
-        doctypeFormat.setForeground(QColor(SYNTAX_COLORS["import"]))
-        self.highlightingRules.append((re.compile(r'<!DOCTYPE[^>]*>'), doctypeFormat))
+# Delay after the last edit before completions are requested, in milliseconds.
+COMPLETION_DEBOUNCE_MS = 150
+FUZZY_RESULT_LIMIT = 200 # Rows shown in the completion popup
+FUZZY_SCORE_LIMIT = 2000 # Most matches scored per keystroke; beyond this only prefix matches are ranked
+FUZZY_RECENCY_WINDOW = 30 # The last this many accepted completions get a ranking bonus
+WORKSPACE_FUZZY_CANDIDATES = 5000 # Workspace symbols sharing the first typed letter offered to the matcher
 
-        cdataFormat = QTextCharFormat()
-        cdataFormat.setForeground(QColor(SYNTAX_COLORS["variable"]))
-        self.highlightingRules.append((re.compile(r'<!\[CDATA\[.*?\]\]>', re.DOTALL), cdataFormat))
+# CompletionStats keeps latency counters for the completion pipeline.
+class CompletionStats:
+    MAX_SAMPLES = 1000
 
-    def highlightBlock(self, text):
-        for pattern, format in self.highlightingRules:
-            expression = pattern
-            index = expression.search(text)
-            while index:
-                self.setFormat(index.start(), index.end() - index.start(), format)
-                index = expression.search(text, index.end())
-
-# JsonHighlighter provides syntax highlighting for JSON data.
-class JsonHighlighter(QSyntaxHighlighter):
-    def __init__(self, document):
-        super().__init__(document)
-        self.highlightingRules = []
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.requests = 0
+        self.superseded = 0 # Replaced by a newer request before the worker picked them up
+        self.stale = 0 # Finished after the text or cursor had moved on, so never shown
+        self.delivered = 0
+        self.keystroke_times = [] # Seconds spent in CodeEditor.keyPressEvent on the GUI thread
+        self.backend_times = [] # Seconds spent computing completions on the worker thread
+        self.delivery_times = [] # Seconds from a request being sent to its results being shown
+
+    def record(self, samples, seconds):
+        samples.append(seconds)
+        if len(samples) > self.MAX_SAMPLES:
+            del samples[:len(samples) - self.MAX_SAMPLES]
+
+    @staticmethod
+    def _describe(label, samples):
+        if not samples:
+            return f"{label}: no samples"
+        ordered = sorted(samples)
+        median = ordered[len(ordered) // 2] * 1000
+        p95 = ordered[min(int(len(ordered) * 0.95), len(ordered) - 1)] * 1000
+        return f"{label}: median {median:.1f} ms, p95 {p95:.1f} ms, max {ordered[-1] * 1000:.1f} ms ({len(ordered)} samples)"
+
+    def summary(self):
+        return "\n".join([
+            self._describe("Keystroke handling", self.keystroke_times),
+            self._describe("Completion backend", self.backend_times),
+            self._describe("Request to results", self.delivery_times),
+            f"Requests: {self.requests}, delivered: {self.delivered}, "
+            f"superseded: {self.superseded}, stale: {self.stale}",
+        ])
+
+completion_stats = CompletionStats()
+
+# A snapshot of an editor's text and cursor to complete off the GUI thread.
+class CompletionRequest:
+    def __init__(self, owner, revision, position, text, file_path, line, column, workspace=None):
+        self.owner = owner
+        self.revision = revision
+        self.position = position
+        self.text = text
+        self.file_path = file_path
+        self.line = line
+        self.column = column
+        self.workspace = workspace
+        self.created = time.perf_counter()
+
+# Most imports remembered per workspace for preloading at the next launch.
+JEDI_PRELOAD_LIMIT = 40
+WORKSPACE_RESCAN_SECONDS = 60.0 # How often the symbol index checks the workspace for edits no notification reported
+WORKSPACE_MAX_FILE_SIZE = 1024 * 1024 # Larger files are not indexed
+WORKSPACE_SKIP_DIRS = {CACHE_DIR} # Always skipped; anything else is left out only by a .gitignore
+WORKSPACE_REBUILD_THRESHOLD = 1000 # Re-sort the index instead of inserting when more names change at once
+WORKSPACE_COMPLETION_LIMIT = 200 # Workspace symbols offered per completion prefix
+
+# Top-level modules imported by Python source, in order of appearance.
+def imported_modules(text):
+    modules = []
+    for match in re.finditer(r'^\s*(?:from\s+([A-Za-z_][\w.]*)\s+import\b|import\s+([A-Za-z_][\w.]*(?:\s*,\s*[A-Za-z_][\w.]*)*))', text, re.MULTILINE):
+        names = [match.group(1)] if match.group(1) else match.group(2).split(',')
+        for name in names:
+            module = name.strip().split('.')[0]
+            if module and module not in modules:
+                modules.append(module)
+    return modules
+
+# JediBackend keeps one workspace's jedi.Project and environment alive between completions,
+# so sys.path is resolved once and imported packages stay in Jedi's caches.
+# It is only used from the CompletionService thread.
+class JediBackend:
+    def __init__(self, root):
+        self.root = root
+        self.project = jedi.Project(root)
+        try:
+            self.environment = self.project.get_environment()
+        except Exception as e:
+            print(f"Error finding the Python environment for {root}: {e}. Using the running interpreter.")
+            self.environment = jedi.InterpreterEnvironment()
+        self.preloaded = set()
 
-        keyFormat = QTextCharFormat()
-        keyFormat.setForeground(QColor(SYNTAX_COLORS["json_key"]))
-        self.highlightingRules.append((re.compile(r'"(\w+)":'), keyFormat))
+    def complete(self, request):
+        script = jedi.Script(request.text, path=request.file_path, project=self.project, environment=self.environment)
+        return script.complete(line=request.line, column=request.column)
 
-        stringValueFormat = QTextCharFormat()
-        stringValueFormat.setForeground(QColor(SYNTAX_COLORS["json_value_string"]))
-        self.highlightingRules.append((re.compile(r':\s*"[^"]*"'), stringValueFormat))
+    # Imports a module in Jedi so that its parse trees and stubs are cached before the first completion.
+    def preload(self, module):
+        if module in self.preloaded:
+            return
+        self.preloaded.add(module)
+        source = f"import {module}\n{module}."
+        try:
+            jedi.Script(source, project=self.project, environment=self.environment).complete(line=2, column=len(module) + 1)
+        except Exception as e:
+            print(f"Error preloading {module} for completion: {e}")
 
-        numberValueFormat = QTextCharFormat()
-        numberValueFormat.setForeground(QColor(SYNTAX_COLORS["json_value_number"]))
-        self.highlightingRules.append((re.compile(r':\s*\b-?\d+(\.\d+)?([eE][+\-]?\d+)?\b'), numberValueFormat))
+# CompletionService runs Jedi (or the plain word scan) on one shared worker thread.
+# Only the newest request of each editor is kept; older ones that have not started are dropped.
+class CompletionService(QThread):
+    completed = pyqtSignal(object, object) # CompletionRequest, list of words
 
-        booleanNullFormat = QTextCharFormat()
-        booleanNullFormat.setForeground(QColor(SYNTAX_COLORS["boolean"]))
-        self.highlightingRules.append((re.compile(r'\b(true|false|null)\b'), booleanNullFormat))
+    def __init__(self):
+        super().__init__()
+        self._condition = threading.Condition()
+        self._pending = {} # Editor -> newest request not started yet
+        self._preloads = [] # (workspace, module) pairs to warm up while no completion is waiting
+        self._stopping = False
+        self._backends = {} # Workspace root -> JediBackend
+        self._preload_lists = self._load_preload_lists()
+
+    @staticmethod
+    def _load_preload_lists():
+        try:
+            if os.path.exists(JEDI_PRELOAD_FILE):
+                with open(JEDI_PRELOAD_FILE, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+        except Exception as e:
+            print(f"Error loading completion preload list: {e}")
+        return {}
 
-    def highlightBlock(self, text):
-        for pattern, format in self.highlightingRules:
-            expression = pattern
-            index = expression.search(text)
-            while index:
-                if pattern.pattern == r'"(\w+)":':
-                    self.setFormat(index.start(1), len(index.group(1)), format)
-                else:
-                    self.setFormat(index.start(), index.end() - index.start(), format)
-                index = expression.search(text, index.end())
+    def _save_preload_lists(self):
+        try:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            with open(JEDI_PRELOAD_FILE, 'w', encoding='utf-8') as f:
+                json.dump(self._preload_lists, f, indent=4)
+        except Exception as e:
+            print(f"Error saving completion preload list: {e}")
 
-# MarkdownHighlighter provides syntax highlighting for Markdown text.
-class MarkdownHighlighter(QSyntaxHighlighter):
-    def __init__(self, document):
-        super().__init__(document)
-        self.highlightingRules = []
-
-        headingFormat = QTextCharFormat()
-        headingFormat.setForeground(QColor(SYNTAX_COLORS["markdown_heading"]))
-        self.highlightingRules.append((re.compile(r'^#+\s.*'), headingFormat))
-
-        boldFormat = QTextCharFormat()
-        boldFormat.setForeground(QColor(SYNTAX_COLORS["markdown_bold"]))
-        boldFormat.setFontWeight(QFont.Bold)
-        self.highlightingRules.append((re.compile(r'\*\*([^\*]+)\*\*'), boldFormat))
-        self.highlightingRules.append((re.compile(r'__([^_]+)__'), boldFormat))
-
-        italicFormat = QTextCharFormat()
-        italicFormat.setForeground(QColor(SYNTAX_COLORS["markdown_italic"]))
-        italicFormat.setFontItalic(True)
-        self.highlightingRules.append((re.compile(r'\*([^\*]+)\*'), italicFormat))
-        self.highlightingRules.append((re.compile(r'_([^_]+)_'), italicFormat))
-
-        codeBlockFormat = QTextCharFormat()
-        codeBlockFormat.setForeground(QColor(SYNTAX_COLORS["variable"]))
-        self.highlightingRules.append((re.compile(r'`[^`]+`'), codeBlockFormat))
-        self.highlightingRules.append((re.compile(r'```[\s\S]*?```', re.DOTALL), codeBlockFormat))
-
-        linkFormat = QTextCharFormat()
-        linkFormat.setForeground(QColor(SYNTAX_COLORS["function"]))
-        linkFormat.setUnderlineStyle(QTextCharFormat.SingleUnderline)
-        self.highlightingRules.append((re.compile(r'\[([^\]]+)\]\(([^\)]+)\)'), linkFormat))
-
-        listFormat = QTextCharFormat()
-        listFormat.setForeground(QColor(SYNTAX_COLORS["keywords"]))
-        self.highlightingRules.append((re.compile(r'^\s*[\-\*\+]\s'), listFormat))
-        self.highlightingRules.append((re.compile(r'^\s*\d+\.\s'), listFormat))
+    # Queues the imports of a Python file so Jedi has them cached before they are completed.
+    def preload(self, workspace, text):
+        if not _HAS_JEDI:
+            return
+        workspace = os.path.abspath(workspace or os.getcwd())
+        with self._condition:
+            for module in imported_modules(text):
+                self._preloads.append((workspace, module))
+            self._condition.notify()
+
+    def submit(self, request):
+        with self._condition:
+            if request.owner in self._pending:
+                completion_stats.superseded += 1
+            self._pending[request.owner] = request
+            self._condition.notify()
+
+    def cancel(self, owner):
+        with self._condition:
+            self._pending.pop(owner, None)
+
+    def stop(self):
+        with self._condition:
+            self._stopping = True
+            self._condition.notify()
+        self.wait()
 
-    def highlightBlock(self, text):
-        for pattern, format in self.highlightingRules:
-            expression = pattern
-            index = expression.search(text)
-            while index:
-                if pattern.pattern.startswith(r'\*\*') or pattern.pattern.startswith(r'__') or \
-                   pattern.pattern.startswith(r'\*') or pattern.pattern.startswith(r'_') or \
-                   pattern.pattern.startswith(r'`') or pattern.pattern.startswith(r'\['):
-                    self.setFormat(index.start(1), len(index.group(1)), format)
+    def run(self):
+        while True:
+            with self._condition:
+                while not self._pending and not self._preloads and not self._stopping:
+                    self._condition.wait()
+                if self._stopping:
+                    return
+                request = preload = None
+                if self._pending: # Completions always go before preloading
+                    request = self._pending.pop(next(iter(self._pending)))
                 else:
-                    self.setFormat(index.start(), index.end() - index.start(), format)
-                index = expression.search(text, index.end())
+                    preload = self._preloads.pop(0)
+            if preload:
+                self._preload(*preload)
+                continue
+            start = time.perf_counter()
+            words = self._complete(request)
+            completion_stats.record(completion_stats.backend_times, time.perf_counter() - start)
+            self.completed.emit(request, words)
+
+    # Returns the warm backend for a workspace, creating it on first use.
+    # A new backend starts preloading the imports remembered from the last session.
+    def _backend(self, workspace):
+        root = os.path.abspath(workspace or os.getcwd())
+        backend = self._backends.get(root)
+        if backend is None:
+            jedi.settings.cache_directory = os.path.abspath(os.path.join(CACHE_DIR, "jedi")) # Parse trees persist here
+            backend = JediBackend(root)
+            self._backends[root] = backend
+            with self._condition:
+                for module in self._preload_lists.get(root, []):
+                    self._preloads.append((root, module))
+        return backend
+
+    def _preload(self, workspace, module):
+        try:
+            backend = self._backend(workspace)
+        except Exception as e:
+            print(f"Error starting completion backend for {workspace}: {e}")
+            return
+        if module in backend.preloaded:
+            return
+        backend.preload(module)
+        remembered = self._preload_lists.setdefault(backend.root, [])
+        if module not in remembered:
+            remembered.append(module)
+            del remembered[:-JEDI_PRELOAD_LIMIT]
+            self._save_preload_lists()
+
+    def _complete(self, request):
+        if _HAS_JEDI:
+            try:
+                completions = self._backend(request.workspace).complete(request)
+                return sorted(set(c.name for c in completions))
+            except Exception as e:
+                # Fallback to simple word completion if jedi fails
+                print(f"Jedi completion failed: {e}. Falling back to simple word completion.")
+        return None # The editor's WordIndex already holds the simple word completions
+
+_completion_service = None
+
+# Returns the shared CompletionService, starting it on first use.
+def get_completion_service():
+    global _completion_service
+    if _completion_service is None:
+        _completion_service = CompletionService()
+        app = QApplication.instance()
+        if app is not None:
+            app.aboutToQuit.connect(_completion_service.stop)
+        _completion_service.start()
+    return _completion_service
+
+# WorkspaceIndexThread is the base of the indexes that follow the files of a workspace on a background
+# thread. It queues the work the GUI hands it (a new root, saved files, directories the
+# WorkspaceWatcher reports) under one condition and runs the subclass hooks for it: _reset for a new
+# root, _index_paths for reported files, _sync to bring a directory in line with the disk (the whole
+# root on the first crawl and every rescan_seconds, for edits in place no notification reported),
+# then _updated once the work is done and _close when stopped.
+class WorkspaceIndexThread(QThread):
+    directories_walked = pyqtSignal(object) # Directories of the workspace, for the WorkspaceWatcher
+    rescan_seconds = WORKSPACE_RESCAN_SECONDS
+    index_name = "workspace index" # For error messages
 
-# ShellHighlighter provides syntax highlighting for Shell scripts (Bash).
-class ShellHighlighter(QSyntaxHighlighter):
-    def __init__(self, document):
-        super().__init__(document)
-        self.highlightingRules = []
-
-        keywordFormat = QTextCharFormat()
-        keywordFormat.setForeground(QColor(SYNTAX_COLORS["shell_keyword"]))
-        keywords = ['if', 'then', 'else', 'elif', 'fi', 'case', 'esac', 'for', 'while',
-                    'until', 'do', 'done', 'in', 'function', 'select', 'break', 'continue',
-                    'return', 'exit', 'export', 'declare', 'local', 'readonly', 'unset',
-                    'source', 'test', '[[', ']]', '[', ']', 'cd', 'pwd', 'ls', 'grep',
-                    'find', 'awk', 'sed', 'cut', 'sort', 'uniq', 'head', 'tail', 'cat',
-                    'echo', 'printf', 'read', 'trap', 'set', 'shopt', 'alias', 'unalias']
-        self.highlightingRules.extend([(re.compile(r'\b' + keyword + r'\b'), keywordFormat) for keyword in keywords])
-
-        stringFormat = QTextCharFormat()
-        stringFormat.setForeground(QColor(SYNTAX_COLORS["shell_string"]))
-        self.highlightingRules.append((re.compile(r'"[^"\\]*(\\.[^"\\]*)*"'), stringFormat))
-        self.highlightingRules.append((re.compile(r"'[^'\\]*(\\.[^'\\]*)*'"), stringFormat))
-
-        commentFormat = QTextCharFormat()
-        commentFormat.setForeground(QColor(SYNTAX_COLORS["comments"]))
-        self.highlightingRules.append((re.compile(r'#[^\n]*'), commentFormat))
-
-        variableFormat = QTextCharFormat()
-        variableFormat.setForeground(QColor(SYNTAX_COLORS["variable"]))
-        self.highlightingRules.append((re.compile(r'\$[a-zA-Z_][a-zA-Z0-9_]*'), variableFormat))
-        self.highlightingRules.append((re.compile(r'\$\{[a-zA-Z_][a-zA-Z0-9_]*\}'), variableFormat))
-
-        commandFormat = QTextCharFormat()
-        commandFormat.setForeground(QColor(SYNTAX_COLORS["function"]))
-        self.highlightingRules.append((re.compile(r'^\s*\b[a-zA-Z_][a-zA-Z0-9_]*\b'), commandFormat))
+    def __init__(self):
+        super().__init__()
+        self._condition = threading.Condition() # Guards the pending work below and the subclass's published state
+        self._root = None
+        self._root_changed = False
+        self._dirty_paths = set()
+        self._dirty_directories = set()
+        self._updating = False # The worker is applying changes it took from the sets above
+        self._running = True
+        self._watcher = get_workspace_watcher()
+        self._watcher.directory_changed.connect(self.update_directory)
+        self.directories_walked.connect(self._watcher.watch)
+
+    # Indexes a new workspace directory, dropping the previous one and the work pending for it.
+    def set_root(self, root):
+        root = os.path.abspath(root)
+        with self._condition:
+            if root == self._root:
+                return
+            self._root = root
+            self._root_changed = True
+            self._dirty_paths.clear()
+            self._dirty_directories.clear()
+            self._condition.notify()
+        self._watcher.set_root(root)
+
+    # Re-reads one file, e.g. after it was saved, created or renamed. Missing files are dropped.
+    def update_file(self, path):
+        with self._condition:
+            self._dirty_paths.add(os.path.abspath(path))
+            self._condition.notify()
+
+    # Brings the files of a directory and its subdirectories up to date.
+    def update_directory(self, path):
+        with self._condition:
+            self._dirty_directories.add(os.path.abspath(path))
+            self._condition.notify()
+
+    def stop(self):
+        with self._condition:
+            self._running = False
+            self._condition.notify()
+        self.wait()
+
+    def _interrupted(self):
+        return not self._running or self._root_changed
 
-    def highlightBlock(self, text):
-        for pattern, format in self.highlightingRules:
-            expression = pattern
-            index = expression.search(text)
-            while index:
-                self.setFormat(index.start(), index.end() - index.start(), format)
-                index = expression.search(text, index.end())
-
-# TypeScriptHighlighter provides syntax highlighting for TypeScript code.
-class TypeScriptHighlighter(QSyntaxHighlighter):
-    def __init__(self, document):
-        super().__init__(document)
-        self.highlightingRules = []
+    def run(self):
+        while True:
+            with self._condition:
+                timed_out = False
+                while self._running and not self._root_changed and not self._dirty_paths and not self._dirty_directories:
+                    if not self._condition.wait(self.rescan_seconds):
+                        timed_out = True
+                        break
+                if not self._running:
+                    break
+                root = self._root
+                crawl = self._root_changed
+                self._root_changed = False
+                paths, self._dirty_paths = self._dirty_paths, set()
+                directories, self._dirty_directories = self._dirty_directories, set()
+                self._updating = not crawl and bool(paths or directories)
+            try:
+                if crawl:
+                    self._reset(root)
+                if paths:
+                    directories |= self._index_paths(root, paths)
+                complete = False
+                if root is not None:
+                    if crawl or timed_out:
+                        complete = self._sync(root, root, [])
+                    else:
+                        self._sync_directories(root, directories)
+                self._updated(root, crawl and complete)
+            except Exception as e:
+                print(f"Error updating the {self.index_name} of {root}: {e}")
+            with self._condition:
+                self._updating = False
+        self._close()
+
+    # Syncs the reported directories of the workspace, each subtree once. One that is gone, or now
+    # hidden or ignored, is synced with rules of None, so its files are dropped.
+    def _sync_directories(self, root, directories):
+        prefix = os.path.join(root, '')
+        synced = []
+        for directory in sorted(directories): # Parents sort before their subdirectories
+            if directory != root and not directory.startswith(prefix):
+                continue
+            if any(directory == d or directory.startswith(os.path.join(d, '')) for d in synced):
+                continue
+            if self._sync(root, directory, inherited_ignore_rules(root, directory)):
+                synced.append(directory)
+
+    # Yields the files under directory that find in files would search, adding the directories walked
+    # to 'directories'. Yields none if rules is None.
+    def _walk(self, directory, rules, directories):
+        if rules is not None:
+            yield from iter_search_files(directory, rules, directories)
+
+    # Starts over for a new root (None before the first), on the worker thread.
+    def _reset(self, root):
+        pass
 
-        js_highlighter = JavaScriptHighlighter(document)
-        self.highlightingRules.extend(js_highlighter.highlightingRules)
+    # Re-reads reported files. Returns the directories to sync for them, like those of new files,
+    # whose listing depends on their directory's ignore rules.
+    def _index_paths(self, root, paths):
+        return set()
 
-        tsKeywordFormat = QTextCharFormat()
-        tsKeywordFormat.setForeground(QColor(SYNTAX_COLORS["typescript_keyword"]))
-        ts_keywords = ['public', 'private', 'protected', 'interface', 'enum', 'abstract',
-                       'implements', 'extends', 'static', 'readonly', 'declare', 'type',
-                       'module', 'namespace', 'as', 'is', 'infer', 'keyof', 'unique',
-                       'never', 'any', 'unknown', 'void', 'boolean', 'number', 'string',
-                       'symbol', 'bigint']
-        self.highlightingRules.extend([(re.compile(r'\b' + keyword + r'\b'), tsKeywordFormat) for keyword in ts_keywords])
+    # Brings the index of the files under directory in line with the disk. 'rules' are the ignore
+    # rules in force above it. Returns False if interrupted by a new root or stop().
+    def _sync(self, root, directory, rules):
+        raise NotImplementedError
 
-    def highlightBlock(self, text):
-        for pattern, format in self.highlightingRules:
-            expression = pattern
-            index = expression.search(text)
-            while index:
-                self.setFormat(index.start(), index.end() - index.start(), format)
-                index = expression.search(text, index.end())
-
-# VueHighlighter provides syntax highlighting for Vue.js single-file components.
-class VueHighlighter(QSyntaxHighlighter):
-    def __init__(self, document):
-        super().__init__(document)
-        self.highlightingRules = []
-
-        # HTML part
-        html_highlighter = HtmlHighlighter(document)
-        self.highlightingRules.extend(html_highlighter.highlightingRules)
-
-        # CSS part
-        css_highlighter = CssHighlighter(document)
-        self.highlightingRules.extend(css_highlighter.highlightingRules)
-
-        # JavaScript part
-        js_highlighter = JavaScriptHighlighter(document)
-        self.highlightingRules.extend(js_highlighter.highlightingRules)
-
-        # Vue specific directives and components
-        vueKeywordFormat = QTextCharFormat()
-        vueKeywordFormat.setForeground(QColor(SYNTAX_COLORS["vue_keyword"]))
-        vue_keywords = ['v-bind', 'v-on', 'v-model', 'v-if', 'v-else', 'v-else-if',
-                        'v-for', 'v-show', 'v-text', 'v-html', 'v-pre', 'v-cloak',
-                        'v-once', 'slot', 'template', 'script', 'style', 'data',
-                        'methods', 'computed', 'watch', 'props', 'components',
-                        'mounted', 'created', 'updated', 'destroyed', 'beforeCreate',
-                        'beforeMount', 'beforeUpdate', 'beforeDestroy']
-        self.highlightingRules.extend([(re.compile(r'\b' + keyword + r'\b'), vueKeywordFormat) for keyword in vue_keywords])
+    # Called after each round of work; 'crawled' is True once the first crawl of root has completed.
+    def _updated(self, root, crawled):
+        pass
 
-    def highlightBlock(self, text):
-        for pattern, format in self.highlightingRules:
-            expression = pattern
-            index = expression.search(text)
-            while index:
-                self.setFormat(index.start(), index.end() - index.start(), format)
-                index = expression.search(text, index.end())
-
-# DartHighlighter provides syntax highlighting for Dart code.
-class DartHighlighter(QSyntaxHighlighter):
-    def __init__(self, document):
-        super().__init__(document)
-        self.highlightingRules = []
-        keywordFormat = QTextCharFormat()
-        keywordFormat.setForeground(QColor(SYNTAX_COLORS["dart_keyword"]))
-        keywords = ['abstract', 'as', 'assert', 'async', 'await', 'break', 'case', 'catch',
-                    'class', 'const', 'continue', 'covariant', 'default', 'deferred', 'do',
-                    'dynamic', 'else', 'enum', 'export', 'extends', 'extension', 'external',
-                    'factory', 'false', 'final', 'finally', 'for', 'Function', 'get', 'hide',
-                    'if', 'implements', 'import', 'in', 'interface', 'is', 'late', 'library',
-                    'mixin', 'new', 'null', 'on', 'operator', 'part', 'required', 'rethrow',
-                    'return', 'set', 'show', 'static', 'super', 'switch', 'sync', 'this',
-                    'throw', 'true', 'try', 'typedef', 'var', 'void', 'while', 'with', 'yield',
-                    'int', 'double', 'String', 'bool', 'List', 'Map', 'Set', 'print']
-        self.highlightingRules.extend([(re.compile(r'\b' + keyword + r'\b'), keywordFormat) for keyword in keywords])
-        stringFormat = QTextCharFormat()
-        stringFormat.setForeground(QColor(SYNTAX_COLORS["strings"]))
-        self.highlightingRules.append((re.compile(r'"[^"\\]*(\\.[^"\\]*)*"'), stringFormat))
-        self.highlightingRules.append((re.compile(r"'[^'\\]*(\\.[^'\\]*)*'"), stringFormat))
-        self.highlightingRules.append((re.compile(r'"""[\s\S]*?"""'), stringFormat))
-        self.highlightingRules.append((re.compile(r"'''[\s\S]*?'''"), stringFormat))
-        commentFormat = QTextCharFormat()
-        commentFormat.setForeground(QColor(SYNTAX_COLORS["comments"]))
-        self.highlightingRules.append((re.compile(r'//[^\n]*'), commentFormat))
-        self.highlightingRules.append((re.compile(r'/\*.*?\*/', re.DOTALL), commentFormat))
-        numberFormat = QTextCharFormat()
-        numberFormat.setForeground(QColor(SYNTAX_COLORS["integer"]))
-        self.highlightingRules.append((re.compile(r'\b[0-9]+(?:\.[0-9]+)?\b'), numberFormat))
+    def _close(self):
+        pass
 
-    def highlightBlock(self, text):
-        for pattern, format in self.highlightingRules:
-            expression = pattern
-            index = expression.search(text)
-            while index:
-                self.setFormat(index.start(), index.end() - index.start(), format)
-                index = expression.search(text, index.end())
-
-# RHighlighter provides syntax highlighting for R code.
-class RHighlighter(QSyntaxHighlighter):
-    def __init__(self, document):
-        super().__init__(document)
-        self.highlightingRules = []
-        keywordFormat = QTextCharFormat()
-        keywordFormat.setForeground(QColor(SYNTAX_COLORS["r_keyword"]))
-        keywords = ['if', 'else', 'repeat', 'while', 'for', 'in', 'next', 'break',
-                    'function', 'return', 'switch', 'try', 'tryCatch', 'stop', 'warning',
-                    'message', 'library', 'require', 'attach', 'detach', 'source',
-                    'data', 'read.csv', 'read.table', 'write.csv', 'write.table',
-                    'plot', 'hist', 'boxplot', 'mean', 'median', 'sum', 'min', 'max',
-                    'sd', 'var', 'lm', 'glm', 'summary', 'print', 'cat', 'paste',
-                    'c', 'list', 'data.frame', 'matrix', 'array', 'factor', 'TRUE',
-                    'FALSE', 'NA', 'NULL', 'Inf', 'NaN']
-        self.highlightingRules.extend([(re.compile(r'\b' + keyword + r'\b'), keywordFormat) for keyword in keywords])
-        stringFormat = QTextCharFormat()
-        stringFormat.setForeground(QColor(SYNTAX_COLORS["strings"]))
-        self.highlightingRules.append((re.compile(r'"[^"\\]*(\\.[^"\\]*)*"'), stringFormat))
-        self.highlightingRules.append((re.compile(r"'[^'\\]*(\\.[^'\\]*)*'"), stringFormat))
-        commentFormat = QTextCharFormat()
-        commentFormat.setForeground(QColor(SYNTAX_COLORS["comments"]))
-        self.highlightingRules.append((re.compile(r'#[^\n]*'), commentFormat))
-        numberFormat = QTextCharFormat()
-        numberFormat.setForeground(QColor(SYNTAX_COLORS["integer"]))
-        self.highlightingRules.append((re.compile(r'\b[0-9]+(?:\.[0-9]+)?\b'), numberFormat))
+# WorkspaceSymbolIndex collects the names defined by the files of a workspace (functions, classes,
+# top-level variables, ...) on a background thread. The first crawl indexes every file find in files
+# would search; after that only files that were saved or opened, and the directories the
+# WorkspaceWatcher reports, are read again, with a rare rescan for edits in place. Names are kept
+# sorted so a prefix lookup is a binary search.
+class WorkspaceSymbolIndex(WorkspaceIndexThread):
+    index_name = "symbol index"
 
-    def highlightBlock(self, text):
-        for pattern, format in self.highlightingRules:
-            expression = pattern
-            index = expression.search(text)
-            while index:
-                self.setFormat(index.start(), index.end() - index.start(), format)
-                index = expression.search(text, index.end())
+    def __init__(self):
+        super().__init__()
+        self._files = {} # path -> (mtime, names), only touched by the worker thread
+        self._skipped = {} # path -> mtime of files without symbols, so rescans do not probe them again
+        self._counts = {} # name -> number of files defining it, only touched by the worker thread
+        self._extra_paths = set() # Opened or saved files outside the root
+        self._entries = [] # Sorted (lowercase name, name) pairs, guarded by the condition
+
+    # Returns up to 'limit' names starting with 'prefix', ignoring case. Safe to call from any thread.
+    def complete(self, prefix, limit=WORKSPACE_COMPLETION_LIMIT):
+        key = prefix.lower()
+        results = []
+        with self._condition:
+            entries = self._entries
+            i = bisect.bisect_left(entries, (key,))
+            while i < len(entries) and len(results) < limit and entries[i][0].startswith(key):
+                results.append(entries[i][1])
+                i += 1
+        return results
+
+    def _reset(self, root):
+        self._files = {}
+        self._skipped = {}
+        self._counts = {}
+        self._extra_paths = set()
+        with self._condition:
+            self._entries = []
+
+    # Re-reads files that were saved or opened, also those outside the root, which are kept.
+    def _index_paths(self, root, paths):
+        delta = Counter()
+        for path in paths:
+            if root is None or not path.startswith(os.path.join(root, '')):
+                self._extra_paths.add(path)
+            self._index_file(path, delta)
+        self._apply(delta)
+        return set()
+
+    # Re-reads the new and modified files under directory and forgets those that went away.
+    def _sync(self, root, directory, rules):
+        seen = set()
+        delta = Counter()
+        batch = 0
+        directories = []
+        for path in self._walk(directory, rules, directories):
+            if self._interrupted():
+                return False # Superseded; the next pass starts over
+            seen.add(path)
+            if self._index_file(path, delta):
+                batch += 1
+                if batch >= 200: # Publish large crawls in batches so results show up early
+                    self._apply(delta)
+                    delta = Counter()
+                    batch = 0
+        prefix = os.path.join(directory, '')
+        for path in [path for path in self._files if path.startswith(prefix)]:
+            if path not in seen and path not in self._extra_paths:
+                delta.subtract(self._files.pop(path)[1]) # Deleted, or now hidden or ignored
+        for path in [path for path in self._skipped if path.startswith(prefix)]:
+            if path not in seen:
+                del self._skipped[path]
+        if directory == root:
+            for path in list(self._extra_paths):
+                self._index_file(path, delta)
+        self._apply(delta)
+        self.directories_walked.emit(directories)
+        return True
+
+    # Re-reads one file if it changed since it was last indexed, adding the name changes to 'delta'.
+    # Returns True if the file was read or removed.
+    def _index_file(self, path, delta):
+        old = self._files.get(path)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            stat = None
+        if stat is not None and stat.st_mtime in (old[0] if old else None, self._skipped.get(path)):
+            return False # Unchanged, and not probed for its language again
+        language = LANGUAGES.get(language_for_path(path) or '') if stat is not None else None
+        pattern = language.symbol_pattern() if language else None
+        if pattern is None or stat is None or stat.st_size > WORKSPACE_MAX_FILE_SIZE:
+            if stat is not None:
+                self._skipped[path] = stat.st_mtime
+            else:
+                self._skipped.pop(path, None)
+            if old is None:
+                return False
+            del self._files[path]
+            self._extra_paths.discard(path)
+            delta.subtract(old[1])
+            return True
+        self._skipped.pop(path, None)
+        try:
+            with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+                text = f.read()
+        except OSError:
+            return False
+        names = set()
+        for match in pattern.finditer(text):
+            name = match.group(match.lastindex) if match.lastindex else None
+            if name and name not in _SYMBOL_STOPWORDS:
+                names.add(name)
+        self._files[path] = (stat.st_mtime, names)
+        if old is not None:
+            delta.subtract(old[1])
+        delta.update(names)
+        return True
+
+    # Applies name count changes, publishing the new and removed names to readers.
+    def _apply(self, delta):
+        added = []
+        removed = []
+        for name, change in delta.items():
+            if not change:
+                continue
+            count = self._counts.get(name, 0)
+            total = count + change
+            if total > 0:
+                self._counts[name] = total
+                if count == 0:
+                    added.append(name)
+            elif count > 0:
+                del self._counts[name]
+                removed.append(name)
+        if len(added) + len(removed) > WORKSPACE_REBUILD_THRESHOLD:
+            entries = sorted((name.lower(), name) for name in self._counts) # Sorted outside the lock
+            with self._condition:
+                self._entries = entries
+            return
+        with self._condition:
+            entries = self._entries
+            for name in removed:
+                entry = (name.lower(), name)
+                i = bisect.bisect_left(entries, entry)
+                if i < len(entries) and entries[i] == entry:
+                    del entries[i]
+            for name in added:
+                bisect.insort(entries, (name.lower(), name))
+
+_symbol_index = None
+
+# Returns the shared WorkspaceSymbolIndex, starting it on first use.
+def get_symbol_index():
+    global _symbol_index
+    if _symbol_index is None:
+        _symbol_index = WorkspaceSymbolIndex()
+        app = QApplication.instance()
+        if app is not None:
+            app.aboutToQuit.connect(_symbol_index.stop)
+        _symbol_index.start()
+    return _symbol_index
+
+# WordIndex keeps the words of a document for the simple completer.
+# Each contentsChange re-reads only the blocks it touched, and words are reference counted
+# so a word leaves the model only when its last occurrence is deleted.
+class WordIndex:
+    WORD_PATTERN = re.compile(r'\b\w+\b')
+
+    def __init__(self, document, model=None):
+        self.document = document
+        self.model = model # Optional QStringListModel, kept sorted and updated row by row
+        self.counts = {} # word -> number of occurrences in the document
+        self.words = [] # Sorted distinct words, one per model row
+        self._block_words = [] # Interned words of each block, indexed by block number
+        self.rebuild()
+        document.contentsChange.connect(self._on_contents_change)
+
+    # Re-reads the whole document and resets the model.
+    def rebuild(self):
+        findall = self.WORD_PATTERN.findall
+        lines = self.document.toPlainText().split('\n')
+        if len(lines) == self.document.blockCount():
+            # Interned, so the many copies of a word share one string
+            self._block_words = [tuple(map(sys.intern, findall(line))) for line in lines]
+            counts = Counter(itertools.chain.from_iterable(self._block_words))
+        else:
+            # Blocks with line separators inside; read them one by one
+            self._block_words = []
+            counts = Counter()
+            block = self.document.begin()
+            while block.isValid():
+                words = tuple(map(sys.intern, findall(block.text())))
+                self._block_words.append(words)
+                counts.update(words)
+                block = block.next()
+        self.counts = dict(counts)
+        self.words = sorted(counts)
+        if self.model is not None:
+            self.model.setStringList(self.words)
+
+    def _on_contents_change(self, position, removed, added):
+        document = self.document
+        first_block = document.findBlock(position)
+        if not first_block.isValid():
+            self.rebuild()
+            return
+        last_block = document.findBlock(position + added)
+        if not last_block.isValid():
+            last_block = document.lastBlock()
+        first = first_block.blockNumber()
+        new_count = last_block.blockNumber() - first + 1
+        old_count = new_count - (document.blockCount() - len(self._block_words))
+        if old_count < 1 or first + old_count > len(self._block_words):
+            self.rebuild() # The change does not line up with the index; start over
+            return
+        if new_count > 1000 and new_count * 2 > document.blockCount():
+            self.rebuild() # Most of the document is new, e.g. setPlainText; one pass is faster
+            return
 
-# Worker class for running external processes in a separate thread.
-# This prevents the UI from freezing during long-running operations.
-class Worker(QThread):
-    finished = pyqtSignal(str, str)
+        findall = self.WORD_PATTERN.findall
+        lines = None
+        if new_count > 100:
+            # Many blocks, e.g. a paste or a chunk appended while loading: read them in one call
+            cursor = QTextCursor(first_block)
+            cursor.setPosition(last_block.position() + last_block.length() - 1, QTextCursor.KeepAnchor)
+            lines = cursor.selectedText().split('\u2029')
+        if lines is not None and len(lines) == new_count:
+            new_words = [tuple(map(sys.intern, findall(line))) for line in lines]
+        else:
+            new_words = []
+            block = first_block
+            for _ in range(new_count):
+                new_words.append(tuple(map(sys.intern, findall(block.text()))))
+                block = block.next()
+
+        # Only the net change matters, so retyping a block leaves its words' rows alone
+        delta = Counter(itertools.chain.from_iterable(new_words))
+        delta.subtract(itertools.chain.from_iterable(self._block_words[first:first + old_count]))
+        self._block_words[first:first + old_count] = new_words
+        for word, change in delta.items():
+            if change:
+                self._adjust(word, change)
+
+    # Applies a count change to one word, inserting or removing its model row when needed.
+    def _adjust(self, word, change):
+        count = self.counts.get(word, 0)
+        total = count + change
+        if total > 0:
+            self.counts[word] = total
+            if count == 0:
+                row = bisect.bisect_left(self.words, word)
+                self.words.insert(row, word)
+                if self.model is not None:
+                    self.model.insertRows(row, 1)
+                    self.model.setData(self.model.index(row), word)
+        elif count > 0:
+            del self.counts[word]
+            row = bisect.bisect_left(self.words, word)
+            del self.words[row]
+            if self.model is not None:
+                self.model.removeRows(row, 1)
+
+# CompletionHistory remembers which completions were accepted most recently, across all editors.
+# Quick Open keeps one of the files opened most recently.
+class CompletionHistory:
+    def __init__(self, window=FUZZY_RECENCY_WINDOW):
+        self.window = window
+        self.clock = 0
+        self.last_used = {} # completion -> clock value when it was last accepted
+
+    def record(self, completion):
+        self.clock += 1
+        self.last_used[completion] = self.clock
+        if len(self.last_used) > self.window * 10:
+            oldest = self.clock - self.window
+            self.last_used = {name: tick for name, tick in self.last_used.items() if tick > oldest}
+
+    # Ranking bonus: highest for the last accepted completion, zero once it leaves the window.
+    def bonus(self, completion):
+        tick = self.last_used.get(completion)
+        if tick is None:
+            return 0
+        return max(0, self.window - (self.clock - tick))
+
+    # The completions still in the window, most recent first.
+    def recent(self):
+        oldest = self.clock - self.window
+        return [name for name, tick in sorted(self.last_used.items(), key=lambda item: -item[1]) if tick > oldest]
+
+completion_history = CompletionHistory()
+
+# Positions in 'text' where a word starts: the first character, and letters or digits after other
+# characters, after lowercase letters when uppercase (camelCase) or after letters when digits.
+def word_starts(text):
+    starts = []
+    previous = ''
+    for i, ch in enumerate(text):
+        if (i == 0 or (ch.isalnum() and not previous.isalnum())
+                or (ch.isupper() and not previous.isupper()) or (ch.isdigit() and not previous.isdigit())):
+            starts.append(i)
+        previous = ch
+    return starts
+
+# Lowercases text without changing its length: a character that lowercases to several ('İ' to 'i'
+# and a combining dot) keeps only the first, so positions in the result are positions in the text.
+def fold_case(text):
+    lower = text.lower()
+    if len(lower) == len(text):
+        return lower
+    return ''.join(ch.lower()[0] for ch in text)
+
+# Scores how well 'key', the lowercase 'query', matches 'candidate', whose lowercase text is 'lower'
+# and word starts 'starts'; higher is better. Returns None if it does not match. Characters are
+# matched in order, preferring word starts; adjacent and same-case characters score higher, gaps and
+# a long candidate lower.
+def fuzzy_score(query, key, candidate, lower, starts, prefer_starts=True):
+    if len(lower) != len(candidate):
+        lower = fold_case(candidate) # Positions in 'lower' must be positions in 'candidate'
+    if len(key) != len(query):
+        key = fold_case(query)
+    score = 0
+    pos = 0
+    last = -2
+    for n, ch in enumerate(key):
+        i = lower.find(ch, pos)
+        if i < 0:
+            # Preferring word starts skipped too far ahead; retry with the leftmost match
+            return fuzzy_score(query, key, candidate, lower, starts, False) if prefer_starts else None
+        if prefer_starts and i != last + 1 and i not in starts:
+            for start in starts:
+                if start > i and lower[start] == ch:
+                    i = start
+                    break
+        if i == last + 1:
+            score += 6 # Adjacent to the previous matched character
+        else:
+            score -= min(i - pos, 6) # Gap since the previous match
+        if i in starts:
+            score += 16 if i == 0 else 10
+        if candidate[i] == query[n]:
+            score += 1 # Same case as typed
+        last = i
+        pos = i + 1
+    return score - (len(lower) - len(key)) * 0.2
+
+# FuzzyMatcher ranks completion candidates for the word being typed. A candidate matches when it
+# contains the query's characters in order, ignoring case. Matches at word starts (snake_case,
+# camelCase, digits), adjacent matched characters, short candidates and recently accepted completions
+# rank higher. Matches are cached per query, so each extra keystroke only filters the previous matches.
+class FuzzyMatcher:
+    def __init__(self):
+        self.candidates = []
+        self._matches = {} # lowercase query -> candidates matching it
+        self._details = {} # candidate -> (lowercase text, sorted word start positions)
+
+    # Replaces the candidates and drops the cached matches.
+    def set_candidates(self, candidates):
+        self.candidates = candidates
+        self._matches = {}
+
+    # Returns up to 'limit' candidates matching 'query', best first.
+    def match(self, query, limit=FUZZY_RESULT_LIMIT):
+        key = fold_case(query)
+        if not key:
+            return []
+        matches = self._matches.get(key)
+        if matches is None:
+            # Narrow the longest cached shorter query instead of scanning every candidate
+            pool = self.candidates
+            for end in range(len(key) - 1, 0, -1):
+                cached = self._matches.get(key[:end])
+                if cached is not None:
+                    pool = cached
+                    break
+            if len(key) == 1:
+                matches = [candidate for candidate in pool if key in fold_case(candidate)]
+            else:
+                # Folded the way fuzzy_score folds; IGNORECASE would also match 'ſ' for 's'
+                search = re.compile('.*?'.join(re.escape(ch) for ch in key)).search
+                matches = [candidate for candidate in pool if search(fold_case(candidate))]
+            self._matches[key] = matches
+
+        scored = matches
+        if len(matches) > FUZZY_SCORE_LIMIT:
+            # Too many to score on every keystroke; prefix matches rank above the rest anyway
+            length = len(key)
+            scored = [candidate for candidate in matches if fold_case(candidate[:length]) == key] or matches
+            scored = scored[:FUZZY_SCORE_LIMIT]
+        ranked = []
+        for candidate in scored:
+            score = self.score(query, key, candidate)
+            if score is not None:
+                ranked.append((-score, candidate))
+        # A partial selection of the best rows, never a sort of every match
+        return [candidate for _, candidate in heapq.nsmallest(limit, ranked)]
+
+    def _details_for(self, candidate):
+        details = self._details.get(candidate)
+        if details is None:
+            details = (fold_case(candidate), word_starts(candidate))
+            if len(self._details) > 200000:
+                self._details.clear()
+            self._details[candidate] = details
+        return details
+
+    # Scores one candidate; higher is better. Returns None if it does not match.
+    def score(self, query, key, candidate):
+        lower, starts = self._details_for(candidate)
+        score = fuzzy_score(query, key, candidate, lower, starts)
+        if score is None:
+            return None
+        return score + completion_history.bonus(candidate)
+
+# CompletionListModel backs the completion popup with a plain Python list of ranked rows.
+# Replacing the rows is a single model reset, with no QStringList copy or proxy sorting.
+class CompletionListModel(QAbstractListModel):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.items = []
+
+    def set_items(self, items):
+        self.beginResetModel()
+        self.items = items
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.items)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if index.isValid() and role in (Qt.DisplayRole, Qt.EditRole):
+            return self.items[index.row()]
+        return None
+
+# LineNumberArea is the gutter on the left of a CodeEditor. The editor paints it, since only the
+# editor knows where its blocks are.
+class LineNumberArea(QWidget):
+    def __init__(self, editor):
+        super().__init__(editor)
+        self.editor = editor
 
-    def __init__(self, command, tool_name):
-        super().__init__()
-        self.command = command
-        self.tool_name = tool_name
+    def sizeHint(self):
+        return QSize(self.editor.line_number_area_width(), 0)
 
-    def run(self):
-        try:
-            process = QProcess()
-            process.start(self.command)
-            process.waitForFinished()
-            output = process.readAllStandardOutput().data().decode().strip()
-            error_output = process.readAllStandardError().data().decode().strip()
-            result = output if output else error_output
-            self.finished.emit(self.tool_name, result)
-        except Exception as e:
-            self.finished.emit(self.tool_name, f"Error running {self.tool_name}: {e}")
+    def paintEvent(self, event):
+        self.editor.paint_line_numbers(event)
 
 # CodeEditor is the main text editing widget with syntax highlighting and auto-completion.
-class CodeEditor(QTextEdit):
+# It is built on QPlainTextEdit, whose block-based layout keeps large files cheap to open and scroll.
+class CodeEditor(QPlainTextEdit):
+    load_progress = pyqtSignal(int) # Percent of the file appended by load_file
+    load_finished = pyqtSignal()
+    load_failed = pyqtSignal(str)
+
     def __init__(self, parent=None, ide_instance=None):
         super().__init__(parent)
         self.ide_instance = ide_instance # Reference to the IDE instance
@@ -1179,88 +2497,162 @@ class CodeEditor(QTextEdit):
         self.language_detected = False
         self.auto_close_enabled = True # Default, will be updated by IDE
         self.completer_enabled = True # Default, will be updated by IDE
-        self.setWordWrapMode(QTextOption.NoWrap) # Disable word wrap for horizontal scrollbar
+        self.setLineWrapMode(QPlainTextEdit.NoWrap) # Disable word wrap for horizontal scrollbar
+
+        # State of a file being streamed in by load_file
+        self.loading = False
+        self._loader = None
+        self._load_language = None
+        self._pending_chunks = deque() # (text, percent) received from the loader, not yet appended
+        self._append_timer = QTimer(self)
+        self._append_timer.setSingleShot(True)
+        self._append_timer.timeout.connect(self._append_next_chunk)
+        QApplication.instance().aboutToQuit.connect(self.cancel_load)
+
+        # Line number gutter, drawn in the viewport margin
+        self.line_number_area = LineNumberArea(self)
+        self._set_gutter_colors(THEMES["dark"])
+        self.blockCountChanged.connect(self._update_line_number_area_width)
+        self.updateRequest.connect(self._update_line_number_area)
+        self.cursorPositionChanged.connect(self.line_number_area.update) # Repaint the current line's number
+        self._update_line_number_area_width()
 
         # Setup auto-completion
         self.completer = QCompleter(self)
-        self.completer.setModel(QStringListModel())
+        self.word_index = WordIndex(self.document()) # Words of this document, kept current as it changes
+        self.jedi_words = None # Results of the last Jedi completion, or None to use the word index
+        self.matcher = FuzzyMatcher()
+        self._matcher_query = None # Query the matcher's current candidates were gathered for
+        self._matcher_word_start = -1 # Position of the word that query was typed in
+
+        # The matcher ranks and filters; the popup shows its rows as they are
+        self.completion_list = CompletionListModel(self)
+        self.completer.setModel(self.completion_list)
         self.completer.setWidget(self)
-        self.completer.setCompletionMode(QCompleter.PopupCompletion)
+        self.completer.setCompletionMode(QCompleter.UnfilteredPopupCompletion)
         self.completer.setCaseSensitivity(Qt.CaseInsensitive)
         self.completer.activated.connect(self.insertCompletion)
-        self.completer.popup().setWindowOpacity(0.9) # Set opacity for completer popup
+        self.completion_popup = None # Created by _completion_popup the first time completions are shown
+
+        # Completions are computed on the shared CompletionService once typing pauses
+        self._completion_timer = QTimer(self)
+        self._completion_timer.setSingleShot(True)
+        self._completion_timer.setInterval(COMPLETION_DEBOUNCE_MS)
+        self._completion_timer.timeout.connect(self._request_completions)
+
+        # Untitled buffers are classified once typing pauses
+        self._language_timer = QTimer(self)
+        self._language_timer.setSingleShot(True)
+        self._language_timer.setInterval(CLASSIFY_DEBOUNCE_MS)
+        self._language_timer.timeout.connect(self._auto_detect_language_on_type)
+        get_completion_service().completed.connect(self._on_completions_ready)
 
         # Connect signals for dynamic behavior
         self.document().contentsChange.connect(self.update_completer_words)
-        self.document().contentsChange.connect(self._auto_detect_language_on_type)
-        self.document().contentsChanged.connect(self._handle_document_modified)
-        self.update_completer_words()
+        self.document().contentsChange.connect(self._schedule_language_detection)
+        self.document().modificationChanged.connect(self._handle_document_modified)
+        self.verticalScrollBar().valueChanged.connect(self._update_visible_range)
+
+    # Streams a file into the editor. A FileLoader reads and decodes it in the background, and
+    # each chunk is appended on its own event loop turn, so the window stays responsive and the
+    # top of the file shows up right away. The editor is read-only until the whole file is in.
+    def load_file(self, file_path, language=None):
+        self.cancel_load()
+        self.loading = True
+        self._load_language = language
+        self.setReadOnly(True)
+        self.document().setUndoRedoEnabled(False) # Loading is not an undoable edit
+        self._loader = FileLoader(file_path)
+        self._loader.chunk_loaded.connect(self._on_chunk_loaded)
+        self._loader.loaded.connect(self._on_file_loaded)
+        self._loader.failed.connect(self._on_load_failed)
+        self._loader.start()
+
+    # Stops a load in progress, keeping whatever was appended so far.
+    def cancel_load(self):
+        if self._loader is None:
+            return
+        self._loader.stop()
+        self._loader = None
+        self._pending_chunks.clear()
+        self._append_timer.stop()
+        self._finish_load()
+
+    def _on_chunk_loaded(self, text, percent):
+        self._pending_chunks.append((text, percent))
+        if not self._append_timer.isActive():
+            self._append_timer.start(0)
+
+    def _on_file_loaded(self):
+        self._pending_chunks.append((None, 100)) # Marks the end once the chunks before it are in
+        if not self._append_timer.isActive():
+            self._append_timer.start(0)
+
+    def _on_load_failed(self, message):
+        self.cancel_load()
+        self.load_failed.emit(message)
+
+    def _append_next_chunk(self):
+        if not self._pending_chunks:
+            return
+        text, percent = self._pending_chunks.popleft()
+        if text is None:
+            self._loader = None
+            self._finish_load()
+            self.load_finished.emit()
+            return
+        first_chunk = self.document().isEmpty()
+        cursor = QTextCursor(self.document())
+        cursor.movePosition(QTextCursor.End)
+        cursor.insertText(text)
+        self.document().setModified(False) # Still the file as it is on disk
+        if first_chunk:
+            self.set_highlighter(self._load_language, lazy=percent < 100) # More is on its way
+        self.load_progress.emit(percent)
+        if self._pending_chunks:
+            self._append_timer.start(0)
+
+    def _finish_load(self):
+        self.loading = False
+        self.document().setUndoRedoEnabled(True)
+        self.document().setModified(False)
+        self.setReadOnly(False)
+
+    # Sets the syntax highlighter for a registered language name, or removes it for None.
+    # 'lazy' is passed on to GrammarHighlighter.start.
+    def set_highlighter(self, language, lazy=False):
+        grammar = get_grammar(language) if language else None
+
+        # Keep the current highlighter when the language is unchanged; only rehighlight if the colors changed
+        if self.highlighter and grammar is not None and self.highlighter.grammar is grammar:
+            if self.highlighter.refresh_formats():
+                self.highlighter.start(lazy)
+            self.language_detected = True
+            return
 
-    # Sets the appropriate syntax highlighter based on the file extension.
-    def set_highlighter(self, file_extension):
         if self.highlighter:
             self.highlighter.setDocument(None)
+        self.highlighter = GrammarHighlighter(self.document(), grammar) if grammar else None
 
-        # Map file extensions to their respective highlighter classes
-        if file_extension == '.py':
-            self.highlighter = PythonHighlighter(self.document())
-        elif file_extension == '.html':
-            self.highlighter = HtmlHighlighter(self.document())
-        elif file_extension == '.css':
-            self.highlighter = CssHighlighter(self.document())
-        elif file_extension == '.js':
-            self.highlighter = JavaScriptHighlighter(self.document())
-        elif file_extension == '.java':
-            self.highlighter = JavaHighlighter(self.document())
-        elif file_extension in ['.cpp', '.cxx', '.cc', '.h', '.hpp']:
-            self.highlighter = CppHighlighter(self.document())
-        elif file_extension == '.cs':
-            self.highlighter = CSharpHighlighter(self.document())
-        elif file_extension == '.scss':
-            self.highlighter = ScssHighlighter(self.document())
-        elif file_extension in ['.sql']:
-            self.highlighter = SqlHighlighter(self.document())
-        elif file_extension == '.swift':
-            self.highlighter = SwiftHighlighter(self.document())
-        elif file_extension == '.rb':
-            self.highlighter = RubyHighlighter(self.document())
-        elif file_extension == '.go':
-            self.highlighter = GoHighlighter(self.document())
-        elif file_extension == '.rs':
-            self.highlighter = RustHighlighter(self.document())
-        elif file_extension == '.php':
-            self.highlighter = PhpHighlighter(self.document())
-        elif file_extension == '.pl':
-            self.highlighter = PerlHighlighter(self.document())
-        elif file_extension == '.kt':
-            self.highlighter = KotlinHighlighter(self.document())
-        elif file_extension in ['.jsx', '.tsx']: # Use file_extension here
-            self.highlighter = ReactNativeHighlighter(self.document())
-        elif file_extension in ['.xml', '.xsd', '.xsl', '.svg']: # Use file_extension here
-            self.highlighter = XmlHighlighter(self.document())
-        elif file_extension == '.json':
-            self.highlighter = JsonHighlighter(self.document())
-        elif file_extension == '.md':
-            self.highlighter = MarkdownHighlighter(self.document())
-        elif file_extension in ['.sh', '.bash']: # Use file_extension here
-            self.highlighter = ShellHighlighter(self.document())
-        elif file_extension in ['.ts', '.tsx']: # Use file_extension here
-            self.highlighter = TypeScriptHighlighter(self.document())
-        elif file_extension in ['.vue']: # Use file_extension here
-            self.highlighter = VueHighlighter(self.document())
-        elif file_extension == '.dart':
-            self.highlighter = DartHighlighter(self.document())
-        elif file_extension == '.r':
-            self.highlighter = RHighlighter(self.document())
-        else:
-            self.highlighter = None # No highlighter for unknown file types
-        
         if self.highlighter:
-            self.highlighter.rehighlight()
+            self._update_visible_range()
+            if not self.isVisible():
+                self.highlighter.pause()
+            self.highlighter.start(lazy) # Highlights large documents lazily, starting with the visible blocks
             self.language_detected = True # Mark language as detected
 
-    # Attempts to auto-detect the language based on the initial text content.
-    # This is useful for new, unsaved files.
+        # Let the completion backend warm up the modules this file imports
+        if language == 'python':
+            workspace = self.ide_instance.current_directory if self.ide_instance else None
+            get_completion_service().preload(workspace, self.toPlainText())
+
+    # Restarts the language detection countdown while an untitled buffer is being edited.
+    def _schedule_language_detection(self):
+        if self.language_detected or not self.ide_instance or self.ide_instance.tab_paths.get(self) is not None:
+            return
+        self._language_timer.start()
+
+    # Attempts to auto-detect the language of a new, unsaved file from the start of its text.
     def _auto_detect_language_on_type(self):
         if not self.ide_instance:
             return
@@ -1271,112 +2663,39 @@ class CodeEditor(QTextEdit):
         if file_path is not None or self.language_detected:
             return
 
-        text = self.toPlainText().strip().lower()
-        detected_ext = None
-
-        # Heuristic rules for language detection
-        if text.startswith('<!doctype html>') or text.startswith('<html'):
-            detected_ext = '.html'
-        elif text.startswith('import ') or text.startswith('package '):
-            if re.search(r'\bclass\b|\bpublic static void main\b', text):
-                detected_ext = '.java'
-            elif re.search(r'\bfun\b|\bval\b|\bvar\b', text):
-                detected_ext = '.kt'
-            elif re.search(r'\bpackage main\b|\bfunc main\b', text):
-                detected_ext = '.go'
-            elif re.search(r'\bimport\s+react\b|\bimport\s+\{.*\}\s+from\s+\'react\'', text):
-                detected_ext = '.jsx'
-            elif re.search(r'\bimport\s+\{.*\}\s+from\s+\'vue\'', text) or re.search(r'<template>|<script>|<style>', self.toPlainText().strip()):
-                detected_ext = '.vue'
-            elif re.search(r'\bimport\s+\'dart:io\'', text) or re.search(r'\bvoid\s+main\s*\(', text):
-                detected_ext = '.dart'
-        elif text.startswith('#include') or re.search(r'\b(int|void|char|double|float)\s+main\s*\(', text):
-            detected_ext = '.cpp'
-        elif text.startswith('using system;') or re.search(r'\bclass\b.*?\bpublic static void main\b', text):
-            detected_ext = '.cs'
-        elif text.startswith('<?php'):
-            detected_ext = '.php'
-        elif text.startswith('require ') or text.startswith('use '):
-            if re.search(r'\bmy\b|\buse strict\b', text):
-                detected_ext = '.pl'
-            elif re.search(r'\bdef\b|\bend\b|\bclass\b', text):
-                detected_ext = '.rb'
-        elif text.startswith('fn ') or text.startswith('mod '):
-            detected_ext = '.rs'
-        elif text.startswith('@import') or re.search(r'\$[a-zA-Z0-9_-]+', text):
-            detected_ext = '.scss'
-        elif re.search(r'\b(select|insert|update|delete)\b', text):
-            detected_ext = '.sql'
-        elif re.search(r'\bfunc\b|\bvar\b|\blet\b', text) and not text.startswith('import '):
-            detected_ext = '.swift'
-        elif text.startswith('//') or text.startswith('/*'):
-            pass # Comments alone are not enough for detection
-        elif text.strip().startswith('{') or text.strip().startswith('.'):
-            detected_ext = '.css'
-        elif re.search(r'\bfunction\b|\bconst\b|\blet\b|\bvar\b', text):
-            detected_ext = '.js'
-        elif re.search(r'\b(def|class|import)\b', text):
-            detected_ext = '.py'
-        elif text.startswith('<') and '>' in text:
-            detected_ext = '.xml'
-        elif text.startswith('{') and '}' in text and ':' in text:
-            detected_ext = '.json'
-        elif text.startswith('# ') or text.startswith('## ') or text.startswith('- ') or text.startswith('* '):
-            detected_ext = '.md'
-        elif text.startswith('#!') or text.startswith('echo ') or text.startswith('ls '):
-            detected_ext = '.sh'
-        elif re.search(r'\b(function|var|let|const)\b', text) and re.search(r'\b(interface|enum|type)\b', text):
-            detected_ext = '.ts'
-        elif re.search(r'\b(library|require|attach|detach)\b', text) or re.search(r'<-', text):
-            detected_ext = '.r'
+        # Read only the sample the classifier looks at, however large the buffer is
+        cursor = QTextCursor(self.document())
+        cursor.setPosition(min(CLASSIFY_SAMPLE_CHARS, self.document().characterCount() - 1), QTextCursor.KeepAnchor)
+        language = classify_language(cursor.selectedText().replace('\u2029', '\n'))
 
         # Apply highlighter if a language is detected
-        if detected_ext:
-            self.set_highlighter(detected_ext)
-            # Find the tab widget and index for this editor
-            tab_widget = None
-            tab_index = -1
-            for i in range(self.ide_instance.left_tab_widget.count()):
-                if self.ide_instance.left_tab_widget.widget(i) == self:
-                    tab_widget = self.ide_instance.left_tab_widget
-                    tab_index = i
-                    break
-            if not tab_widget and not self.ide_instance.right_tab_widget.isHidden():
-                for i in range(self.ide_instance.right_tab_widget.count()):
-                    if self.ide_instance.right_tab_widget.widget(i) == self:
-                        tab_widget = self.ide_instance.right_tab_widget
-                        tab_index = i
-                        break
-
-            if tab_widget and tab_index != -1 and tab_widget.tabText(tab_index) == "Untitled":
-                tab_widget.setTabText(tab_index, f"Untitled ({detected_ext[1:].upper()})")
-            self.ide_instance.statusBar().showMessage(f"Language auto-detected as {detected_ext[1:].upper()}", 1500)
-            # Disconnect to prevent re-detection on every keystroke after initial detection
-            self.document().contentsChange.disconnect(self._auto_detect_language_on_type)
-
-    # Handles document modification to update tab text (e.g., add '*' for unsaved changes).
-    def _handle_document_modified(self):
-        if not self.ide_instance:
+        if language:
+            self.set_highlighter(language)
+            extensions = LANGUAGES[language].extensions
+            label = extensions[0][1:].upper() if extensions else LANGUAGES[language].display_name
+            tab_widget, tab_index = self.ide_instance.tab_paths.location(self)
+            if tab_widget and tab_index != -1 and tab_widget.tabText(tab_index).lstrip('*') == "Untitled":
+                prefix = '*' if tab_widget.tabText(tab_index).startswith('*') else ''
+                tab_widget.setTabText(tab_index, f"{prefix}Untitled ({label})")
+            self.ide_instance.statusBar().showMessage(f"Language auto-detected as {label}", 1500)
+
+    # setPlainText reports the document as modified while it fills it, then clears the flag
+    # without a signal; pass the final state on.
+    def setPlainText(self, text):
+        super().setPlainText(text)
+        self._handle_document_modified(self.document().isModified())
+
+    # Handles the document's modified state flipping: records it in the tab registry and
+    # adds or removes the '*' on the tab text for unsaved changes.
+    def _handle_document_modified(self, modified):
+        if not self.ide_instance or self.loading:
             return
 
-        # Find the tab widget and index for this editor
-        tab_widget = None
-        tab_index = -1
-        for i in range(self.ide_instance.left_tab_widget.count()):
-            if self.ide_instance.left_tab_widget.widget(i) == self:
-                tab_widget = self.ide_instance.left_tab_widget
-                tab_index = i
-                break
-        if not tab_widget and not self.ide_instance.right_tab_widget.isHidden():
-            for i in range(self.ide_instance.right_tab_widget.count()):
-                    if self.ide_instance.right_tab_widget.widget(i) == self:
-                        tab_widget = self.ide_instance.right_tab_widget
-                        tab_index = i
-                        break
-
+        self.ide_instance.tab_paths.set_dirty(self, modified)
+        tab_widget, tab_index = self.ide_instance.tab_paths.location(self)
         if tab_widget and tab_index != -1:
             current_tab_text = tab_widget.tabText(tab_index)
-            if self.document().isModified():
+            if modified:
                 if not current_tab_text.startswith('*'):
                     tab_widget.setTabText(tab_index, '*' + current_tab_text)
             else:
@@ -1389,117 +2708,109 @@ class CodeEditor(QTextEdit):
             return
         
         tc = self.textCursor()
-        # Get the current word prefix
+        # Replace the word being typed; fuzzy matches need not start with it
         tc.select(QTextCursor.WordUnderCursor)
-        prefix = tc.selectedText()
+        tc.insertText(completion)
+        completion_history.record(completion)
 
-        # If the completion starts with the prefix, replace the prefix with the completion
-        if completion.startswith(prefix):
-            tc.insertText(completion[len(prefix):]) # Insert only the remaining part of the completion
-        else:
-            # If the completion doesn't start with the prefix, replace the whole word
-            tc.insertText(completion)
-        
         self.setTextCursor(tc)
 
+    # Returns the completer's popup, creating it on first use. The popup is a window of its own with
+    # scroll bars, so every editor that never shows it saves those widgets from being styled.
+    def _completion_popup(self):
+        if self.completion_popup is None:
+            self.completion_popup = self.completer.popup()
+            self.completion_popup.setUniformItemSizes(True)
+            self.completion_popup.setWindowOpacity(0.9) # Set opacity for completer popup
+        return self.completion_popup
+
+    def _hide_completion_popup(self):
+        if self.completion_popup is not None:
+            self.completion_popup.hide()
+
+    # Turns the completion popup on or off. The completer keeps its unfiltered popup mode either way,
+    # since the FuzzyMatcher decides which rows it shows.
+    def set_completer_enabled(self, enabled):
+        self.completer_enabled = enabled
+        if not enabled:
+            self._completion_timer.stop()
+            self._hide_completion_popup()
+
     # Returns the word currently under the text cursor.
     def textUnderCursor(self):
         tc = self.textCursor()
         tc.select(QTextCursor.WordUnderCursor)
         return tc.selectedText()
 
-    # Updates the word list for the completer based on the current document content.
+    # Schedules a completion request; it is sent once the user stops typing for COMPLETION_DEBOUNCE_MS.
+    # Without Jedi the WordIndex keeps the completer's model current and no request is needed.
     def update_completer_words(self):
-        if not self.completer_enabled:
+        if not self.completer_enabled or not _HAS_JEDI or self.loading:
             return
+        self._completion_timer.start()
 
-        text = self.toPlainText()
+    # Sends a snapshot of the text and cursor to the completion service.
+    def _request_completions(self):
         cursor = self.textCursor()
-        cursor_line = cursor.blockNumber() + 1
-        cursor_column = cursor.positionInBlock()
-        
-        if _HAS_JEDI:
-            try:
-                file_path = self.ide_instance.tab_paths.get(self)
-                # jedi.Script expects source and path for constructor. line and column for complete().
-                script = jedi.Script(text, path=file_path)
-                completions = script.complete(line=cursor_line, column=cursor_column)
-                words = sorted(list(set([c.name for c in completions])))
-            except Exception as e:
-                # Fallback to simple word completion if jedi fails
-                print(f"Jedi completion failed: {e}. Falling back to simple word completion.")
-                words = sorted(list(set(re.findall(r'\b\w+\b', text))))
-        else:
-            # Simple word completion
-            words = sorted(list(set(re.findall(r'\b\w+\b', text))))
-        
-        self.completer.model().setStringList(words)
+        file_path = self.ide_instance.tab_paths.get(self) if self.ide_instance else None
+        workspace = self.ide_instance.current_directory if self.ide_instance else None
+        request = CompletionRequest(self, self.document().revision(), cursor.position(), self.toPlainText(),
+                                    file_path, cursor.blockNumber() + 1, cursor.positionInBlock(), workspace)
+        completion_stats.requests += 1
+        get_completion_service().submit(request)
+
+    # Shows completion results unless the text or the cursor changed since they were requested.
+    def _on_completions_ready(self, request, words):
+        if request.owner is not self:
+            return
+        if request.revision != self.document().revision() or request.position != self.textCursor().position():
+            completion_stats.stale += 1
+            return
+        completion_stats.delivered += 1
+        completion_stats.record(completion_stats.delivery_times, time.perf_counter() - request.created)
+        self.jedi_words = words # None when Jedi was unavailable; the document's words are used instead
+        self._matcher_query = None # Gather candidates again
+
+        # Refresh the popup for the word being typed now that the list is up to date
+        if self.completer_enabled and self.hasFocus():
+            prefix = self.textUnderCursor()
+            if prefix:
+                self._show_completions(prefix)
 
-    # Applies the selected theme's stylesheet to the CodeEditor.
+    # Ranks the completions for 'prefix' and shows them, or hides the popup if nothing matches.
+    def _show_completions(self, prefix):
+        key = prefix.lower()
+        tc = self.textCursor()
+        tc.select(QTextCursor.WordUnderCursor)
+        word_start = tc.selectionStart()
+        if (self._matcher_query is None or word_start != self._matcher_word_start
+                or not key.startswith(self._matcher_query)):
+            # A new word: gather this document's completions plus workspace symbols with the same first letter
+            local = self.jedi_words if self.jedi_words is not None else self.word_index.words
+            local_names = set(local)
+            workspace = get_symbol_index().complete(key[:1], WORKSPACE_FUZZY_CANDIDATES)
+            self.matcher.set_candidates(list(local) + [name for name in workspace if name not in local_names])
+            self._matcher_query = key
+            self._matcher_word_start = word_start
+        items = self.matcher.match(prefix)
+        if self.jedi_words is None and self.word_index.counts.get(prefix, 0) <= 1:
+            items = [item for item in items if item != prefix] # Only the word being typed
+        self.completion_list.set_items(items)
+        if not items:
+            self._hide_completion_popup()
+            return
+        popup = self._completion_popup()
+        cr = self.cursorRect()
+        cr.setWidth(popup.sizeHint().width())
+        self.completer.complete(cr)
+        popup.setCurrentIndex(self.completion_list.index(0))
+
+    # Updates the gutter colors, which the editor paints itself; everything else comes from the
+    # application stylesheet.
     def apply_theme(self, theme_name):
         theme = THEMES[theme_name]
-        self.setStyleSheet(f"""
-            QTextEdit {{
-                background-color: {theme["bg_color"]};
-                color: {theme["text_color"]};
-                selection-background-color: {theme["selection_bg"]};
-                border: 1px solid {theme["border_color"]};
-                border-radius: 5px;
-            }}
-            QScrollBar:vertical {{
-                border: none;
-                background: {theme["scrollbar_bg"]};
-                width: 8px; /* Thinner vertical scrollbar */
-                margin: 0px;
-            }}
-            QScrollBar::handle:vertical {{
-                background: {theme["scrollbar_handle"]};
-                min-height: 20px;
-                border-radius: 4px;
-            }}
-            QScrollBar::handle:vertical:hover {{
-                background: {theme["scrollbar_handle_hover"]};
-            }}
-            QScrollBar::add-line:vertical, QScrollBar::sub-line:vertical {{
-                height: 0px;
-                width: 0px;
-            }}
-            QScrollBar::add-page:vertical, QScrollBar::sub-page:vertical {{
-                background: none;
-            }}
-            QScrollBar:horizontal {{
-                border: none;
-                background: {theme["scrollbar_bg"]};
-                height: 8px; /* Thinner horizontal scrollbar */
-                margin: 0px;
-            }}
-            QScrollBar::handle:horizontal {{
-                background: {theme["scrollbar_handle"]};
-                min-width: 20px;
-                border-radius: 4px;
-            }}
-            QScrollBar::handle:horizontal:hover {{
-                background: {theme["scrollbar_handle_hover"]};
-            }}
-            QScrollBar::add-line:horizontal, QScrollBar::sub-line:horizontal {{
-                width: 0px;
-                height: 0px;
-            }}
-            QScrollBar::add-page:horizontal, QScrollBar::sub-page:horizontal {{
-                background: none;
-            }}
-            QCompleter {{
-                background-color: {theme["completer_bg"]};
-                color: {theme["completer_text"]};
-                selection-background-color: {theme["completer_selection_bg"]};
-                border: 1px solid {theme["border_color"]};
-                border-radius: 5px;
-            }}
-            QCompleter::item:selected {{
-                background-color: {theme["completer_selection_bg"]};
-                color: {theme["completer_text"]};
-            }}
-        """)
+        self._set_gutter_colors(theme)
+        self.line_number_area.update()
 
     # Handles drag enter events for file dropping.
     def dragEnterEvent(self, event):
@@ -1542,10 +2853,16 @@ class CodeEditor(QTextEdit):
         else:
             super().dropEvent(event)
 
-    # Overrides key press events for auto-closing brackets/quotes and completer interaction.
+    # Times key handling for the completion latency counters.
     def keyPressEvent(self, event):
+        start = time.perf_counter()
+        self._handle_key_press(event)
+        completion_stats.record(completion_stats.keystroke_times, time.perf_counter() - start)
+
+    # Handles key presses for auto-closing brackets/quotes and completer interaction.
+    def _handle_key_press(self, event):
         # If completer is visible, handle specific keys to prevent default behavior
-        if self.completer.popup().isVisible():
+        if self.completion_popup is not None and self.completion_popup.isVisible():
             if event.key() in (Qt.Key_Enter, Qt.Key_Return, Qt.Key_Escape, Qt.Key_Tab, Qt.Key_Backtab):
                 event.ignore()
                 return
@@ -1587,8 +2904,8 @@ class CodeEditor(QTextEdit):
                 # If backspace is pressed and there's an auto-closed pair, delete both
                 pos = cursor.position()
                 if pos > 0:
-                    char_before = self.toPlainText()[pos-1]
-                    char_after = self.toPlainText()[pos] if pos < len(self.toPlainText()) else ''
+                    char_before = self.document().characterAt(pos - 1)
+                    char_after = self.document().characterAt(pos)
                     pairs = {'(': ')', '[': ']', '{': '}', "'": "'", '"': '"'}
                     if char_before in pairs and pairs[char_before] == char_after:
                         cursor.deleteChar() # Delete the character after the cursor
@@ -1602,12 +2919,83 @@ class CodeEditor(QTextEdit):
         if self.completer_enabled:
             prefix = self.textUnderCursor()
             if len(prefix) >= 1:
-                self.completer.setCompletionPrefix(prefix)
-                cr = self.cursorRect()
-                cr.setWidth(self.completer.popup().sizeHint().width())
-                self.completer.complete(cr)
+                self._show_completions(prefix)
             else:
-                self.completer.popup().hide() # Hide if prefix is too short
+                self._hide_completion_popup() # Hide if prefix is too short
+
+    # Tells the highlighter which blocks are on screen so they are highlighted first.
+    def _update_visible_range(self):
+        if not self.highlighter:
+            return
+        first = self.firstVisibleBlock().blockNumber()
+        last = self.cursorForPosition(QPoint(0, self.viewport().height() - 1)).blockNumber()
+        self.highlighter.set_visible_range(first, max(first, last))
+
+    # Width of the gutter: room for the digits of the last line number plus padding.
+    def line_number_area_width(self):
+        digits = len(str(max(1, self.blockCount())))
+        return 12 + self.fontMetrics().width('9') * digits
+
+    def _update_line_number_area_width(self, _=0):
+        width = self.line_number_area_width()
+        if width != self.viewportMargins().left():
+            self.setViewportMargins(width, 0, 0, 0)
+
+    # Scrolls or repaints the gutter along with the part of the viewport that changed.
+    def _update_line_number_area(self, rect, dy):
+        if dy:
+            self.line_number_area.scroll(0, dy)
+        else:
+            self.line_number_area.update(0, rect.y(), self.line_number_area.width(), rect.height())
+
+    # Paints the numbers of the visible lines only.
+    def paint_line_numbers(self, event):
+        painter = QPainter(self.line_number_area)
+        painter.fillRect(event.rect(), self.gutter_bg)
+        block = self.firstVisibleBlock()
+        number = block.blockNumber()
+        current = self.textCursor().blockNumber()
+        top = int(self.blockBoundingGeometry(block).translated(self.contentOffset()).top())
+        bottom = top + int(self.blockBoundingRect(block).height())
+        width = self.line_number_area.width() - 6
+        height = self.fontMetrics().height()
+        while block.isValid() and top <= event.rect().bottom():
+            if block.isVisible() and bottom >= event.rect().top():
+                painter.setPen(self.gutter_current_text if number == current else self.gutter_text)
+                painter.drawText(0, top, width, height, Qt.AlignRight, str(number + 1))
+            block = block.next()
+            top = bottom
+            bottom = top + int(self.blockBoundingRect(block).height())
+            number += 1
+
+    def _set_gutter_colors(self, theme):
+        self.gutter_bg = QColor(theme["tab_bg"])
+        self.gutter_text = QColor(theme["scrollbar_handle"])
+        self.gutter_current_text = QColor(theme["text_color"])
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        cr = self.contentsRect()
+        self.line_number_area.setGeometry(QRect(cr.left(), cr.top(), self.line_number_area_width(), cr.height()))
+        self._update_visible_range()
+
+    # The gutter's width depends on the font, which the IDE and Ctrl+wheel zoom change.
+    def changeEvent(self, event):
+        super().changeEvent(event)
+        if event.type() == QEvent.FontChange:
+            self._update_line_number_area_width()
+
+    # Background highlighting only runs while the editor's tab is shown.
+    def showEvent(self, event):
+        super().showEvent(event)
+        if self.highlighter:
+            self._update_visible_range()
+            self.highlighter.resume()
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        if self.highlighter:
+            self.highlighter.pause()
 
     # Handles wheel events for zooming text with Ctrl + scroll.
     def wheelEvent(self, event):
@@ -1625,7 +3013,82 @@ class CodeEditor(QTextEdit):
         else:
             super().wheelEvent(event)
 
+IMAGE_RESCALE_DEBOUNCE_MS = 150 # Resizes closer together than this are scaled fast; smooth scaling waits
+IMAGE_SCALED_CACHE_SIZE = 4 # Smoothly scaled pixmaps kept per MediaViewer
+IMAGE_DECODE_CACHE_SIZE = 8 # Decoded images kept for reopening
+
+_decoded_images = {} # (path, modification time, decode size) -> QImage, least recently used first
+
+# Returns a decoded image from the cache, or None.
+def cached_image(key):
+    image = _decoded_images.pop(key, None)
+    if image is not None:
+        _decoded_images[key] = image # Now the most recently used
+    return image
+
+def remember_image(key, image):
+    _decoded_images.pop(key, None)
+    _decoded_images[key] = image
+    while len(_decoded_images) > IMAGE_DECODE_CACHE_SIZE:
+        del _decoded_images[next(iter(_decoded_images))]
+
+_running_viewer_threads = None # Decoding threads that have not ended, even if their viewer was closed
+
+# Starts a viewer's decoding thread and keeps it referenced until it ends, so closing the viewer can
+# stop it without waiting for the decode in progress. Threads delete themselves once ended; the
+# ones still running are waited for when the app quits.
+def start_viewer_thread(thread):
+    global _running_viewer_threads
+    if _running_viewer_threads is None:
+        _running_viewer_threads = set()
+        QApplication.instance().aboutToQuit.connect(stop_viewer_threads)
+    _running_viewer_threads.add(thread)
+    thread.finished.connect(functools.partial(_viewer_thread_finished, thread))
+    thread.start()
+
+def _viewer_thread_finished(thread):
+    thread.wait() # finished is emitted just before the thread ends
+    _running_viewer_threads.discard(thread)
+    thread.deleteLater()
+
+def stop_viewer_threads():
+    for thread in list(_running_viewer_threads):
+        thread.stop()
+    for thread in list(_running_viewer_threads):
+        thread.wait()
+
+# ImageDecoder reads an image off the GUI thread. An image bigger than max_size is decoded
+# straight at the size that fits it, which for JPEG skips most of the work of a full decode.
+class ImageDecoder(QThread):
+    decoded = pyqtSignal(QImage)
+    failed = pyqtSignal(str)
+
+    def __init__(self, file_path, max_size):
+        super().__init__()
+        self.file_path = file_path
+        self.max_size = max_size
+        self._stopped = False
+
+    # Drops the result of the decode in progress, which cannot be interrupted.
+    def stop(self):
+        self._stopped = True
+
+    def run(self):
+        reader = QImageReader(self.file_path)
+        size = reader.size()
+        if size.isValid() and (size.width() > self.max_size.width() or size.height() > self.max_size.height()):
+            reader.setScaledSize(size.scaled(self.max_size, Qt.KeepAspectRatio))
+        image = reader.read()
+        if self._stopped:
+            return
+        if image.isNull():
+            self.failed.emit(reader.errorString())
+        else:
+            self.decoded.emit(image)
+
 # MediaViewer widget for displaying images and playing videos.
+# Images are decoded once, in the background and at most at screen resolution. Resizing shows a
+# fast rescale right away and replaces it with a smooth one once the size stops changing.
 class MediaViewer(QWidget):
     def __init__(self, file_path, parent=None):
         super().__init__(parent)
@@ -1636,6 +3099,14 @@ class MediaViewer(QWidget):
 
         self.media_widget = None
         self.player = None
+        self.source = None # Decoded image as a pixmap, scaled to the viewer's size for display
+        self._scaled = {} # (width, height) -> smoothly scaled pixmap, least recently used first
+        self._decoder = None
+        self._rescale_timer = QTimer(self)
+        self._rescale_timer.setSingleShot(True)
+        self._rescale_timer.setInterval(IMAGE_RESCALE_DEBOUNCE_MS)
+        self._rescale_timer.timeout.connect(lambda: self._show_scaled(smooth=True))
+        QApplication.instance().aboutToQuit.connect(self.close_media)
 
         self._load_media()
 
@@ -1645,19 +3116,13 @@ class MediaViewer(QWidget):
 
         if file_ext in ['.png', '.jpg', '.jpeg', '.gif', '.bmp', '.tiff']:
             self.media_widget = QLabel(self)
-            image = QImage(self.file_path)
-            if image.isNull():
-                self.media_widget.setText(f"Could not load image: {os.path.basename(self.file_path)}")
-                self.media_widget.setAlignment(Qt.AlignCenter)
-            else:
-                pixmap = QPixmap.fromImage(image)
-                # Scale pixmap to fit the label while maintaining aspect ratio
-                scaled_pixmap = pixmap.scaled(self.size(), Qt.KeepAspectRatio, Qt.SmoothTransformation)
-                self.media_widget.setPixmap(scaled_pixmap)
-                self.media_widget.setScaledContents(False) # Set to False as we're handling scaling manually
-                self.media_widget.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding) # Allow label to expand
-                self.media_widget.setAlignment(Qt.AlignCenter)
+            self.media_widget.setText(f"Loading {os.path.basename(self.file_path)}...")
+            self.media_widget.setScaledContents(False) # Set to False as we're handling scaling manually
+            self.media_widget.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding) # Allow label to expand
+            self.media_widget.setMinimumSize(1, 1) # The pixmap follows the viewer's size, not the other way round
+            self.media_widget.setAlignment(Qt.AlignCenter)
             self.layout.addWidget(self.media_widget)
+            self._load_image()
         elif file_ext in ['.mp4', '.avi', '.mov', '.mkv', '.webm']:
             if _HAS_MULTIMEDIA: # Check if multimedia modules are available
                 self.player = QMediaPlayer(self)
@@ -1692,93 +3157,2473 @@ class MediaViewer(QWidget):
             self.media_widget.setAlignment(Qt.AlignCenter)
             self.layout.addWidget(self.media_widget)
 
+    # Largest size worth decoding: the screen in device pixels, since the viewer never gets bigger.
+    def _decode_size(self):
+        screen = QApplication.primaryScreen()
+        if screen is None:
+            return QSize(3840, 2160)
+        return screen.size() * screen.devicePixelRatio()
+
+    # Shows the image from the decoded image cache, or starts decoding it in the background.
+    def _load_image(self):
+        max_size = self._decode_size()
+        try:
+            key = (self.file_path, os.path.getmtime(self.file_path), max_size.width(), max_size.height())
+        except OSError as e:
+            self._on_image_failed(str(e))
+            return
+        image = cached_image(key)
+        if image is not None:
+            self._on_image_decoded(image)
+            return
+        self._decoder = ImageDecoder(self.file_path, max_size)
+        self._decoder.decoded.connect(lambda image: (remember_image(key, image), self._on_image_decoded(image)))
+        self._decoder.failed.connect(self._on_image_failed)
+        start_viewer_thread(self._decoder)
+
+    def _on_image_decoded(self, image):
+        self._decoder = None # Done; it deletes itself
+        self.source = QPixmap.fromImage(image) # Pixmaps can only be made on the GUI thread
+        self._scaled.clear()
+        self._show_scaled(smooth=True)
+
+    def _on_image_failed(self, error):
+        self._decoder = None
+        print(f"Error loading image {self.file_path}: {error}")
+        self.media_widget.setText(f"Could not load image: {os.path.basename(self.file_path)}")
+
+    # Scales the decoded image to fit the viewer while maintaining aspect ratio. Smooth results are
+    # cached by size, so going back to a recent size (like toggling split view) costs nothing.
+    def _show_scaled(self, smooth):
+        if self.source is None:
+            return
+        target = self.source.size().scaled(self.size(), Qt.KeepAspectRatio)
+        key = (target.width(), target.height())
+        pixmap = self._scaled.pop(key, None)
+        if pixmap is None and smooth:
+            pixmap = self.source.scaled(target, Qt.IgnoreAspectRatio, Qt.SmoothTransformation)
+        if pixmap is None:
+            self.media_widget.setPixmap(self.source.scaled(target, Qt.IgnoreAspectRatio, Qt.FastTransformation))
+            self._rescale_timer.start() # Replace it with a smooth one once resizing settles
+            return
+        self._scaled[key] = pixmap
+        while len(self._scaled) > IMAGE_SCALED_CACHE_SIZE:
+            del self._scaled[next(iter(self._scaled))]
+        self.media_widget.setPixmap(pixmap)
+
+    # Stops video playback before the tab is closed. A background decode is detached rather than
+    # waited for: it finishes on its own and its image is dropped.
+    def close_media(self):
+        if self._decoder is not None:
+            for signal in (self._decoder.decoded, self._decoder.failed):
+                signal.disconnect()
+            self._decoder.stop()
+            self._decoder = None
+        if self.player and self.player.state() != QMediaPlayer.StoppedState:
+            self.player.stop()
+
     def resizeEvent(self, event):
         # Re-scale image when the viewer is resized
-        if isinstance(self.media_widget, QLabel) and self.media_widget.pixmap():
-            # Only reload and scale if the pixmap is not null and the image was loaded successfully
-            original_image = QImage(self.file_path)
-            if not original_image.isNull():
-                pixmap = QPixmap.fromImage(original_image)
-                scaled_pixmap = pixmap.scaled(self.size(), Qt.KeepAspectRatio, Qt.SmoothTransformation)
-                self.media_widget.setPixmap(scaled_pixmap)
         super().resizeEvent(event)
+        self._show_scaled(smooth=False)
+
+# Images with at least this many pixels open in a TiledImageViewer instead of a MediaViewer.
+TILED_IMAGE_MIN_PIXELS = 32 * 1024 * 1024
+IMAGE_TILE_SIZE = 256 # Side of a pyramid tile in pixels
+IMAGE_OVERVIEW_SIZE = 2048 # Pyramid levels no bigger than this on either side are kept whole in memory
+IMAGE_TILE_CACHE_MIN = 64 # Tiles a TiledImageViewer keeps at least; more if its viewport shows more
+IMAGE_MAX_ZOOM = 8.0
+IMAGE_TILE_DIR = os.path.join(CACHE_DIR, "image_tiles") # Raw pyramid levels of the open TiledImageViewers
+IMAGE_DECODE_BAND_BYTES = 256 * 1024 * 1024 # Most decoded pixel bytes held at once
+
+# True if an image is big enough to be shown in tiles rather than decoded whole.
+def is_very_large_image(file_path):
+    size = QImageReader(file_path).size()
+    return size.isValid() and size.width() * size.height() >= TILED_IMAGE_MIN_PIXELS
+
+# ImagePyramid is a mipmap pyramid of an image: level n is the image at 1/2**n scale, cut into
+# IMAGE_TILE_SIZE tiles. Levels that fit in IMAGE_OVERVIEW_SIZE are kept whole in memory. The finer
+# levels are written once as raw pixels to IMAGE_TILE_DIR, and their tiles are read from there on
+# demand a row at a time (not memory-mapped, so panning does not pile up resident pages). Formats
+# whose reader can clip (JPEG) are decoded in bands of at most IMAGE_DECODE_BAND_BYTES. Bands are as
+# tall as that allows, because Qt's JPEG reader still decodes every row above a clip rect. Other
+# formats are decoded whole once, so when the image would take more than that, the pyramid starts at
+# the finest level that fits, decoded scaled by readers that scale row by row (PNG). Images in formats
+# that can do neither are refused. Only a TileLoader thread calls build, read_tile and close.
+class ImagePyramid:
+    def __init__(self, file_path):
+        self.file_path = file_path
+        reader = QImageReader(file_path)
+        self.size = reader.size()
+        if not self.size.isValid():
+            raise ValueError(reader.errorString())
+        self.image_format = bytes(reader.format()).decode('ascii', 'replace')
+        self.fast_overview = self.image_format == 'jpeg' # JPEG decodes straight at 1/2, 1/4 or 1/8 scale
+        self.overview_level = 0 # Finest level kept in memory
+        while max(self._level_dimensions(self.overview_level)) > IMAGE_OVERVIEW_SIZE:
+            self.overview_level += 1
+        self._clips = reader.supportsOption(QImageIOHandler.ClipRect)
+        self._scales = reader.supportsOption(QImageIOHandler.ScaledSize)
+        self.first_level = 0 # Finest level decoded; coarser if decoding the image whole would take too much
+        while (not self._clips and self.first_level < self.overview_level
+               and self._level_bytes(self.first_level) > IMAGE_DECODE_BAND_BYTES):
+            self.first_level += 1
+        self.level_count = self.overview_level + 1
+        while max(self._level_dimensions(self.level_count - 1)) > IMAGE_TILE_SIZE:
+            self.level_count += 1
+        self.format = QImage.Format_RGB32
+        self._levels = {} # Level -> (file descriptor, bytes per line) of its raw copy
+        self._files = [] # Paths of the raw copies
+
+    def _level_dimensions(self, level):
+        scale = 1 << level
+        return (max(1, (self.size.width() + scale - 1) // scale), max(1, (self.size.height() + scale - 1) // scale))
+
+    def level_size(self, level):
+        return QSize(*self._level_dimensions(level))
+
+    def _level_bytes(self, level):
+        width, height = self._level_dimensions(level)
+        return 4 * width * height
+
+    def _scaled(self, image, level):
+        return image.scaled(self.level_size(level), Qt.IgnoreAspectRatio, Qt.SmoothTransformation)
+
+    # Decodes the image, passes the in-memory levels (finest first) to on_overview, then writes the
+    # finer levels unless stopped() turns true first. JPEG overviews are decoded on their own first,
+    # so they show up long before the whole image is decoded.
+    def build(self, on_overview, stopped):
+        if self.first_level and not self._scales:
+            raise ValueError(f"{self.size.width()} x {self.size.height()} {self.image_format.upper()} images are "
+                             f"too large to decode, since Qt can neither clip nor scale them while decoding")
+        overview = None
+        if self.fast_overview:
+            reader = QImageReader(self.file_path)
+            reader.setScaledSize(self.level_size(self.overview_level))
+            overview = reader.read()
+            if not overview.isNull():
+                self._send_overview(overview, on_overview)
+            else:
+                overview = None
+        if self.overview_level == self.first_level:
+            if overview is None:
+                reader = QImageReader(self.file_path)
+                if self.first_level:
+                    reader.setScaledSize(self.level_size(self.first_level))
+                self._send_overview(self._read(reader), on_overview)
+            return
+        os.makedirs(IMAGE_TILE_DIR, exist_ok=True)
+        overviews = None if overview is not None else [] # Bands scaled down to the overview level
+        if not self._write_level(self.first_level, self._decoded_bands(overviews, stopped), stopped):
+            return
+        if overviews is not None:
+            overview = QImage(self.level_size(self.overview_level), self.format)
+            painter = QPainter(overview)
+            painter.setCompositionMode(QPainter.CompositionMode_Source)
+            for top, band in overviews:
+                painter.drawImage(0, top, band)
+            painter.end()
+            self._send_overview(overview, on_overview)
+        for level in range(self.first_level + 1, self.overview_level):
+            if stopped() or not self._write_level(level, self._halved_bands(level), stopped):
+                return
 
-# FindDialog provides a dialog for finding text within the active editor.
-class FindDialog(QDialog):
-    def __init__(self, parent=None):
+    def _read(self, reader):
+        image = reader.read()
+        if image.isNull():
+            raise ValueError(reader.errorString())
+        return image
+
+    # Yields the first level in bands of rows converted to self.format, decoding one band at a time
+    # if the reader can clip. Each band's copy at the overview level is added to overviews (if not
+    # None) as (top row, image). Stops early once stopped() turns true.
+    def _decoded_bands(self, overviews, stopped):
+        width, height = self._level_dimensions(self.first_level)
+        scale = 1 << (self.overview_level - self.first_level) # First level pixels per overview pixel
+        step = max(2 * IMAGE_TILE_SIZE, scale) # So bands halve and scale without seams
+        if self._clips:
+            band = max(step, IMAGE_DECODE_BAND_BYTES // (4 * width) // step * step)
+        else:
+            band = height # Clipping would decode the whole image for every band
+        for top in range(0, height, band):
+            if stopped():
+                return
+            reader = QImageReader(self.file_path)
+            rows = min(band, height - top)
+            if rows < height:
+                reader.setClipRect(QRect(0, top, width, rows))
+            elif self.first_level:
+                reader.setScaledSize(self.level_size(self.first_level))
+            image = self._read(reader)
+            if top == 0:
+                self.format = QImage.Format_ARGB32_Premultiplied if image.hasAlphaChannel() else QImage.Format_RGB32
+            image = image.convertToFormat(self.format)
+            if overviews is not None:
+                overviews.append((top // scale, image.scaled(self._level_dimensions(self.overview_level)[0],
+                    (rows + scale - 1) // scale, Qt.IgnoreAspectRatio, Qt.SmoothTransformation)))
+            yield image
+
+    def _send_overview(self, overview, on_overview):
+        levels = [overview]
+        for level in range(self.overview_level + 1, self.level_count):
+            levels.append(self._scaled(levels[-1], level))
+        on_overview(levels)
+
+    # Writes a level as raw rows from images of consecutive bands of it. Returns False if stopped()
+    # turned true first.
+    def _write_level(self, level, bands, stopped):
+        handle, path = tempfile.mkstemp(prefix=f"level{level}_", suffix=".raw", dir=IMAGE_TILE_DIR)
+        self._files.append(path)
+        with os.fdopen(handle, 'wb') as f:
+            for band in bands:
+                if stopped():
+                    return False
+                bits = band.constBits()
+                bits.setsize(band.sizeInBytes())
+                f.write(memoryview(bits))
+        if stopped(): # The bands may have ended early
+            return False
+        self._levels[level] = (os.open(path, os.O_RDONLY), 4 * self._level_dimensions(level)[0])
+        return True
+
+    # Yields a level in bands, each halved from rows of the level above's file, so no level
+    # but the first is ever in memory whole.
+    def _halved_bands(self, level):
+        fd, stride = self._levels[level - 1]
+        width, height = self._level_dimensions(level - 1)
+        band = 2 * IMAGE_TILE_SIZE # Even, so the bands halve without seams
+        for top in range(0, height, band):
+            rows = min(band, height - top)
+            pixels = os.pread(fd, rows * stride, top * stride)
+            yield QImage(pixels, width, rows, stride, self.format).scaled(
+                (width + 1) // 2, (rows + 1) // 2, Qt.IgnoreAspectRatio, Qt.SmoothTransformation)
+
+    def has_level(self, level):
+        return level in self._levels
+
+    # Reads one tile, or returns None if its level was not written.
+    def read_tile(self, level, column, row):
+        width, height = self._level_dimensions(level)
+        x, y = column * IMAGE_TILE_SIZE, row * IMAGE_TILE_SIZE
+        width, height = min(IMAGE_TILE_SIZE, width - x), min(IMAGE_TILE_SIZE, height - y)
+        if level not in self._levels:
+            return None
+        fd, stride = self._levels[level]
+        start = y * stride + x * 4
+        rows = b''.join(os.pread(fd, width * 4, start + i * stride) for i in range(height))
+        return QImage(rows, width, height, width * 4, self.format).copy() # Copy so the image owns its pixels
+
+    # Closes and deletes the raw level copies.
+    def close(self):
+        for fd, _ in self._levels.values():
+            os.close(fd)
+        self._levels.clear()
+        for path in self._files:
+            try:
+                os.remove(path)
+            except OSError as e:
+                print(f"Error removing image tile file {path}: {e}")
+        self._files.clear()
+
+# TileLoader builds an ImagePyramid, then decodes the tiles a TiledImageViewer asks for. Each request
+# replaces the previous one, so tiles that were scrolled past are never decoded. Once stopped it
+# closes the pyramid itself, so stopping never waits for a decode in progress.
+class TileLoader(QThread):
+    overview_ready = pyqtSignal(object) # In-memory pyramid levels as QImages, finest first
+    tile_loaded = pyqtSignal(object, QImage) # (level, column, row), tile
+    failed = pyqtSignal(str)
+
+    def __init__(self, pyramid):
+        super().__init__()
+        self.pyramid = pyramid
+        self._condition = threading.Condition()
+        self._wanted = [] # Tiles still to decode, most wanted first
+        self._loading = None # Tile being decoded right now
+        self._stopping = False
+
+    def request(self, tiles):
+        with self._condition:
+            self._wanted = [tile for tile in tiles if tile != self._loading]
+            self._condition.notify()
+
+    def stop(self):
+        with self._condition:
+            self._stopping = True
+            self._condition.notify()
+
+    def run(self):
+        try:
+            self.pyramid.build(self.overview_ready.emit, self._load_written_tiles)
+        except Exception as e:
+            self.failed.emit(str(e))
+            self.pyramid.close()
+            return
+        while True:
+            with self._condition:
+                while not self._wanted and not self._stopping:
+                    self._condition.wait()
+                if self._stopping:
+                    break
+                self._loading = self._wanted.pop(0)
+            self._load_tile()
+        self.pyramid.close()
+
+    def _load_tile(self):
+        tile = self.pyramid.read_tile(*self._loading)
+        if tile is not None:
+            self.tile_loaded.emit(self._loading, tile)
+
+    # Loads the wanted tiles of the levels written so far. The pyramid calls this between the bands
+    # it writes, so zooming in does not wait for every level. Returns True once stopping.
+    def _load_written_tiles(self):
+        while True:
+            with self._condition:
+                if self._stopping:
+                    return True
+                written = [tile for tile in self._wanted if self.pyramid.has_level(tile[0])]
+                if not written:
+                    return False
+                self._loading = written[0]
+                self._wanted.remove(self._loading)
+            self._load_tile()
+
+# TiledImageViewer shows images too big to decode whole, like 20k x 20k TIFFs or satellite tiles.
+# It draws the in-memory levels of an ImagePyramid first, then the tiles of the level matching the
+# zoom on top as a TileLoader decodes them. Only tiles near the viewport are kept, so memory use
+# depends on the viewport, not the image. Ctrl+wheel and +/- zoom, dragging pans, 0 fits, 1 is 100%.
+class TiledImageViewer(QAbstractScrollArea):
+    def __init__(self, file_path, parent=None):
         super().__init__(parent)
-        self.setWindowTitle("Find")
-        self.setMinimumWidth(300)
-        self.layout = QVBoxLayout(self)
+        self.file_path = file_path
+        self.pyramid = ImagePyramid(file_path)
+        self.zoom = 1.0
+        self._fit = True # Keep the whole image in view until the user zooms
+        self._overviews = [] # QPixmaps of the in-memory levels, finest first
+        self._tiles = {} # (level, column, row) -> QPixmap, least recently used first
+        self._tile_limit = IMAGE_TILE_CACHE_MIN
+        self._error = None
+        self._drag_start = None # (mouse position, scroll values) while panning
+        self.colors = THEMES["dark"]
+
+        self.setFocusPolicy(Qt.StrongFocus)
+        self.horizontalScrollBar().valueChanged.connect(self.viewport().update)
+        self.verticalScrollBar().valueChanged.connect(self.viewport().update)
+
+        self.loader = TileLoader(self.pyramid)
+        self.loader.overview_ready.connect(self._on_overview_ready)
+        self.loader.tile_loaded.connect(self._on_tile_loaded)
+        self.loader.failed.connect(self._on_failed)
+        QApplication.instance().aboutToQuit.connect(self.close_file)
+        start_viewer_thread(self.loader)
+
+    # Stops decoding, e.g. when the tab is closed. The loader is detached rather than waited for: it
+    # finishes the band it may be decoding on its own, then deletes the raw level copies.
+    def close_file(self):
+        if self.loader is None:
+            return
+        for signal in (self.loader.overview_ready, self.loader.tile_loaded, self.loader.failed):
+            signal.disconnect()
+        self.loader.stop()
+        self.loader = None
+        self._tiles.clear()
 
-        self.find_label = QLabel("Find what:")
-        self.find_input = QLineEdit()
-        self.find_input.setPlaceholderText("Enter text to find...")
-        self.layout.addWidget(self.find_label)
-        self.layout.addWidget(self.find_input)
+    def apply_theme(self, theme_name):
+        self.colors = THEMES[theme_name]
+        self.viewport().update()
+
+    def _on_overview_ready(self, levels):
+        self._overviews = [QPixmap.fromImage(image) for image in levels]
+        self.viewport().update()
+
+    def _on_tile_loaded(self, key, image):
+        self._tiles[key] = QPixmap.fromImage(image)
+        while len(self._tiles) > self._tile_limit:
+            del self._tiles[next(iter(self._tiles))]
+        self.viewport().update()
+
+    def _on_failed(self, error):
+        self.loader = None # Its thread ends and deletes it
+        print(f"Error loading image {self.file_path}: {error}")
+        self._error = f"Could not load image: {os.path.basename(self.file_path)}\n{error}"
+        self.viewport().update()
+
+    def _fit_zoom(self):
+        size = self.pyramid.size
+        return min(1.0, self.viewport().width() / size.width(), self.viewport().height() / size.height())
+
+    # Viewport position of the image's top left corner; images smaller than the viewport are centered.
+    def _origin(self):
+        width, height = self.pyramid.size.width() * self.zoom, self.pyramid.size.height() * self.zoom
+        viewport = self.viewport()
+        x = (viewport.width() - width) / 2 if width < viewport.width() else -self.horizontalScrollBar().value()
+        y = (viewport.height() - height) / 2 if height < viewport.height() else -self.verticalScrollBar().value()
+        return QPointF(x, y)
+
+    def _update_scroll_range(self):
+        viewport = self.viewport()
+        for bar, length, page in ((self.horizontalScrollBar(), self.pyramid.size.width(), viewport.width()),
+                                  (self.verticalScrollBar(), self.pyramid.size.height(), viewport.height())):
+            bar.setRange(0, max(0, int(length * self.zoom) - page))
+            bar.setPageStep(page)
+            bar.setSingleStep(max(1, page // 10))
+
+    # Zooms keeping the image point under anchor (the viewport center by default) in place.
+    def set_zoom(self, zoom, anchor=None):
+        zoom = min(max(zoom, self._fit_zoom()), IMAGE_MAX_ZOOM)
+        if anchor is None:
+            anchor = QPointF(self.viewport().rect().center())
+        origin = self._origin()
+        image_x, image_y = (anchor.x() - origin.x()) / self.zoom, (anchor.y() - origin.y()) / self.zoom
+        self.zoom = zoom
+        self._fit = False
+        self._update_scroll_range()
+        self.horizontalScrollBar().setValue(round(image_x * zoom - anchor.x()))
+        self.verticalScrollBar().setValue(round(image_y * zoom - anchor.y()))
+        self.viewport().update()
+
+    # Coarsest level that still has at least one pixel per screen pixel, or the finest decoded level.
+    def _level_for_zoom(self):
+        level = self.pyramid.first_level
+        while level < self.pyramid.level_count - 1 and self.zoom * (2 << level) <= 1:
+            level += 1
+        return level
 
-        self.case_sensitive_checkbox = QCheckBox("Case sensitive")
-        self.layout.addWidget(self.case_sensitive_checkbox)
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        if self._fit:
+            self.zoom = self._fit_zoom()
+        self._update_scroll_range()
+
+    def paintEvent(self, event):
+        painter = QPainter(self.viewport())
+        rect = self.viewport().rect()
+        painter.fillRect(rect, QColor(self.colors["bg_color"]))
+        if not self._overviews:
+            painter.setPen(QColor(self.colors["text_color"]))
+            painter.drawText(rect, Qt.AlignCenter, self._error or f"Loading {os.path.basename(self.file_path)}...")
+            return
+        origin = self._origin()
+        level = self._level_for_zoom()
+        # An in-memory level goes underneath, so tiles still loading show blurred rather than blank
+        coarse = max(level, self.pyramid.overview_level)
+        self._draw_level(painter, self._overviews[coarse - self.pyramid.overview_level], coarse, origin, coarse > level)
+        loading = level < coarse and self._draw_tiles(painter, level, origin)
+        painter.setPen(QColor(self.colors["scrollbar_handle"]))
+        status = f"{self.zoom:.0%}" + (" - loading tiles..." if loading else "")
+        if self.pyramid.first_level and self.zoom * (1 << self.pyramid.first_level) > 1: # Finer than decoded
+            status += f" - decoded at 1/{1 << self.pyramid.first_level} size"
+        painter.drawText(rect.adjusted(0, 0, -8, -4), Qt.AlignRight | Qt.AlignBottom, status)
+
+    # Draws the part of a whole in-memory level that is in view. A stand-in for finer tiles is
+    # smoothed when enlarged; at the zoom's own level enlarged pixels stay sharp.
+    def _draw_level(self, painter, pixmap, level, origin, stand_in):
+        scale = self.zoom * (1 << level) # Screen pixels per level pixel
+        viewport = self.viewport()
+        source = QRectF(-origin.x() / scale, -origin.y() / scale, viewport.width() / scale, viewport.height() / scale)
+        source = source.intersected(QRectF(pixmap.rect()))
+        target = QRectF(origin.x() + source.x() * scale, origin.y() + source.y() * scale,
+                        source.width() * scale, source.height() * scale)
+        painter.setRenderHint(QPainter.SmoothPixmapTransform, scale < 1 or stand_in)
+        painter.drawPixmap(target, pixmap, source)
+
+    # Draws the tiles of a level that are in view and requests the missing ones, nearest the center
+    # first, then the ring around the view so panning finds them ready. Returns True if any is missing.
+    def _draw_tiles(self, painter, level, origin):
+        scale = self.zoom * (1 << level)
+        size = self.pyramid.level_size(level)
+        columns, rows = (size.width() - 1) // IMAGE_TILE_SIZE + 1, (size.height() - 1) // IMAGE_TILE_SIZE + 1
+        span = IMAGE_TILE_SIZE * scale # Screen pixels per tile
+        first_column, first_row = max(0, int(-origin.x() // span)), max(0, int(-origin.y() // span))
+        last_column = min(columns - 1, int((self.viewport().width() - origin.x()) // span))
+        last_row = min(rows - 1, int((self.viewport().height() - origin.y()) // span))
+
+        painter.setRenderHint(QPainter.SmoothPixmapTransform, scale < 1)
+        missing = []
+        for row in range(first_row, last_row + 1):
+            for column in range(first_column, last_column + 1):
+                key = (level, column, row)
+                pixmap = self._tiles.pop(key, None)
+                if pixmap is None:
+                    missing.append(key)
+                    continue
+                self._tiles[key] = pixmap # Now the most recently used
+                # Rounding shared edges the same way for both neighbours leaves no seams
+                left, top = round(origin.x() + column * span), round(origin.y() + row * span)
+                right = round(origin.x() + (column * IMAGE_TILE_SIZE + pixmap.width()) * scale)
+                bottom = round(origin.y() + (row * IMAGE_TILE_SIZE + pixmap.height()) * scale)
+                painter.drawPixmap(QRect(left, top, right - left, bottom - top), pixmap)
+
+        self._tile_limit = max(IMAGE_TILE_CACHE_MIN, 2 * (last_row - first_row + 3) * (last_column - first_column + 3))
+        center_column, center_row = (first_column + last_column) / 2, (first_row + last_row) / 2
+        missing.sort(key=lambda key: abs(key[1] - center_column) + abs(key[2] - center_row))
+        ring = [(level, column, row)
+                for row in range(max(0, first_row - 1), min(rows, last_row + 2))
+                for column in range(max(0, first_column - 1), min(columns, last_column + 2))
+                if not (first_row <= row <= last_row and first_column <= column <= last_column)
+                and (level, column, row) not in self._tiles]
+        if self.loader:
+            self.loader.request(missing + ring)
+        return bool(missing)
 
-        self.whole_word_checkbox = QCheckBox("Whole words only")
-        self.layout.addWidget(self.whole_word_checkbox)
+    def wheelEvent(self, event):
+        if event.modifiers() & Qt.ControlModifier:
+            self.set_zoom(self.zoom * 1.25 ** (event.angleDelta().y() / 120), QPointF(event.pos()))
+            event.accept()
+        else:
+            super().wheelEvent(event)
+
+    def mousePressEvent(self, event):
+        if event.button() == Qt.LeftButton:
+            self._drag_start = (event.pos(), self.horizontalScrollBar().value(), self.verticalScrollBar().value())
+            self.viewport().setCursor(Qt.ClosedHandCursor)
+        super().mousePressEvent(event)
+
+    def mouseMoveEvent(self, event):
+        if self._drag_start:
+            position, x, y = self._drag_start
+            self.horizontalScrollBar().setValue(x - (event.pos().x() - position.x()))
+            self.verticalScrollBar().setValue(y - (event.pos().y() - position.y()))
+        super().mouseMoveEvent(event)
+
+    def mouseReleaseEvent(self, event):
+        if event.button() == Qt.LeftButton:
+            self._drag_start = None
+            self.viewport().unsetCursor()
+        super().mouseReleaseEvent(event)
+
+    def keyPressEvent(self, event):
+        key = event.key()
+        if key in (Qt.Key_Plus, Qt.Key_Equal):
+            self.set_zoom(self.zoom * 1.25)
+        elif key == Qt.Key_Minus:
+            self.set_zoom(self.zoom / 1.25)
+        elif key == Qt.Key_0:
+            self.set_zoom(self._fit_zoom())
+            self._fit = True
+        elif key == Qt.Key_1:
+            self.set_zoom(1.0)
+        else:
+            super().keyPressEvent(event)
+
+# Files at least this large open read-only in a LargeFileViewer instead of a CodeEditor.
+LARGE_FILE_THRESHOLD = 50 * 1024 * 1024
+LARGE_FILE_INDEX_BLOCK = 64 * 1024 # Bytes covered by each entry of the sparse newline index
+LARGE_FILE_MAX_LINE = 4096 # Bytes of a line that are decoded and drawn
+
+# LineOffsetIndex is a sparse newline index over a memory-mapped file. It stores how many
+# newlines come before each LARGE_FILE_INDEX_BLOCK-sized block, so finding where a line starts
+# is a bisect plus a scan of one block. Blocks are added by a LineIndexer thread; readers only
+# look at the blocks indexed so far.
+class LineOffsetIndex:
+    def __init__(self, data):
+        self.data = data # mmap of the file
+        self.size = len(data)
+        self.newlines_before = [0] # newlines_before[i] is the newline count in data[:i * LARGE_FILE_INDEX_BLOCK]
+        self.complete = False
+
+    # Bytes indexed so far.
+    def indexed_size(self):
+        return min((len(self.newlines_before) - 1) * LARGE_FILE_INDEX_BLOCK, self.size)
+
+    # Number of lines known so far; exact once the index is complete.
+    def line_count(self):
+        return self.newlines_before[-1] + 1
+
+    # Indexes up to 'blocks' more blocks. Returns False once the whole file is indexed.
+    def extend(self, blocks):
+        counts = self.newlines_before
+        for _ in range(blocks):
+            start = (len(counts) - 1) * LARGE_FILE_INDEX_BLOCK
+            if start >= self.size:
+                self.complete = True
+                return False
+            counts.append(counts[-1] + self.data[start:start + LARGE_FILE_INDEX_BLOCK].count(b'\n'))
+        return True
+
+    # Byte offset where a line (0-based) starts, or None if that part is not indexed yet.
+    def line_offset(self, line):
+        if line <= 0:
+            return 0
+        counts = self.newlines_before
+        i = bisect.bisect_left(counts, line) - 1 # The block holding the line's preceding newline
+        if i + 1 >= len(counts):
+            return None
+        pos = i * LARGE_FILE_INDEX_BLOCK - 1
+        for _ in range(line - counts[i]):
+            pos = self.data.find(b'\n', pos + 1)
+        return pos + 1
+
+    # Line (0-based) containing a byte offset.
+    def line_of_offset(self, offset):
+        i = min(offset // LARGE_FILE_INDEX_BLOCK, len(self.newlines_before) - 1)
+        line = self.newlines_before[i]
+        start = i * LARGE_FILE_INDEX_BLOCK
+        while start < offset: # Counts in bounded slices past the indexed part
+            end = min(offset, start + 16 * LARGE_FILE_INDEX_BLOCK)
+            line += self.data[start:end].count(b'\n')
+            start = end
+        return line
+
+    # Returns the text of up to 'count' lines starting at 'first', each cut at LARGE_FILE_MAX_LINE bytes.
+    def read_lines(self, first, count):
+        pos = self.line_offset(first)
+        lines = []
+        if pos is None:
+            return lines
+        while len(lines) < count and pos <= self.size:
+            end = self.data.find(b'\n', pos)
+            if end < 0:
+                end = self.size
+            raw = self.data[pos:min(end, pos + LARGE_FILE_MAX_LINE)]
+            lines.append(raw.decode('utf-8', errors='replace').rstrip('\r'))
+            if end >= self.size:
+                break
+            pos = end + 1
+        return lines
 
-        self.find_next_button = QPushButton("Find Next")
-        self.find_next_button.clicked.connect(self._find_next)
-        self.layout.addWidget(self.find_next_button)
+# Builds a LineOffsetIndex in the background, reporting progress as it goes.
+class LineIndexer(QThread):
+    progress = pyqtSignal(int) # Percent of the file indexed
 
-        self.find_prev_button = QPushButton("Find Previous")
-        self.find_prev_button.clicked.connect(self._find_prev)
-        self.layout.addWidget(self.find_prev_button)
+    def __init__(self, index):
+        super().__init__()
+        self.index = index
+        self._stopped = False
 
-        self.editor = None # Reference to the editor to perform find operations on
+    def stop(self):
+        self._stopped = True
+        self.wait()
 
+    def run(self):
+        step = max(1, (16 * 1024 * 1024) // LARGE_FILE_INDEX_BLOCK) # Report every 16 MB
+        while not self._stopped and self.index.extend(step):
+            self.progress.emit(int(self.index.indexed_size() * 100 / max(1, self.index.size)))
+        if not self._stopped:
+            self.progress.emit(100)
+
+# LargeFileViewer shows a file too big for a CodeEditor without reading it into memory.
+# The file is memory-mapped, and only the lines in the viewport are decoded and drawn,
+# so opening is instant and memory stays bounded whatever the file size. Read-only.
+class LargeFileViewer(QAbstractScrollArea):
+    def __init__(self, file_path, parent=None):
+        super().__init__(parent)
+        self.file_path = file_path
+        self._file = open(file_path, 'rb')
+        self.data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.index = LineOffsetIndex(self.data)
+        self.progress = 0
+        self.match = None # (line, column, length) of the selected search hit, in characters of its line
+        self._selected = None # (byte offset, byte length) of that hit
+        self._caret = None # Byte offset searches start from while no hit is selected, set by go_to_line
+        self._max_columns = 0
+        self.colors = THEMES["dark"]
+
+        self.setFont(QFont("Inter", 10))
+        self.setFocusPolicy(Qt.StrongFocus)
+        self.verticalScrollBar().valueChanged.connect(self.viewport().update)
+        self.horizontalScrollBar().valueChanged.connect(self.viewport().update)
+
+        self.indexer = LineIndexer(self.index)
+        self.indexer.progress.connect(self._on_index_progress)
+        self.indexer.start()
+        self._update_scroll_range()
+
+    # Stops indexing and unmaps the file, e.g. when its tab is closed.
+    def close_file(self):
+        if self.indexer is None:
+            return
+        self.indexer.stop()
+        self.indexer = None
+        self.data.close()
+        self._file.close()
+
+    def apply_theme(self, theme_name):
+        self.colors = THEMES[theme_name]
+        self.viewport().update()
+
+    def line_height(self):
+        return self.fontMetrics().height()
+
+    def visible_line_count(self):
+        return max(1, self.viewport().height() // self.line_height())
+
+    def _gutter_width(self):
+        return 12 + self.fontMetrics().width('9') * len(str(self.index.line_count()))
+
+    def _on_index_progress(self, percent):
+        self.progress = percent
+        self._update_scroll_range()
+        self.viewport().update()
+
+    def _update_scroll_range(self):
+        vertical = self.verticalScrollBar()
+        vertical.setRange(0, max(0, self.index.line_count() - self.visible_line_count()))
+        vertical.setPageStep(self.visible_line_count())
+        horizontal = self.horizontalScrollBar()
+        char_width = self.fontMetrics().width('M')
+        horizontal.setRange(0, max(0, self._max_columns * char_width - self.viewport().width() + self._gutter_width()))
+        horizontal.setPageStep(self.viewport().width())
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self._update_scroll_range()
+
+    def paintEvent(self, event):
+        painter = QPainter(self.viewport())
+        painter.setFont(self.font())
+        metrics = self.fontMetrics()
+        height = self.line_height()
+        gutter = self._gutter_width()
+        rect = self.viewport().rect()
+        painter.fillRect(rect, QColor(self.colors["bg_color"]))
+        painter.fillRect(0, 0, gutter, rect.height(), QColor(self.colors["tab_bg"]))
+
+        first = self.verticalScrollBar().value()
+        lines = self.index.read_lines(first, self.visible_line_count() + 1)
+        x_offset = self.horizontalScrollBar().value()
+        widest = self._max_columns
+        painter.setClipRect(gutter, 0, rect.width() - gutter, rect.height())
+        for row, text in enumerate(lines):
+            y = row * height
+            widest = max(widest, len(text))
+            if self.match and self.match[0] == first + row:
+                _, column, length = self.match
+                x = gutter + 4 - x_offset + metrics.width(text[:column])
+                painter.fillRect(x, y, metrics.width(text[column:column + length]), height, QColor(self.colors["selection_bg"]))
+            painter.setPen(QColor(self.colors["text_color"]))
+            painter.drawText(gutter + 4 - x_offset, y + metrics.ascent(), text)
+        painter.setClipping(False)
+
+        painter.setPen(QColor(self.colors["scrollbar_handle"]))
+        for row in range(len(lines)):
+            painter.drawText(0, row * height, gutter - 6, height, Qt.AlignRight, str(first + row + 1))
+        if self.progress < 100:
+            painter.drawText(rect.adjusted(0, 0, -8, -4), Qt.AlignRight | Qt.AlignBottom, f"Indexing lines... {self.progress}%")
+        if widest != self._max_columns:
+            self._max_columns = widest
+            self._update_scroll_range()
+
+    def keyPressEvent(self, event):
+        vertical = self.verticalScrollBar()
+        key = event.key()
+        if key == Qt.Key_Down:
+            vertical.triggerAction(vertical.SliderSingleStepAdd)
+        elif key == Qt.Key_Up:
+            vertical.triggerAction(vertical.SliderSingleStepSub)
+        elif key == Qt.Key_PageDown:
+            vertical.triggerAction(vertical.SliderPageStepAdd)
+        elif key == Qt.Key_PageUp:
+            vertical.triggerAction(vertical.SliderPageStepSub)
+        elif key == Qt.Key_Home and event.modifiers() & Qt.ControlModifier:
+            vertical.setValue(0)
+        elif key == Qt.Key_End and event.modifiers() & Qt.ControlModifier:
+            vertical.setValue(vertical.maximum())
+        else:
+            super().keyPressEvent(event)
+
+    # Scrolls so a line (1-based) is near the top. Returns False if it is not indexed yet.
+    def go_to_line(self, line_number):
+        line = min(max(line_number, 1), self.index.line_count()) - 1
+        if self.index.line_offset(line) is None:
+            return False
+        self._caret = self.index.line_offset(line)
+        self._selected = self.match = None
+        self.verticalScrollBar().setValue(max(0, line - self.visible_line_count() // 3))
+        self.viewport().update()
+        return True
+
+    # Byte offsets of the start and end of the selected search hit. Without one, both are where the
+    # next search starts: the line go_to_line went to, or else the top of the view.
+    def selection(self):
+        if self._selected is not None:
+            offset, length = self._selected
+            return offset, offset + length
+        offset = self._caret
+        if offset is None:
+            offset = self.index.line_offset(self.verticalScrollBar().value()) or 0
+        return offset, offset
+
+    # Selects a search hit given as a byte offset and length, scrolling it into view.
+    def select_range(self, offset, length):
+        line = self.index.line_of_offset(offset)
+        line_start = self.data.rfind(b'\n', 0, offset) + 1
+        column = len(self.data[line_start:offset].decode('utf-8', errors='replace'))
+        self.match = (line, column, len(self.data[offset:offset + length].decode('utf-8', errors='replace')))
+        self._selected = (offset, length)
+        first = self.verticalScrollBar().value()
+        if not first <= line < first + self.visible_line_count():
+            self.verticalScrollBar().setValue(max(0, line - self.visible_line_count() // 3))
+        self.viewport().update()
+
+FIND_IN_FILES_WORKERS = max(1, (os.cpu_count() or 2) - 1) # Search processes; one core is left for the IDE
+FIND_IN_FILES_BATCH = 256 # Files a worker searches per task; smaller batches spend more time on messaging
+FIND_IN_FILES_MAX_FILE_SIZE = 16 * 1024 * 1024 # Larger files are skipped
+FIND_IN_FILES_MAX_MATCHES = 10000 # A search stops after this many matches
+FIND_IN_FILES_LINE_CHARS = 240 # Characters of a matching line kept for the results list
+FIND_REGEX_CACHE_SIZE = 64 # Compiled search patterns kept
+
+# Builds the regex for a search from the find bar's options. Compiled patterns are cached, as the
+# find bar compiles its query again whenever typing pauses or an option changes.
+@functools.lru_cache(maxsize=FIND_REGEX_CACHE_SIZE)
+def compile_search_pattern(text, regex=False, case_sensitive=False, whole_words=False):
+    pattern = text if regex else re.escape(text)
+    if whole_words:
+        pattern = rf'\b(?:{pattern})\b'
+    return re.compile(pattern, 0 if case_sensitive else re.IGNORECASE)
+
+# Reads a directory's .gitignore as (directory, regex, directories only, anchored) rules. Globs, a
+# leading or inner slash (anchored to the directory) and a trailing slash (directories only) are
+# understood; negated (!) patterns are skipped.
+def read_ignore_rules(directory):
+    try:
+        with open(os.path.join(directory, '.gitignore'), encoding='utf-8', errors='replace') as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return []
+    rules = []
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith('#') or line.startswith('!'):
+            continue
+        dir_only = line.endswith('/')
+        line = line.rstrip('/')
+        anchored = '/' in line
+        line = line.lstrip('/')
+        if line:
+            rules.append((directory, re.compile(fnmatch.translate(line)), dir_only, anchored))
+    return rules
+
+# True if a workspace entry matches one of the ignore rules in force in its directory.
+def is_ignored(rules, path, name, is_dir):
+    for directory, regex, dir_only, anchored in rules:
+        if dir_only and not is_dir:
+            continue
+        subject = path[len(directory) + 1:].replace(os.sep, '/') if anchored else name
+        if regex.match(subject):
+            return True
+    return False
+
+# Yields the files under root that find-in-files searches, in name order: not hidden, not in
+# the IDE's own WORKSPACE_SKIP_DIRS and not ignored by any .gitignore on the way down. 'rules' are the ignore
+# rules in force above root; if 'directories' is a list, every directory walked is added to it.
+def iter_search_files(root, rules=(), directories=None):
+    pending = [(root, list(rules))] # (directory, ignore rules inherited from above)
+    while pending:
+        directory, rules = pending.pop()
+        try:
+            with os.scandir(directory) as it:
+                entries = sorted(it, key=lambda entry: entry.name)
+        except OSError:
+            continue
+        if directories is not None:
+            directories.append(directory)
+        if any(entry.name == '.gitignore' for entry in entries):
+            rules = rules + read_ignore_rules(directory)
+        subdirectories = []
+        for entry in entries:
+            try:
+                is_dir = entry.is_dir(follow_symlinks=False)
+            except OSError:
+                continue
+            if entry.name.startswith('.') or (is_dir and entry.name in WORKSPACE_SKIP_DIRS):
+                continue
+            if rules and is_ignored(rules, entry.path, entry.name, is_dir):
+                continue
+            if is_dir:
+                subdirectories.append(entry.path)
+            elif entry.is_file():
+                yield entry.path
+        pending.extend((subdirectory, rules) for subdirectory in reversed(subdirectories))
+
+# Returns the ignore rules in force above a directory of the workspace, or None if the directory
+# itself is hidden, skipped or ignored.
+def inherited_ignore_rules(root, directory):
+    if directory == root:
+        return []
+    rules = []
+    path = root
+    for part in directory[len(os.path.join(root, '')):].split(os.sep):
+        rules = rules + read_ignore_rules(path)
+        path = os.path.join(path, part)
+        if part.startswith('.') or part in WORKSPACE_SKIP_DIRS or (rules and is_ignored(rules, path, part, True)):
+            return None
+    return rules
+
+WORKSPACE_WATCH_LIMIT = 4096 # Directories watched for changes; the rest are only seen by the rescans
+
+# WorkspaceWatcher tells the workspace indexes about files added to, removed from or renamed in the
+# workspace's directories, with one QFileSystemWatcher for all of them. The indexes hand it the
+# directories they walk.
+class WorkspaceWatcher(QObject):
+    directory_changed = pyqtSignal(str)
+
+    def __init__(self):
+        super().__init__()
+        self._root = None
+        self._watched = set()
+        self._watcher = QFileSystemWatcher(self)
+        self._watcher.directoryChanged.connect(self._on_directory_changed)
+
+    # Drops the watches of the previous workspace.
+    def set_root(self, root):
+        if root == self._root:
+            return
+        self._root = root
+        if self._watched:
+            self._watcher.removePaths(list(self._watched))
+            self._watched.clear()
+
+    def watch(self, directories):
+        prefix = os.path.join(self._root or '', '')
+        room = WORKSPACE_WATCH_LIMIT - len(self._watched)
+        added = [d for d in directories if d not in self._watched and os.path.join(d, '').startswith(prefix)][:max(0, room)]
+        if added:
+            self._watcher.addPaths(added)
+            self._watched.update(added)
+
+    def _on_directory_changed(self, path):
+        if not os.path.isdir(path):
+            self._watched.discard(path) # The watcher drops deleted directories by itself
+        self.directory_changed.emit(path)
+
+_workspace_watcher = None
+
+def get_workspace_watcher():
+    global _workspace_watcher
+    if _workspace_watcher is None:
+        _workspace_watcher = WorkspaceWatcher()
+    return _workspace_watcher
+
+_search_generation = None # In search worker processes: id of the newest search, shared with the IDE
+
+def _init_search_worker(generation):
+    global _search_generation
+    _search_generation = generation
+
+# Searches a batch of files in a worker process. Returns (files searched, matches), each match being
+# (path, line, column, length, line text). Binary files, with a NUL byte near the start, are skipped.
+# Gives up on the rest of the batch once a newer search has started.
+def search_files(search_id, paths, regex):
+    matches = []
+    searched = 0
+    for path in paths:
+        if _search_generation is not None and _search_generation.value != search_id:
+            break
+        searched += 1
+        try:
+            with open(path, 'rb') as f:
+                data = f.read(FIND_IN_FILES_MAX_FILE_SIZE + 1)
+        except OSError:
+            continue
+        if len(data) > FIND_IN_FILES_MAX_FILE_SIZE or b'\0' in data[:8192]:
+            continue
+        text = data.decode('utf-8', errors='replace')
+        line, counted = 1, 0
+        for match in regex.finditer(text):
+            start = match.start()
+            if match.end() == start:
+                continue # Empty matches (of patterns like 'a*') point at nothing
+            line += text.count('\n', counted, start)
+            counted = start
+            line_start = text.rfind('\n', 0, start) + 1
+            line_end = text.find('\n', start)
+            line_text = text[line_start:line_end if line_end >= 0 else len(text)].rstrip('\r')
+            matches.append((path, line, start - line_start, match.end() - start, line_text[:FIND_IN_FILES_LINE_CHARS]))
+            if len(matches) >= FIND_IN_FILES_MAX_MATCHES:
+                return searched, matches
+    return searched, matches
+
+_search_pool = None # (process pool, shared id of the newest search)
+
+# Starts a pool of search worker processes; returns (pool, shared id of the newest search). Workers
+# are spawned, not forked, since forking a process that runs Qt threads is unsafe.
+def start_search_pool():
+    context = multiprocessing.get_context('spawn')
+    generation = context.Value('i', 0)
+    pool = context.Pool(FIND_IN_FILES_WORKERS, _init_search_worker, (generation,))
+    app = QApplication.instance()
+    if app is not None:
+        app.aboutToQuit.connect(pool.terminate)
+    return pool, generation
+
+# Returns the shared find-in-files process pool, starting it on first use.
+def get_search_pool():
+    global _search_pool
+    if _search_pool is None:
+        _search_pool = start_search_pool()
+    return _search_pool
+
+TRIGRAM_INDEX_DIR = os.path.join(CACHE_DIR, "trigram_index") # One SQLite database per workspace
+TRIGRAM_INDEX_VERSION = 1 # Databases of another layout version are rebuilt
+TRIGRAM_FLUSH_POSTINGS = 4000000 # (trigram, file) pairs held in memory before they are written as a segment
+TRIGRAM_RESCAN_SECONDS = 60.0 # How often the whole workspace is checked for edits no notification reported
+TRIGRAM_QUERY_TRIGRAMS = 6 # Rarest trigrams of a literal looked up; more rarely narrow the search further
+TRIGRAM_QUERY_CHUNK = 500 # File ids per query when looking up the paths of the candidates
+
+_REPEAT_OPS = {sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT, getattr(sre_parse, 'POSSESSIVE_REPEAT', None)}
+
+# Returns the path of the trigram index database of a workspace root.
+def trigram_index_path(root):
+    return os.path.join(TRIGRAM_INDEX_DIR, hashlib.sha1(root.encode('utf-8')).hexdigest()[:16] + ".sqlite")
+
+# Packs ascending file ids as zlib-compressed deltas, one or two bytes an id on most posting lists.
+def pack_file_ids(ids):
+    return zlib.compress(array('I', map(operator.sub, ids, itertools.chain((0,), ids))).tobytes(), 1)
+
+def unpack_file_ids(data):
+    deltas = array('I')
+    deltas.frombytes(zlib.decompress(data))
+    return itertools.accumulate(deltas)
+
+# Returns what any match of a parsed regex must contain, as ('and', parts) or ('or', parts), each
+# part being a literal string or another such tuple. An 'and' without parts requires nothing.
+def regex_requirements(items):
+    parts, run = [], []
+    for op, av in items:
+        if op == sre_parse.LITERAL:
+            run.append(chr(av))
+            continue
+        if op == sre_parse.AT:
+            continue # Anchors like \b match no characters, so the literals around them still touch
+        if run:
+            parts.append(''.join(run))
+            run = []
+        if op == sre_parse.SUBPATTERN:
+            parts.append(regex_requirements(av[-1]))
+        elif op in _REPEAT_OPS and av[0] >= 1:
+            parts.append(regex_requirements(av[2]))
+        elif op == getattr(sre_parse, 'ATOMIC_GROUP', None):
+            parts.append(regex_requirements(av))
+        elif op == sre_parse.BRANCH:
+            parts.append(('or', [regex_requirements(branch) for branch in av[1]]))
+    if run:
+        parts.append(''.join(run))
+    return ('and', parts)
+
+# ASCII letters that a case-insensitive regex also matches with non-ASCII characters: 'i' with the
+# dotted capital I and the dotless i, 'k' with the Kelvin sign and 's' with the long s.
+FOLDED_ASCII_LETTERS = frozenset(b'iks')
+
+# Returns the trigrams of a literal as the index stores them: UTF-8 bytes with ASCII letters
+# lowercased. Ignoring case, only trigrams of ASCII bytes are kept, since other letters fold
+# differently, and not those with a letter in FOLDED_ASCII_LETTERS: the index only lowercases
+# ASCII, so a file spelling that letter with its non-ASCII fold lacks the trigram.
+def literal_trigrams(text, ignore_case):
+    data = text.encode('utf-8').lower()
+    grams = {data[i:i + 3] for i in range(len(data) - 2)}
+    if ignore_case:
+        grams = {gram for gram in grams if gram.isascii() and FOLDED_ASCII_LETTERS.isdisjoint(gram)}
+    return grams
+
+# Sort key putting workspace-relative paths in the order iter_search_files yields them: the files
+# of a directory first, then its subdirectories, each in name order.
+def walk_order_key(relative_path):
+    parts = relative_path.split(os.sep)
+    return [(1, part) for part in parts[:-1]] + [(0, parts[-1])]
+
+# TrigramIndex keeps an on-disk index of the three-byte sequences in every workspace file, so find
+# in files only has to read the files that can contain a match. Posting lists live in an SQLite
+# database under TRIGRAM_INDEX_DIR and are written in segments: the first crawl writes a few large
+# ones, each later batch of changes a small one, and segments are merged like the digits of a
+# binary counter, so no update rewrites the whole index. A changed file gets a new id rather than
+# having its old postings removed; the stale ids name no file and are dropped by the next merge.
+# Directory change notifications, update_file calls for saved files and a periodic rescan for
+# edits in place keep the index current.
+class TrigramIndex(WorkspaceIndexThread):
+    rescan_seconds = TRIGRAM_RESCAN_SECONDS
+    index_name = "trigram index"
+
+    def __init__(self):
+        super().__init__()
+        self._ready_root = None # Root whose index is complete, once the first crawl is done
+        self._connection = None # Only touched by the worker thread, like the buffer
+        self._buffer = defaultdict(list) # trigram -> ascending ids of the files indexed since the last flush
+        self._buffered = 0
+
+    # Indexes a new workspace directory, reusing its database from an earlier session if there is one.
+    def set_root(self, root):
+        with self._condition:
+            if os.path.abspath(root) != self._root:
+                self._ready_root = None # Before the worker can finish crawling the new root
+        super().set_root(root)
+
+    # Returns the paths of the files under root that may contain a match of regex, in walk order, or
+    # None when the index cannot narrow the search: it is still being built or is catching up with
+    # changes, or the pattern has no literal of three characters every match must contain. Safe to
+    # call from any thread.
+    def candidates(self, root, regex):
+        root = os.path.abspath(root)
+        with self._condition:
+            if (root != self._ready_root or self._root_changed or self._updating
+                    or self._dirty_paths or self._dirty_directories):
+                return None
+        try:
+            requirements = regex_requirements(sre_parse.parse(regex.pattern, regex.flags))
+        except Exception:
+            return None
+        try:
+            connection = sqlite3.connect(trigram_index_path(root), isolation_level=None)
+        except sqlite3.Error as e:
+            print(f"Error opening trigram index of {root}: {e}")
+            return None
+        try:
+            connection.execute("BEGIN") # One snapshot, even if the worker commits meanwhile
+            segments = [row[0] for row in connection.execute("SELECT id FROM segments")]
+            ids = self._matching_ids(connection, segments, requirements, bool(regex.flags & re.IGNORECASE), {})
+            if ids is None:
+                return None
+            ids = list(ids)
+            paths = []
+            for i in range(0, len(ids), TRIGRAM_QUERY_CHUNK):
+                chunk = ids[i:i + TRIGRAM_QUERY_CHUNK]
+                rows = connection.execute(f"SELECT path FROM files WHERE id IN ({','.join('?' * len(chunk))})", chunk)
+                paths.extend(row[0] for row in rows)
+        except sqlite3.Error as e:
+            print(f"Error reading trigram index of {root}: {e}")
+            return None
+        finally:
+            connection.close()
+        paths.sort(key=walk_order_key)
+        return [os.path.join(root, path) for path in paths]
+
+    # Returns the set of ids of the files meeting the requirements, or None if they rule out none.
+    def _matching_ids(self, connection, segments, requirements, ignore_case, postings):
+        kind, parts = requirements
+        results = []
+        for part in parts:
+            if isinstance(part, str):
+                ids = self._literal_ids(connection, segments, part, ignore_case, postings)
+            else:
+                ids = self._matching_ids(connection, segments, part, ignore_case, postings)
+            if ids is None and kind == 'or':
+                return None
+            if ids is not None:
+                results.append(ids)
+        if not results:
+            return None
+        if kind == 'or':
+            return set().union(*results)
+        results.sort(key=len)
+        return results[0].intersection(*results[1:])
+
+    def _literal_ids(self, connection, segments, text, ignore_case, postings):
+        grams = literal_trigrams(text, ignore_case)
+        if not grams:
+            return None
+        if not segments:
+            return set() # Nothing indexed has any trigram
+        marks = ','.join('?' * len(segments))
+        sizes = {}
+        for gram in grams:
+            row = connection.execute(f"SELECT SUM(LENGTH(ids)) FROM postings WHERE segment IN ({marks}) AND trigram = ?",
+                                     (*segments, gram)).fetchone()
+            if not row[0]:
+                return set() # No file has this trigram
+            sizes[gram] = row[0]
+        ids = None
+        for gram in sorted(grams, key=sizes.get)[:TRIGRAM_QUERY_TRIGRAMS]:
+            if gram not in postings:
+                gram_ids = set()
+                for (data,) in connection.execute(f"SELECT ids FROM postings WHERE segment IN ({marks}) AND trigram = ?",
+                                                  (*segments, gram)):
+                    gram_ids.update(unpack_file_ids(data))
+                postings[gram] = gram_ids
+            ids = postings[gram] if ids is None else ids & postings[gram]
+            if not ids:
+                break
+        return ids
+
+    def _updated(self, root, crawled):
+        if root is None:
+            return
+        self._flush()
+        if crawled:
+            with self._condition:
+                if not self._root_changed:
+                    self._ready_root = root
+
+    def _close(self):
+        if self._connection is not None:
+            self._connection.close()
+
+    # Opens the database of a new root.
+    def _reset(self, root):
+        if self._connection is not None:
+            self._connection.close()
+        self._buffer.clear()
+        self._buffered = 0
+        os.makedirs(TRIGRAM_INDEX_DIR, exist_ok=True)
+        self._connection = sqlite3.connect(trigram_index_path(root))
+        self._connection.execute("PRAGMA journal_mode = WAL") # Searches read while the index is written
+        self._connection.execute("PRAGMA synchronous = NORMAL")
+        if self._connection.execute("PRAGMA user_version").fetchone()[0] != TRIGRAM_INDEX_VERSION:
+            self._connection.executescript(f"""
+                DROP TABLE IF EXISTS files;
+                DROP TABLE IF EXISTS segments;
+                DROP TABLE IF EXISTS postings;
+                CREATE TABLE files (id INTEGER PRIMARY KEY AUTOINCREMENT, path TEXT UNIQUE NOT NULL,
+                                    mtime INTEGER, size INTEGER);
+                CREATE TABLE segments (id INTEGER PRIMARY KEY, postings INTEGER);
+                CREATE TABLE postings (segment INTEGER, trigram BLOB, ids BLOB,
+                                       PRIMARY KEY (segment, trigram)) WITHOUT ROWID;
+                PRAGMA user_version = {TRIGRAM_INDEX_VERSION};
+            """)
+
+    # Indexes the new and changed files under directory and drops the missing ones.
+    def _sync(self, root, directory, rules):
+        prefix_length = len(os.path.join(root, ''))
+        if directory == root:
+            rows = self._connection.execute("SELECT path, id, mtime, size FROM files")
+        else:
+            prefix = os.path.join(directory[prefix_length:], '')
+            rows = self._connection.execute("SELECT path, id, mtime, size FROM files WHERE path >= ? AND path < ?",
+                                            (prefix, prefix[:-1] + chr(ord(os.sep) + 1)))
+        known = {path: (file_id, mtime, size) for path, file_id, mtime, size in rows}
+        directories = []
+        for path in self._walk(directory, rules, directories):
+            if self._interrupted():
+                return False
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entry = known.pop(path[prefix_length:], None)
+            if entry is None or entry[1:] != (stat.st_mtime_ns, stat.st_size):
+                self._index_file(path, path[prefix_length:], stat, entry[0] if entry else None)
+        self._connection.executemany("DELETE FROM files WHERE id = ?", [(entry[0],) for entry in known.values()])
+        self.directories_walked.emit(directories)
+        return True
+
+    # Re-reads saved files of the workspace.
+    def _index_paths(self, root, paths):
+        directories = set()
+        if root is None:
+            return directories
+        prefix = os.path.join(root, '')
+        for path in paths:
+            if not path.startswith(prefix):
+                continue
+            row = self._connection.execute("SELECT id, mtime, size FROM files WHERE path = ?", (path[len(prefix):],)).fetchone()
+            if row is None:
+                directories.add(os.path.dirname(path)) # A new file: whether it is searched depends on its directory
+                continue
+            try:
+                stat = os.stat(path)
+            except OSError:
+                self._connection.execute("DELETE FROM files WHERE id = ?", (row[0],))
+                continue
+            if row[1:] != (stat.st_mtime_ns, stat.st_size):
+                self._index_file(path, path[len(prefix):], stat, row[0])
+        return directories
+
+    def _index_file(self, path, relative_path, stat, old_id):
+        if old_id is not None:
+            self._connection.execute("DELETE FROM files WHERE id = ?", (old_id,))
+        try:
+            with open(path, 'rb') as f:
+                data = f.read(FIND_IN_FILES_MAX_FILE_SIZE + 1)
+        except OSError:
+            return # Tried again by the next sync
+        file_id = self._connection.execute("INSERT INTO files (path, mtime, size) VALUES (?, ?, ?)",
+                                           (relative_path, stat.st_mtime_ns, stat.st_size)).lastrowid
+        if len(data) > FIND_IN_FILES_MAX_FILE_SIZE or b'\0' in data[:8192]:
+            return # search_files skips these files, so they need no postings
+        data = data.lower()
+        grams = {data[i:i + 3] for i in range(len(data) - 2)}
+        for gram in grams:
+            self._buffer[gram].append(file_id)
+        self._buffered += len(grams)
+        if self._buffered >= TRIGRAM_FLUSH_POSTINGS:
+            self._flush()
+
+    # Writes the buffered postings as a new segment, then merges the newest two segments for as long
+    # as the newer is at least as large as the older.
+    def _flush(self):
+        if self._buffer:
+            segment = self._connection.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM segments").fetchone()[0]
+            self._connection.executemany("INSERT INTO postings VALUES (?, ?, ?)",
+                                         ((segment, gram, pack_file_ids(ids)) for gram, ids in self._buffer.items()))
+            self._connection.execute("INSERT INTO segments VALUES (?, ?)", (segment, self._buffered))
+            self._buffer.clear()
+            self._buffered = 0
+            segments = self._connection.execute("SELECT id, postings FROM segments ORDER BY id").fetchall()
+            while len(segments) >= 2 and segments[-1][1] >= segments[-2][1]:
+                segments[-2:] = [self._merge(segments[-2][0], segments[-1][0])]
+        self._connection.commit()
+
+    # Merges a segment into the one before it, dropping the ids of files that changed or went away.
+    # Returns (segment, postings) of the result.
+    def _merge(self, older, newer):
+        live = {row[0] for row in self._connection.execute("SELECT id FROM files")}
+        query = "SELECT trigram, ids FROM postings WHERE segment = ? ORDER BY trigram"
+        rows = heapq.merge(self._connection.execute(query, (older,)), self._connection.execute(query, (newer,)),
+                           key=operator.itemgetter(0))
+        merged = []
+        count = 0
+        for gram, group in itertools.groupby(rows, key=operator.itemgetter(0)):
+            ids = [file_id for _, data in group for file_id in unpack_file_ids(data) if file_id in live]
+            if ids:
+                merged.append((older, gram, pack_file_ids(ids)))
+                count += len(ids)
+        self._connection.execute("DELETE FROM postings WHERE segment IN (?, ?)", (older, newer))
+        self._connection.execute("DELETE FROM segments WHERE id = ?", (newer,))
+        self._connection.executemany("INSERT INTO postings VALUES (?, ?, ?)", merged)
+        self._connection.execute("UPDATE segments SET postings = ? WHERE id = ?", (count, older))
+        return (older, count)
+
+_trigram_index = None
+
+# Returns the shared TrigramIndex, starting it on first use.
+def get_trigram_index():
+    global _trigram_index
+    if _trigram_index is None:
+        _trigram_index = TrigramIndex()
+        app = QApplication.instance()
+        if app is not None:
+            app.aboutToQuit.connect(_trigram_index.stop)
+        _trigram_index.start()
+    return _trigram_index
+
+FILE_INDEX_PUBLISH_FILES = 10000 # Files crawled between the updates readers of the file index see
+FILE_INDEX_RESCAN_SECONDS = 60.0 # How often the whole workspace is checked for files no notification reported
+QUICK_OPEN_RESULT_LIMIT = 100 # Files listed by Quick Open
+QUICK_OPEN_SCORE_LIMIT = 400 # Most matching files scored per query, the likeliest to rank high first
+QUICK_OPEN_EXAMINE_LIMIT = 10000 # Most candidate files checked for a match per query
+QUICK_OPEN_NAME_BONUS = 20 # Added to the score when the whole query matches within the file name
+QUICK_OPEN_RECENT_FILES = 30 # The last this many files opened rank higher, the latest most
+
+_NONZERO_BYTE = re.compile(rb'[^\x00]')
+
+# Yields the positions of the set bits of a non-negative int, lowest first.
+def iter_bits(bits):
+    data = bits.to_bytes((bits.bit_length() + 7) // 8, 'little')
+    for match in _NONZERO_BYTE.finditer(data):
+        byte = data[match.start()]
+        while byte:
+            low = byte & -byte
+            yield match.start() * 8 + low.bit_length() - 1
+            byte ^= low
+
+# WorkspaceFileIndex keeps the paths of the files under the workspace root that find in files
+# searches, for Quick Open. A background crawl fills it, publishing what it has every few thousand
+# files; directory change notifications, update_file calls and a periodic rescan keep it current.
+# Every file gets an id, and for every character the index keeps bitsets (Python ints, one bit per
+# id) of the files whose paths contain it, whose names start with it and where it starts a word or
+# a path segment. A query ANDs the bitsets of its characters, so files that cannot match are never
+# looked at. Readers take the latest snapshot of the index; the worker publishes a new one after
+# each change rather than editing the one they may be using.
+class WorkspaceFileIndex(WorkspaceIndexThread):
+    rescan_seconds = FILE_INDEX_RESCAN_SECONDS
+    index_name = "file index"
+
+    def __init__(self):
+        super().__init__()
+        # Guarded by the condition: (root, paths by id (None once removed), word starts of the paths by id, bitset of live ids, {char: bitset} of paths
+        # containing it, {char: bitset} of names starting with it, {char: bitset} of word starts,
+        # sorted (lowercase name, id) list)
+        self._snapshot = (None, [], [], 0, {}, {}, {}, [])
+        self._clear(None) # The state below is only touched by the worker thread
+
+    # Returns up to 'limit' absolute paths of files matching 'query' (its characters in order,
+    # ignoring case and spaces), best first. A file scores on its name if the whole query matches
+    # there, and on its path relative to the root otherwise; recently opened files score higher.
+    # 'extra' paths, like those of open files outside the workspace, are ranked along, and so are the
+    # 'recent' ones: the recently opened files that still exist, worked out here if not given. Matches are
+    # scored in the order they are likeliest to rank high: names starting with the query, names
+    # starting with its first character, paths with a word starting with it, then the rest, up to
+    # QUICK_OPEN_SCORE_LIMIT of them. For a query with a path separator, the name is expected to
+    # match the part after the last one. Safe to call from any thread.
+    def match(self, query, limit=QUICK_OPEN_RESULT_LIMIT, extra=(), recent=None):
+        query = ''.join(query.split()).replace('/', os.sep)
+        key = query.lower()
+        if not key:
+            return []
+        with self._condition:
+            root, paths, path_starts, live, contains, name_starts, starts, names = self._snapshot
+        # Each character, then anything but the next one: unlike '.*?', this never backtracks. Lowering
+        # the paths is quicker than matching them with IGNORECASE.
+        pattern = re.escape(key[0]) + ''.join(f'[^{re.escape(ch)}]*{re.escape(ch)}' for ch in key[1:])
+        search = re.compile(pattern).search
+        prefix = os.path.join(root, '') if root else None
+        if recent is None:
+            recent = [path for path in recent_files.recent() if os.path.isfile(path)]
+        scores = {}
+        for path in itertools.chain(recent, extra):
+            if path not in scores:
+                relative = path[len(prefix):] if prefix and path.startswith(prefix) else path
+                score = self._score(query, key, relative, word_starts(relative)) if search(relative.lower()) else None
+                if score is not None:
+                    scores[path] = score + recent_files.bonus(path)
+
+        mask = live
+        for ch in set(key):
+            mask &= contains.get(ch, 0)
+        name_key = key[key.rfind(os.sep) + 1:] or key
+        named = name_starts.get(name_key[0], 0) & mask
+        worded = starts.get(name_key[0], 0) & mask & ~named
+        i = bisect.bisect_left(names, (name_key,))
+        prefixed = [] # Names starting with the whole query, which the bitsets cannot single out
+        while i < len(names) and len(prefixed) < QUICK_OPEN_SCORE_LIMIT and names[i][0].startswith(name_key):
+            prefixed.append(names[i][1])
+            i += 1
+        candidates = itertools.chain(prefixed, iter_bits(named), iter_bits(worded), iter_bits(mask & ~named & ~worded))
+        scored = 0
+        for file_id in itertools.islice(candidates, QUICK_OPEN_EXAMINE_LIMIT):
+            relative = paths[file_id]
+            if relative is None:
+                continue # Removed since
+            path = prefix + relative
+            if path in scores or not search(relative.lower()):
+                continue
+            score = self._score(query, key, relative, path_starts[file_id])
+            if score is not None:
+                scores[path] = score + recent_files.bonus(path)
+                scored += 1
+                if scored >= QUICK_OPEN_SCORE_LIMIT:
+                    break
+        return [path for path, _ in heapq.nsmallest(limit, scores.items(), key=lambda item: (-item[1], item[0]))]
+
+    # Scores a path relative to the root, given its word starts.
+    def _score(self, query, key, path, starts):
+        name_start = path.rfind(os.sep) + 1
+        lower = path.lower()
+        if os.sep not in key:
+            name = path[name_start:]
+            name_starts = [0] + [i - name_start for i in starts if i > name_start]
+            score = fuzzy_score(query, key, name, lower[name_start:], name_starts)
+            if score is not None:
+                return score + QUICK_OPEN_NAME_BONUS - name_start * 0.05 # Shallower files first
+        return fuzzy_score(query, key, path, lower, starts)
+
+    # Drops the previous root's files, so readers stop seeing them as the crawl starts.
+    def _reset(self, root):
+        self._clear(root)
+        self._publish()
+
+    def _updated(self, root, crawled):
+        if root is None:
+            return
+        if self._dead > len(self._ids) // 4 + FILE_INDEX_PUBLISH_FILES:
+            self._compact()
+        self._publish()
+
+    def _clear(self, root):
+        self._index_root = root
+        self._ids = {} # relative path -> id of the live files
+        self._paths = [] # id -> relative path, also of files since removed
+        self._path_starts = [] # id -> word starts of the path, as bytes unless the path is very long
+        self._live = 0
+        self._dead = 0
+        self._contains = {}
+        self._name_starts = {}
+        self._starts = {}
+        self._names = []
+
+    def _publish(self):
+        snapshot = (self._index_root, self._paths, self._path_starts, self._live, dict(self._contains),
+                    dict(self._name_starts), dict(self._starts), self._names)
+        with self._condition:
+            self._snapshot = snapshot
+
+    # Gives new ids to files, given by their paths relative to the root.
+    def _add(self, paths):
+        if not paths:
+            return
+        first = len(self._paths)
+        size = (len(paths) + 7) // 8
+        tables = ({}, {}, {}) # char -> bytearray bitset of the batch, for contains, name starts and word starts
+        names = []
+        path_starts = []
+        for n, path in enumerate(paths):
+            lower = path.lower()
+            name_start = path.rfind(os.sep) + 1
+            starts = word_starts(path)
+            path_starts.append(bytes(starts) if len(path) < 256 else tuple(starts))
+            chars = (set(lower), lower[name_start:name_start + 1], {lower[i] for i in starts if i < len(lower)})
+            byte, bit = n >> 3, 1 << (n & 7)
+            for table, table_chars in zip(tables, chars):
+                for ch in table_chars:
+                    bits = table.get(ch)
+                    if bits is None:
+                        bits = table[ch] = bytearray(size)
+                    bits[byte] |= bit
+            self._ids[path] = first + n
+            names.append((lower[name_start:], first + n))
+        # New lists rather than extended ones, since readers may hold the published ones
+        self._paths = self._paths + paths
+        self._path_starts = self._path_starts + path_starts
+        for table, batch in zip((self._contains, self._name_starts, self._starts), tables):
+            for ch, bits in batch.items():
+                table[ch] = table.get(ch, 0) | int.from_bytes(bits, 'little') << first
+        self._live |= ((1 << len(paths)) - 1) << first
+        names.sort()
+        self._names = sorted(self._names + names) # Two sorted runs: a merge, and a new list for readers
+
+    def _remove(self, paths):
+        ids = []
+        for path in paths:
+            file_id = self._ids.pop(path, None)
+            if file_id is not None:
+                ids.append(file_id)
+        if not ids:
+            return
+        removed = 0
+        self._paths = list(self._paths) # A copy, since readers may hold the published list
+        for file_id in ids:
+            removed |= 1 << file_id
+            self._paths[file_id] = None
+        self._dead += len(ids)
+        self._live &= ~removed
+
+    # Renumbers the live files, dropping the ids of removed ones from the bitsets.
+    def _compact(self):
+        paths = sorted(self._ids)
+        self._clear(self._index_root)
+        self._add(paths)
+
+    # Adds the new files under directory and drops the missing ones. Large crawls are published as
+    # they go.
+    def _sync(self, root, directory, rules):
+        prefix_length = len(os.path.join(root, ''))
+        prefix = '' if directory == root else os.path.join(directory[prefix_length:], '')
+        known = {path for path in self._ids if path.startswith(prefix)}
+        found = []
+        directories = []
+        for path in self._walk(directory, rules, directories):
+            if self._interrupted():
+                return False
+            path = path[prefix_length:]
+            if path in known:
+                known.discard(path)
+                continue
+            found.append(path)
+            if len(found) >= FILE_INDEX_PUBLISH_FILES:
+                self._add(found)
+                self._publish()
+                found = []
+        self._add(found)
+        self._remove(known)
+        self.directories_walked.emit(directories)
+        return True
+
+    # Drops saved paths that went away; new files are listed by syncing their directory.
+    def _index_paths(self, root, paths):
+        directories = set()
+        if root is None:
+            return directories
+        prefix = os.path.join(root, '')
+        for path in paths:
+            if not path.startswith(prefix):
+                continue
+            if path[len(prefix):] in self._ids:
+                if not os.path.isfile(path):
+                    self._remove([path[len(prefix):]])
+            elif os.path.isfile(path):
+                directories.add(os.path.dirname(path)) # Whether it is listed depends on its directory
+        return directories
+
+_file_index = None
+
+# Returns the shared WorkspaceFileIndex, starting it on first use.
+def get_file_index():
+    global _file_index
+    if _file_index is None:
+        _file_index = WorkspaceFileIndex()
+        app = QApplication.instance()
+        if app is not None:
+            app.aboutToQuit.connect(_file_index.stop)
+        _file_index.start()
+    return _file_index
+
+recent_files = CompletionHistory(QUICK_OPEN_RECENT_FILES) # Absolute paths of the files opened lately
+
+# FileSearch walks the workspace and feeds batches of its files to the search pool, emitting the
+# matches batch by batch in walk order. Given a TrigramIndex that can narrow the search, it takes
+# the candidate files from the index instead of walking. Only a few batches per worker are queued at
+# a time, so the walk never runs far ahead of the search and cancelling takes effect within a file.
+class FileSearch(QThread):
+    found = pyqtSignal(object) # Matches from one batch
+    progress = pyqtSignal(int, int) # Files searched, matches found
+
+    def __init__(self, root, regex, index=None):
+        super().__init__()
+        self.root = root
+        self.regex = regex
+        self.index = index
+        self.indexed = False # Only the index's candidate files were searched
+        self.pool, self.generation = get_search_pool()
+        with self.generation.get_lock():
+            self.generation.value += 1 # Workers drop whatever older search they are busy with
+            self.search_id = self.generation.value
+        self.searched = 0
+        self.match_count = 0
+        self.limit_reached = False
+        self._cancelled = False
+
+    def cancel(self):
+        self._cancelled = True
+        with self.generation.get_lock():
+            if self.generation.value == self.search_id:
+                self.generation.value += 1
+
+    def run(self):
+        paths = self.index.candidates(self.root, self.regex) if self.index is not None else None
+        self.indexed = paths is not None
+        pending = deque()
+        batch = []
+        for path in (iter_search_files(self.root) if paths is None else paths):
+            if self._cancelled:
+                return
+            batch.append(path)
+            if len(batch) < FIND_IN_FILES_BATCH:
+                continue
+            pending.append(self.pool.apply_async(search_files, (self.search_id, batch, self.regex)))
+            batch = []
+            while pending and (len(pending) > 4 * FIND_IN_FILES_WORKERS or pending[0].ready()):
+                self._collect(pending.popleft())
+        if batch:
+            pending.append(self.pool.apply_async(search_files, (self.search_id, batch, self.regex)))
+        while pending and not self._cancelled:
+            self._collect(pending.popleft())
+
+    def _collect(self, result):
+        try:
+            searched, matches = result.get()
+        except Exception as e:
+            print(f"Error searching files: {e}")
+            return
+        if self._cancelled:
+            return
+        matches = matches[:FIND_IN_FILES_MAX_MATCHES - self.match_count]
+        self.searched += searched
+        self.match_count += len(matches)
+        if matches:
+            self.found.emit(matches)
+        self.progress.emit(self.searched, self.match_count)
+        if self.match_count >= FIND_IN_FILES_MAX_MATCHES:
+            self.limit_reached = True
+            self.cancel()
+
+FIND_BACKGROUND_MIN_CHARS = 2 * 1024 * 1024 # Longer documents, and every regular expression, are searched by worker processes
+FIND_WINDOW_CHARS = 256 * 1024 # Characters of a document a worker searches per task
+FIND_FILE_WINDOW_BYTES = 1024 * 1024 # Bytes of a file in a LargeFileViewer a worker searches per task
+FIND_REGEX_TIMEOUT = 3.0 # Seconds a task may take before its pattern is given up on as pathological
+FIND_STUCK_SECONDS = 0.5 # A search cancelled while a task takes this long kills the worker rather than wait
+
+_ASTRAL_CHARACTER = re.compile('[\U00010000-\U0010FFFF]')
+
+# Qt counts text positions in UTF-16 code units, in which characters beyond the Basic Multilingual
+# Plane (most emoji) take two, while Python counts them as one. Offsets into a string convert
+# between the two with the ascending positions of those characters in it.
+def astral_positions(text):
+    return [match.start() for match in _ASTRAL_CHARACTER.finditer(text)]
+
+def utf16_offset(astral, offset):
+    return offset + bisect.bisect_left(astral, offset)
+
+def str_offset(astral, offset):
+    count = 0
+    while count < len(astral) and astral[count] + count < offset:
+        count += 1
+    return offset - count
+
+# Searches one window of whole lines of a document in a worker process, line by line like the find
+# bar. 'offset' is the window's position in the document. Returns the matches as lists of document
+# positions and lengths in UTF-16 units, or None once a newer search has started.
+def search_document_window(search_id, text, offset, regex):
+    if _search_generation is not None and _search_generation.value != search_id:
+        return None
+    starts, lengths = [], []
+    has_astral = _ASTRAL_CHARACTER.search(text) is not None
+    for line in text.split('\n'):
+        astral = astral_positions(line) if has_astral else None
+        for match in regex.finditer(line):
+            start, end = match.span()
+            if end > start: # Empty matches (of patterns like 'a*') point at nothing
+                if astral:
+                    start, end = utf16_offset(astral, start), utf16_offset(astral, end)
+                starts.append(offset + start)
+                lengths.append(end - start)
+        offset += len(line) + len(astral or ()) + 1
+    return starts, lengths
+
+# Searches bytes start to end, a window of whole lines, of a large file in a worker process, like
+# search_document_window: each line is decoded as UTF-8 and searched on its own. Returns the
+# matches as lists of byte offsets in the file and byte lengths, or None once a newer search has
+# started.
+def search_file_window(search_id, path, start, end, regex):
+    if _search_generation is not None and _search_generation.value != search_id:
+        return None
+    with open(path, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+    starts, lengths = [], []
+    offset = start
+    for raw in data.split(b'\n'):
+        line = raw.decode('utf-8', errors='surrogateescape') # Keeps invalid bytes, so offsets map back
+        for match in regex.finditer(line):
+            match_start, match_end = match.span()
+            if match_end > match_start: # Empty matches (of patterns like 'a*') point at nothing
+                if not raw.isascii():
+                    match_start = len(line[:match_start].encode('utf-8', errors='surrogateescape'))
+                    match_end = match_start + len(match.group().encode('utf-8', errors='surrogateescape'))
+                starts.append(offset + match_start)
+                lengths.append(match_end - match_start)
+        offset += len(raw) + 1
+    return starts, lengths
+
+_document_search_pool = None # (process pool, shared id of the newest search) of the find bar
+
+# Returns the find bar's process pool, starting it on first use. It is kept apart from the find in
+# files pool so that neither search cancels the other, and so that a worker stuck in a pattern can
+# be killed with its pool.
+def get_document_search_pool():
+    global _document_search_pool
+    if _document_search_pool is None:
+        _document_search_pool = start_search_pool()
+    return _document_search_pool
+
+# Terminates a find bar pool with a stuck worker; the next search starts a fresh one.
+def discard_document_search_pool(pool):
+    global _document_search_pool
+    if _document_search_pool is not None and _document_search_pool[0] is pool:
+        _document_search_pool = None
+    pool.terminate()
+
+# DocumentSearch finds a pattern in a snapshot of a document for the find bar: the snapshot is cut
+# into windows of whole lines, searched by worker processes a few at a time, and the matches come
+# back in document order as positions, each window followed by how far the search has got. Both are
+# in UTF-16 units, like the document's own positions. A
+# regular expression that backtracks catastrophically cannot be interrupted inside re, so a task
+# running past FIND_REGEX_TIMEOUT has its pool terminated and the search reports timed_out.
+class DocumentSearch(QThread):
+    found = pyqtSignal(object, object) # Starts and lengths of the matches in one window
+    progress = pyqtSignal(int) # Document position the search has got up to
+    timed_out = pyqtSignal()
+
+    def __init__(self, text, regex):
+        super().__init__()
+        self.text = text
+        self.regex = regex
+        self.pool, self.generation = get_document_search_pool()
+        with self.generation.get_lock():
+            self.generation.value += 1 # Workers drop whatever older search they are busy with
+            self.search_id = self.generation.value
+        self._cancelled = False
+
+    def cancel(self):
+        self._cancelled = True
+        with self.generation.get_lock():
+            if self.generation.value == self.search_id:
+                self.generation.value += 1
+
+    # Yields each window's task as (position searched up to once it is done, function, arguments).
+    def _tasks(self):
+        text = self.text
+        position = 0
+        document_position = 0 # Of the window at position, in UTF-16 units
+        while position <= len(text):
+            end = text.find('\n', position + FIND_WINDOW_CHARS)
+            end = len(text) if end < 0 else end
+            window = text[position:end]
+            document_end = document_position + len(window) + len(_ASTRAL_CHARACTER.findall(window))
+            yield document_end, search_document_window, (self.search_id, window, document_position, self.regex)
+            position, document_position = end + 1, document_end + 1
+
+    def run(self):
+        tasks = self._tasks()
+        task = next(tasks, None)
+        pending = deque() # (position searched up to once the window is done, result)
+        while (task is not None or pending) and not self._cancelled:
+            while task is not None and len(pending) < 2 * FIND_IN_FILES_WORKERS:
+                end, function, arguments = task
+                pending.append((end, self.pool.apply_async(function, arguments)))
+                task = next(tasks, None)
+            end, result = pending.popleft()
+            matches = self._wait(result)
+            if matches is None:
+                return
+            if matches[0]:
+                self.found.emit(*matches)
+            self.progress.emit(end)
+
+    # Waits for the matches of a window; None if the search was cancelled, timed out or failed.
+    def _wait(self, result):
+        start = time.monotonic()
+        while not self._cancelled:
+            try:
+                return result.get(0.05)
+            except multiprocessing.TimeoutError:
+                if time.monotonic() - start > FIND_REGEX_TIMEOUT:
+                    discard_document_search_pool(self.pool)
+                    self.timed_out.emit()
+                    return None
+            except Exception as e:
+                print(f"Error searching document: {e}")
+                return None
+        if not result.ready() and time.monotonic() - start > FIND_STUCK_SECONDS:
+            discard_document_search_pool(self.pool) # Newer searches would queue behind the stuck task
+        return None
+
+# LargeFileSearch finds a pattern in the file of a LargeFileViewer like DocumentSearch does in a
+# document, with the same workers and timeout. Windows of whole lines are cut from a memory map of
+# the file and each worker reads its own window, so no text is copied between processes. Positions
+# are byte offsets in the file.
+class LargeFileSearch(DocumentSearch):
+    def __init__(self, file_path, regex):
+        super().__init__(None, regex)
+        self.file_path = file_path
+
+    def _tasks(self):
+        try:
+            with open(self.file_path, 'rb') as f:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError) as e:
+            print(f"Error searching {self.file_path}: {e}")
+            return
+        with data:
+            position = 0
+            while position <= len(data):
+                end = data.find(b'\n', position + FIND_FILE_WINDOW_BYTES)
+                end = len(data) if end < 0 else end
+                yield end, search_file_window, (self.search_id, self.file_path, position, end, self.regex)
+                position = end + 1
+
+FIND_MATCH_SLICE = 0.008 # Time budget of one slice of collecting matches, in seconds
+FIND_RESCAN_DEBOUNCE_MS = 150 # Matches are collected again once typing in the bar or the editor pauses
+
+# FindBar finds text in the active editor from a bar under the editors. It counts the matches and
+# highlights those in the viewport through extra selections. Matches are collected block by block
+# in short time slices from the event loop, so the count grows without freezing the window; long
+# documents and regular expressions are searched by a DocumentSearch instead, from a snapshot of
+# the text, so that a slow pattern only holds up a worker and times out. Files in a LargeFileViewer
+# are searched by a LargeFileSearch the same way, and their matches are byte offsets. Replace All
+# works from the collected matches, once they are all in, and edits every matching block inside one
+# edit block: a single undo step, and a single layout pass when the block ends.
+class FindBar(QWidget):
+    def __init__(self, ide_instance, parent=None):
+        super().__init__(parent)
+        self.ide_instance = ide_instance
+        self.editor = None # CodeEditor or LargeFileViewer searched
+        self.regex = None # Pattern the matches below are collected for
+        self.starts = [] # Document positions of the matches found so far, ascending
+        self.lengths = []
+        self._scan_block = None # Next block to search in the event loop, or None
+        self.search = None # DocumentSearch collecting the matches in worker processes, or None
+        self._searched_to = 0 # Document position the matches are complete up to
+        self._timed_out = False # The pattern was too slow to search the whole document
+        self._snapshot = None # ((revision, characters), text) of the document searched last
+        self._revision = -1 # Document revision the matches were collected for
+        self._pending_jump = None # True or False: find next or previous once enough matches are in
+        self._pending_replace_all = False # Replace All once every match is in
+        self._replacing = False
+        self._match_color = QColor(THEMES["dark"]["find_match_bg"])
+        self._current_color = QColor(THEMES["dark"]["find_current_bg"])
+        self.layout = QGridLayout(self)
+        self.layout.setContentsMargins(0, 0, 0, 0)
+
+        self.find_input = QLineEdit()
+        self.find_input.setPlaceholderText("Find...")
+        self.find_input.returnPressed.connect(self.find_next)
+        self.layout.addWidget(self.find_input, 0, 0)
+        self.find_prev_button = QPushButton("Previous")
+        self.find_prev_button.clicked.connect(self.find_prev)
+        self.layout.addWidget(self.find_prev_button, 0, 1)
+        self.find_next_button = QPushButton("Next")
+        self.find_next_button.clicked.connect(self.find_next)
+        self.layout.addWidget(self.find_next_button, 0, 2)
+        self.count_label = QLabel("")
+        self.count_label.setMinimumWidth(QFontMetrics(self.font()).width("999999 of 999999+"))
+        self.layout.addWidget(self.count_label, 0, 3)
+
+        self.options_layout = QHBoxLayout()
+        self.case_sensitive_checkbox = QCheckBox("Case sensitive")
+        self.options_layout.addWidget(self.case_sensitive_checkbox)
+        self.whole_word_checkbox = QCheckBox("Whole words only")
+        self.options_layout.addWidget(self.whole_word_checkbox)
+        self.regex_checkbox = QCheckBox("Regular expression")
+        self.options_layout.addWidget(self.regex_checkbox)
+        self.layout.addLayout(self.options_layout, 0, 4)
+        self.close_button = QPushButton("Close")
+        self.close_button.clicked.connect(self.close_bar)
+        self.layout.addWidget(self.close_button, 0, 5)
+
+        self.replace_input = QLineEdit()
+        self.replace_input.setPlaceholderText("Replace with...")
+        self.replace_input.returnPressed.connect(self.replace)
+        self.layout.addWidget(self.replace_input, 1, 0)
+        self.replace_button = QPushButton("Replace")
+        self.replace_button.clicked.connect(self.replace)
+        self.layout.addWidget(self.replace_button, 1, 1)
+        self.replace_all_button = QPushButton("Replace All")
+        self.replace_all_button.clicked.connect(self.replace_all)
+        self.layout.addWidget(self.replace_all_button, 1, 2)
+
+        self._scan_timer = QTimer(self)
+        self._scan_timer.timeout.connect(self._scan_next_slice)
+        self._rescan_timer = QTimer(self)
+        self._rescan_timer.setSingleShot(True)
+        self._rescan_timer.setInterval(FIND_RESCAN_DEBOUNCE_MS)
+        self._rescan_timer.timeout.connect(self.restart_scan)
+        self.find_input.textChanged.connect(self._rescan_timer.start)
+        for checkbox in (self.case_sensitive_checkbox, self.whole_word_checkbox, self.regex_checkbox):
+            checkbox.toggled.connect(self.restart_scan)
+        self.find_input.installEventFilter(self)
+        self.replace_input.installEventFilter(self)
+        QApplication.instance().aboutToQuit.connect(self._stop_scan)
+
+    # Searches another editor, or none. The old one loses its highlights.
     def set_editor(self, editor):
+        if editor is self.editor:
+            return
+        if isinstance(self.editor, CodeEditor):
+            try:
+                self.editor.document().contentsChange.disconnect(self._on_contents_change)
+                self.editor.verticalScrollBar().valueChanged.disconnect(self._update_highlights)
+                self.editor.verticalScrollBar().rangeChanged.disconnect(self._update_highlights)
+                self.editor.cursorPositionChanged.disconnect(self._on_cursor_moved)
+                self.editor.setExtraSelections([])
+            except (TypeError, RuntimeError):
+                pass # Already gone with its tab
         self.editor = editor
+        if isinstance(editor, CodeEditor):
+            editor.document().contentsChange.connect(self._on_contents_change)
+            editor.verticalScrollBar().valueChanged.connect(self._update_highlights)
+            editor.verticalScrollBar().rangeChanged.connect(self._update_highlights)
+            editor.cursorPositionChanged.connect(self._on_cursor_moved)
+        self._snapshot = None
+        self.restart_scan()
+
+    # Shows the bar with the query field focused, optionally filled in.
+    def show_query(self, text=""):
+        self.show()
+        if text:
+            self.find_input.setText(text)
+        self.restart_scan()
+        self.find_input.setFocus()
+        self.find_input.selectAll()
+
+    def close_bar(self):
+        self.hide()
+        self.restart_scan() # Hidden, it only stops and clears the highlights
+        if self.editor is not None:
+            self.editor.setFocus()
 
-    # Determines the find flags based on checkbox states.
-    def _get_find_flags(self):
-        flags = QTextDocument.FindFlags()
-        if self.case_sensitive_checkbox.isChecked():
-            flags |= QTextDocument.FindCaseSensitively
-        if self.whole_word_checkbox.isChecked():
-            flags |= QTextDocument.FindWholeWords
-        return flags
-
-    # Finds the next occurrence of the text.
-    def _find_next(self):
-        if self.editor:
-            text_to_find = self.find_input.text()
-            if text_to_find:
-                # Ensure cursor is at the beginning of the selection for 'find next'
-                cursor = self.editor.textCursor()
-                if cursor.hasSelection():
-                    cursor.setPosition(cursor.selectionEnd())
-                    self.editor.setTextCursor(cursor)
-
-                found = self.editor.find(text_to_find, self._get_find_flags())
-                if not found:
-                    QMessageBox.information(self, "Find", f"'{text_to_find}' not found.")
-            else:
-                QMessageBox.warning(self, "Find", "Please enter text to find.")
-
-    # Finds the previous occurrence of the text.
-    def _find_prev(self):
-        if self.editor:
-            text_to_find = self.find_input.text()
-            if text_to_find:
-                # Ensure cursor is at the end of the selection for 'find previous'
-                cursor = self.editor.textCursor()
-                if cursor.hasSelection():
-                    cursor.setPosition(cursor.selectionStart())
-                    self.editor.setTextCursor(cursor)
-
-                flags = self._get_find_flags() | QTextDocument.FindBackward
-                found = self.editor.find(text_to_find, flags)
-                if not found:
-                    QMessageBox.information(self, "Find", f"'{text_to_find}' not found.")
+    def apply_theme(self, theme_name):
+        self._match_color = QColor(THEMES[theme_name]["find_match_bg"])
+        self._current_color = QColor(THEMES[theme_name]["find_current_bg"])
+        self._update_highlights()
+
+    # Escape closes the bar rather than toggling zen mode, whose shortcut would take it first.
+    def eventFilter(self, watched, event):
+        if event.type() == QEvent.ShortcutOverride and event.key() == Qt.Key_Escape:
+            event.accept()
+            return True
+        return super().eventFilter(watched, event)
+
+    def keyPressEvent(self, event):
+        if event.key() == Qt.Key_Escape:
+            self.close_bar()
+        else:
+            super().keyPressEvent(event)
+
+    # True while matches are still being collected.
+    def is_searching(self):
+        return self._scan_block is not None or self.search is not None
+
+    # Stops collecting matches, in the event loop or in the workers.
+    def _stop_scan(self):
+        self._scan_timer.stop()
+        self._scan_block = None
+        if self.search is not None:
+            for signal in (self.search.found, self.search.progress, self.search.timed_out):
+                signal.disconnect()
+            self.search.cancel()
+            self.search.wait()
+            self.search = None
+
+    # Drops the matches and collects them again for the current query, options and text.
+    def restart_scan(self):
+        self._rescan_timer.stop()
+        self._stop_scan()
+        self._pending_replace_all = False
+        self.regex = None
+        self.starts, self.lengths = [], []
+        self._searched_to = 0
+        self._timed_out = False
+        text = self.find_input.text()
+        if isinstance(self.editor, (CodeEditor, LargeFileViewer)) and self.isVisible() and text:
+            try:
+                self.regex = compile_search_pattern(text, self.regex_checkbox.isChecked(),
+                                                    self.case_sensitive_checkbox.isChecked(), self.whole_word_checkbox.isChecked())
+            except re.error as e:
+                self.count_label.setText("Invalid pattern")
+                self.count_label.setToolTip(str(e))
+                self._update_highlights()
+                return
+            if isinstance(self.editor, LargeFileViewer):
+                self._start_search() # Always in the workers; the file is not in memory
             else:
-                QMessageBox.warning(self, "Find", "Please enter text to find.")
+                document = self.editor.document()
+                self._revision = document.revision()
+                if self.regex_checkbox.isChecked() or document.characterCount() >= FIND_BACKGROUND_MIN_CHARS:
+                    self._start_search()
+                else:
+                    self._scan_block = document.begin()
+                    self._scan_timer.start(0)
+        self._update_highlights()
+        self._update_count()
+
+    # Hands the search to a DocumentSearch, or a LargeFileSearch for a LargeFileViewer. The snapshot
+    # is kept while the text is unchanged, so refining the query does not copy a long document again.
+    def _start_search(self):
+        if isinstance(self.editor, LargeFileViewer):
+            self.search = LargeFileSearch(self.editor.file_path, self.regex)
+        else:
+            document = self.editor.document()
+            key = (document.revision(), document.characterCount())
+            if self._snapshot is None or self._snapshot[0] != key:
+                self._snapshot = (key, self.editor.toPlainText())
+            self.search = DocumentSearch(self._snapshot[1], self.regex)
+        self.search.found.connect(self._on_search_found)
+        self.search.progress.connect(self._on_search_progress)
+        self.search.timed_out.connect(self._on_search_timed_out)
+        self.search.start()
+
+    def _on_search_found(self, starts, lengths):
+        found = len(self.starts)
+        self.starts.extend(starts)
+        self.lengths.extend(lengths)
+        if isinstance(self.editor, CodeEditor) and self.starts[found] < self._visible_range()[1]:
+            self._update_highlights()
+
+    def _on_search_progress(self, position):
+        self._searched_to = position
+        if position >= self._text_length():
+            self._stop_scan() # Done; the thread is only returning
+        self._update_count()
+        self._run_pending()
+
+    # Matches found before the pattern got stuck are kept; the count says they may not be all.
+    def _on_search_timed_out(self):
+        self._stop_scan()
+        self._timed_out = True
+        self._update_count()
+        self._run_pending()
+
+    # Searches blocks until the slice's time budget runs out.
+    def _scan_next_slice(self):
+        deadline = time.perf_counter() + FIND_MATCH_SLICE
+        regex, starts, lengths = self.regex, self.starts, self.lengths
+        found = len(starts)
+        block = self._scan_block
+        while block.isValid() and time.perf_counter() < deadline:
+            position = block.position()
+            text = block.text()
+            astral = astral_positions(text)
+            for match in regex.finditer(text):
+                start, end = match.span()
+                if end > start: # Empty matches (of patterns like 'a*') point at nothing
+                    if astral:
+                        start, end = utf16_offset(astral, start), utf16_offset(astral, end)
+                    starts.append(position + start)
+                    lengths.append(end - start)
+            block = block.next()
+        if block.isValid():
+            self._scan_block = block
+            self._searched_to = block.position()
+        else:
+            self._scan_block = None
+            self._scan_timer.stop()
+        if len(starts) > found and starts[found] < self._visible_range()[1]:
+            self._update_highlights()
+        self._update_count()
+        self._run_pending()
+
+    # Goes on with a find or Replace All that was waiting for matches.
+    def _run_pending(self):
+        if self._pending_jump is not None:
+            self._jump(self._pending_jump)
+        if self._pending_replace_all and not self.is_searching():
+            self.replace_all()
+
+    # Positions of the first and past the last character of the blocks in the viewport.
+    def _visible_range(self):
+        editor = self.editor
+        last = editor.cursorForPosition(QPoint(0, editor.viewport().height() - 1)).block()
+        return editor.firstVisibleBlock().position(), last.position() + last.length()
+
+    # Length of the text searched, in the units of the match positions: UTF-16 units of a document,
+    # bytes of a large file.
+    def _text_length(self):
+        if isinstance(self.editor, LargeFileViewer):
+            return self.editor.index.size
+        return self.editor.document().characterCount() - 1 # Less the last paragraph separator
+
+    # Start and end of the editor's selection, equal when nothing is selected.
+    def _selection(self):
+        if isinstance(self.editor, LargeFileViewer):
+            return self.editor.selection()
+        cursor = self.editor.textCursor()
+        return cursor.selectionStart(), cursor.selectionEnd()
+
+    # Index of the match the editor has selected, or -1.
+    def _current_index(self):
+        start, end = self._selection()
+        if start == end:
+            return -1
+        i = bisect.bisect_left(self.starts, start)
+        if i < len(self.starts) and self.starts[i] == start and self.lengths[i] == end - start:
+            return i
+        return -1
+
+    def _update_highlights(self, *_):
+        if not isinstance(self.editor, CodeEditor) or self._replacing:
+            return
+        selections = []
+        if self.starts:
+            first, last = self._visible_range()
+            current = self._current_index()
+            document = self.editor.document()
+            for i in range(bisect.bisect_left(self.starts, first), bisect.bisect_left(self.starts, last)):
+                selection = QTextEdit.ExtraSelection()
+                selection.format.setBackground(self._current_color if i == current else self._match_color)
+                selection.cursor = QTextCursor(document)
+                selection.cursor.setPosition(self.starts[i])
+                selection.cursor.setPosition(self.starts[i] + self.lengths[i], QTextCursor.KeepAnchor)
+                selections.append(selection)
+        self.editor.setExtraSelections(selections)
+
+    def _update_count(self):
+        self.count_label.setToolTip("")
+        if self.regex is None:
+            self.count_label.setText("")
+            return
+        count = len(self.starts)
+        searching = self.is_searching()
+        more = "+" if searching or self._timed_out else ""
+        current = self._current_index()
+        if self._timed_out:
+            self.count_label.setToolTip(f"The pattern took over {FIND_REGEX_TIMEOUT:g} s on part of the document, so the search stopped there.")
+        if count == 0 and searching:
+            percent = self._searched_to * 100 // max(1, self._text_length())
+            self.count_label.setText(f"Searching... {percent}%")
+        elif count == 0:
+            self.count_label.setText("Pattern too slow" if self._timed_out else "No matches")
+        elif current >= 0:
+            self.count_label.setText(f"{current + 1} of {count}{more}")
+        else:
+            self.count_label.setText(f"{count}{more} matches")
+
+    def _on_cursor_moved(self):
+        if self.regex is not None and not self._replacing:
+            self._update_highlights() # The selected match is drawn in its own color
+            self._update_count()
+
+    # Edits move the matches after them, so they are collected again once typing pauses. Highlighting
+    # changes come as contentsChange too, but change neither the text's length nor the revision.
+    def _on_contents_change(self, position, chars_removed, chars_added):
+        if self.regex is None or self._replacing:
+            return
+        if chars_removed == chars_added and self.editor.document().revision() == self._revision:
+            return
+        self._stop_scan()
+        self._pending_replace_all = False
+        self.starts, self.lengths = [], []
+        self._update_highlights()
+        self._rescan_timer.start()
+
+    def find_next(self):
+        self._find(True)
+
+    def find_prev(self):
+        self._find(False)
+
+    def _find(self, forward):
+        if not isinstance(self.editor, (CodeEditor, LargeFileViewer)):
+            return
+        if self.regex is None or self._rescan_timer.isActive():
+            self.restart_scan() # The query changed since the last scan
+        if self.regex is not None:
+            self._jump(forward)
+
+    # Selects the nearest match after or before the cursor, wrapping around the document. Matches
+    # not collected yet are waited for.
+    def _jump(self, forward):
+        self._pending_jump = None
+        start, end = self._selection()
+        starts = self.starts
+        scanning = self.is_searching()
+        if forward:
+            i = bisect.bisect_left(starts, start + (1 if end > start else 0))
+            if i == len(starts):
+                if scanning:
+                    self._pending_jump = True
+                    return
+                i = 0
+        else:
+            if scanning and self._searched_to <= start:
+                self._pending_jump = False # Matches closer to the cursor may still come
+                return
+            i = bisect.bisect_left(starts, start) - 1
+            if i < 0:
+                if scanning:
+                    self._pending_jump = False
+                    return
+                i = len(starts) - 1
+        if not starts:
+            return
+        if isinstance(self.editor, LargeFileViewer):
+            self.editor.select_range(starts[i], self.lengths[i])
+            self._update_count() # The viewer has no cursor signal to do it
+            return
+        cursor = self.editor.textCursor()
+        cursor.setPosition(starts[i])
+        cursor.setPosition(starts[i] + self.lengths[i], QTextCursor.KeepAnchor)
+        self.editor.setTextCursor(cursor)
+        self.editor.ensureCursorVisible()
+
+    # The replacement text for a match: with a regular expression, \1 or \g<name> insert groups.
+    def _replacement(self, match):
+        if self.regex_checkbox.isChecked():
+            return match.expand(self.replace_input.text())
+        return self.replace_input.text()
+
+    def _can_replace(self):
+        if not isinstance(self.editor, CodeEditor) or self.editor.isReadOnly():
+            self.ide_instance.statusBar().showMessage("Nothing to replace in this tab.", 2000)
+            return False
+        if self.regex is None or self._rescan_timer.isActive():
+            self.restart_scan()
+        if self._timed_out:
+            self.ide_instance.statusBar().showMessage("The pattern is too slow to replace with.", 3000)
+            return False
+        return self.regex is not None
+
+    # Replaces the selected match and selects the next one.
+    def replace(self):
+        if not self._can_replace():
+            return
+        cursor = self.editor.textCursor()
+        block = cursor.block()
+        text = block.text()
+        astral = astral_positions(text)
+        match = self.regex.match(text, str_offset(astral, cursor.selectionStart() - block.position())) if cursor.hasSelection() else None
+        if match is None or utf16_offset(astral, match.end()) != cursor.selectionEnd() - block.position():
+            self._jump(True) # Nothing replaced: the selection is not a match, so select one first
+            return
+        try:
+            replacement = self._replacement(match)
+        except (re.error, IndexError) as e:
+            self.ide_instance.statusBar().showMessage(f"Invalid replacement: {e}", 3000)
+            return
+        cursor.insertText(replacement)
+        self.editor.setTextCursor(cursor)
+        self.restart_scan()
+        self._jump(True)
+
+    # Replaces every match as one undoable edit. The edit is made from the matches the search
+    # collected, so the pattern is never run over the whole document here; while they are still
+    # coming in, it waits for the rest, and a pattern that timed out replaces nothing. A regular
+    # expression is only matched again at each match, to expand its groups. New block texts are
+    # worked out first, so an invalid replacement leaves the document untouched.
+    def replace_all(self):
+        self._pending_replace_all = False
+        if not self._can_replace():
+            return
+        if self.is_searching():
+            self._pending_replace_all = True
+            self.ide_instance.statusBar().showMessage("Replacing once every match is found...", 3000)
+            return
+        document = self.editor.document()
+        expand = self.regex_checkbox.isChecked()
+        replacement = self.replace_input.text()
+        count = 0
+        edits = []
+        block = None
+        try:
+            for start, length in zip(self.starts, self.lengths):
+                if block is None or start >= block.position() + block.length():
+                    if block is not None and pieces:
+                        edits.append((block, ''.join(pieces) + text[done:]))
+                    block = document.findBlock(start)
+                    text = block.text()
+                    astral = astral_positions(text)
+                    pieces, done = [], 0
+                begin = str_offset(astral, start - block.position())
+                end = str_offset(astral, start + length - block.position())
+                if expand:
+                    match = self.regex.match(text, begin)
+                    if match is None or match.end() != end:
+                        continue
+                    replacement = self._replacement(match)
+                pieces += [text[done:begin], replacement]
+                done = end
+                count += 1
+            if block is not None and pieces:
+                edits.append((block, ''.join(pieces) + text[done:]))
+        except (re.error, IndexError) as e:
+            self.ide_instance.statusBar().showMessage(f"Invalid replacement: {e}", 3000)
+            return
+        cursor = QTextCursor(document)
+        self._replacing = True
+        cursor.beginEditBlock()
+        try:
+            for block, new_text in edits:
+                cursor.setPosition(block.position())
+                cursor.setPosition(block.position() + block.length() - 1, QTextCursor.KeepAnchor)
+                cursor.insertText(new_text)
+        finally:
+            cursor.endEditBlock()
+            self._replacing = False
+        self.restart_scan()
+        self.ide_instance.statusBar().showMessage(f"Replaced {count} matches.", 3000)
+
+# SearchResultsModel lists find-in-files matches as they stream in.
+class SearchResultsModel(QAbstractListModel):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.root = ""
+        self.matches = []
+
+    def clear(self, root):
+        self.beginResetModel()
+        self.root = root
+        self.matches = []
+        self.endResetModel()
+
+    def add_matches(self, matches):
+        first = len(self.matches)
+        self.beginInsertRows(QModelIndex(), first, first + len(matches) - 1)
+        self.matches.extend(matches)
+        self.endInsertRows()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.matches)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        path, line, _, _, text = self.matches[index.row()]
+        if role == Qt.DisplayRole:
+            return f"{os.path.relpath(path, self.root)}:{line}: {text.strip()}"
+        if role == Qt.ToolTipRole:
+            return path
+        return None
+
+# FindInFilesPanel searches every file under the IDE's current directory, with the find bar's options
+# plus regular expressions. Matches are listed as they are found; activating one opens the file there.
+class FindInFilesPanel(QWidget):
+    def __init__(self, ide_instance, parent=None):
+        super().__init__(parent)
+        self.ide_instance = ide_instance
+        self.search = None
+        self._started = 0.0
+        self.layout = QVBoxLayout(self)
+        self.layout.setContentsMargins(0, 0, 0, 0)
+
+        self.options_layout = QHBoxLayout()
+        self.find_input = QLineEdit()
+        self.find_input.setPlaceholderText("Find in files...")
+        self.find_input.returnPressed.connect(self._start_search)
+        self.options_layout.addWidget(self.find_input)
+
+        self.regex_checkbox = QCheckBox("Regular expression")
+        self.options_layout.addWidget(self.regex_checkbox)
+        self.case_sensitive_checkbox = QCheckBox("Case sensitive")
+        self.options_layout.addWidget(self.case_sensitive_checkbox)
+        self.whole_word_checkbox = QCheckBox("Whole words only")
+        self.options_layout.addWidget(self.whole_word_checkbox)
+
+        self.search_button = QPushButton("Search")
+        self.search_button.clicked.connect(self._toggle_search)
+        self.options_layout.addWidget(self.search_button)
+        self.close_button = QPushButton("Close")
+        self.close_button.clicked.connect(self._close)
+        self.options_layout.addWidget(self.close_button)
+        self.layout.addLayout(self.options_layout)
+
+        self.status_label = QLabel("")
+        self.layout.addWidget(self.status_label)
+
+        self.results_model = SearchResultsModel(self)
+        self.results_view = QListView()
+        self.results_view.setModel(self.results_model)
+        self.results_view.setUniformItemSizes(True) # Rows are never measured, however many stream in
+        self.results_view.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.results_view.activated.connect(self._open_result)
+        self.results_view.clicked.connect(self._open_result)
+        self.layout.addWidget(self.results_view)
+
+    # Shows the panel with the query field focused, optionally filled in.
+    def show_query(self, text=""):
+        self.show()
+        if text:
+            self.find_input.setText(text)
+        self.find_input.setFocus()
+        self.find_input.selectAll()
+
+    def _toggle_search(self):
+        if self.search is not None:
+            self.cancel_search()
+            self.status_label.setText(f"Stopped: {self._summary()}")
+        else:
+            self._start_search()
+
+    def _start_search(self):
+        text = self.find_input.text()
+        if not text:
+            self.status_label.setText("Enter text to find.")
+            return
+        try:
+            regex = compile_search_pattern(text, self.regex_checkbox.isChecked(),
+                                           self.case_sensitive_checkbox.isChecked(), self.whole_word_checkbox.isChecked())
+        except re.error as e:
+            self.status_label.setText(f"Invalid regular expression: {e}")
+            return
+        self.cancel_search()
+        root = self.ide_instance.current_directory
+        self.results_model.clear(root)
+        self.search = FileSearch(root, regex, get_trigram_index())
+        self.search.found.connect(self.results_model.add_matches)
+        self.search.progress.connect(lambda searched, found: self.status_label.setText(f"Searching... {self._summary()}"))
+        self.search.finished.connect(self._on_search_finished)
+        self.search_button.setText("Stop")
+        self.status_label.setText(f"Searching {root}...")
+        self._started = time.perf_counter()
+        self.search.start()
+
+    # Stops the running search, dropping the results it has not delivered yet.
+    def cancel_search(self):
+        if self.search is None:
+            return
+        for signal in (self.search.found, self.search.progress, self.search.finished):
+            signal.disconnect()
+        self.search.cancel()
+        self.search.wait()
+        self.search = None
+        self.search_button.setText("Search")
+
+    def _summary(self):
+        search = self.search
+        if search is None:
+            return f"{self.results_model.rowCount()} matches"
+        return f"{search.match_count} matches in {search.searched} files"
+
+    def _on_search_finished(self):
+        limit = f" (stopped at {FIND_IN_FILES_MAX_MATCHES})" if self.search.limit_reached else ""
+        indexed = ", indexed" if self.search.indexed else ""
+        self.status_label.setText(f"{self._summary()}{limit}, {time.perf_counter() - self._started:.1f} s{indexed}")
+        self.search = None
+        self.search_button.setText("Search")
+
+    def _open_result(self, index):
+        path, line, column, length, _ = self.results_model.matches[index.row()]
+        self.ide_instance.open_file_at(path, line, column, length)
+
+    def _close(self):
+        self.cancel_search()
+        self.hide()
 
 # SyntaxPaletteDialog allows users to customize syntax highlighting colors.
 class SyntaxPaletteDialog(QDialog):
@@ -1826,7 +5671,7 @@ class SyntaxPaletteDialog(QDialog):
         current_color = QColor(SYNTAX_COLORS[key])
         color = QColorDialog.getColor(current_color, self, "Select Color")
         if color.isValid():
-            SYNTAX_COLORS[key] = color.name() # Update the global SYNTAX_COLORS dictionary
+            set_syntax_color(key, color.name()) # Update the global SYNTAX_COLORS dictionary
             self.color_buttons[key].setStyleSheet(f"background-color: {color.name()}; border: 1px solid gray; border-radius: 4px;")
 
     # Emits a signal to reapply colors after changes are made.
@@ -1834,7 +5679,9 @@ class SyntaxPaletteDialog(QDialog):
         self.color_changed.emit()
         self.accept()
 
-# QuickSwitcherDialog allows fast navigation between open tabs.
+# QuickSwitcherDialog (Ctrl+P) opens any file of the workspace, found by a fuzzy match of its path in
+# the WorkspaceFileIndex, or switches to an open tab. Without a query it lists the open tabs, then
+# the files opened most recently.
 class QuickSwitcherDialog(QDialog):
     def __init__(self, ide_instance, parent=None):
         super().__init__(parent)
@@ -1845,9 +5692,10 @@ class QuickSwitcherDialog(QDialog):
         self.layout.setContentsMargins(10, 10, 10, 10)
 
         self.search_input = QLineEdit()
-        self.search_input.setPlaceholderText("Type to filter files...")
+        self.search_input.setPlaceholderText("Type to find a file in the workspace...")
         self.search_input.textChanged.connect(self._filter_list)
         self.layout.addWidget(self.search_input)
+        self.recent_paths = [path for path in recent_files.recent() if os.path.isfile(path)] # Checked once, not per keystroke
 
         self.tab_list_view = QListView()
         self.list_model = QStringListModel()
@@ -1886,15 +5734,31 @@ class QuickSwitcherDialog(QDialog):
                     display_name = f"{os.path.basename(file_path)} - {os.path.dirname(file_path)} (Right Panel)"
                 self.all_tabs_data.append((display_name, file_path, self.ide.right_tab_widget, i, widget))
         
-        self.current_filtered_data = list(self.all_tabs_data)
-        self.list_model.setStringList([data[0] for data in self.current_filtered_data])
-        if self.current_filtered_data:
-            self.tab_list_view.setCurrentIndex(self.list_model.index(0))
+        self._filter_list("")
+
+    # A row for a file that is not open: its name and its directory, relative to the workspace.
+    def _file_data(self, file_path):
+        directory = os.path.dirname(file_path)
+        root = os.path.join(self.ide.current_directory, '')
+        if directory.startswith(root):
+            directory = directory[len(root):]
+        elif directory == root[:-1]:
+            directory = ''
+        display_name = f"{os.path.basename(file_path)} - {directory}" if directory else os.path.basename(file_path)
+        return (display_name, file_path, None, -1, None)
 
     def _filter_list(self, text):
-        self.current_filtered_data = [
-            data for data in self.all_tabs_data if text.lower() in data[0].lower()
-        ]
+        if not text.strip():
+            open_paths = {data[1] for data in self.all_tabs_data}
+            self.current_filtered_data = list(self.all_tabs_data) + [
+                self._file_data(path) for path in self.recent_paths if path not in open_paths
+            ]
+        else:
+            open_tabs = {data[1]: data for data in self.all_tabs_data if data[1]}
+            paths = get_file_index().match(text, QUICK_OPEN_RESULT_LIMIT, list(open_tabs), self.recent_paths)
+            self.current_filtered_data = [open_tabs.get(path) or self._file_data(path) for path in paths] + [
+                data for data in self.all_tabs_data if not data[1] and text.lower() in data[0].lower() # Untitled tabs
+            ]
         self.list_model.setStringList([data[0] for data in self.current_filtered_data])
         if self.current_filtered_data:
             self.tab_list_view.setCurrentIndex(self.list_model.index(0))
@@ -1925,12 +5789,122 @@ class QuickSwitcherDialog(QDialog):
         if selected_index.isValid():
             row = selected_index.row()
             if 0 <= row < len(self.current_filtered_data):
-                _, _, tab_widget_instance, tab_index, widget_instance = self.current_filtered_data[row]
+                _, file_path, tab_widget_instance, tab_index, widget_instance = self.current_filtered_data[row]
+                if file_path:
+                    self.ide.open_file(file_path, self.ide.active_tab_widget or self.ide.left_tab_widget) # Or switches to its tab
+                    self.accept()
+                    return
                 tab_widget_instance.setCurrentIndex(tab_index)
                 # Ensure the IDE's active editor is updated
                 self.ide._set_active_tab_widget(tab_widget_instance.currentIndex(), tab_widget_instance) 
                 self.accept()
 
+# TabRegistry is the IDE's widget -> file path dict (None for untitled tabs). Beside it, it keeps
+# where each widget sits (tab widget and index) and which widget has each path open, so finding a
+# tab never means scanning the tab bars. EditorTabWidget reports every insert, removal and move.
+# Those only edit the tab widget's list; the indexes behind the change are renumbered by the next
+# location() call, so moving n tabs in a row costs O(n), not O(n) each.
+# It also holds the set of editors with unsaved changes, which the editors keep current.
+class TabRegistry(dict):
+    def __init__(self):
+        super().__init__()
+        self._panels = {} # widget -> tab widget it is in
+        self._indexes = {} # widget -> index in its tab widget; valid below the tab widget's stale mark
+        self._stale = {} # tab widget -> first index whose widgets' stored indexes may be out of date
+        self._panel_widgets = {} # tab widget -> its widgets in tab order
+        self._by_path = {} # normalized path -> widget
+        self.dirty = set() # Editors whose document is modified
+
+    @staticmethod
+    def normalize(path):
+        return os.path.normcase(os.path.abspath(path))
+
+    # Also re-paths a widget. An editor added (again) with unsaved changes counts as dirty, as its
+    # document will not report a modification it already has.
+    def __setitem__(self, widget, path):
+        self._forget_path(widget)
+        super().__setitem__(widget, path)
+        if path:
+            self._by_path[self.normalize(path)] = widget
+        if isinstance(widget, QPlainTextEdit) and widget.document().isModified():
+            self.dirty.add(widget)
+
+    def __delitem__(self, widget):
+        self._forget_path(widget)
+        self.dirty.discard(widget)
+        super().__delitem__(widget)
+
+    def pop(self, widget, *default):
+        self._forget_path(widget)
+        self.dirty.discard(widget)
+        return super().pop(widget, *default)
+
+    def set_dirty(self, widget, dirty):
+        if dirty:
+            self.dirty.add(widget)
+        else:
+            self.dirty.discard(widget)
+
+    def _forget_path(self, widget):
+        path = self.get(widget)
+        if path and self._by_path.get(self.normalize(path)) is widget:
+            del self._by_path[self.normalize(path)]
+
+    # Returns the widget that has a file open, or None.
+    def widget_for_path(self, path):
+        return self._by_path.get(self.normalize(path))
+
+    # Returns (tab widget, index) of a widget, or (None, -1) if it is not in a tab.
+    def location(self, widget):
+        tab_widget = self._panels.get(widget)
+        if tab_widget is None:
+            return (None, -1)
+        start = self._stale.pop(tab_widget, None)
+        if start is not None:
+            widgets = self._panel_widgets[tab_widget]
+            for index in range(start, len(widgets)):
+                self._indexes[widgets[index]] = index
+        return (tab_widget, self._indexes[widget])
+
+    def tab_inserted(self, tab_widget, index):
+        widget = tab_widget.widget(index)
+        self._panel_widgets.setdefault(tab_widget, []).insert(index, widget)
+        self._panels[widget] = tab_widget
+        self._mark_stale(tab_widget, index)
+
+    def tab_removed(self, tab_widget, index):
+        widgets = self._panel_widgets.get(tab_widget, [])
+        if index >= len(widgets):
+            return
+        widget = widgets.pop(index)
+        if self._panels.get(widget) is tab_widget: # Not already added to the other tab widget
+            del self._panels[widget]
+            self._indexes.pop(widget, None)
+        self._mark_stale(tab_widget, index)
+
+    def tab_moved(self, tab_widget, from_index, to_index):
+        widgets = self._panel_widgets[tab_widget]
+        widgets.insert(to_index, widgets.pop(from_index))
+        self._mark_stale(tab_widget, min(from_index, to_index))
+
+    def _mark_stale(self, tab_widget, index):
+        self._stale[tab_widget] = min(index, self._stale.get(tab_widget, index))
+
+# QTabWidget that keeps a TabRegistry in step with its tabs.
+class EditorTabWidget(QTabWidget):
+    def __init__(self, registry, parent=None):
+        super().__init__(parent)
+        self.registry = registry
+        self.tabBar().tabMoved.connect(lambda from_index, to_index: self.registry.tab_moved(self, from_index, to_index))
+
+    def tabInserted(self, index):
+        super().tabInserted(index)
+        self.registry.tab_inserted(self, index)
+
+    def tabRemoved(self, index):
+        super().tabRemoved(index)
+        self.registry.tab_removed(self, index)
+
 # The main IDE window, containing all components and logic.
 class IDE(QMainWindow):
     def __init__(self):
@@ -1951,8 +5925,13 @@ class IDE(QMainWindow):
         self.current_font = QFont("Inter", 10)
 
         self._load_config() # Load settings on startup
+        get_symbol_index().set_root(self.current_directory) # Index the workspace in the background
+        get_trigram_index().set_root(self.current_directory)
+        get_file_index().set_root(self.current_directory)
 
-        self.find_dialog = FindDialog(self)
+        self.find_bar = FindBar(self)
+        self.find_bar.hide()
+        self._pending_jumps = {} # Editor still loading -> (line, column, length) to show once loaded
 
         self._create_actions()
         
@@ -2018,7 +5997,7 @@ class IDE(QMainWindow):
                 loaded_syntax_colors = config.get("syntax_colors", {})
                 for key, value in loaded_syntax_colors.items():
                     if key in SYNTAX_COLORS: # Only update existing keys
-                        SYNTAX_COLORS[key] = value
+                        set_syntax_color(key, value)
         except Exception as e:
             print(f"Error loading configuration: {e}")
             # Reset to default if loading fails
@@ -2031,17 +6010,28 @@ class IDE(QMainWindow):
             # SYNTAX_COLORS remains default if not loaded successfully
 
     # Saves the current session state (open files and their content) for crash recovery.
+    # Only unsaved work is copied into the session; saved files are reopened from disk.
     def _save_session(self):
         session_data = []
         for tab_widget in [self.left_tab_widget, self.right_tab_widget]:
             for i in range(tab_widget.count()):
                 widget = tab_widget.widget(i)
                 file_path = self.tab_paths.get(widget)
-                if isinstance(widget, CodeEditor):
+                if isinstance(widget, CodeEditor) and widget.loading and file_path:
+                    # Only partly loaded, but nothing is lost: it is reopened from disk
                     session_data.append({
                         "path": file_path,
-                        "content": widget.toPlainText(), # Always save content
-                        "is_modified": widget.document().isModified(),
+                        "content": None,
+                        "is_modified": False,
+                        "panel": "left" if tab_widget == self.left_tab_widget else "right",
+                        "tab_index": i
+                    })
+                elif isinstance(widget, CodeEditor):
+                    is_modified = widget in self.tab_paths.dirty
+                    session_data.append({
+                        "path": file_path,
+                        "content": widget.toPlainText() if is_modified or not file_path else None,
+                        "is_modified": is_modified,
                         "panel": "left" if tab_widget == self.left_tab_widget else "right",
                         "tab_index": i # Store tab index to try and restore order
                     })
@@ -2085,18 +6075,25 @@ class IDE(QMainWindow):
                         if panel == "right" and self.right_tab_widget.isHidden():
                             self._toggle_split_view() # Ensure right panel is visible
 
+                        if content is None and file_path:
+                            # Saved at the time; reopen it from disk
+                            if os.path.isfile(file_path):
+                                self.open_file(file_path, target_tab_widget)
+                            continue
+
                         editor = CodeEditor(self, self)
-                        editor.setText(content if content is not None else "")
+                        editor.apply_theme(self.current_theme)
+                        editor.setPlainText(content if content is not None else "")
                         editor.document().setModified(is_modified)
                         editor.auto_close_enabled = self.auto_close_enabled
-                        editor.completer.setCompletionMode(QCompleter.PopupCompletion if self.completer_enabled else QCompleter.Disabled)
+                        editor.set_completer_enabled(self.completer_enabled)
                         editor.setFont(self.current_font)
                         editor.setTabStopWidth(QFontMetrics(self.current_font).width(' ' * 4))
 
                         tab_name = "Untitled"
                         if file_path:
                             tab_name = os.path.basename(file_path)
-                            editor.set_highlighter(os.path.splitext(file_path)[1].lower())
+                            editor.set_highlighter(language_for_path(file_path))
                         else:
                             # Try to auto-detect language for restored untitled files
                             editor.language_detected = False # Allow auto-detection
@@ -2108,6 +6105,8 @@ class IDE(QMainWindow):
                         tab_index = target_tab_widget.addTab(editor, tab_name)
                         target_tab_widget.setCurrentIndex(tab_index)
                         self.tab_paths[editor] = file_path # Store path (or None for untitled)
+                        if file_path:
+                            get_symbol_index().update_file(file_path)
 
                         self.statusBar().showMessage(f"Restored: {tab_name}", 2000)
                     
@@ -2149,7 +6148,8 @@ class IDE(QMainWindow):
         self.copy_action.setEnabled(can_edit)
         self.paste_action.setEnabled(can_edit)
         self.select_all_action.setEnabled(can_edit)
-        self.find_action.setEnabled(can_edit)
+        self.find_action.setEnabled(can_edit or self._current_large_file_viewer() is not None)
+        self.go_to_line_action.setEnabled(can_edit or self._current_large_file_viewer() is not None)
         self.save_file_action.setEnabled(can_edit)
         self.save_as_file_action.setEnabled(can_edit)
         self.syntax_palette_action.setEnabled(True) # Always enabled
@@ -2247,8 +6247,11 @@ class IDE(QMainWindow):
         self.code_splitter.setHandleWidth(3)
         self.code_splitter.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
 
+        # Dictionary to keep track of open files and their paths: widget_instance -> file_path
+        self.tab_paths = TabRegistry()
+
         # Left tab widget for code editors
-        self.left_tab_widget = QTabWidget()
+        self.left_tab_widget = EditorTabWidget(self.tab_paths)
         self.left_tab_widget.setTabsClosable(True)
         self.left_tab_widget.tabCloseRequested.connect(self._close_tab)
         self.left_tab_widget.setContextMenuPolicy(Qt.CustomContextMenu)
@@ -2261,7 +6264,7 @@ class IDE(QMainWindow):
         self.left_tab_widget.setObjectName("left_tab_widget") # For identification
 
         # Right tab widget for split view
-        self.right_tab_widget = QTabWidget()
+        self.right_tab_widget = EditorTabWidget(self.tab_paths)
         self.right_tab_widget.setTabsClosable(True)
         self.right_tab_widget.tabCloseRequested.connect(self._close_tab)
         self.right_tab_widget.setContextMenuPolicy(Qt.CustomContextMenu)
@@ -2281,6 +6284,12 @@ class IDE(QMainWindow):
         self.code_splitter.setStretchFactor(1, 1)
 
         self.right_panel_layout.addWidget(self.code_splitter)
+        self.right_panel_layout.addWidget(self.find_bar) # Finds in the active editor, right under it
+
+        # Find in files results, between the editors and the terminal
+        self.find_in_files_panel = FindInFilesPanel(self)
+        self.find_in_files_panel.hide()
+        self.right_panel_layout.addWidget(self.find_in_files_panel)
 
         # Terminal splitter (for output)
         self.terminal_splitter = QSplitter(Qt.Horizontal)
@@ -2315,11 +6324,9 @@ class IDE(QMainWindow):
 
         # Set stretch factors for code editor and terminal within the right panel
         self.right_panel_layout.setStretchFactor(self.code_splitter, 7)
+        self.right_panel_layout.setStretchFactor(self.find_in_files_panel, 3)
         self.right_panel_layout.setStretchFactor(self.terminal_splitter, 3)
 
-        # Dictionary to keep track of open files and their paths: widget_instance -> file_path
-        self.tab_paths = {}
-
         self.current_editor = None # Currently active code editor
         self.active_tab_widget = self.left_tab_widget # Currently active tab widget
 
@@ -2391,7 +6398,15 @@ class IDE(QMainWindow):
 
         self.find_action = QAction(QIcon.fromTheme("edit-find"), "Find...", self)
         self.find_action.setShortcut("Ctrl+F")
-        self.find_action.triggered.connect(self._show_find_dialog)
+        self.find_action.triggered.connect(self._show_find_bar)
+
+        self.find_in_files_action = QAction(QIcon.fromTheme("edit-find"), "Find in Files...", self)
+        self.find_in_files_action.setShortcut("Ctrl+Shift+F")
+        self.find_in_files_action.triggered.connect(self._show_find_in_files)
+
+        self.go_to_line_action = QAction("Go to Line...", self)
+        self.go_to_line_action.setShortcut("Ctrl+G")
+        self.go_to_line_action.triggered.connect(self._go_to_line)
 
         self.auto_save_action = QAction("Auto Save", self)
         self.auto_save_action.setCheckable(True)
@@ -2432,6 +6447,9 @@ class IDE(QMainWindow):
         self.toggle_completer_action.setChecked(self.completer_enabled)
         self.toggle_completer_action.triggered.connect(self._toggle_completer)
 
+        self.completion_stats_action = QAction("Completion Latency...", self)
+        self.completion_stats_action.triggered.connect(self._show_completion_stats)
+
     # Creates the application's menu bar with File, Edit, Run, Tools, and View menus.
     def _create_menu_bar(self):
         menu_bar = self.menuBar()
@@ -2455,6 +6473,8 @@ class IDE(QMainWindow):
         edit_menu.addAction(self.select_all_action)
         edit_menu.addSeparator()
         edit_menu.addAction(self.find_action)
+        edit_menu.addAction(self.find_in_files_action)
+        edit_menu.addAction(self.go_to_line_action)
         edit_menu.addSeparator()
         # Removed keybinds_action as requested
         # edit_menu.addAction(self.keybinds_action)
@@ -2476,6 +6496,7 @@ class IDE(QMainWindow):
         tools_menu.addSeparator()
         tools_menu.addAction(self.toggle_auto_closer_action)
         tools_menu.addAction(self.toggle_completer_action)
+        tools_menu.addAction(self.completion_stats_action)
         tools_menu.addAction(self.auto_save_action)
         tools_menu.addAction(self.auto_format_on_save_action) # New auto-format on save action
 
@@ -2512,7 +6533,10 @@ class IDE(QMainWindow):
 
         if self.current_editor and isinstance(self.current_editor, CodeEditor):
             # Update completer mode based on global setting
-            self.current_editor.completer.setCompletionMode(QCompleter.PopupCompletion if self.completer_enabled else QCompleter.Disabled)
+            self.current_editor.set_completer_enabled(self.completer_enabled)
+
+        if self.find_bar.isVisible(): # The bar follows the active tab
+            self.find_bar.set_editor(self.current_editor or self._current_large_file_viewer())
         
         self._update_edit_actions_state() # Update action states based on new active editor
 
@@ -2524,10 +6548,10 @@ class IDE(QMainWindow):
         self.tab_paths[editor] = None # Mark as unsaved using widget as key
         self.current_editor = editor
         self.active_tab_widget = target_tab_widget # Ensure active_tab_widget is set
-        self.apply_theme(self.current_theme) # Apply current theme to new editor
+        editor.apply_theme(self.current_theme) # The stylesheet is application-wide; only the gutter needs colors
         self._update_edit_actions_state()
         editor.auto_close_enabled = self.auto_close_enabled
-        editor.completer.setCompletionMode(QCompleter.PopupCompletion if self.completer_enabled else QCompleter.Disabled)
+        editor.set_completer_enabled(self.completer_enabled)
         editor.setFont(self.current_font) # Apply current font to new editor
         editor.setTabStopWidth(QFontMetrics(self.current_font).width(' ' * 4))
 
@@ -2541,65 +6565,43 @@ class IDE(QMainWindow):
     # Includes logic for handling large files with warnings.
     def open_file(self, file_path, target_tab_widget):
         # Check if the file is already open
-        for widget, path in self.tab_paths.items():
-            if path == file_path:
-                # Find which tab widget this widget belongs to
-                for i in range(self.left_tab_widget.count()):
-                    if self.left_tab_widget.widget(i) == widget:
-                        self.left_tab_widget.setCurrentIndex(i)
-                        self._set_active_tab_widget(i, self.left_tab_widget) # Update active editor
-                        self.statusBar().showMessage(f"File already open: {os.path.basename(file_path)}", 2000)
-                        return
-                if not self.right_tab_widget.isHidden():
-                    for i in range(self.right_tab_widget.count()):
-                        if self.right_tab_widget.widget(i) == widget:
-                            self.right_tab_widget.setCurrentIndex(i)
-                            self._set_active_tab_widget(i, self.right_tab_widget) # Update active editor
-                            self.statusBar().showMessage(f"File already open: {os.path.basename(file_path)}", 2000)
-                            return
-
+        tab_widget, tab_index = self.tab_paths.location(self.tab_paths.widget_for_path(file_path))
+        if tab_widget:
+            tab_widget.setCurrentIndex(tab_index)
+            self._set_active_tab_widget(tab_index, tab_widget) # Update active editor
+            recent_files.record(os.path.abspath(file_path))
+            self.statusBar().showMessage(f"File already open: {os.path.basename(file_path)}", 2000)
+            return
 
         file_ext = os.path.splitext(file_path)[1].lower()
         new_widget_instance = None
 
         try:
             file_size = os.path.getsize(file_path)
-            # Warn for very large files (e.g., > 500 MB)
-            if file_size > 500 * 1024 * 1024:
-                reply = QMessageBox.question(self, "Very Large File Warning",
-                                             f"The file '{os.path.basename(file_path)}' is extremely large ({file_size / (1024*1024):.2f} MB). "
-                                             "Opening it directly might cause significant performance issues or crashes. "
-                                             "Consider using a specialized large file viewer for this file. Do you want to proceed anyway?",
-                                             QMessageBox.Yes | QMessageBox.No)
-                if reply == QMessageBox.No:
-                    return
-            # Warn for large files (e.g., > 50 MB)
-            elif file_size > 50 * 1024 * 1024:
-                 reply = QMessageBox.question(self, "Large File Warning",
-                                             f"The file '{os.path.basename(file_path)}' is large ({file_size / (1024*1024):.2f} MB). "
-                                             "Opening it directly might cause performance issues. Do you want to proceed?",
-                                             QMessageBox.Yes | QMessageBox.No)
-                 if reply == QMessageBox.No:
-                    return
 
             # Handle different file types
-            if file_ext in ['.py', '.txt', '.md', '.json', '.html', '.css', '.js',
-                            '.java', '.cpp', '.cxx', '.cc', '.h', '.hpp', '.cs',
-                            '.scss', '.sql', '.swift', '.rb', '.go', '.rs', '.php',
-                            '.pl', '.kt', '.jsx', '.tsx', '.xml', '.xsd', '.xsl', '.svg',
-                            '.sh', '.bash', '.ts', '.vue', '.dart', '.r']:
-                # Open as a code editor
-                with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                    content = f.read()
+            language = language_for_path(file_path)
+            if file_size >= LARGE_FILE_THRESHOLD and file_ext not in ['.png', '.jpg', '.jpeg', '.gif', '.bmp', '.tiff', '.mp4', '.avi', '.mov', '.mkv', '.webm']:
+                # Too big to load into an editor: map it and show it read-only
+                viewer = LargeFileViewer(file_path, self)
+                viewer.setFont(self.current_font)
+                viewer.apply_theme(self.current_theme)
+                new_widget_instance = viewer
+            elif language or file_ext == '.txt':
+                # Open as a code editor; the content streams in once the tab is added
                 editor = CodeEditor(self, self) # Pass self (IDE instance)
-                editor.setText(content)
-                editor.document().setModified(False)
-                editor.set_highlighter(file_ext)
+                editor.apply_theme(self.current_theme)
+                load_language = language
                 editor.auto_close_enabled = self.auto_close_enabled
-                editor.completer.setCompletionMode(QCompleter.PopupCompletion if self.completer_enabled else QCompleter.Disabled)
+                editor.set_completer_enabled(self.completer_enabled)
                 editor.setFont(self.current_font) # Apply current font
                 editor.setTabStopWidth(QFontMetrics(self.current_font).width(' ' * 4))
                 new_widget_instance = editor
+            elif file_ext in ['.png', '.jpg', '.jpeg', '.gif', '.bmp', '.tiff'] and is_very_large_image(file_path):
+                # Too big to decode whole: show it in tiles
+                viewer = TiledImageViewer(file_path, self)
+                viewer.apply_theme(self.current_theme)
+                new_widget_instance = viewer
             elif file_ext in ['.png', '.jpg', '.jpeg', '.gif', '.bmp', '.tiff']:
                 # Open as an image viewer
                 new_widget_instance = MediaViewer(file_path, self)
@@ -2615,11 +6617,9 @@ class IDE(QMainWindow):
                 QMessageBox.warning(self, "Unsupported File Type",
                                     f"Opening files of type '{file_ext}' is not fully supported in the editor. "
                                     "Attempting to open as plain text if possible, otherwise it will show a viewer.")
-                with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                    content = f.read()
                 editor = CodeEditor(self, self) # Pass self (IDE instance)
-                editor.setText(content)
-                editor.document().setModified(False)
+                editor.apply_theme(self.current_theme)
+                load_language = None
                 editor.setFont(self.current_font) # Apply current font
                 editor.setTabStopWidth(QFontMetrics(self.current_font).width(' ' * 4))
                 new_widget_instance = editor
@@ -2633,21 +6633,58 @@ class IDE(QMainWindow):
             target_tab_widget.setCurrentIndex(tab_index)
 
             self.tab_paths[new_widget_instance] = file_path # Store using widget as key
+            get_symbol_index().update_file(file_path) # Make its symbols available even outside the workspace
+            recent_files.record(os.path.abspath(file_path))
             
             # Update current_editor and active_tab_widget
             self._set_active_tab_widget(tab_index, target_tab_widget) 
 
-            self.apply_theme(self.current_theme)
             self._update_edit_actions_state()
-            self.statusBar().showMessage(f"Opened: {os.path.basename(file_path)}", 2000)
+            if isinstance(new_widget_instance, CodeEditor):
+                self._start_loading(new_widget_instance, file_path, load_language)
+            else:
+                self.statusBar().showMessage(f"Opened: {os.path.basename(file_path)}", 2000)
         else:
             QMessageBox.critical(self, "Error", f"Could not create viewer for file: {file_path}")
 
+    # Streams a file into a freshly added editor tab, showing the progress in the tab text.
+    # Closing the tab cancels the load.
+    def _start_loading(self, editor, file_path, language):
+        tab_name = os.path.basename(file_path)
+
+        def set_tab_text(text, tooltip):
+            tab_widget, index = self.tab_paths.location(editor)
+            if tab_widget:
+                tab_widget.setTabText(index, text)
+                tab_widget.setTabToolTip(index, tooltip)
+
+        def on_finished():
+            set_tab_text(tab_name, file_path)
+            self.statusBar().showMessage(f"Opened: {tab_name}", 2000)
+            jump = self._pending_jumps.pop(editor, None)
+            if jump:
+                self._show_line(editor, *jump)
+
+        def on_failed(message):
+            set_tab_text(tab_name, file_path)
+            self._pending_jumps.pop(editor, None)
+            QMessageBox.critical(self, "Error Opening File", f"Could not read file '{tab_name}': {message}")
+
+        editor.load_progress.connect(lambda percent: set_tab_text(f"{tab_name} ({percent}%)",
+                                                                  "Loading... close the tab to cancel"))
+        editor.load_finished.connect(on_finished)
+        editor.load_failed.connect(on_failed)
+        set_tab_text(f"{tab_name} (0%)", "Loading... close the tab to cancel")
+        editor.load_file(file_path, language)
+
     # Saves the content of the current active editor to its associated file path.
     def _save_file(self):
         if not self.current_editor or not isinstance(self.current_editor, CodeEditor):
             QMessageBox.information(self, "Save", "Only code editor files can be saved.")
             return
+        if self.current_editor.loading:
+            self.statusBar().showMessage("The file is still loading.", 2000)
+            return
 
         file_path = self.tab_paths.get(self.current_editor)
 
@@ -2670,7 +6707,7 @@ class IDE(QMainWindow):
                     if process.exitCode() == 0:
                         with open(temp_file_path, 'r', encoding='utf-8') as f:
                             formatted_content = f.read()
-                        self.current_editor.setText(formatted_content)
+                        self.current_editor.setPlainText(formatted_content)
                         self.statusBar().showMessage(f"Auto-formatted and saved: {os.path.basename(file_path)}", 2000)
                     else:
                         self.statusBar().showMessage(f"Black formatting failed for {os.path.basename(file_path)}", 2000)
@@ -2684,6 +6721,9 @@ class IDE(QMainWindow):
                     self.statusBar().showMessage(f"Saved: {os.path.basename(file_path)}", 2000)
 
                 self.current_editor.document().setModified(False)
+                get_symbol_index().update_file(file_path)
+                get_trigram_index().update_file(file_path)
+                get_file_index().update_file(file_path)
             except Exception as e:
                 QMessageBox.critical(self, "Error", f"Could not save file: {e}")
 
@@ -2692,43 +6732,21 @@ class IDE(QMainWindow):
         if not self.current_editor or not isinstance(self.current_editor, CodeEditor):
             QMessageBox.information(self, "Save As", "Only code editor files can be saved.")
             return
+        if self.current_editor.loading:
+            self.statusBar().showMessage("The file is still loading.", 2000)
+            return
 
-        # Define file filters for various programming languages and common file types
-        file_filters = (
-            "Python Files (*.py);;"
-            "Java Files (*.java);;"
-            "HTML Files (*.html);;"
-            "JavaScript Files (*.js);;"
-            "C++ Files (*.cpp *.cxx *.cc *.h *.hpp);;"
-            "C# Files (*.cs);;"
-            "CSS Files (*.css);;"
-            "SCSS Files (*.scss);;"
-            "SQL Files (*.sql);;"
-            "Swift Files (*.swift);;"
-            "Ruby Files (*.rb);;"
-            "Go Files (*.go);;"
-            "Rust Files (*.rs);;"
-            "PHP Files (*.php);;"
-            "Perl Files (*.pl);;"
-            "Kotlin Files (*.kt);;"
-            "React Native Files (*.jsx *.tsx);;"
-            "XML Files (*.xml *.xsd *.xsl *.svg);;"
-            "JSON Files (*.json);;"
-            "Markdown Files (*.md);;"
-            "Shell Script Files (*.sh *.bash);;"
-            "TypeScript Files (*.ts *.tsx);;"
-            "Vue Files (*.vue);;"
-            "Dart Files (*.dart);;"
-            "R Files (*.r);;"
-            "Text Files (*.txt);;"
-            "All Files (*.*)"
-        )
+        # File filters for every registered language and common file types
+        file_filters = language_file_filters()
         file_path, _ = QFileDialog.getSaveFileName(self, "Save File As", self.current_directory, file_filters)
         if file_path:
             try:
                 with open(file_path, 'w', encoding='utf-8') as f:
                     f.write(self.current_editor.toPlainText())
                 self.current_editor.document().setModified(False)
+                get_symbol_index().update_file(file_path)
+                get_trigram_index().update_file(file_path)
+                get_file_index().update_file(file_path)
 
                 # Update tab_paths: remove old entry if it exists, add new one
                 old_file_path = self.tab_paths.get(self.current_editor)
@@ -2742,8 +6760,7 @@ class IDE(QMainWindow):
                 if tab_index != -1:
                     self.active_tab_widget.setTabText(tab_index, os.path.basename(file_path))
                 
-                file_ext = os.path.splitext(file_path)[1].lower()
-                self.current_editor.set_highlighter(file_ext) # Apply new highlighter based on extension
+                self.current_editor.set_highlighter(language_for_path(file_path)) # Apply new highlighter based on file type
 
                 self.statusBar().showMessage(f"Saved as: {os.path.basename(file_path)}", 2000)
             except Exception as e:
@@ -2777,10 +6794,21 @@ class IDE(QMainWindow):
             elif reply == QMessageBox.Cancel:
                 return # Do not close the tab if cancelled
         
-        # Stop media playback if closing a media viewer
-        if isinstance(widget_to_close, MediaViewer) and widget_to_close.player and \
-           widget_to_close.player.state() != QMediaPlayer.StoppedState:
-            widget_to_close.player.stop()
+        if self.find_bar.editor is widget_to_close:
+            self.find_bar.set_editor(None)
+
+        # Stop streaming the file in if it is still loading
+        if isinstance(widget_to_close, CodeEditor):
+            widget_to_close.cancel_load()
+            self._pending_jumps.pop(widget_to_close, None)
+
+        # Stop indexing and unmap the file if closing a large file or image viewer
+        if isinstance(widget_to_close, (LargeFileViewer, TiledImageViewer)):
+            widget_to_close.close_file()
+
+        # Stop media playback and image decoding if closing a media viewer
+        if isinstance(widget_to_close, MediaViewer):
+            widget_to_close.close_media()
 
         # Remove the file from tracking dictionaries
         if widget_to_close in self.tab_paths:
@@ -2856,6 +6884,9 @@ class IDE(QMainWindow):
         new_dir = QFileDialog.getExistingDirectory(self, "Select Directory", self.current_directory)
         if new_dir:
             self.current_directory = new_dir
+            get_symbol_index().set_root(new_dir)
+            get_trigram_index().set_root(new_dir)
+            get_file_index().set_root(new_dir)
             self.file_model.setRootPath(self.current_directory)
             self.file_tree.setRootIndex(self.file_model.index(self.current_directory))
             self.dir_path_display.setText(self.current_directory)
@@ -2868,16 +6899,12 @@ class IDE(QMainWindow):
         for widget, file_path in self.tab_paths.items():
             if isinstance(widget, CodeEditor) and file_path and file_path.lower().endswith('.py'):
                 # Find which tab widget this widget belongs to
+                tab_widget, tab_index = self.tab_paths.location(widget)
                 tab_text = ""
-                for i in range(self.left_tab_widget.count()):
-                    if self.left_tab_widget.widget(i) == widget:
-                        tab_text = self.left_tab_widget.tabText(i)
-                        break
-                if not tab_text and not self.right_tab_widget.isHidden():
-                    for i in range(self.right_tab_widget.count()):
-                        if self.right_tab_widget.widget(i) == widget:
-                            tab_text = self.right_tab_widget.tabText(i) + " (Right Panel)"
-                            break
+                if tab_widget == self.left_tab_widget:
+                    tab_text = tab_widget.tabText(tab_index)
+                elif tab_widget == self.right_tab_widget and not self.right_tab_widget.isHidden():
+                    tab_text = tab_widget.tabText(tab_index) + " (Right Panel)"
                 if tab_text:
                     python_files_open.append((file_path, tab_text, widget))
 
@@ -2917,16 +6944,7 @@ class IDE(QMainWindow):
                 self.current_editor = editor_for_run
                 
                 # Find the tab widget that contains this editor
-                found_tab_widget = None
-                for i in range(self.left_tab_widget.count()):
-                    if self.left_tab_widget.widget(i) == editor_for_run:
-                        found_tab_widget = self.left_tab_widget
-                        break
-                if not found_tab_widget and not self.right_tab_widget.isHidden():
-                    for i in range(self.right_tab_widget.count()):
-                        if self.right_tab_widget.widget(i) == editor_for_run:
-                            found_tab_widget = self.right_tab_widget
-                            break
+                found_tab_widget = self.tab_paths.location(editor_for_run)[0]
                 
                 if found_tab_widget:
                     self.active_tab_widget = found_tab_widget
@@ -3026,7 +7044,7 @@ class IDE(QMainWindow):
                 try:
                     with open(file_path, 'r', encoding='utf-8') as f:
                         content = f.read()
-                    self.current_editor.setText(content)
+                    self.current_editor.setPlainText(content)
                     self.current_editor.document().setModified(False)
                     self.statusBar().showMessage(f"File formatted by Black: {os.path.basename(file_path)}", 2000)
                 except Exception as e:
@@ -3086,15 +7104,20 @@ class IDE(QMainWindow):
                 return
             try:
                 os.rename(old_file_path, new_file_path) # Rename the file on disk
+                get_symbol_index().update_file(old_file_path)
+                get_symbol_index().update_file(new_file_path)
+                get_trigram_index().update_file(old_file_path)
+                get_file_index().update_file(old_file_path)
+                get_trigram_index().update_file(new_file_path)
+                get_file_index().update_file(new_file_path)
                 
-                # Update tracking dictionaries
-                del self.tab_paths[widget_to_rename]
+                # Update tracking dictionaries; unsaved changes stay tracked
                 self.tab_paths[widget_to_rename] = new_file_path
-                source_tab_widget.setTabText(index, os.path.basename(new_file_path))
+                modified = '*' if widget_to_rename in self.tab_paths.dirty else ''
+                source_tab_widget.setTabText(index, modified + os.path.basename(new_file_path))
                 
-                file_ext = os.path.splitext(new_file_path)[1].lower()
                 if isinstance(widget_to_rename, CodeEditor):
-                    widget_to_rename.set_highlighter(file_ext) # Update highlighter for new extension
+                    widget_to_rename.set_highlighter(language_for_path(new_file_path)) # Update highlighter for new file type
 
                 self.statusBar().showMessage(f"Renamed '{old_file_name}' to '{new_file_name}'", 2000)
                 # Refresh file tree view to reflect the rename
@@ -3233,8 +7256,7 @@ class IDE(QMainWindow):
         for widget, file_path in self.tab_paths.items():
             if isinstance(widget, CodeEditor):
                 if file_path:
-                    file_ext = os.path.splitext(file_path)[1].lower()
-                    widget.set_highlighter(file_ext)
+                    widget.set_highlighter(language_for_path(file_path))
                 else:
                     # If file is untitled, re-detect language based on content
                     widget.language_detected = False
@@ -3259,19 +7281,82 @@ class IDE(QMainWindow):
         # Apply setting to all existing and new code editors
         for widget in self.tab_paths.keys(): # Iterate through widgets in tab_paths
             if isinstance(widget, CodeEditor):
-                widget.completer.setCompletionMode(QCompleter.PopupCompletion if self.completer_enabled else QCompleter.Disabled)
+                widget.set_completer_enabled(self.completer_enabled)
         # Also apply to current editor if it's not yet in tab_paths (e.g., new untitled)
         if self.current_editor and isinstance(self.current_editor, CodeEditor) and self.current_editor not in self.tab_paths:
-            self.current_editor.completer.setCompletionMode(QCompleter.PopupCompletion if self.completer_enabled else QCompleter.Disabled)
+            self.current_editor.set_completer_enabled(self.completer_enabled)
         self.statusBar().showMessage(f"Completer: {'Enabled' if self.completer_enabled else 'Disabled'}", 2000)
 
-    # Displays the find dialog for searching text in the current editor.
-    def _show_find_dialog(self):
-        if self.current_editor and isinstance(self.current_editor, CodeEditor):
-            self.find_dialog.set_editor(self.current_editor)
-            self.find_dialog.exec_()
-        else:
+    # Shows the completion latency counters.
+    def _show_completion_stats(self):
+        QMessageBox.information(self, "Completion Latency", completion_stats.summary())
+
+    # Returns the LargeFileViewer in the active tab, if that is what it shows.
+    def _current_large_file_viewer(self):
+        widget = self.active_tab_widget.currentWidget() if self.active_tab_widget else None
+        return widget if isinstance(widget, LargeFileViewer) else None
+
+    # Returns the text selected in the current editor if it lies on one line, else "".
+    def _selected_line_text(self):
+        if not isinstance(self.current_editor, CodeEditor):
+            return ""
+        text = self.current_editor.textCursor().selectedText()
+        return "" if '\u2029' in text else text # QTextCursor's paragraph separator: the selection spans lines
+
+    # Shows the find bar for the current editor, starting from the selected text if there is some on one line.
+    def _show_find_bar(self):
+        editor = self.current_editor if isinstance(self.current_editor, CodeEditor) else self._current_large_file_viewer()
+        if editor is None:
             QMessageBox.information(self, "Find", "No active code editor to search in.")
+            return
+        self.find_bar.set_editor(editor)
+        self.find_bar.show_query(self._selected_line_text())
+
+    # Shows the find in files panel, starting from the selected text if there is some on one line.
+    def _show_find_in_files(self):
+        self.find_in_files_panel.show_query(self._selected_line_text())
+
+    # Opens a file and shows a line (1-based), selecting 'length' characters from 'column'. Editors
+    # still streaming the file in jump there once it is loaded.
+    def open_file_at(self, file_path, line_number, column=0, length=0):
+        self.open_file(file_path, self.active_tab_widget or self.left_tab_widget)
+        widget = self.tab_paths.widget_for_path(file_path)
+        if isinstance(widget, LargeFileViewer):
+            if not widget.go_to_line(line_number):
+                self.statusBar().showMessage("That line has not been indexed yet.", 2000)
+        elif isinstance(widget, CodeEditor):
+            if widget.loading:
+                self._pending_jumps[widget] = (line_number, column, length)
+            else:
+                self._show_line(widget, line_number, column, length)
+
+    # Moves an editor's cursor to a line (1-based), selecting 'length' characters from 'column'. Both
+    # count Python characters, which the line's text converts to Qt's UTF-16 positions.
+    def _show_line(self, editor, line_number, column=0, length=0):
+        block = editor.document().findBlockByNumber(max(0, min(line_number, editor.blockCount()) - 1))
+        cursor = QTextCursor(block)
+        if length:
+            astral = astral_positions(block.text())
+            start, end = utf16_offset(astral, column), utf16_offset(astral, column + length)
+            cursor.setPosition(block.position() + min(start, block.length() - 1))
+            cursor.setPosition(block.position() + min(end, block.length() - 1), QTextCursor.KeepAnchor)
+        editor.setTextCursor(cursor)
+        editor.centerCursor()
+        editor.setFocus()
+
+    # Asks for a line number and moves the current editor or large file viewer to it.
+    def _go_to_line(self):
+        viewer = self._current_large_file_viewer()
+        if viewer:
+            line_number, ok = QInputDialog.getInt(self, "Go to Line", "Line number:", 1, 1, viewer.index.line_count())
+            if ok and not viewer.go_to_line(line_number):
+                self.statusBar().showMessage("That line has not been indexed yet.", 2000)
+        elif self.current_editor and isinstance(self.current_editor, CodeEditor):
+            editor = self.current_editor
+            line_number, ok = QInputDialog.getInt(self, "Go to Line", "Line number:",
+                                                  editor.textCursor().blockNumber() + 1, 1, editor.blockCount())
+            if ok:
+                self._show_line(editor, line_number)
 
     # Toggles the auto-save feature.
     def _toggle_auto_save(self):
@@ -3290,17 +7375,8 @@ class IDE(QMainWindow):
 
     # Performs an auto-save operation for the current modified file.
     def _perform_auto_save(self):
-        # Iterate through all open code editors in both tab widgets
-        all_code_editors = []
-        for i in range(self.left_tab_widget.count()):
-            widget = self.left_tab_widget.widget(i)
-            if isinstance(widget, CodeEditor):
-                all_code_editors.append(widget)
-        if not self.right_tab_widget.isHidden():
-            for i in range(self.right_tab_widget.count()):
-                widget = self.right_tab_widget.widget(i)
-                if isinstance(widget, CodeEditor):
-                    all_code_editors.append(widget)
+        # Only the editors with unsaved changes need a look
+        all_code_editors = [widget for widget in list(self.tab_paths.dirty) if isinstance(widget, CodeEditor)]
 
         saved_count = 0
         for editor in all_code_editors:
@@ -3311,6 +7387,9 @@ class IDE(QMainWindow):
                         with open(file_path, 'w', encoding='utf-8') as f:
                             f.write(editor.toPlainText())
                         editor.document().setModified(False)
+                        get_symbol_index().update_file(file_path)
+                        get_trigram_index().update_file(file_path)
+                        get_file_index().update_file(file_path)
                         self.statusBar().showMessage(f"Auto-saved: {os.path.basename(file_path)}", 1000)
                         saved_count += 1
                     else: # If it's an untitled file, save to session file
@@ -3336,6 +7415,8 @@ class IDE(QMainWindow):
                 if isinstance(widget, CodeEditor):
                     widget.setFont(self.current_font)
                     widget.setTabStopWidth(QFontMetrics(self.current_font).width(' ' * 4))
+                elif isinstance(widget, LargeFileViewer):
+                    widget.setFont(self.current_font)
             # Also apply to current editor if it's not yet in tab_paths (e.g., new untitled)
             if self.current_editor and isinstance(self.current_editor, CodeEditor) and self.current_editor not in self.tab_paths:
                 self.current_editor.setFont(self.current_font)
@@ -3374,148 +7455,30 @@ class IDE(QMainWindow):
     # Returns the specific terminal associated with a given editor widget.
     def get_terminal_for_editor(self, editor_widget):
         # Determine which tab widget the editor belongs to
-        for i in range(self.left_tab_widget.count()):
-            if self.left_tab_widget.widget(i) == editor_widget:
-                return self.left_terminal
-        for i in range(self.right_tab_widget.count()):
-            if self.right_tab_widget.widget(i) == editor_widget:
-                return self.right_terminal
-        return self.left_terminal # Fallback if editor not found or not a code editor
+        if self.tab_paths.location(editor_widget)[0] == self.right_tab_widget:
+            return self.right_terminal
+        return self.left_terminal # Left panel, or fallback if editor not found or not a code editor
 
     # Displays the Quick Switcher dialog.
     def _show_quick_switcher(self):
         dialog = QuickSwitcherDialog(self, self)
         dialog.exec_()
 
-    # Applies the selected theme to the entire IDE.
+    # Applies the selected theme to the entire IDE. The stylesheet is set once on the application, so
+    # widgets created later are styled when they are first shown without re-polishing the others.
     def apply_theme(self, theme_name):
         self.current_theme = theme_name
-        theme = THEMES[theme_name]
-
-        self.setStyleSheet(f"""
-            QMainWindow {{
-                background-color: {theme["bg_color"]};
-                color: {theme["text_color"]};
-            }}
-            QTabWidget::pane {{
-                border: 1px solid {theme["border_color"]};
-                border-radius: 5px;
-            }}
-            QTabBar::tab {{
-                background: {theme["tab_bg"]};
-                color: {theme["tab_text"]};
-                border: 1px solid {theme["border_color"]};
-                border-bottom-color: {theme["border_color"]};
-                border-top-left-radius: 4px;
-                border-top-right-radius: 4px;
-                padding: 5px 10px;
-                margin-right: 2px;
-            }}
-            QTabBar::tab:selected {{
-                background: {theme["tab_selected_bg"]};
-                color: {theme["text_color"]};
-                border-bottom-color: {theme["tab_selected_bg"]};
-            }}
-            QTabBar::tab:hover {{
-                background: {theme["current_line_bg"]};
-            }}
-            QSplitter::handle {{
-                background-color: {theme["border_color"]};
-                width: 3px;
-                height: 3px;
-            }}
-            QTreeView {{
-                background-color: {theme["bg_color"]};
-                color: {theme["text_color"]};
-                border: 1px solid {theme["border_color"]};
-                border-radius: 5px;
-            }}
-            QTreeView::item:selected {{
-                background-color: {theme["file_tree_selection_bg"]}; /* Blue highlight for selected items */
-                color: {theme["file_tree_selection_text"]}; /* White text for file tree selection */
-                border-radius: 3px; /* Rounded corners for selected item */
-                padding: 2px; /* Add some padding */
-            }}
-            QTreeView::branch:selected {{
-                background-color: {theme["file_tree_selection_bg"]}; /* Ensure branch also highlights blue */
-            }}
-            QPlainTextEdit {{ /* Terminal */
-                background-color: {theme["terminal_bg"]};
-                color: {theme["terminal_text"]};
-                border: 1px solid {theme["border_color"]};
-                border-radius: 5px;
-            }}
-            QLineEdit {{
-                background-color: {theme["terminal_bg"]};
-                color: {theme["terminal_text"]};
-                border: 1px solid {theme["border_color"]};
-                padding: 2px;
-                border-radius: 3px;
-            }}
-            QPushButton {{
-                background-color: {theme["current_line_bg"]};
-                color: {theme["text_color"]};
-                border: 1px solid {theme["border_color"]};
-                border-radius: 5px;
-                padding: 3px 8px;
-            }}
-            QPushButton:hover {{
-                background-color: {theme["selection_bg"]};
-            }}
-            QMenu {{
-                background-color: {theme["bg_color"]};
-                color: {theme["text_color"]};
-                border: 1px solid {theme["border_color"]};
-            }}
-            QMenu::item:selected {{
-                background-color: {theme["selection_bg"]};
-            }}
-            QDialog {{
-                background-color: {theme["bg_color"]};
-                color: {theme["text_color"]};
-                border-radius: 5px;
-            }}
-            QLabel {{
-                color: {theme["text_color"]};
-            }}
-            QCheckBox {{
-                color: {theme["text_color"]};
-            }}
-            QCompleter {{
-                border: 1px solid {theme["border_color"]};
-                border-radius: 4px;
-                background-color: {theme["completer_bg"]};
-                color: {theme["completer_text"]};
-                selection-background-color: {theme["completer_selection_bg"]};
-            }}
-            QCompleter::item:selected {{
-                background-color: {theme["completer_selection_bg"]};
-                color: {theme["completer_text"]};
-            }}
-            QuickSwitcherDialog {{
-                background-color: {theme["bg_color"]};
-                color: {theme["text_color"]};
-                border: 1px solid {theme["border_color"]};
-                border-radius: 5px;
-            }}
-            QuickSwitcherDialog QLineEdit {{
-                background-color: {theme["terminal_bg"]};
-                color: {theme["terminal_text"]};
-                border: 1px solid {theme["border_color"]};
-                padding: 5px;
-                border-radius: 3px;
-            }}
-            QuickSwitcherDialog QListView {{
-                background-color: {theme["bg_color"]};
-                color: {theme["text_color"]};
-                border: 1px solid {theme["border_color"]};
-                border-radius: 5px;
-            }}
-            QuickSwitcherDialog QListView::item:selected {{
-                background-color: {theme["file_tree_selection_bg"]};
-                color: {theme["file_tree_selection_text"]};
-            }}
-        """)
+        stylesheet = theme_stylesheet(theme_name)
+        app = QApplication.instance()
+        if app.styleSheet() != stylesheet: # Setting even the same sheet again re-polishes every widget
+            # Replacing one application sheet with another re-polishes each widget once per styled
+            # ancestor; clearing it first makes Qt swap the style and polish each widget only once.
+            app.setStyleSheet("")
+            app.setStyleSheet(stylesheet)
+        for widget in self.tab_paths: # Editor gutters and large file and image viewers paint themselves
+            if isinstance(widget, (CodeEditor, LargeFileViewer, TiledImageViewer)):
+                widget.apply_theme(theme_name)
+        self.find_bar.apply_theme(theme_name) # So do the find highlights
 
 
 if __name__ == "__main__":